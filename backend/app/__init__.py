@@ -15,9 +15,13 @@ from flask_uploads import configure_uploads, IMAGES, UploadSet
 from config import Config
 from flask_caching import Cache
 from app.utils.tasks import make_celery
+from app.utils.json_provider import FastJSONProvider
+from app.utils.db_routing import RoutingSession, init_replicas
+import importlib
 import os
+import threading
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 migrate = Migrate()
 limiter = Limiter(key_func=get_remote_address, default_limits=["1000 per day", "200 per hour"])
@@ -34,13 +38,66 @@ def configure_logging():
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
 
-def create_app():
+# (module, blueprint, URL prefix) of every blueprint of the API
+BLUEPRINTS = [
+    ('app.routes.auth', 'bp', '/api/v1/auth'),
+    ('app.routes.google_auth', 'google_auth', '/api/v1/google_auth/'),
+    ('app.routes.profile_routes', 'profile_bp', '/api/v1/profile'),
+    ('app.routes.two_factor_auth', 'two_factor_auth_bp', '/api/v1/auth/2fa'),
+    ('app.routes.role_permissions', 'role_permissions_bp', '/api/v1/role_permissions'),
+    ('app.routes.projects', 'projects_bp', '/api/v1/projects'),
+    ('app.routes.categories', 'categories_bp', '/api/v1/categories'),
+    ('app.routes.backer_routes', 'backer_bp', '/api/v1/backers'),
+    ('app.routes.notifications', 'notifications_bp', '/api/v1/notifications'),
+    ('app.routes.reward_routes', 'reward_bp', '/api/v1/rewards'),
+    ('app.routes.payout_routes', 'payout_bp', '/api/v1/payouts'),
+    ('app.routes.bank_account_routes', 'bank_account_bp', '/api/v1/bank-accounts'),
+    ('app.routes.analytics_routes', 'analytics_bp', '/api/v1/analytics'),
+    ('app.routes.upload_routes', 'uploads_bp', '/api/v1/uploads'),
+    ('app.routes.admin_routes', 'admin_bp', '/api/v1/admin'),
+]
+
+def register_blueprints(app):
+    """Import and register every blueprint in BLUEPRINTS."""
+    for module_name, attribute, url_prefix in BLUEPRINTS:
+        blueprint = getattr(importlib.import_module(module_name), attribute)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+class LazyBlueprintLoader:
+    """
+    WSGI middleware that registers the blueprints right before the first request.
+
+    Used with ``LAZY_BLUEPRINTS``: ``create_app`` returns without importing the
+    routes, and the first request pays for them instead. Flask only accepts
+    blueprints until it handles a request, hence registering them here rather
+    than in a request hook. Call ``register_blueprints`` directly when routes
+    are needed outside a request (``url_for`` in CLI commands).
+    """
+
+    def __init__(self, app, wsgi_app):
+        self.app = app
+        self.wsgi_app = wsgi_app
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def __call__(self, environ, start_response):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    register_blueprints(self.app)
+                    self.loaded = True
+        return self.wsgi_app(environ, start_response)
+
+def create_app(config_overrides=None):
 
     # Configure logging first
     configure_logging()
 
     app = Flask(__name__, static_folder='static', static_url_path='/static')
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
 
     app.config['UPLOAD_FOLDER'] = 'app/static/uploads/profiles'
     
@@ -61,6 +118,7 @@ def create_app():
         cache.init_app(app)
 
         db.init_app(app)
+        init_replicas(app)
         migrate.init_app(app, db)
         jwt.init_app(app)
         limiter.init_app(app)
@@ -72,57 +130,44 @@ def create_app():
         CORS(app, supports_credentials=True, resources={
             r"/api/*": {
                 "origins": ["http://localhost:3000"],  # Add your frontend URL
-                "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-                "allow_headers": ["Content-Type", "Authorization"],
-                "expose_headers": ["Content-Type", "Authorization"],
+                "methods": ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+                "allow_headers": ["Content-Type", "Authorization", "Idempotency-Key", "Upload-Offset"],
+                "expose_headers": ["Content-Type", "Authorization", "Idempotent-Replayed", "Upload-Offset"],
                 "max_age": 600  # Cache preflight requests for 10 minutes
             }
         })
-        # auth-related routes
-        from app.routes.auth import bp as auth_bp
-        app.register_blueprint(auth_bp, url_prefix='/api/v1/auth')
-
-        # auth/google-related routes
-        from app.routes.google_auth import google_auth
-        app.register_blueprint(google_auth, url_prefix='/api/v1/google_auth/')
-
-        # User-related routes
-        from app.routes.profile_routes import profile_bp
-        app.register_blueprint(profile_bp, url_prefix='/api/v1/profile')
-
-        # 2fa-related routes
-        from app.routes.two_factor_auth import two_factor_auth_bp
-        app.register_blueprint(two_factor_auth_bp, url_prefix='/api/v1/auth/2fa')
-
-        # Admin routes
-        from app.routes.role_permissions import role_permissions_bp
-        app.register_blueprint(role_permissions_bp, url_prefix='/api/v1/role_permissions')
-
-        # Project-related routes
-        from app.routes.projects import projects_bp
-        app.register_blueprint(projects_bp, url_prefix='/api/v1/projects')
-
-        # Categories-related routes
-        from app.routes.categories import categories_bp
-        app.register_blueprint(categories_bp, url_prefix='/api/v1/categories')
-
-        # Backers-related routes
-        from app.routes.backer_routes import backer_bp
-        app.register_blueprint(backer_bp, url_prefix='/api/v1/backers')
-
-        # Notification-related routes
-        from app.routes.notifications import notifications_bp  # Import the notifications blueprint
-        app.register_blueprint(notifications_bp, url_prefix='/api/v1/notifications')  # Register the blueprint
-
-        #Reward-related routes
-        from app.routes.reward_routes import reward_bp
-        app.register_blueprint(reward_bp, url_prefix='/api/v1/rewards')
-
-        from app.routes.payout_routes import payout_bp
-        app.register_blueprint(payout_bp, url_prefix='/api/v1/payouts')
-
-        from app.routes.bank_account_routes import bank_account_bp
-        app.register_blueprint(bank_account_bp, url_prefix='/api/v1/bank-accounts')
+        if app.config.get('LAZY_BLUEPRINTS'):
+            # Import the routes (and the services behind them) when the first request arrives
+            app.wsgi_app = LazyBlueprintLoader(app, app.wsgi_app)
+        else:
+            register_blueprints(app)
+
+        # Keep the admin dashboard aggregates up to date
+        from app.services.platform_metrics_service import register_metric_listeners
+        register_metric_listeners()
+
+        # Reference counts of content-addressed media
+        from app.services.media_blob_service import register_blob_ref_listeners
+        register_blob_ref_listeners()
+
+        # Invalidate service cache tags when tagged models change
+        from app.services.cache_tags import register_cache_tag_listeners
+        register_cache_tag_listeners()
+
+        # Send Stripe calls to a stand-in API when configured
+        if app.config.get('STRIPE_API_BASE'):
+            from app.utils.lazy_import import when_imported
+            api_base = app.config['STRIPE_API_BASE']
+            when_imported('stripe', lambda stripe: setattr(stripe, 'api_base', api_base))
+
+        # Prometheus instrumentation and /metrics (scraping must not use up the rate limits)
+        from app.utils.metrics import init_metrics, metrics_view
+        init_metrics(app)
+        limiter.exempt(metrics_view)
+
+        # CLI commands
+        from app.cli import register_commands
+        register_commands(app)
 
         @app.errorhandler(422)
         def handle_validation_error(e):
@@ -1,4 +1,4 @@
-# In app/cli.py or similar file where you define Flask CLI commands
+# app/cli.py
 import click
 from flask.cli import with_appcontext
 from app import db
@@ -14,5 +14,78 @@ def update_backers_count_command():
     db.session.commit()
     click.echo('Updated backers count for all projects.')
 
-# Register the command
-app.cli.add_command(update_backers_count_command)
\ No newline at end of file
+@click.command('backfill-funding-rollups')
+@click.option('--project-id', type=int, default=None, help='Only rebuild rollups for this project.')
+@click.option('--batch-size', type=int, default=10000, show_default=True, help='Donations read per batch.')
+@with_appcontext
+def backfill_funding_rollups_command(project_id, batch_size):
+    """Rebuild hourly/daily funding rollups from donation history."""
+    from app.services.analytics_service import AnalyticsService
+    stats = AnalyticsService().backfill(project_id=project_id, batch_size=batch_size)
+    click.echo(f"Scanned {stats['donations_scanned']} donations, "
+               f"upserted {stats['rollup_rows_upserted']} rollup rows.")
+
+@click.command('rebuild-platform-metrics')
+@with_appcontext
+def rebuild_platform_metrics_command():
+    """Recompute the admin dashboard aggregates from the source tables."""
+    from app.services.platform_metrics_service import PlatformMetricsService
+    stats = PlatformMetricsService().rebuild()
+    click.echo(f"Rebuilt platform metrics from {stats['contributions']} aggregates.")
+
+@click.command('release-expired-reservations')
+@click.option('--limit', type=int, default=500, show_default=True, help='Maximum holds released per run.')
+@with_appcontext
+def release_expired_reservations_command(limit):
+    """Give back reward units held by abandoned checkouts."""
+    from app.services.reward_inventory_service import RewardInventoryService
+    released = RewardInventoryService().release_expired(limit=limit)
+    click.echo(f"Released {released} expired reward reservations.")
+
+@click.command('gc-media-blobs')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Blobs examined per batch.')
+@click.option('--grace-seconds', type=int, default=None, help='Override MEDIA_BLOB_GC_GRACE.')
+@click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted.')
+@with_appcontext
+def gc_media_blobs_command(batch_size, grace_seconds, max_batches, dry_run):
+    """Delete stored media that nothing has referenced for the grace period."""
+    from app.services.media_blob_service import MediaBlobService
+    stats = MediaBlobService().collect_garbage(
+        batch_size=batch_size, grace_seconds=grace_seconds, max_batches=max_batches, dry_run=dry_run
+    )
+    prefix = 'Would delete' if dry_run else 'Deleted'
+    click.echo(f"{prefix} {stats['blobs_deleted']} blobs ({stats['bytes_reclaimed']} bytes), "
+               f"skipped {stats['skipped']}.")
+
+@click.command('generate-image-variants')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Images examined per batch.')
+@with_appcontext
+def generate_image_variants_command(batch_size):
+    """Render the thumbnail/card/hero variants of stored images that lack them."""
+    from app.services.media_blob_service import MediaBlobService
+    stats = MediaBlobService().generate_missing_variants(batch_size=batch_size)
+    click.echo(f"Generated variants for {stats['generated']} of {stats['examined']} images.")
+
+@click.command('reap-orphaned-uploads')
+@click.option('--grace-seconds', type=int, default=None, help='Override ORPHAN_UPLOAD_GRACE.')
+@click.option('--quarantine', is_flag=True, help='Move orphans to ORPHAN_UPLOAD_QUARANTINE_DIR instead of deleting them.')
+@click.option('--dry-run', is_flag=True, help='Only report what would be reaped.')
+@with_appcontext
+def reap_orphaned_uploads_command(grace_seconds, quarantine, dry_run):
+    """Remove uploaded files that no project, media or user references."""
+    from app.services.orphan_reaper_service import OrphanReaperService
+    stats = OrphanReaperService().reap(grace_seconds=grace_seconds, quarantine=quarantine, dry_run=dry_run)
+    action = 'Would reap' if dry_run else ('Quarantined' if quarantine else 'Deleted')
+    click.echo(f"{action} {stats['files_reaped']} of {stats['files_scanned']} files "
+               f"({stats['bytes_reclaimed']} bytes), {stats['recent']} within the grace period.")
+
+def register_commands(app):
+    """Register the custom CLI commands on the app."""
+    app.cli.add_command(update_backers_count_command)
+    app.cli.add_command(backfill_funding_rollups_command)
+    app.cli.add_command(rebuild_platform_metrics_command)
+    app.cli.add_command(release_expired_reservations_command)
+    app.cli.add_command(gc_media_blobs_command)
+    app.cli.add_command(generate_image_variants_command)
+    app.cli.add_command(reap_orphaned_uploads_command)
@@ -14,14 +14,20 @@ from .comment import Comment
 from .project_update import ProjectUpdate
 from .tag import Tag
 from .faq import FAQ
-from .media import Media, MediaType
+from .media import Media, MediaType, MediaBlob
+from .upload_session import UploadSession
 
 # Financial models
 from .donation import Donation
 # from .payment import Payment, PaymentStatus, PaymentMethod
 from .reward import Reward
+from .reward_reservation import RewardReservation
 from .token_blocklist import TokenBlocklist
 
+# Analytics models
+from .funding_rollup import ProjectFundingRollup
+from .platform_metric import PlatformMetric
+
 # We don't need to create a Base here since we're using Flask-SQLAlchemy
 # The db.Model will serve as our declarative base
 
@@ -30,5 +30,11 @@ class Donation(db.Model):
     project = db.relationship("Project", back_populates="donations")
     reward = db.relationship("Reward", back_populates="donations", foreign_keys=[reward_id])
 
+    # Hot query shapes, see app.utils.query_plans
+    __table_args__ = (
+        db.Index('ix_donations_project_user', 'project_id', 'user_id', 'amount', 'created_at'),
+        db.Index('ix_donations_project_status', 'project_id', 'status', 'amount'),
+    )
+
     def __repr__(self):
         return f'<Donation {self.amount} {self.currency} to Project {self.project_id}>'
\ No newline at end of file
@@ -100,3 +100,31 @@ class PaymentProvider(Enum):
     @classmethod
     def from_string(cls, value):
         return cls._from_str(value, default=cls.STRIPE)
+
+
+class RollupGranularity(Enum):
+    HOUR = 'HOUR'
+    DAY = 'DAY'
+
+    @classmethod
+    def from_string(cls, value):
+        try:
+            return cls[str(value).upper()]
+        except KeyError:
+            raise ValueError(f"Invalid granularity: {value}. Must be one of: hour, day")
+
+    def truncate(self, moment):
+        """Return the start of the bucket that contains ``moment``."""
+        if self is RollupGranularity.HOUR:
+            return moment.replace(minute=0, second=0, microsecond=0)
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+class ReservationStatus(Enum):
+    HELD = 'HELD'
+    CONFIRMED = 'CONFIRMED'
+    RELEASED = 'RELEASED'
+
+class UploadStatus(Enum):
+    IN_PROGRESS = 'IN_PROGRESS'
+    COMPLETED = 'COMPLETED'
+    ABORTED = 'ABORTED'
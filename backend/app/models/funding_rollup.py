@@ -0,0 +1,37 @@
+# app/models/funding_rollup.py
+from sqlalchemy.sql import func
+from app import db
+from .enums import RollupGranularity
+
+class ProjectFundingRollup(db.Model):
+    """Pre-aggregated funding activity for a project, one row per time bucket."""
+    __tablename__ = 'project_funding_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    granularity = db.Column(db.Enum(RollupGranularity), nullable=False)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    donation_count = db.Column(db.Integer, nullable=False, default=0)
+    new_backers = db.Column(db.Integer, nullable=False, default=0)
+    refund_count = db.Column(db.Integer, nullable=False, default=0)
+    refund_amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+    # The unique key doubles as the index serving a project's series as one range read
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'granularity', 'bucket_start', name='uix_funding_rollup_bucket'),
+    )
+
+    def to_dict(self):
+        return {
+            'bucket_start': self.bucket_start.isoformat(),
+            'amount': float(self.amount or 0),
+            'donation_count': self.donation_count or 0,
+            'new_backers': self.new_backers or 0,
+            'refund_count': self.refund_count or 0,
+            'refund_amount': float(self.refund_amount or 0),
+        }
+
+    def __repr__(self):
+        return f'<ProjectFundingRollup project={self.project_id} {self.granularity.value} {self.bucket_start}>'
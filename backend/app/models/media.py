@@ -1,3 +1,4 @@
+from datetime import datetime
 from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean
 from sqlalchemy.orm import relationship
 from app import db
@@ -15,8 +16,42 @@ class Media(db.Model):
     project_id = db.Column(db.Integer, ForeignKey('projects.id'), nullable=False)
     type = db.Column(db.Enum(MediaType), nullable=False)
     url = db.Column(db.String(255), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of a content-addressed url
     caption = db.Column(db.String(255))
     order = db.Column(db.Integer, default=0)
 
     project = db.relationship("Project", back_populates="media")
-    
\ No newline at end of file
+
+class MediaBlob(db.Model):
+    """
+    A stored file, addressed by the SHA-256 of its content.
+
+    ``ref_count`` is the number of rows (project images/videos, media items,
+    profile images) currently pointing at the blob; blobs that stay
+    unreferenced past the grace period are removed by the garbage collector.
+    """
+    __tablename__ = 'media_blobs'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    extension = db.Column(db.String(10), nullable=False)
+    subfolder = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_media_blobs_gc', 'ref_count', 'updated_at'),
+    )
+
+    @property
+    def relative_path(self):
+        return f"{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}.{self.extension}"
+
+    @property
+    def key(self):
+        """Storage key of the blob, see app.utils.storage."""
+        return f"{self.subfolder}/{self.relative_path}"
+
+    def __repr__(self):
+        return f'<MediaBlob {self.sha256[:12]} refs={self.ref_count}>'
@@ -17,6 +17,12 @@ class Notification(db.Model):
     
     user = db.relationship("User", back_populates="notifications")
 
+    # Hot query shapes, see app.utils.query_plans
+    __table_args__ = (
+        db.Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        db.Index('ix_notifications_user_read_created', 'user_id', 'read_at', 'created_at'),
+    )
+
 
     def to_dict(self):
         return {
@@ -24,8 +30,8 @@ class Notification(db.Model):
             'user_id': self.user_id,
             'type': self.type.name if self.type else None,
             'message': self.message,
-            'read_at': self.read_at.isoformat() if self.read_at else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'read_at': self.read_at,
+            'created_at': self.created_at,
             'project_id': self.project_id
         }
 
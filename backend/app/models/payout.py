@@ -30,6 +30,11 @@ class Payout(db.Model):
     # Relationships
     project = db.relationship("Project", back_populates="payouts")
     user = db.relationship("User", back_populates="payouts")
+
+    # Hot query shapes, see app.utils.query_plans
+    __table_args__ = (
+        db.Index('ix_payouts_user_created', 'user_id', 'created_at'),
+    )
     
     def __repr__(self):
         return f'<Payout {self.amount} {self.currency} for Project {self.project_id}>'
\ No newline at end of file
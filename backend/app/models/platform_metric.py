@@ -0,0 +1,28 @@
+# app/models/platform_metric.py
+from sqlalchemy.sql import func
+from app import db
+
+class PlatformMetric(db.Model):
+    """
+    Incrementally maintained platform-wide counter.
+
+    ``period`` is ``'all'`` for running totals or an ISO date (``YYYY-MM-DD``)
+    for daily buckets, ``dimension`` is ``''`` when the metric is not broken down.
+    """
+    __tablename__ = 'platform_metrics'
+
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(db.String(50), nullable=False)
+    dimension = db.Column(db.String(50), nullable=False, default='')
+    period = db.Column(db.String(10), nullable=False, default='all')
+    count = db.Column(db.BigInteger, nullable=False, default=0)
+    amount = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('metric', 'dimension', 'period', name='uix_platform_metric_key'),
+        db.Index('ix_platform_metric_period', 'period', 'metric'),
+    )
+
+    def __repr__(self):
+        return f'<PlatformMetric {self.metric}[{self.dimension}] {self.period}={self.count}/{self.amount}>'
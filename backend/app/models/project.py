@@ -4,6 +4,7 @@ from . import db
 from decimal import Decimal
 from datetime import datetime
 from .enums import ProjectStatus
+from app.utils.image_utils import image_srcset
 
 project_backers = Table('project_backers', db.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
@@ -36,6 +37,13 @@ class Project(db.Model):
     deleted_at = Column(DateTime)
     backers_count = db.Column(db.Integer, default=0)
 
+    # Hot query shapes, see app.utils.query_plans
+    __table_args__ = (
+        db.Index('ix_projects_status_created', 'status', 'created_at'),
+        db.Index('ix_projects_creator_status', 'creator_id', 'status'),
+        db.Index('ix_projects_deleted_created', 'is_deleted', 'created_at'),
+    )
+
     payouts = db.relationship("Payout", back_populates="project")
     # Add a field to track if the project funds are available for withdrawal
     funds_available = db.Column(db.Boolean, default=False)
@@ -93,16 +101,17 @@ class Project(db.Model):
             "description": self.description,
             "goal_amount": self.goal_amount,
             "current_amount": self.current_amount,
-            "start_date": self.start_date.isoformat(),
-            "end_date": self.end_date.isoformat(),
-            "created_at": self.created_at.isoformat(),
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "created_at": self.created_at,
             "creator_id": self.creator_id,
             "category_id": self.category_id,
             "image_url": self.image_url,
-            "status": self.status.value,
+            "image_srcset": image_srcset(self.image_url),
+            "status": self.status,
             "featured": self.featured,
             "risk_and_challenges": self.risk_and_challenges,
             "video_url": self.video_url,
             "is_deleted": self.is_deleted,
-            "deleted_at": self.deleted_at.isoformat() if self.deleted_at else None,
+            "deleted_at": self.deleted_at,
         }
\ No newline at end of file
@@ -0,0 +1,41 @@
+# app/models/reward_reservation.py
+from datetime import datetime
+from app import db
+from .enums import ReservationStatus
+
+class RewardReservation(db.Model):
+    """
+    One unit of a limited reward held for a donation while checkout is open.
+
+    Held and confirmed reservations are both counted in ``Reward.quantity_claimed``;
+    releasing a held reservation gives its unit back.
+    """
+    __tablename__ = 'reward_reservations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    reward_id = db.Column(db.Integer, db.ForeignKey('rewards.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    donation_id = db.Column(db.Integer, db.ForeignKey('donations.id'), nullable=True, unique=True)
+    status = db.Column(db.Enum(ReservationStatus), nullable=False, default=ReservationStatus.HELD)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    confirmed_at = db.Column(db.DateTime, nullable=True)
+    released_at = db.Column(db.DateTime, nullable=True)
+    release_reason = db.Column(db.String(50), nullable=True)
+
+    # Serves the sweep for expired holds
+    __table_args__ = (
+        db.Index('ix_reward_reservations_status_expires', 'status', 'expires_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'reward_id': self.reward_id,
+            'donation_id': self.donation_id,
+            'status': self.status.value,
+            'expires_at': self.expires_at.isoformat(),
+        }
+
+    def __repr__(self):
+        return f'<RewardReservation reward={self.reward_id} donation={self.donation_id} {self.status.value}>'
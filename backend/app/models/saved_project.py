@@ -16,6 +16,8 @@ class SavedProject(db.Model):
     # Define unique constraint to prevent duplicate saves
     __table_args__ = (
         db.UniqueConstraint('user_id', 'project_id', name='uix_user_project'),
+        # The saved list, newest first (see app.utils.query_plans)
+        db.Index('ix_saved_projects_user_created', 'user_id', 'created_at'),
     )
     
     def __repr__(self):
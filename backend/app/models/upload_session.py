@@ -0,0 +1,42 @@
+# app/models/upload_session.py
+from datetime import datetime
+from app import db
+from .enums import UploadStatus
+
+class UploadSession(db.Model):
+    """A resumable upload whose bytes are appended in chunks until it is completed."""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    extension = db.Column(db.String(10), nullable=False)
+    subfolder = db.Column(db.String(10), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    checksum = db.Column(db.String(64), nullable=True)  # Expected SHA-256, hex encoded
+    status = db.Column(db.Enum(UploadStatus), nullable=False, default=UploadStatus.IN_PROGRESS)
+    url = db.Column(db.String(255), nullable=True)
+    is_direct = db.Column(db.Boolean, nullable=False, default=False)  # Sent to object storage via a presigned URL
+    # Set while one append writes the chunk at received_size
+    chunk_token = db.Column(db.String(32), nullable=True)
+    chunk_claimed_until = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'total_size': self.total_size,
+            'received_size': self.received_size,
+            'status': self.status.value,
+            'url': self.url,
+            'direct': self.is_direct,
+            'expires_at': self.expires_at.isoformat(),
+        }
+
+    def __repr__(self):
+        return f'<UploadSession {self.id} {self.received_size}/{self.total_size} {self.status.value}>'
@@ -10,7 +10,10 @@ from flask import url_for
 from flask import current_app
 from datetime import datetime
 from app.models.association_tables import user_roles  # Import the association table
-import pyotp
+from app.utils.image_utils import image_srcset
+from app.utils.lazy_import import lazy_module
+
+pyotp = lazy_module('pyotp')
 
 # class UserRole(PyEnum):
 #     USER = 'user'
@@ -185,6 +188,9 @@ class User(db.Model):
     def get_profile_image_url(self):
         if not self.profile_image:
             return None
+        # Images uploaded to the media store are saved with their URL, older ones by file name
+        if '/' in self.profile_image:
+            return self.profile_image
         return url_for('static', filename=f'uploads/profiles/{self.profile_image}', _external=True)
 
     def to_dict(self, include_private=False):
@@ -194,14 +200,15 @@ class User(db.Model):
             'full_name': self.full_name,
             'bio': self.bio,
             'profile_image': self.get_profile_image_url(),
+            'profile_image_srcset': image_srcset(self.profile_image),
             'website': self.website,
             'twitter': self.twitter,
             'location': self.location,
-            'created_at': self.created_at.isoformat(),
+            'created_at': self.created_at,
             'is_active': self.is_active,
             'is_verified': self.is_verified,
             'roles': [role.name for role in self.roles],  # List of role names
-            'last_login': self.last_login.isoformat() if self.last_login else None,
+            'last_login': self.last_login,
             'projects_created_count': len(self.projects_created),
             'backed_projects_count': len(self.backed_projects),
             'total_donations': self.get_total_donations(),
@@ -214,7 +221,7 @@ class User(db.Model):
                 'email': self.email,
                 'preferences': self.preferences or {},
                 'stripe_customer_id': getattr(self, 'stripe_customer_id', None),
-                'last_password_change': self.last_password_change.isoformat() if self.last_password_change else None
+                'last_password_change': self.last_password_change
             }
             base_dict.update(private_dict)
 
@@ -0,0 +1,28 @@
+# app/routes/admin_routes.py
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required
+from app.services.platform_metrics_service import PlatformMetricsService
+from app.utils.response import success_response, error_response
+from app.utils.decorators import permission_required
+import logging
+
+admin_bp = Blueprint('admin', __name__)
+platform_metrics_service = PlatformMetricsService()
+logger = logging.getLogger(__name__)
+
+@admin_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+@permission_required('view_platform_metrics')
+def get_platform_metrics():
+    """Get platform-wide GMV, fees, payouts, projects and signups."""
+    try:
+        days = request.args.get('days', 30, type=int)
+        result = platform_metrics_service.get_dashboard(days=days)
+
+        if 'error' in result:
+            return error_response(message=result['error'], status_code=result.get('status_code', 400))
+
+        return success_response(data=result)
+    except Exception as e:
+        logger.error(f"Error in get_platform_metrics: {str(e)}")
+        return error_response(message="An unexpected error occurred", status_code=500)
@@ -0,0 +1,58 @@
+# app/routes/analytics_routes.py
+from flask import Blueprint, request
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app.services.analytics_service import AnalyticsService
+from app.models.project import Project
+from app.utils.response import success_response, error_response
+from app.utils.decorators import permission_required
+from datetime import datetime
+import logging
+
+analytics_bp = Blueprint('analytics', __name__)
+analytics_service = AnalyticsService()
+logger = logging.getLogger(__name__)
+
+def _parse_datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    # Rollups are bucketed in naive UTC
+    return parsed.replace(tzinfo=None)
+
+@analytics_bp.route('/projects/<int:project_id>/funding', methods=['GET'])
+@jwt_required()
+@permission_required('view_project_analytics')
+def get_project_funding(project_id):
+    """Get hourly or daily funding rollups for a project."""
+    try:
+        project = Project.query.get(project_id)
+        if not project:
+            return error_response(message="Project not found", status_code=404)
+
+        current_user_id = get_jwt_identity()
+        user_roles = get_jwt().get('roles', [])
+        if current_user_id != project.creator_id and 'Admin' not in user_roles:
+            return error_response(message="You don't have permission to view this project's analytics", status_code=403)
+
+        try:
+            start = _parse_datetime_arg('start')
+            end = _parse_datetime_arg('end')
+        except ValueError:
+            return error_response(message="start and end must be ISO 8601 datetimes", status_code=400)
+
+        result = analytics_service.get_project_series(
+            project_id,
+            granularity=request.args.get('granularity', 'day'),
+            start=start,
+            end=end,
+            fill=request.args.get('fill', 'true').lower() != 'false'
+        )
+
+        if 'error' in result:
+            return error_response(message=result['error'], status_code=result.get('status_code', 400))
+
+        return success_response(data=result)
+    except Exception as e:
+        logger.error(f"Error in get_project_funding: {str(e)}")
+        return error_response(message="An unexpected error occurred", status_code=500)
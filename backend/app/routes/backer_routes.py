@@ -3,14 +3,14 @@
 from flask import Blueprint, request, current_app, url_for
 from app.services.backer_service import BackerService
 from app.utils.response import success_response, error_response
-from app.utils.decorators import permission_required
+from app.utils.decorators import permission_required, query_budget
 from app.utils.rate_limit import rate_limit
+from app.utils.idempotency import idempotent
 from app.services.email_service import send_templated_email
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 from app import db
 from app.models.donation import Donation
-from sqlalchemy.orm import Session
 from app.schemas.backer_schemas import (
     BackProjectSchema,
     ProjectUpdateSchema,
@@ -27,9 +27,11 @@ logger = logging.getLogger(__name__)
 @jwt_required()
 @rate_limit(limit=5, per=60)
 @permission_required('back_project')
+@idempotent()
 def back_project(project_id):
     logger.info(f"Attempting to back project {project_id}")
-    
+    donation_id = None
+
     try:
         schema = BackProjectSchema()
         sanitized_data = sanitize_input(request.json)
@@ -86,6 +88,9 @@ def back_project(project_id):
         
     except Exception as e:
         logger.error(f"Unexpected error in back_project: {str(e)}")
+        if donation_id is not None:
+            # The donation is committed; undo it so a retry with the same Idempotency-Key can't double it
+            backer_service.donation_service.abandon_donation(donation_id, 'Checkout could not be started')
         return error_response(
             message="An unexpected error occurred", 
             status_code=500
@@ -147,36 +152,35 @@ def get_donation_details(donation_id):
     Get details of a specific donation.
     """
     try:
-        with Session(db.engine) as session:
-            donation = session.query(Donation).get(donation_id)
-            
-            if not donation:
-                return error_response(message="Donation not found", status_code=404)
-            
-            # Get associated project and user details
-            project = donation.project
-            user = donation.user
-            
-            result = {
-                'id': donation.id,
-                'amount': float(donation.amount),
-                'currency': donation.currency,
-                'status': donation.status.value,
-                'created_at': donation.created_at.isoformat(),
-                'project_id': project.id,
-                'project_title': project.title,
-                'user_id': user.id,
-                'username': user.username
+        donation = db.session.get(Donation, donation_id)
+        
+        if not donation:
+            return error_response(message="Donation not found", status_code=404)
+        
+        # Get associated project and user details
+        project = donation.project
+        user = donation.user
+        
+        result = {
+            'id': donation.id,
+            'amount': float(donation.amount),
+            'currency': donation.currency,
+            'status': donation.status.value,
+            'created_at': donation.created_at.isoformat(),
+            'project_id': project.id,
+            'project_title': project.title,
+            'user_id': user.id,
+            'username': user.username
+        }
+        
+        if donation.reward:
+            result['reward'] = {
+                'id': donation.reward.id,
+                'title': donation.reward.title
             }
-            
-            if donation.reward:
-                result['reward'] = {
-                    'id': donation.reward.id,
-                    'title': donation.reward.title
-                }
-            
-            return success_response(data=result)
-            
+        
+        return success_response(data=result)
+        
     except Exception as e:
         logger.error(f"Error getting donation details: {str(e)}")
         return error_response(message="An unexpected error occurred", status_code=500)
@@ -184,6 +188,7 @@ def get_donation_details(donation_id):
 @backer_bp.route('/projects/<int:project_id>/backers', methods=['GET'])
 @jwt_required()
 @permission_required('view_backers')
+@query_budget(5)
 def list_project_backers(project_id):
     """
     Endpoint for listing backers of a project.
@@ -217,9 +222,6 @@ def list_user_backed_projects(user_id):
     # Check if the user has the required permission
     logger.info(f"Checking permission 'view_user_backed_projects' for user {current_user_id}")
     
-    # Log request headers for debugging
-    logger.debug(f"Request headers: {dict(request.headers)}")
-
     result = backer_service.get_user_backed_projects(user_id, page, per_page, status)
     if 'error' in result:
         logger.error(f"Error in list_user_backed_projects: {result['error']}")
@@ -7,6 +7,9 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 import logging
 from app.models.user import User
 from app import db
+from app.utils.lazy_import import lazy_module
+
+stripe = lazy_module('stripe')
 
 bank_account_bp = Blueprint('bank_account_bp', __name__)
 stripe_service = StripeService()
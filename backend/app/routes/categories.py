@@ -2,11 +2,14 @@
 
 from flask import Blueprint, request, jsonify
 from app.services.category_service import (
-    create_category, get_category_by_id, get_all_categories, update_category, delete_category
+    create_category, get_category_data, get_all_categories_data, update_category, delete_category
 )
+from app.utils.exceptions import CategoryNotFoundError
 from flask_jwt_extended import jwt_required
 import logging
 from app.utils.decorators import permission_required
+from app.utils.conditional import etag
+from app.services.cache_tags import CATEGORIES_TAG, category_tag
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -34,17 +37,13 @@ def create_new_category():
         return jsonify({'error': str(e)}), 500
 
 @categories_bp.route('/<int:category_id>', methods=['GET'])
+@etag(tags=lambda category_id: [category_tag(category_id)], policy='reference')
 def get_category(category_id):  # Remove @jwt_required() and @permission_required
     """Retrieve a specific category by ID."""
     try:
-        category = get_category_by_id(category_id)
-        if category:
-            return jsonify({
-                'id': category.id,
-                'name': category.name
-            }), 200
-        else:
-            return jsonify({'error': 'Category not found'}), 404
+        return jsonify(get_category_data(category_id)), 200
+    except CategoryNotFoundError:
+        return jsonify({'error': 'Category not found'}), 404
     except Exception as e:
         logger.error(f'Error retrieving category with ID {category_id}: {e}')
         return jsonify({'error': str(e)}), 500
@@ -53,16 +52,13 @@ def get_category(category_id):  # Remove @jwt_required() and @permission_require
 @categories_bp.route('/', methods=['GET'])
 @jwt_required()
 @permission_required('view_categories')
+@etag(tags=lambda: [CATEGORIES_TAG], policy='private')
 def get_all_categories_route():
     """Retrieve all categories."""
     try:
-        categories = get_all_categories()
         return jsonify({
             "status": "success",
-            "data": [{
-                'id': category.id,
-                'name': category.name
-            } for category in categories]
+            "data": get_all_categories_data()
         }), 200
     except Exception as e:
         logger.error(f'Error retrieving all categories: {e}')
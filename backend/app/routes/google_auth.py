@@ -1,7 +1,6 @@
 # backend/app/routes/google_auth.py
 
 from flask import Blueprint, redirect, url_for, session, request, current_app
-from authlib.integrations.flask_client import OAuth
 from app import db
 from app.models.user import User
 from app.models.role import Role  # Make sure to import Role explicitly
@@ -17,6 +16,9 @@ logger = logging.getLogger(__name__)
 google_auth = Blueprint('google_auth', __name__)
 
 def init_oauth(app):
+    # authlib is only needed once someone signs in with Google
+    from authlib.integrations.flask_client import OAuth
+
     oauth = OAuth(app)
     google = oauth.register(
         name='google',
@@ -27,17 +29,19 @@ def init_oauth(app):
     )
     return google
 
-@google_auth.before_app_request
-def setup_oauth():
-    global google
-    google = init_oauth(current_app)
+def get_google():
+    """The Google OAuth client of the current app, registered on first use."""
+    google = current_app.extensions.get('google_oauth_client')
+    if google is None:
+        google = current_app.extensions['google_oauth_client'] = init_oauth(current_app)
+    return google
 
 @google_auth.route('/login/google')
 def login():
     state = secrets.token_urlsafe(16)
     session['oauth_state'] = state
     redirect_uri = url_for('google_auth.authorized', _external=True)
-    return google.authorize_redirect(redirect_uri, state=state)
+    return get_google().authorize_redirect(redirect_uri, state=state)
 
 @google_auth.route('/login/google/authorized')
 def authorized():
@@ -48,13 +52,13 @@ def authorized():
             return redirect(f"{current_app.config['FRONTEND_URL']}/signin?error=invalid_state")
 
         # Exchange authorization code for tokens
-        token = google.authorize_access_token()
+        token = get_google().authorize_access_token()
         if not token:
             current_app.logger.error("Failed to get token from Google")
             return redirect(f"{current_app.config['FRONTEND_URL']}/signin?error=token_error")
 
         # Get user info from Google
-        resp = google.get('https://www.googleapis.com/oauth2/v3/userinfo')
+        resp = get_google().get('https://www.googleapis.com/oauth2/v3/userinfo')
         user_info = resp.json()
         
         if not user_info.get('email'):
@@ -3,6 +3,7 @@ from flask import Blueprint, request, current_app
 from app.services.payout_service import PayoutService
 from app.utils.response import success_response, error_response
 from app.utils.decorators import permission_required
+from app.utils.idempotency import idempotent
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import logging
 from app.utils.input_sanitizer import sanitize_input
@@ -32,6 +33,7 @@ def check_payout_eligibility(project_id):
 @payout_bp.route('/projects/<int:project_id>/payouts', methods=['POST'])
 @jwt_required()
 @permission_required('create_payout')
+@idempotent()
 def request_payout(project_id):
     """Request a payout for a project."""
     try:
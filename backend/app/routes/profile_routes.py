@@ -3,7 +3,7 @@ from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.user_service import UserService  # Update this import
 from app.utils.response import api_response
-from app.utils.decorators import permission_required
+from app.utils.decorators import permission_required, query_budget
 import logging
 
 # Configure logging
@@ -15,6 +15,7 @@ profile_bp = Blueprint('profile', __name__)
 
 @profile_bp.route('/', methods=['GET'])
 @jwt_required()
+@query_budget(6)
 def get_profile():
     current_user_id = get_jwt_identity()
     
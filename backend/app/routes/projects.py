@@ -5,12 +5,14 @@ from app import jwt, limiter
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt, verify_jwt_in_request
 import logging
 from app.services.project_service import (
-    create_project, get_project_by_id, update_project, delete_project, get_all_projects, get_user_drafts, activate_project
+    create_project, get_project_by_id, update_project, delete_project, get_all_projects, get_user_drafts, activate_project,
+    get_project_data, get_discovery_data
 )
 from app.utils.exceptions import ProjectNotFoundError, ValidationError
 from app.utils.response import api_response
 from app.models.enums import ProjectStatus
 from app.utils.file_utils import handle_file_upload
+from app.services.upload_service import UploadService
 from app.models.saved_project import SavedProject
 from app import db
 from app.services.project_role_service import ProjectRoleService
@@ -18,19 +20,32 @@ from app.models.project import Project
 from datetime import datetime
 from app.utils.project_utils import validate_project_data
 from werkzeug.datastructures import CombinedMultiDict
-from app.utils.decorators import permission_required
+from werkzeug.security import safe_join
+from app.utils.image_utils import original_for_variant
+from app.utils.media_serving import send_media
+from app.utils.decorators import permission_required, query_budget
 from app.services.notification_service import NotificationService
 from app.services.email_service import send_templated_email
 from app.utils.rate_limit import rate_limit
+from app.utils.conditional import etag
+from app.utils.db_routing import replica_reads
+from app.services.cache_tags import PROJECTS_TAG, project_tag
 import os
 from app.utils.sharing import generate_share_link, validate_share_link
 from sqlalchemy import or_, and_  
+from sqlalchemy.orm import joinedload
+from app.utils.project_projections import (
+    FIELDS_PARAM, parse_fields, load_fields, compile_serializer, serialize_projects
+)
 
 # logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 projects_bp = Blueprint('projects', __name__)
 
+# Search results default to this compact shape (plus category_name) unless ?fields= is given
+SEARCH_RESULT_FIELDS = ('id', 'title', 'description', 'image_url', 'created_at')
+
 @projects_bp.before_request
 def handle_preflight():
     if request.method == 'OPTIONS':
@@ -40,51 +55,59 @@ def handle_preflight():
 @projects_bp.route('/uploads/<path:filename>/')
 # @jwt_required()
 def uploaded_file(filename):
-    """Serve uploaded files with proper MIME types"""
+    """Serve uploaded files with validators, long-lived caching and byte ranges"""
+    # Split the path to get subfolder and actual filename, which is
+    # either a plain name or a hash-sharded path (ab/cd/<sha256>.<ext>)
+    parts = filename.split('/')
+    if len(parts) not in (2, 4):
+        logger.warning(f"Invalid file path format: {filename}")
+        return api_response(message="Invalid file path", status_code=400)
+
+    subfolder, actual_filename = parts[0], '/'.join(parts[1:])
+
+    # Determine the correct upload directory based on subfolder
+    if subfolder == 'photos':
+        upload_dir = current_app.config['UPLOADED_PHOTOS_DEST']
+    elif subfolder == 'videos':
+        upload_dir = current_app.config['UPLOADED_VIDEOS_DEST']
+    else:
+        logger.warning(f"Invalid subfolder requested: {subfolder}")
+        return api_response(message="Invalid subfolder", status_code=400)
+
     try:
-        logger.info(f"Attempting to serve file: {filename}")
-        
-        # Split the path to get subfolder and actual filename
-        parts = filename.split('/')
-        if len(parts) != 2:
-            logger.error(f"Invalid file path format: {filename}")
-            return api_response(message="Invalid file path", status_code=400)
-            
-        subfolder, actual_filename = parts
-        
-        # Determine the correct upload directory based on subfolder
-        if subfolder == 'photos':
-            upload_dir = current_app.config['UPLOADED_PHOTOS_DEST']
-        elif subfolder == 'videos':
-            upload_dir = current_app.config['UPLOADED_VIDEOS_DEST']
-        else:
-            logger.error(f"Invalid subfolder requested: {subfolder}")
-            return api_response(message="Invalid subfolder", status_code=400)
-        
-        if not os.path.exists(os.path.join(upload_dir, actual_filename)):
-            logger.error(f"File not found: {actual_filename} in {upload_dir}")
-            abort(404)
-            
-        logger.info(f"Serving file from directory: {upload_dir}")
-        logger.info(f"File name: {actual_filename}")
-        
-        response = send_from_directory(
-            upload_dir,
-            actual_filename,
-            as_attachment=False
-        )
-        
+        try:
+            response = send_media(upload_dir, subfolder, actual_filename)
+        except FileNotFoundError:
+            # Image variants are rendered in the background, serve the original until
+            # then, without the immutable caching the variant itself will get
+            original = original_for_variant(safe_join(upload_dir, actual_filename) or '')
+            if not original:
+                raise
+            response = send_media(upload_dir, subfolder, os.path.relpath(original, upload_dir), immutable=False)
+
         # Add CORS headers
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Origin, Accept, Content-Type'
-        
+        response.headers['Access-Control-Allow-Headers'] = 'Origin, Accept, Content-Type, Range, If-None-Match'
+        response.headers['Access-Control-Expose-Headers'] = 'Content-Range, Accept-Ranges, ETag'
+
         return response
-        
-    except Exception as e:
-        logger.error(f"Error serving uploaded file {filename}: {str(e)}")
+
+    except FileNotFoundError:
         return api_response(message="File not found", status_code=404)
 
+def attach_completed_uploads(data, user_id):
+    """Replace image_upload_id/video_upload_id with the URL of the completed resumable upload."""
+    for id_field, url_field, extensions_key in (
+        ('image_upload_id', 'image_url', 'ALLOWED_EXTENSIONS'),
+        ('video_upload_id', 'video_url', 'ALLOWED_VIDEO_EXTENSIONS'),
+    ):
+        upload_id = data.pop(id_field, None)
+        if upload_id:
+            data[url_field] = UploadService.resolve_upload_url(
+                upload_id, user_id, current_app.config[extensions_key]
+            )
+
 @projects_bp.before_request
 @limiter.limit("100 per minute")
 def limit_blueprint_requests():
@@ -134,6 +157,8 @@ def create_draft_project():
         if not data:
             return api_response(message="No data received", status_code=400)
 
+        attach_completed_uploads(data, get_jwt_identity())
+
         # Set draft status
         data['status'] = ProjectStatus.DRAFT
         data['creator_id'] = get_jwt_identity()
@@ -167,9 +192,6 @@ def create_draft_project():
 @rate_limit(limit=5, per=60)  # 5 requests per minute
 def create_new_project():
     try:
-        logger.info(f"Request method: {request.method}")
-        logger.info(f"Request headers: {request.headers}")
-
         # Handle form data or JSON data
         if request.content_type.startswith('multipart/form-data'):
             # Handle form data with file uploads
@@ -386,6 +408,7 @@ def update_existing_project(project_id):
             )
             logger.info(f"Image uploaded: {data['image_url']}")
 
+        attach_completed_uploads(data, data['creator_id'])
 
         updated_project = update_project(project_id, data)
         return api_response(data=updated_project.to_dict(), message="Project updated successfully", status_code=200)
@@ -413,11 +436,15 @@ def delete_existing_project(project_id):
 @projects_bp.route('/<int:project_id>', methods=['GET'])
 @jwt_required()
 @permission_required('view_projects')
+@etag(tags=lambda project_id: [project_tag(project_id)], policy='private')
+@replica_reads
 def get_project(project_id):
-    """Get a single project by ID"""
+    """Get a single project by ID, ``?fields=`` picks a projection or fields (default ``detail``)"""
     try:
-        project = get_project_by_id(project_id)
-        return api_response(data=project.to_dict(), status_code=200)
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
+        return api_response(data=get_project_data(project_id, fields), status_code=200)
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except ProjectNotFoundError as e:
         return api_response(message=str(e), status_code=404)
     except Exception as e:
@@ -427,20 +454,22 @@ def get_project(project_id):
 @projects_bp.route('/', methods=['GET'])
 @jwt_required()
 @permission_required('view_projects')
+@replica_reads
 def get_projects():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
         
         # Get current user info
         current_user_id = get_jwt_identity()
         jwt_data = get_jwt()
         user_roles = jwt_data.get('roles', [])
         
-        # Base query
-        query = Project.query
+        # Base query, loading only the columns of the requested fields
+        query = Project.query.options(load_fields(fields))
         
         # For MyProjectsPage, we want to show only the user's own projects
         # Check if this is a request for user's own projects
@@ -473,7 +502,7 @@ def get_projects():
         
         # Apply additional filters from request
         filters = {k: v for k, v in request.args.items() 
-                  if k not in ['page', 'per_page', 'sort_by', 'sort_order', 'my_projects', 'status']}
+                  if k not in ['page', 'per_page', 'sort_by', 'sort_order', 'my_projects', 'status', FIELDS_PARAM]}
                   
         for key, value in filters.items():
             if hasattr(Project, key):
@@ -490,7 +519,7 @@ def get_projects():
         projects_pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
         return api_response(data={
-            'projects': [project.to_dict() for project in projects_pagination.items],
+            'projects': serialize_projects(projects_pagination.items, fields),
             'total': projects_pagination.total,
             'pages': projects_pagination.pages,
             'current_page': page,
@@ -498,6 +527,8 @@ def get_projects():
             'sort_order': sort_order,
             'filters': filters
         }, status_code=200)
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f'Error retrieving projects: {e}')
         return api_response(message="An unexpected error occurred", status_code=500)
@@ -552,18 +583,23 @@ def get_pending_projects():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
+        
         pending_projects = Project.query.filter_by(status=ProjectStatus.PENDING)\
+            .options(load_fields(fields))\
             .paginate(page=page, per_page=per_page, error_out=False)
         
         return api_response(
             data={
-                'projects': [project.to_dict() for project in pending_projects.items],
+                'projects': serialize_projects(pending_projects.items, fields),
                 'total': pending_projects.total,
                 'pages': pending_projects.pages,
                 'current_page': page
             },
             status_code=200
         )
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f"Error fetching pending projects: {str(e)}")
         return api_response(message="Failed to fetch pending projects", status_code=500)
@@ -679,9 +715,10 @@ def get_my_projects():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status', None)
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
         
         # Query projects created by current user
-        query = Project.query.filter_by(creator_id=user_id)
+        query = Project.query.filter_by(creator_id=user_id).options(load_fields(fields))
         
         # Filter by status if provided
         if status:
@@ -694,7 +731,7 @@ def get_my_projects():
         paginated_projects = query.paginate(page=page, per_page=per_page)
         
         # Format response
-        projects = [p.to_dict() for p in paginated_projects.items]
+        projects = serialize_projects(paginated_projects.items, fields)
         
         meta = {
             'page': page,
@@ -707,6 +744,8 @@ def get_my_projects():
             data={'projects': projects, 'meta': meta},
             status_code=200
         )
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f'Error fetching user projects: {str(e)}', exc_info=True)
         return api_response(message="An unexpected error occurred", status_code=500)
@@ -719,9 +758,10 @@ def get_user_projects(user_id):
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status', None)
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
         
         # Query projects created by specified user
-        query = Project.query.filter_by(creator_id=user_id)
+        query = Project.query.filter_by(creator_id=user_id).options(load_fields(fields))
         
         # Filter by status if provided
         if status:
@@ -742,7 +782,7 @@ def get_user_projects(user_id):
         paginated_projects = query.paginate(page=page, per_page=per_page)
         
         # Format response
-        projects = [p.to_dict() for p in paginated_projects.items]
+        projects = serialize_projects(paginated_projects.items, fields)
         
         meta = {
             'page': page,
@@ -755,6 +795,8 @@ def get_user_projects(user_id):
             data={'projects': projects, 'meta': meta},
             status_code=200
         )
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f'Error fetching user projects: {str(e)}', exc_info=True)
         return api_response(message="An unexpected error occurred", status_code=500)
@@ -937,16 +979,21 @@ def admin_pending_projects():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
+        fields = parse_fields(request.args.get(FIELDS_PARAM), default='admin')
+        
         # Use filters to get only pending projects
         filters = {'status': ProjectStatus.PENDING}
-        projects_pagination = get_all_projects(page, per_page, 'created_at', 'desc', filters)
+        projects_pagination = get_all_projects(page, per_page, 'created_at', 'desc', filters,
+                                               options=[load_fields(fields)])
         
         return api_response(data={
-            'projects': [project.to_dict() for project in projects_pagination.items],
+            'projects': serialize_projects(projects_pagination.items, fields),
             'total': projects_pagination.total,
             'pages': projects_pagination.pages,
             'current_page': page
         }, status_code=200)
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f"Error fetching pending projects: {str(e)}")
         return api_response(message="Failed to fetch pending projects", status_code=500)
@@ -1035,6 +1082,7 @@ def unsave_project(project_id):
 
 @projects_bp.route('/saved', methods=['GET'])
 @jwt_required()
+@query_budget(3)
 def get_saved_projects():
     """Get all saved projects for the current user"""
     try:
@@ -1043,30 +1091,37 @@ def get_saved_projects():
         # Get pagination parameters
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
-        
-        # Query saved projects with pagination
-        saved_projects_query = SavedProject.query.filter_by(user_id=current_user_id)
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
+        
+        # Query saved projects with pagination, loading the projects (only the columns the
+        # requested fields need) and their categories along
+        saved_projects_query = SavedProject.query.filter_by(user_id=current_user_id).options(
+            joinedload(SavedProject.project).options(
+                load_fields(fields + ('is_deleted',)),
+                joinedload(Project.category)
+            )
+        ).order_by(SavedProject.created_at.desc())
         saved_projects_paginated = saved_projects_query.paginate(
             page=page, per_page=per_page, error_out=False
         )
         
         # Get the actual project data for each saved project
+        serialize = compile_serializer(fields)
         projects = []
         for saved_project in saved_projects_paginated.items:
-            try:
-                project = get_project_by_id(saved_project.project_id)
-                project_dict = project.to_dict()
-                
-                # Add the saved_at date from the SavedProject model
-                project_dict['saved_at'] = saved_project.created_at.isoformat()
-                
-                # Include category information if it exists
-                if project.category:
-                    project_dict['category_name'] = project.category.name
-                    
-                projects.append(project_dict)
-            except ProjectNotFoundError:
+            project = saved_project.project
+            if project is None or project.is_deleted:
                 continue
+            project_dict = serialize(project)
+            
+            # Add the saved_at date from the SavedProject model
+            project_dict['saved_at'] = saved_project.created_at
+            
+            # Include category information if it exists
+            if project.category:
+                project_dict['category_name'] = project.category.name
+                
+            projects.append(project_dict)
         
         return api_response(
             data={
@@ -1078,6 +1133,8 @@ def get_saved_projects():
             status_code=200
         )
         
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f"Error retrieving saved projects: {str(e)}")
         return api_response(
@@ -1086,6 +1143,8 @@ def get_saved_projects():
         )
 
 @projects_bp.route('/search', methods=['GET'])
+@query_budget(2)
+@replica_reads
 def search_projects():
     """Search for active projects"""
     try:
@@ -1093,9 +1152,13 @@ def search_projects():
         category_id = request.args.get('category_id')
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        requested = request.args.get(FIELDS_PARAM)
+        fields = parse_fields(requested) if requested else SEARCH_RESULT_FIELDS
         
         # Base query for active projects
-        projects_query = Project.query.filter_by(status=ProjectStatus.ACTIVE)
+        projects_query = Project.query.filter_by(status=ProjectStatus.ACTIVE).options(
+            load_fields(fields), joinedload(Project.category)
+        )
         
         # Add search filter if query is provided
         if query:
@@ -1120,13 +1183,10 @@ def search_projects():
         )
         
         # Transform the results to include necessary fields for the frontend
+        serialize = compile_serializer(fields)
         project_list = [{
-            'id': p.id,
-            'title': p.title,
-            'description': p.description,
-            'image_url': p.image_url,
+            **serialize(p),
             'category_name': p.category.name if p.category else 'Uncategorized',
-            'created_at': p.created_at.isoformat() if p.created_at else None
         } for p in projects.items]
         
         return api_response(
@@ -1139,11 +1199,14 @@ def search_projects():
             status_code=200
         )
         
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f"Error searching projects: {str(e)}")
         return api_response(message="Search failed", status_code=500)
 
 @projects_bp.route('/discovery', methods=['GET'])
+@etag(tags=lambda: [PROJECTS_TAG], policy='listing')
 def get_discovery_projects():
     """
     Get projects for the discovery section (featured and top projects)
@@ -1152,41 +1215,15 @@ def get_discovery_projects():
     try:
         # Number of projects to return for the grid
         grid_count = request.args.get('count', 4, type=int)
-        
-        # Base query for active projects
-        base_query = Project.query.filter_by(status=ProjectStatus.ACTIVE)
-        
-        # Get one featured project (prioritize projects marked as featured)
-        featured_query = base_query.filter_by(featured=True)
-        featured_project = featured_query.order_by(Project.current_amount.desc()).first()
-        
-        # If no featured projects exist, get the highest funded active project
-        if not featured_project:
-            featured_project = base_query.order_by(Project.current_amount.desc()).first()
-        
-        # Query for grid projects (avoid including the featured project)
-        grid_query = base_query
-        if featured_project:
-            grid_query = grid_query.filter(Project.id != featured_project.id)
-        
-        # Get trending projects based on recent backers or funding progress
-        grid_projects = grid_query.order_by(
-            # Order by percentage funded (for projects with momentum)
-            (Project.current_amount / Project.goal_amount).desc(),
-            # Then by newest
-            Project.created_at.desc()
-        ).limit(grid_count).all()
-        
-        # Format response
-        response_data = {
-            'featured': featured_project.to_dict() if featured_project else None,
-            'trending': [p.to_dict() for p in grid_projects]
-        }
+        fields = parse_fields(request.args.get(FIELDS_PARAM))
+        response_data = get_discovery_data(grid_count, fields)
         
         return api_response(
             data=response_data,
             status_code=200
         )
+    except ValidationError as e:
+        return api_response(message=str(e), status_code=400)
     except Exception as e:
         logger.error(f'Error fetching discovery projects: {str(e)}', exc_info=True)
         return api_response(message="An unexpected error occurred", status_code=500)
\ No newline at end of file
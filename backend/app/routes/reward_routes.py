@@ -3,13 +3,16 @@ from app.services.reward_service import RewardService
 from app.utils.response import success_response, error_response
 from app.utils.decorators import permission_required
 from app.utils.rate_limit import rate_limit
+from app.utils.idempotency import idempotent
+from app.utils.conditional import etag
+from app.services.cache_tags import rewards_tag
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
 from app.schemas.reward_schemas import RewardSchema, RewardUpdateSchema
 from app.models.project import Project
 from app.models.reward import Reward
 import logging
-from app import db, cache
+from app import db
 
 reward_bp = Blueprint('reward_bp', __name__)
 reward_service = RewardService()
@@ -44,8 +47,8 @@ def create_reward(project_id):
 
 @reward_bp.route('/projects/<int:project_id>/rewards', methods=['GET'])
 @jwt_required()
-@cache.memoize(timeout=300)
 @permission_required('list_rewards')
+@etag(tags=lambda project_id: [rewards_tag(project_id)], policy='private')
 def list_rewards(project_id):
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
@@ -72,7 +75,6 @@ def update_reward(project_id, reward_id):
     try:
         data = request.json
         updated_reward = reward_service.update_reward(project_id, reward_id, data)
-        cache.delete_memoized(list_rewards, project_id)
         return success_response(data=updated_reward, message="Reward updated successfully")
     except ValidationError as err:
         return error_response(message=err.messages, status_code=400)
@@ -92,6 +94,7 @@ def delete_reward(project_id, reward_id):
 @reward_bp.route('/projects/<int:project_id>/rewards/<int:reward_id>/claim', methods=['POST'])
 @jwt_required()
 @permission_required('claim_reward')
+@idempotent()
 def claim_reward(project_id, reward_id):
     user_id = get_jwt_identity()
     result = reward_service.claim_reward(project_id, reward_id, user_id)
@@ -0,0 +1,127 @@
+# app/routes/upload_routes.py
+from flask import Blueprint, request, make_response
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.upload_service import UploadService
+from app.utils.response import success_response, error_response
+from app.utils.decorators import permission_required
+import logging
+
+uploads_bp = Blueprint('uploads', __name__)
+upload_service = UploadService()
+logger = logging.getLogger(__name__)
+
+OFFSET_HEADER = 'Upload-Offset'
+
+def _result_response(result, message="Operation successful"):
+    """Turn a service result into a response that always carries the current offset."""
+    if 'error' in result:
+        response = make_response(error_response(
+            message=result['error'],
+            status_code=result.get('status_code', 400),
+            meta={'received_size': result['received_size']} if 'received_size' in result else None
+        ))
+        if 'received_size' in result:
+            response.headers[OFFSET_HEADER] = str(result['received_size'])
+        return response
+
+    response = make_response(success_response(data=result, message=message))
+    response.headers[OFFSET_HEADER] = str(result['received_size'])
+    return response
+
+@uploads_bp.route('', methods=['POST'], strict_slashes=False)
+@jwt_required()
+@permission_required('upload_media')
+def init_upload():
+    """Start a resumable upload: {filename, total_size, checksum (optional SHA-256 hex)}."""
+    try:
+        data = request.get_json() or {}
+        result = upload_service.init_upload(
+            get_jwt_identity(),
+            data.get('filename'),
+            data.get('total_size'),
+            data.get('checksum')
+        )
+        if 'error' in result:
+            return error_response(message=result['error'], status_code=result.get('status_code', 400))
+        response = _result_response(result, message="Upload started")
+        response.status_code = 201
+        return response
+    except Exception as e:
+        logger.error(f"Error in init_upload: {str(e)}")
+        return error_response(message="An unexpected error occurred", status_code=500)
+
+@uploads_bp.route('/direct', methods=['POST'])
+@jwt_required()
+@permission_required('upload_media')
+def init_direct_upload():
+    """
+    Get a presigned URL to put a file straight into object storage:
+    {filename, total_size, checksum (SHA-256 hex)}. Complete it with POST /<id>/complete.
+    """
+    try:
+        data = request.get_json() or {}
+        result = upload_service.init_direct_upload(
+            get_jwt_identity(),
+            data.get('filename'),
+            data.get('total_size'),
+            data.get('checksum')
+        )
+        if 'error' in result:
+            return error_response(message=result['error'], status_code=result.get('status_code', 400))
+        response = _result_response(result, message="Upload started")
+        response.status_code = 201
+        return response
+    except Exception as e:
+        logger.error(f"Error in init_direct_upload: {str(e)}")
+        return error_response(message="An unexpected error occurred", status_code=500)
+
+@uploads_bp.route('/<string:upload_id>', methods=['GET', 'HEAD'])
+@jwt_required()
+@permission_required('upload_media')
+def get_upload(upload_id):
+    """Get the state of an upload; Upload-Offset tells where to resume."""
+    result = upload_service.get_upload(upload_id, get_jwt_identity())
+    return _result_response(result)
+
+@uploads_bp.route('/<string:upload_id>', methods=['PATCH'])
+@jwt_required()
+@permission_required('upload_media')
+def append_chunk(upload_id):
+    """Append the raw request body at the offset given in the Upload-Offset header."""
+    try:
+        offset = int(request.headers.get(OFFSET_HEADER, ''))
+    except ValueError:
+        return error_response(message=f"{OFFSET_HEADER} header must be an integer", status_code=400)
+
+    try:
+        result = upload_service.append_chunk(
+            upload_id,
+            get_jwt_identity(),
+            offset,
+            request.stream,
+            request.content_length
+        )
+        return _result_response(result, message="Chunk stored")
+    except Exception as e:
+        logger.error(f"Error in append_chunk: {str(e)}")
+        return error_response(message="An unexpected error occurred", status_code=500)
+
+@uploads_bp.route('/<string:upload_id>/complete', methods=['POST'])
+@jwt_required()
+@permission_required('upload_media')
+def complete_upload(upload_id):
+    """Verify the checksum and finalize the upload; returns its URL."""
+    try:
+        result = upload_service.complete_upload(upload_id, get_jwt_identity())
+        return _result_response(result, message="Upload completed")
+    except Exception as e:
+        logger.error(f"Error in complete_upload: {str(e)}")
+        return error_response(message="An unexpected error occurred", status_code=500)
+
+@uploads_bp.route('/<string:upload_id>', methods=['DELETE'])
+@jwt_required()
+@permission_required('upload_media')
+def abort_upload(upload_id):
+    """Abort an upload and discard the received bytes."""
+    result = upload_service.abort_upload(upload_id, get_jwt_identity())
+    return _result_response(result, message="Upload aborted")
@@ -0,0 +1,313 @@
+# app/services/analytics_service.py
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app import db
+from app.models.donation import Donation
+from app.models.project import Project
+from app.models.funding_rollup import ProjectFundingRollup
+from app.models.enums import DonationStatus, RollupGranularity
+from app.utils.db_utils import upsert_increment
+from sqlalchemy import and_, func, or_
+from sqlalchemy.exc import SQLAlchemyError
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY_COLUMNS = ('project_id', 'granularity', 'bucket_start')
+ROLLUP_INCREMENT_COLUMNS = ('amount', 'donation_count', 'new_backers', 'refund_count', 'refund_amount')
+
+# Upper bound on the number of buckets a single series request may span
+MAX_SERIES_BUCKETS = {
+    RollupGranularity.HOUR: 24 * 90,
+    RollupGranularity.DAY: 366 * 5,
+}
+
+DEFAULT_SERIES_WINDOW = {
+    RollupGranularity.HOUR: timedelta(hours=48),
+    RollupGranularity.DAY: timedelta(days=30),
+}
+
+BUCKET_WIDTH = {
+    RollupGranularity.HOUR: timedelta(hours=1),
+    RollupGranularity.DAY: timedelta(days=1),
+}
+
+class AnalyticsService:
+    """Maintains and serves hourly/daily funding rollups per project."""
+
+    @staticmethod
+    def _empty_bucket(project_id, granularity, bucket_start):
+        return {
+            'project_id': project_id,
+            'granularity': granularity,
+            'bucket_start': bucket_start,
+            'amount': Decimal('0'),
+            'donation_count': 0,
+            'new_backers': 0,
+            'refund_count': 0,
+            'refund_amount': Decimal('0'),
+        }
+
+    def _apply(self, session, project_id, moment, **increments):
+        """Add the same increments to the hourly and daily bucket containing ``moment``."""
+        rows = []
+        for granularity in RollupGranularity:
+            row = self._empty_bucket(project_id, granularity, granularity.truncate(moment))
+            row.update(increments)
+            rows.append(row)
+        upsert_increment(session, ProjectFundingRollup.__table__,
+                         ROLLUP_KEY_COLUMNS, ROLLUP_INCREMENT_COLUMNS, rows)
+
+    @staticmethod
+    def _is_first_completed_donation(session, donation):
+        earlier = session.query(Donation.id).filter(
+            Donation.project_id == donation.project_id,
+            Donation.user_id == donation.user_id,
+            Donation.id != donation.id,
+            Donation.status.in_([DonationStatus.COMPLETED, DonationStatus.REFUNDED])
+        ).first()
+        return earlier is None
+
+    def record_donation_completed(self, session, donation):
+        """
+        Add a newly completed donation to its project's rollups.
+
+        Must be called in the same transaction that marks the donation COMPLETED
+        and only once per donation, so webhook retries are not double counted.
+        """
+        moment = donation.completed_at or datetime.utcnow()
+        is_new_backer = self._is_first_completed_donation(session, donation)
+        self._apply(
+            session,
+            donation.project_id,
+            moment,
+            amount=Decimal(str(donation.amount)),
+            donation_count=1,
+            new_backers=1 if is_new_backer else 0
+        )
+
+    def record_donation_refunded(self, session, donation):
+        """Add a refunded donation to the refund counters of its project's rollups."""
+        moment = donation.refunded_at or datetime.utcnow()
+        refund_amount = donation.refund_amount if donation.refund_amount is not None else donation.amount
+        self._apply(
+            session,
+            donation.project_id,
+            moment,
+            refund_count=1,
+            refund_amount=Decimal(str(refund_amount))
+        )
+
+    def backfill(self, project_id=None, batch_size=10000, session=None):
+        """
+        Rebuild rollups from the donations history.
+
+        The rollups in scope are deleted and rebuilt in a single transaction, so
+        readers keep seeing the previous rollups until it commits and the backfill
+        can be re-run. Donations are streamed with keyset pagination and aggregated
+        in memory one batch at a time before being upserted. Only donations up to
+        the highest id at the start are scanned; newer ones are counted by the
+        incremental listener (record_donation_completed), never by both.
+
+        Args:
+            project_id: Restrict the rebuild to one project (all projects if None)
+            batch_size: Number of donations read per round trip
+            session: Session to use (defaults to the Flask-SQLAlchemy session)
+
+        Returns:
+            dict: Counts of donations scanned and bucket rows written
+        """
+        session = session or db.session
+        table = ProjectFundingRollup.__table__
+        stats = {'donations_scanned': 0, 'rollup_rows_upserted': 0}
+
+        try:
+            max_id = session.query(func.max(Donation.id)).scalar() or 0
+
+            delete = table.delete()
+            if project_id is not None:
+                delete = delete.where(table.c.project_id == project_id)
+            session.execute(delete)
+
+            columns = (
+                Donation.id, Donation.project_id, Donation.amount, Donation.status,
+                Donation.completed_at, Donation.created_at,
+                Donation.refunded_at, Donation.refund_amount
+            )
+            last_id = 0
+            while True:
+                query = session.query(*columns).filter(
+                    Donation.id > last_id,
+                    Donation.id <= max_id,
+                    Donation.status.in_([DonationStatus.COMPLETED, DonationStatus.REFUNDED])
+                )
+                if project_id is not None:
+                    query = query.filter(Donation.project_id == project_id)
+                batch = query.order_by(Donation.id).limit(batch_size).all()
+                if not batch:
+                    break
+
+                buckets = {}
+                for row in batch:
+                    moment = row.completed_at or row.created_at
+                    if moment is not None:
+                        self._accumulate(buckets, row.project_id, moment.replace(tzinfo=None),
+                                         amount=Decimal(str(row.amount)), donation_count=1)
+                    if row.status == DonationStatus.REFUNDED and row.refunded_at is not None:
+                        refund = row.refund_amount if row.refund_amount is not None else row.amount
+                        self._accumulate(buckets, row.project_id, row.refunded_at.replace(tzinfo=None),
+                                         refund_count=1, refund_amount=Decimal(str(refund)))
+
+                upsert_increment(session, table, ROLLUP_KEY_COLUMNS, ROLLUP_INCREMENT_COLUMNS,
+                                 buckets.values())
+
+                stats['donations_scanned'] += len(batch)
+                stats['rollup_rows_upserted'] += len(buckets)
+                last_id = batch[-1].id
+
+            stats['rollup_rows_upserted'] += self._backfill_new_backers(session, project_id, max_id, batch_size)
+            session.commit()
+            logger.info(f"Funding rollup backfill finished: {stats}")
+            return stats
+
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Database error in funding rollup backfill: {str(e)}")
+            raise
+
+    def _backfill_new_backers(self, session, project_id, max_id, batch_size):
+        """
+        Credit each (project, backer) pair to the bucket of their first completed donation.
+
+        Pairs are read a batch at a time with keyset pagination on (project_id, user_id),
+        so no cursor stays open on the connection while the batch is upserted. The
+        caller commits.
+        """
+        first_backed = session.query(
+            Donation.project_id,
+            Donation.user_id,
+            func.min(func.coalesce(Donation.completed_at, Donation.created_at)).label('first_at')
+        ).filter(
+            Donation.id <= max_id,
+            Donation.status.in_([DonationStatus.COMPLETED, DonationStatus.REFUNDED])
+        )
+        if project_id is not None:
+            first_backed = first_backed.filter(Donation.project_id == project_id)
+
+        written = 0
+        last = None
+        while True:
+            query = first_backed
+            if last is not None:
+                query = query.filter(or_(
+                    Donation.project_id > last.project_id,
+                    and_(Donation.project_id == last.project_id, Donation.user_id > last.user_id)
+                ))
+            rows = query.group_by(Donation.project_id, Donation.user_id) \
+                .order_by(Donation.project_id, Donation.user_id).limit(batch_size).all()
+            if not rows:
+                break
+
+            buckets = {}
+            for row in rows:
+                first_at = row.first_at
+                if isinstance(first_at, str):
+                    # SQLite returns aggregated datetimes as strings
+                    first_at = datetime.fromisoformat(first_at)
+                if first_at is None:
+                    continue
+                self._accumulate(buckets, row.project_id, first_at.replace(tzinfo=None), new_backers=1)
+            upsert_increment(session, ProjectFundingRollup.__table__,
+                             ROLLUP_KEY_COLUMNS, ROLLUP_INCREMENT_COLUMNS, buckets.values())
+            written += len(buckets)
+            last = rows[-1]
+        return written
+
+    def _accumulate(self, buckets, project_id, moment, **increments):
+        for granularity in RollupGranularity:
+            bucket_start = granularity.truncate(moment)
+            key = (project_id, granularity, bucket_start)
+            row = buckets.get(key)
+            if row is None:
+                row = buckets[key] = self._empty_bucket(project_id, granularity, bucket_start)
+            for column, value in increments.items():
+                row[column] += value
+
+    def get_project_series(self, project_id, granularity='day', start=None, end=None, fill=True):
+        """
+        Return a project's funding series for ``[start, end)`` from the rollups.
+
+        The result is read with a single range scan over the
+        (project_id, granularity, bucket_start) unique index.
+        """
+        try:
+            try:
+                granularity = RollupGranularity.from_string(granularity)
+            except ValueError as e:
+                return {'error': str(e), 'status_code': 400}
+
+            end = granularity.truncate(end or datetime.utcnow()) + BUCKET_WIDTH[granularity]
+            start = granularity.truncate(start or (end - DEFAULT_SERIES_WINDOW[granularity]))
+            if start >= end:
+                return {'error': 'start must be before end', 'status_code': 400}
+
+            bucket_count = int((end - start) / BUCKET_WIDTH[granularity])
+            if bucket_count > MAX_SERIES_BUCKETS[granularity]:
+                return {
+                    'error': f'Requested range spans {bucket_count} buckets; '
+                             f'the maximum is {MAX_SERIES_BUCKETS[granularity]}',
+                    'status_code': 400
+                }
+
+            if not db.session.query(Project.id).filter_by(id=project_id).first():
+                return {'error': 'Project not found', 'status_code': 404}
+
+            rows = ProjectFundingRollup.query.filter(
+                ProjectFundingRollup.project_id == project_id,
+                ProjectFundingRollup.granularity == granularity,
+                ProjectFundingRollup.bucket_start >= start,
+                ProjectFundingRollup.bucket_start < end
+            ).order_by(ProjectFundingRollup.bucket_start).all()
+
+            points = [row.to_dict() for row in rows]
+            if fill:
+                points = self._fill_gaps(points, start, end, BUCKET_WIDTH[granularity])
+
+            totals = {
+                'amount': round(sum(p['amount'] for p in points), 2),
+                'donation_count': sum(p['donation_count'] for p in points),
+                'new_backers': sum(p['new_backers'] for p in points),
+                'refund_count': sum(p['refund_count'] for p in points),
+                'refund_amount': round(sum(p['refund_amount'] for p in points), 2),
+            }
+
+            return {
+                'project_id': project_id,
+                'granularity': granularity.value.lower(),
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'series': points,
+                'totals': totals
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in get_project_series: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+    @staticmethod
+    def _fill_gaps(points, start, end, width):
+        by_start = {p['bucket_start']: p for p in points}
+        filled = []
+        moment = start
+        while moment < end:
+            key = moment.isoformat()
+            filled.append(by_start.get(key) or {
+                'bucket_start': key,
+                'amount': 0.0,
+                'donation_count': 0,
+                'new_backers': 0,
+                'refund_count': 0,
+                'refund_amount': 0.0,
+            })
+            moment += width
+        return filled
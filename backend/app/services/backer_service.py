@@ -6,14 +6,17 @@ from app.models.project import Project
 from threading import Thread
 from app.models.donation import Donation
 from app.models import Reward
-from app import db, cache
+from app import db
 from sqlalchemy import func,  distinct
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy.orm import Session
 from app.services.email_service import send_templated_email
 from app.models.enums import DonationStatus, ProjectStatus
 from app.services.donation_service import DonationService
+from app.services.reward_inventory_service import RewardInventoryService
+from app.services.cache_tags import project_tag
+from app.utils.tiered_cache import cached, invalidate
+from app.utils.db_routing import replica_reads
 from decimal import Decimal, InvalidOperation
 from app.schemas.backer_schemas import BackProjectSchema, ProjectUpdateSchema, ProjectMilestoneSchema
 from marshmallow import ValidationError
@@ -27,6 +30,8 @@ logger = logging.getLogger(__name__)
 class BackerService:
     def __init__(self):
         self.donation_service = DonationService()
+        self.inventory = RewardInventoryService()
+
     def _validate_reward(self, project, amount, reward_id, session):
         """
         Validate reward selection for a project backing.
@@ -53,11 +58,8 @@ class BackerService:
                 
             if reward.minimum_amount > amount:
                 return False, f"Minimum amount of {reward.minimum_amount} required for this reward"
-                
-            if reward.quantity_available is not None:
-                if reward.quantity_claimed >= reward.quantity_available:
-                    return False, "This reward is no longer available"
-                    
+
+            # Availability is enforced when the unit is reserved in back_project
             return True, reward
         return True, None
 
@@ -83,89 +85,100 @@ class BackerService:
                 logger.error(f"Amount conversion error: {str(e)}")
                 return {'error': 'Invalid amount format', 'status_code': 400}
 
-            with Session(db.engine) as session:
-                try:
-                    # Start transaction
-                    project = self._get_project(project_id, session)
-                    if not project:
-                        return {'error': 'Project not found', 'status_code': 404}
-
-                    logger.info(f"Found project with current amount: {project.current_amount}")
-
-                    if project.status != ProjectStatus.ACTIVE:
-                        return {'error': 'Project is not currently accepting donations', 'status_code': 400}
-
-                    user = self._get_user(user_id, session)
-                    if not user:
-                        return {'error': 'User not found', 'status_code': 404}
-
-                    # Validate reward if provided
-                    reward_id = data.get('reward_id')
-                    if reward_id:
-                        is_valid, result = self._validate_reward(project, amount, reward_id, session)
-                        if not is_valid:
-                            return {'error': result, 'status_code': 400}
-
-                    # Create donation
-                    donation = Donation(
-                        user_id=user_id,
-                        project_id=project_id,
-                        amount=amount,
-                        reward_id=reward_id,
-                        currency=data.get('currency', 'USD'),
-                        status=DonationStatus.PENDING,
-                        created_at=datetime.utcnow()
-                    )
-                    session.add(donation)
-
-                    # Update project amounts
-                    if project.current_amount is None:
-                        project.current_amount = Decimal('0')
-                    project.current_amount += amount
-                    
-                    logger.info(f"After update - New current amount: {project.current_amount}")
-
-                    if project.current_amount >= project.goal_amount:
-                        project.status = ProjectStatus.FUNDED
-
-                    if user not in project.backers:
-                        project.backers.append(user)
-                        project.backers_count = project.backers_count + 1  # Increment the counter
-
-                    # Commit the transaction
-                    session.commit()
-
-                    # Prepare response after successful commit
-                    result = {
-                        'donation': {
-                            'id': donation.id,
-                            'amount': str(donation.amount),
-                            'currency': donation.currency,
-                            'status': donation.status.value
-                        },
-                        'user_id': user.id,
-                        'project_id': project.id,
-                        'created_at': donation.created_at.isoformat() if donation.created_at else None,
-                        'donation_status': donation.status.value,
-                        'project_status': project.status.value,
-                        'reward_id': donation.reward_id
-                    }
-
-                    # Handle email sending in background
-                    # app = current_app._get_current_object()
-                    # Thread(target=self._send_confirmation_email_with_context,
-                    #     args=(app, user.email, user.username, project.title, donation)).start()
-                    
-                    self.invalidate_backer_stats_cache(project_id)
-                    return result
+            session = db.session
+            try:
+                # Start transaction
+                project = self._get_project(project_id, session)
+                if not project:
+                    return {'error': 'Project not found', 'status_code': 404}
+
+                logger.info(f"Found project with current amount: {project.current_amount}")
+
+                if project.status != ProjectStatus.ACTIVE:
+                    return {'error': 'Project is not currently accepting donations', 'status_code': 400}
+
+                user = self._get_user(user_id, session)
+                if not user:
+                    return {'error': 'User not found', 'status_code': 404}
+
+                # Validate reward if provided
+                reward_id = data.get('reward_id')
+                if reward_id:
+                    is_valid, result = self._validate_reward(project, amount, reward_id, session)
+                    if not is_valid:
+                        return {'error': result, 'status_code': 400}
+
+                # Create donation
+                donation = Donation(
+                    user_id=user_id,
+                    project_id=project_id,
+                    amount=amount,
+                    reward_id=reward_id,
+                    currency=data.get('currency', 'USD'),
+                    status=DonationStatus.PENDING,
+                    created_at=datetime.utcnow()
+                )
+                session.add(donation)
+
+                # Hold a unit of a limited reward until checkout completes or expires
+                reservation = None
+                if reward_id:
+                    session.flush()
+                    reservation = self.inventory.reserve(session, reward_id, user_id, donation.id)
+                    if reservation is None:
+                        session.rollback()
+                        return {'error': 'This reward is no longer available', 'status_code': 400}
+
+                # Update project amounts
+                if project.current_amount is None:
+                    project.current_amount = Decimal('0')
+                project.current_amount += amount
+                
+                logger.info(f"After update - New current amount: {project.current_amount}")
+
+                if project.current_amount >= project.goal_amount:
+                    project.status = ProjectStatus.FUNDED
+
+                if user not in project.backers:
+                    project.backers.append(user)
+                    project.backers_count = project.backers_count + 1  # Increment the counter
+
+                # Commit the transaction
+                session.commit()
+
+                # Prepare response after successful commit
+                result = {
+                    'donation': {
+                        'id': donation.id,
+                        'amount': donation.amount,
+                        'currency': donation.currency,
+                        'status': donation.status
+                    },
+                    'user_id': user.id,
+                    'project_id': project.id,
+                    'created_at': donation.created_at,
+                    'donation_status': donation.status,
+                    'project_status': project.status,
+                    'reward_id': donation.reward_id,
+                    'reservation_expires_at': reservation.expires_at if reservation else None
+                }
 
-                except SQLAlchemyError as e:
-                    session.rollback()
-                    logger.error(f"Database error in back_project: {str(e)}")
-                    return {'error': 'Database error occurred', 'status_code': 500}
+                # Handle email sending in background
+                # app = current_app._get_current_object()
+                # Thread(target=self._send_confirmation_email_with_context,
+                #     args=(app, user.email, user.username, project.title, donation)).start()
+                
+                self.invalidate_backer_stats_cache(project_id)
+                return result
+
+            except SQLAlchemyError as e:
+                session.rollback()
+                logger.error(f"Database error in back_project: {str(e)}")
+                return {'error': 'Database error occurred', 'status_code': 500}
 
         except Exception as e:
             logger.error(f"Unexpected error in back_project: {str(e)}")
+            db.session.rollback()
             return {'error': 'An unexpected error occurred', 'status_code': 500}
 
     # def _send_success_email(self, user_email, user_username, project_title, donation):
@@ -229,15 +242,15 @@ class BackerService:
         return {
             'donation': {
                 'id': donation.id,
-                'amount': str(donation.amount),  # Convert Decimal to string for JSON
+                'amount': donation.amount,
                 'currency': donation.currency,
-                'status': donation.status.value
+                'status': donation.status
             },
             'user_id': user.id,
             'project_id': project.id,
-            'created_at': donation.created_at.isoformat(),
-            'donation_status': donation.status.value,
-            'project_status': project.status.value,
+            'created_at': donation.created_at,
+            'donation_status': donation.status,
+            'project_status': project.status,
             'reward_id': donation.reward_id
         }
     @staticmethod
@@ -254,6 +267,7 @@ class BackerService:
             logger.warning(f"Project with id {project_id} not found in the database")
         return project
 
+    @replica_reads
     def get_project_backers(self, project_id, page, per_page):
         """
         Get paginated list of project backers with their donation details.
@@ -264,60 +278,56 @@ class BackerService:
             per_page: Number of items per page
         """
         try:
-            with Session(db.engine) as session:
-                project = self._get_project(project_id, session)
-                if not project:
-                    return {'error': 'Project not found', 'status_code': 404}
-
-                # Calculate offset for pagination
-                offset = (page - 1) * per_page
-
-                # Get total count of backers
-                total = session.query(User).join(User.backed_projects)\
-                    .filter(Project.id == project_id).count()
-
-                # Get paginated backers
-                backers_query = session.query(User).join(User.backed_projects)\
-                    .filter(Project.id == project_id)\
-                    .order_by(User.id)\
-                    .offset(offset)\
-                    .limit(per_page)
-
-                backers = []
-                for backer in backers_query:
-                    # Get total amount donated by this backer
-                    total_amount = session.query(func.sum(Donation.amount))\
-                        .filter(
-                            Donation.user_id == backer.id,
-                            Donation.project_id == project_id
-                        ).scalar() or 0
-
-                    # Get first donation date
-                    first_backed_at = session.query(func.min(Donation.created_at))\
-                        .filter(
-                            Donation.user_id == backer.id,
-                            Donation.project_id == project_id
-                        ).scalar()
-
-                    backers.append({
-                        'user_id': backer.id,
-                        'username': backer.username,
-                        'total_amount': float(total_amount),
-                        'first_backed_at': first_backed_at
-                    })
-
-                # Calculate total pages
-                total_pages = (total + per_page - 1) // per_page
-
-                meta = {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'pages': total_pages
-                }
-
-                return {'backers': backers, 'meta': meta}
-                
+            session = db.session
+            project = self._get_project(project_id, session)
+            if not project:
+                return {'error': 'Project not found', 'status_code': 404}
+
+            # Calculate offset for pagination
+            offset = (page - 1) * per_page
+
+            # Get total count of backers
+            total = session.query(User).join(User.backed_projects)\
+                .filter(Project.id == project_id).count()
+
+            # Donation totals of every backer of the project, aggregated once
+            donation_totals = session.query(
+                Donation.user_id.label('user_id'),
+                func.sum(Donation.amount).label('total_amount'),
+                func.min(Donation.created_at).label('first_backed_at')
+            ).filter(Donation.project_id == project_id)\
+                .group_by(Donation.user_id)\
+                .subquery()
+
+            # Get paginated backers
+            backers_query = session.query(
+                User.id, User.username, donation_totals.c.total_amount, donation_totals.c.first_backed_at
+            ).join(User.backed_projects)\
+                .outerjoin(donation_totals, donation_totals.c.user_id == User.id)\
+                .filter(Project.id == project_id)\
+                .order_by(User.id)\
+                .offset(offset)\
+                .limit(per_page)
+
+            backers = [{
+                'user_id': backer.id,
+                'username': backer.username,
+                'total_amount': float(backer.total_amount or 0),
+                'first_backed_at': backer.first_backed_at
+            } for backer in backers_query]
+
+            # Calculate total pages
+            total_pages = (total + per_page - 1) // per_page
+
+            meta = {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': total_pages
+            }
+
+            return {'backers': backers, 'meta': meta}
+            
         except Exception as e:
             logger.error(f"Error in get_project_backers: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
@@ -327,71 +337,71 @@ class BackerService:
         Retrieve a paginated list of projects backed by a specific user.
         """
         try:
-            with Session(db.engine) as session:
-                user = self._get_user(user_id, session)
-                if not user:
-                    logger.warning(f"User with id {user_id} not found")
-                    return {'error': f'User with id {user_id} not found', 'status_code': 404}
-                    
-                # Query for backed projects
-                backed_projects_query = session.query(Project).join(Project.backers).filter(User.id == user_id)
+            session = db.session
+            user = self._get_user(user_id, session)
+            if not user:
+                logger.warning(f"User with id {user_id} not found")
+                return {'error': f'User with id {user_id} not found', 'status_code': 404}
                 
-                # Apply status filter if provided
-                if status:
-                    backed_projects_query = backed_projects_query.filter(Project.status == status.upper())
-                    
-                # Count total items
-                total = backed_projects_query.count()
+            # Query for backed projects
+            backed_projects_query = session.query(Project).join(Project.backers).filter(User.id == user_id)
+            
+            # Apply status filter if provided
+            if status:
+                backed_projects_query = backed_projects_query.filter(Project.status == status.upper())
+                
+            # Count total items
+            total = backed_projects_query.count()
+                
+            # Apply pagination
+            offset = (page - 1) * per_page
+            backed_projects = backed_projects_query.offset(offset).limit(per_page).all()
+                
+            projects = []
+            for project in backed_projects:
+                total_amount = session.query(func.sum(Donation.amount)).filter(
+                    Donation.user_id == user.id,
+                    Donation.project_id == project.id
+                ).scalar() or 0
                     
-                # Apply pagination
-                offset = (page - 1) * per_page
-                backed_projects = backed_projects_query.offset(offset).limit(per_page).all()
+                first_backed_at = session.query(func.min(Donation.created_at)).filter(
+                    Donation.user_id == user.id,
+                    Donation.project_id == project.id
+                ).scalar()
+
+                total_pledged = session.query(func.sum(Donation.amount)).filter(
+                    Donation.project_id == project.id
+                ).scalar() or 0
+
                     
-                projects = []
-                for project in backed_projects:
-                    total_amount = session.query(func.sum(Donation.amount)).filter(
-                        Donation.user_id == user.id,
-                        Donation.project_id == project.id
-                    ).scalar() or 0
-                        
-                    first_backed_at = session.query(func.min(Donation.created_at)).filter(
-                        Donation.user_id == user.id,
-                        Donation.project_id == project.id
-                    ).scalar()
-
-                    total_pledged = session.query(func.sum(Donation.amount)).filter(
-                        Donation.project_id == project.id
-                    ).scalar() or 0
-
-                        
-                    projects.append({
-                        'project_id': project.id,
-                        'id': project.id,
-                        'title': project.title,
-                        'description': project.description,
-                        'total_amount': float(total_amount),
-                        'first_backed_at': first_backed_at,
-                        'status': project.status.value if project.status else None,
-                        'image_url': project.image_url,
-                        'start_date': project.start_date,
-                        'end_date': project.end_date,
-                        'goal_amount': float(project.goal_amount) if project.goal_amount else 0,
-                        'category_id': project.category_id,
-                        'total_pledged': float(total_pledged),
-                        'backers_count': project.backers_count
-                    })
-                        
-                # Calculate pagination metadata
-                total_pages = (total + per_page - 1) // per_page
-                meta = {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'pages': total_pages
-                }
+                projects.append({
+                    'project_id': project.id,
+                    'id': project.id,
+                    'title': project.title,
+                    'description': project.description,
+                    'total_amount': float(total_amount),
+                    'first_backed_at': first_backed_at,
+                    'status': project.status.value if project.status else None,
+                    'image_url': project.image_url,
+                    'start_date': project.start_date,
+                    'end_date': project.end_date,
+                    'goal_amount': float(project.goal_amount) if project.goal_amount else 0,
+                    'category_id': project.category_id,
+                    'total_pledged': float(total_pledged),
+                    'backers_count': project.backers_count
+                })
                     
-                logger.info(f"Successfully retrieved {len(projects)} backed projects for user {user_id}")
-                return {'projects': projects, 'meta': meta}
+            # Calculate pagination metadata
+            total_pages = (total + per_page - 1) // per_page
+            meta = {
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'pages': total_pages
+            }
+                
+            logger.info(f"Successfully retrieved {len(projects)} backed projects for user {user_id}")
+            return {'projects': projects, 'meta': meta}
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_user_backed_projects for user {user_id}: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
@@ -401,96 +411,99 @@ class BackerService:
         Retrieve detailed information about a user's backing of a specific project.
         """
         try:
-            with Session(db.engine) as session:
-                project = self._get_project(project_id, session)
-                user = self._get_user(user_id, session)
-                
-                if not project or not user:
-                    logger.warning(f"Project {project_id} or User {user_id} not found")
-                    return {'error': 'Project or User not found', 'status_code': 404}
-                
-                if user not in project.backers:
-                    logger.warning(f"User {user_id} is not a backer of project {project_id}")
-                    return {'error': 'User is not a backer of this project', 'status_code': 404}
-                
-                donations = session.query(Donation).filter_by(project_id=project_id, user_id=user_id).all()
-                
-                result = {
-                    'user_id': user.id,
-                    'username': user.username,
-                    'project_id': project.id,
-                    'project_title': project.title,
-                    'project_status': project.status.value,
-                    'total_amount': sum(d.amount for d in donations),
-                    'donations': [{
-                        'amount': d.amount,
-                        'created_at': d.created_at,
-                        'status': d.status.value,
-                        'reward_id': d.reward_id
-                    } for d in donations]
-                }
-                
-                logger.info(f"Successfully retrieved backer details for user {user_id} on project {project_id}")
-                return result
+            session = db.session
+            project = self._get_project(project_id, session)
+            user = self._get_user(user_id, session)
+            
+            if not project or not user:
+                logger.warning(f"Project {project_id} or User {user_id} not found")
+                return {'error': 'Project or User not found', 'status_code': 404}
+            
+            if user not in project.backers:
+                logger.warning(f"User {user_id} is not a backer of project {project_id}")
+                return {'error': 'User is not a backer of this project', 'status_code': 404}
+            
+            donations = session.query(Donation).filter_by(project_id=project_id, user_id=user_id).all()
+            
+            result = {
+                'user_id': user.id,
+                'username': user.username,
+                'project_id': project.id,
+                'project_title': project.title,
+                'project_status': project.status.value,
+                'total_amount': sum(d.amount for d in donations),
+                'donations': [{
+                    'amount': d.amount,
+                    'created_at': d.created_at,
+                    'status': d.status.value,
+                    'reward_id': d.reward_id
+                } for d in donations]
+            }
+            
+            logger.info(f"Successfully retrieved backer details for user {user_id} on project {project_id}")
+            return result
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_backer_details: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
 
-    @cache.memoize(timeout=300)  # Cache for 5 minutes
+    @cached('backer_stats', key=lambda self, project_id: project_id,
+            tags=lambda self, project_id: [project_tag(project_id)], ttl=300, stale_ttl=600)
     def get_backer_stats(self, project_id):
         """
         Get statistics about backers for a specific project.
 
-        This method is cached to improve performance for frequently accessed data.
+        Cached until the project or one of its donations changes.
         """
         try:
-            with Session(db.engine) as session:
-                project = self._get_project(project_id, session)
-                if not project:
-                    return {'error': 'Project not found', 'status_code': 404}
-
-                stats = session.query(
-                    func.count(Donation.id).label('total_donations'),
-                    func.sum(Donation.amount).label('total_amount'),
-                    func.avg(Donation.amount).label('average_amount')
-                ).filter(Donation.project_id == project_id).first()
-
-                return {
-                    'project_id': project_id,
-                    'project_status': project.status.value,
-                    'total_backers': len(project.backers),
-                    'total_donations': stats.total_donations or 0,
-                    'total_amount': float(stats.total_amount) if stats.total_amount else 0,
-                    'average_amount': float(stats.average_amount) if stats.average_amount else 0
-                }
+            session = db.session
+            project = self._get_project(project_id, session)
+            if not project:
+                return {'error': 'Project not found', 'status_code': 404}
+
+            stats = session.query(
+                func.count(Donation.id).label('total_donations'),
+                func.sum(Donation.amount).label('total_amount'),
+                func.avg(Donation.amount).label('average_amount')
+            ).filter(Donation.project_id == project_id).first()
+
+            return {
+                'project_id': project_id,
+                'project_status': project.status.value,
+                'total_backers': len(project.backers),
+                'total_donations': stats.total_donations or 0,
+                'total_amount': float(stats.total_amount) if stats.total_amount else 0,
+                'average_amount': float(stats.average_amount) if stats.average_amount else 0
+            }
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_backer_stats: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
     
+    @cached('public_backer_stats', key=lambda self, project_id: project_id,
+            tags=lambda self, project_id: [project_tag(project_id)], ttl=300, stale_ttl=600)
     def get_public_backer_stats(self, project_id):
         """
         Get public statistics about backers for a specific project.
         Returns only non-sensitive aggregate data that can be viewed publicly.
         """
         try:
-            with Session(db.engine) as session:
-                project = self._get_project(project_id, session)
-                if not project:
-                    return {'error': 'Project not found', 'status_code': 404}
-
-                # Query for basic statistics - non-sensitive data only
-                stats = session.query(
-                    func.count(distinct(Donation.user_id)).label('total_backers'),
-                    func.sum(Donation.amount).label('total_amount')
-                ).filter(Donation.project_id == project_id).first()
-
-                return {
-                    'project_id': project_id,
-                    'project_title': project.title,
-                    'total_backers': stats.total_backers or 0,
-                    'total_amount': float(stats.total_amount) if stats.total_amount else 0,
-                    # 'funding_percentage': self._calculate_funding_percentage(project, stats.total_amount)
-                }
+            session = db.session
+            project = self._get_project(project_id, session)
+            if not project:
+                return {'error': 'Project not found', 'status_code': 404}
+
+            # Query for basic statistics - non-sensitive data only
+            stats = session.query(
+                func.count(distinct(Donation.user_id)).label('total_backers'),
+                func.sum(Donation.amount).label('total_amount')
+            ).filter(Donation.project_id == project_id).first()
+
+            return {
+                'project_id': project_id,
+                'project_title': project.title,
+                'total_backers': stats.total_backers or 0,
+                'total_amount': float(stats.total_amount) if stats.total_amount else 0,
+                # 'funding_percentage': self._calculate_funding_percentage(project, stats.total_amount)
+            }
         except SQLAlchemyError as e:
             logger.error(f"Database error in get_public_backer_stats: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
@@ -507,28 +520,28 @@ class BackerService:
         """
         Invalidate the cache for backer stats when there's a new donation.
         """
-        cache.delete_memoized(self.get_backer_stats, self, project_id)
+        invalidate(project_tag(project_id))
 
     def send_project_update_email(self, project_id, update_title, update_content):
         """
         Send a project update email to all backers of a specific project.
         """
         try:
-            with Session(db.engine) as session:
-                project = self._get_project(project_id, session)
-                if not project:
-                    return {'error': 'Project not found', 'status_code': 404}
+            session = db.session
+            project = self._get_project(project_id, session)
+            if not project:
+                return {'error': 'Project not found', 'status_code': 404}
 
-                for backer in project.backers:
-                    send_templated_email(
-                        to_email=backer.email,
-                        email_type='project_update',
-                        user_name=backer.username,
-                        project_title=project.title,
-                        update_title=update_title,
-                        update_content=update_content
-                    )
-                return {'message': f'Update email sent to {len(project.backers)} backers'}
+            for backer in project.backers:
+                send_templated_email(
+                    to_email=backer.email,
+                    email_type='project_update',
+                    user_name=backer.username,
+                    project_title=project.title,
+                    update_title=update_title,
+                    update_content=update_content
+                )
+            return {'message': f'Update email sent to {len(project.backers)} backers'}
         except SQLAlchemyError as e:
             logger.error(f"Database error in send_project_update_email: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
@@ -538,21 +551,21 @@ class BackerService:
         Send a project milestone email to all backers of a specific project.
         """
         try:
-            with Session(db.engine) as session:
-                project = self._get_project(project_id, session)
-                if not project:
-                    return {'error': 'Project not found', 'status_code': 404}
+            session = db.session
+            project = self._get_project(project_id, session)
+            if not project:
+                return {'error': 'Project not found', 'status_code': 404}
 
-                for backer in project.backers:
-                    send_templated_email(
-                        to_email=backer.email,
-                        email_type='project_milestone',
-                        user_name=backer.username,
-                        project_title=project.title,
-                        milestone_title=milestone_title,
-                        milestone_description=milestone_description
-                    )
-                return {'message': f'Milestone email sent to {len(project.backers)} backers'}
+            for backer in project.backers:
+                send_templated_email(
+                    to_email=backer.email,
+                    email_type='project_milestone',
+                    user_name=backer.username,
+                    project_title=project.title,
+                    milestone_title=milestone_title,
+                    milestone_description=milestone_description
+                )
+            return {'message': f'Milestone email sent to {len(project.backers)} backers'}
         except SQLAlchemyError as e:
             logger.error(f"Database error in send_project_milestone_email: {str(e)}")
             return {'error': 'An unexpected error occurred', 'status_code': 500}
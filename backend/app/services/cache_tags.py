@@ -0,0 +1,67 @@
+# app/services/cache_tags.py
+
+"""
+Cache tags of the service cache (app.utils.tiered_cache) and the model
+changes that invalidate them.
+
+Whenever a session flushes a change to one of the models below, the tags of
+the changed rows are invalidated once the transaction commits. Writes that
+bypass the ORM (Core ``UPDATE`` statements) must call ``invalidate_on_commit``
+themselves.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.tiered_cache import invalidate_on_commit
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES_TAG = 'categories'
+# Any project changed, for listings such as discovery
+PROJECTS_TAG = 'projects'
+
+def project_tag(project_id):
+    return f"project:{project_id}"
+
+def rewards_tag(project_id):
+    return f"project:{project_id}:rewards"
+
+def user_tag(user_id):
+    return f"user:{user_id}"
+
+def category_tag(category_id):
+    return f"category:{category_id}"
+
+_model_tags = {}
+
+def _tags_after_flush(session, flush_context):
+    tags = set()
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        tags_of = _model_tags.get(type(instance))
+        if tags_of is None:
+            continue
+        if instance in session.dirty and not session.is_modified(instance):
+            continue
+        try:
+            tags.update(tags_of(instance))
+        except Exception as e:
+            logger.warning(f"Could not determine cache tags of {instance!r}: {str(e)}")
+    if tags:
+        invalidate_on_commit(session, *tags)
+
+def register_cache_tag_listeners():
+    """Invalidate cache tags when tagged models change."""
+    from app.models import Project, User, Category
+    from app.models.donation import Donation
+    from app.models.reward import Reward
+
+    _model_tags.update({
+        Project: lambda project: [project_tag(project.id), PROJECTS_TAG],
+        Donation: lambda donation: [project_tag(donation.project_id), user_tag(donation.user_id)],
+        Reward: lambda reward: [rewards_tag(reward.project_id)],
+        Category: lambda category: [category_tag(category.id), CATEGORIES_TAG],
+        User: lambda user: [user_tag(user.id)],
+    })
+    if not event.contains(Session, 'after_flush', _tags_after_flush):
+        event.listen(Session, 'after_flush', _tags_after_flush)
@@ -3,6 +3,8 @@
 from app.models.category import Category
 from app import db
 from app.utils.exceptions import CategoryNotFoundError
+from app.services.cache_tags import CATEGORIES_TAG, category_tag
+from app.utils.tiered_cache import cached
 
 def create_category(name):
     """Create a new category."""
@@ -22,6 +24,20 @@ def get_all_categories():
     """Retrieve all categories."""
     return Category.query.all()
 
+def _category_data(category):
+    return {'id': category.id, 'name': category.name}
+
+@cached('category', key=lambda category_id: category_id,
+        tags=lambda category_id: [category_tag(category_id)], ttl=3600)
+def get_category_data(category_id):
+    """A category as a dict, cached until it changes."""
+    return _category_data(get_category_by_id(category_id))
+
+@cached('categories', key=lambda: 'all', tags=lambda: [CATEGORIES_TAG], ttl=3600)
+def get_all_categories_data():
+    """All categories as dicts, cached until one of them changes."""
+    return [_category_data(category) for category in Category.query.order_by(Category.id)]
+
 def update_category(category_id, name):
     """Update an existing category."""
     category = get_category_by_id(category_id)
@@ -1,17 +1,22 @@
 # app/services/donation_service.py
 
 from flask import current_app
-import stripe
+from app.utils.lazy_import import lazy_module
 from app.models.donation import Donation
 from app.models.user import User  # Add this import
 from app.models.project import Project  # Add this import
-from app.models.enums import DonationStatus
+from app.models.enums import DonationStatus, ProjectStatus
 from app import db
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 from app.services.email_service import send_templated_email
-from sqlalchemy.orm import Session
+from app.services.analytics_service import AnalyticsService
+from app.services.reward_inventory_service import RewardInventoryService
+from app.services.cache_tags import project_tag
+from app.utils.tiered_cache import invalidate_on_commit
+
+stripe = lazy_module('stripe')
 
 logger = logging.getLogger(__name__)
 
@@ -68,47 +73,101 @@ class DonationService:
         try:
             self._init_stripe()
             
-            with Session(db.engine) as session:
-                donation = session.query(Donation).get(donation_id)
-                if not donation:
-                    logger.error(f"Donation {donation_id} not found")
-                    return None
+            session = db.session
+            donation = session.query(Donation).get(donation_id)
+            if not donation:
+                logger.error(f"Donation {donation_id} not found")
+                return None
 
-                amount_cents = int(float(donation.amount) * 100)
-                
-                checkout_session = stripe.checkout.Session.create(
-                    payment_method_types=['card'],
-                    line_items=[{
-                        'price_data': {
-                            'currency': donation.currency.lower(),
-                            'unit_amount': amount_cents,
-                            'product_data': {
-                                'name': f'Donation to Project #{donation.project_id}',
-                                'description': f'Backing amount: {donation.amount} {donation.currency}'
-                            },
+            amount_cents = int(float(donation.amount) * 100)
+
+            # A held reward unit lives exactly as long as the checkout session.
+            # Stripe only accepts expiries at least 30 minutes out.
+            checkout_options = {}
+            reservation = RewardInventoryService.get_for_donation(session, donation_id)
+            if reservation is not None:
+                expires_at = max(reservation.expires_at,
+                                 datetime.utcnow() + timedelta(minutes=30, seconds=30))
+                checkout_options['expires_at'] = int((expires_at - datetime(1970, 1, 1)).total_seconds())
+                RewardInventoryService.extend(session, donation_id, expires_at)
+
+            checkout_session = stripe.checkout.Session.create(
+                payment_method_types=['card'],
+                line_items=[{
+                    'price_data': {
+                        'currency': donation.currency.lower(),
+                        'unit_amount': amount_cents,
+                        'product_data': {
+                            'name': f'Donation to Project #{donation.project_id}',
+                            'description': f'Backing amount: {donation.amount} {donation.currency}'
                         },
-                        'quantity': 1,
-                    }],
-                    mode='payment',
-                    success_url=success_url,
-                    cancel_url=cancel_url,
-                    metadata={
-                        'donation_id': donation_id,
-                        'project_id': donation.project_id,
-                        'user_id': donation.user_id
-                    }
-                )
+                    },
+                    'quantity': 1,
+                }],
+                mode='payment',
+                success_url=success_url,
+                cancel_url=cancel_url,
+                metadata={
+                    'donation_id': donation_id,
+                    'project_id': donation.project_id,
+                    'user_id': donation.user_id
+                },
+                **checkout_options
+            )
 
-                # Update donation with session ID
-                donation.payment_session_id = checkout_session.id
-                session.commit()
+            # Update donation with session ID
+            donation.payment_session_id = checkout_session.id
+            session.commit()
 
-                return checkout_session
+            return checkout_session
 
         except Exception as e:
             logger.error(f"Error creating checkout session: {str(e)}")
+            self.abandon_donation(donation_id, 'Checkout session could not be created')
             return None
 
+    def abandon_donation(self, donation_id, reason):
+        """
+        Undo a pending donation whose checkout never started, in its own transaction.
+
+        back_project commits the donation, the reward hold and the project totals
+        before checkout is attempted. The donation is failed and the rest handed
+        back, so a retry of the request creates the only donation.
+        """
+        # Drop whatever the failed step left half-done in the session
+        db.session.rollback()
+        try:
+            donation = db.session.get(Donation, donation_id)
+            if donation is None or donation.status != DonationStatus.PENDING:
+                return False
+
+            donation.status = DonationStatus.FAILED
+            donation.failure_reason = reason
+            donation.failed_at = datetime.utcnow()
+            RewardInventoryService().release(db.session, donation_id=donation_id, reason='checkout_failed')
+
+            project = db.session.get(Project, donation.project_id, with_for_update=True)
+            project.current_amount -= donation.amount
+            if project.status == ProjectStatus.FUNDED and project.current_amount < project.goal_amount:
+                project.status = ProjectStatus.ACTIVE
+
+            backs_otherwise = db.session.query(Donation.id).filter(
+                Donation.project_id == donation.project_id,
+                Donation.user_id == donation.user_id,
+                Donation.status.in_([DonationStatus.PENDING, DonationStatus.COMPLETED])
+            ).first()
+            if backs_otherwise is None and donation.user in project.backers:
+                project.backers.remove(donation.user)
+                project.backers_count = project.backers_count - 1
+
+            invalidate_on_commit(db.session, project_tag(project.id))
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to abandon donation {donation_id}: {str(e)}")
+            return False
+
     def handle_webhook(self, payload, sig_header):
         """Handle Stripe webhooks with proper email notifications."""
         self._init_stripe()
@@ -123,6 +182,8 @@ class DonationService:
 
             if event_type == 'checkout.session.completed':
                 return self._handle_successful_checkout(event_data)
+            elif event_type == 'checkout.session.expired':
+                return self._handle_expired_checkout(event_data)
             elif event_type == 'payment_intent.payment_failed':
                 return self._handle_failed_payment(event_data)
             elif event_type == 'payment_intent.refunded':
@@ -139,48 +200,58 @@ class DonationService:
         try:
             donation_id = session['metadata']['donation_id']
             
-            with Session(db.engine) as db_session:
-                donation = db_session.query(Donation).get(donation_id)
-                if not donation:
-                    logger.error(f"Donation {donation_id} not found")
-                    return False
-                    
-                # Update donation status
-                donation.status = DonationStatus.COMPLETED
-                donation.completed_at = datetime.utcnow()
-                donation.payment_id = session['payment_intent']
-
-                # Get related data for email
-                user = db_session.query(User).get(donation.user_id)
-                project = db_session.query(Project).get(donation.project_id)
+            db_session = db.session
+            donation = db_session.query(Donation).get(donation_id)
+            if not donation:
+                logger.error(f"Donation {donation_id} not found")
+                return False
                 
-                if not user or not project:
-                    logger.error(f"User or Project not found for donation {donation_id}")
-                    return False
+            # Stripe retries webhooks, only count the donation once
+            already_completed = donation.status == DonationStatus.COMPLETED
 
-                completed_at_formatted = donation.completed_at.strftime('%B %d, %Y at %I:%M %p')
+            # Update donation status
+            donation.status = DonationStatus.COMPLETED
+            donation.completed_at = donation.completed_at if already_completed else datetime.utcnow()
+            donation.payment_id = session['payment_intent']
 
-                # Send success email
-                try:
-                    send_templated_email(
-                        to_email=user.email,
-                        email_type='donation_success',  # Match your template name
-                        donor_name=user.username,
-                        project_title=project.title,
-                        amount=float(donation.amount),
-                        currency=donation.currency,
-                        donation_id=donation.id,
-                        completed_at=donation.completed_at
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to send success email: {str(e)}")
-                    # Continue processing even if email fails
-                
-                db_session.commit()
-                return True
+            if not already_completed:
+                AnalyticsService().record_donation_completed(db_session, donation)
+                if donation.reward_id:
+                    RewardInventoryService().confirm(db_session, donation.id)
+
+            # Get related data for email
+            user = db_session.query(User).get(donation.user_id)
+            project = db_session.query(Project).get(donation.project_id)
+            
+            if not user or not project:
+                logger.error(f"User or Project not found for donation {donation_id}")
+                db_session.rollback()
+                return False
+
+            completed_at_formatted = donation.completed_at.strftime('%B %d, %Y at %I:%M %p')
+
+            # Send success email
+            try:
+                send_templated_email(
+                    to_email=user.email,
+                    email_type='donation_success',  # Match your template name
+                    donor_name=user.username,
+                    project_title=project.title,
+                    amount=float(donation.amount),
+                    currency=donation.currency,
+                    donation_id=donation.id,
+                    completed_at=donation.completed_at
+                )
+            except Exception as e:
+                logger.error(f"Failed to send success email: {str(e)}")
+                # Continue processing even if email fails
+            
+            db_session.commit()
+            return True
 
         except Exception as e:
             logger.error(f"Error processing successful checkout: {str(e)}")
+            db.session.rollback()
             return False
 
     def _process_successful_payment(self, session, donation_id):
@@ -207,6 +278,7 @@ class DonationService:
                     donation.status = DonationStatus.FAILED
                     donation.failure_reason = payment_intent.last_payment_error.message if payment_intent.last_payment_error else 'Unknown error'
                     donation.failed_at = datetime.utcnow()
+                    RewardInventoryService().release(db.session, donation_id=donation.id, reason='payment_failed')
                     db.session.commit()
                     
                     # Send failure notification email
@@ -214,6 +286,27 @@ class DonationService:
         except Exception as e:
             logger.error(f"Error handling failed payment: {str(e)}")
 
+    def _handle_expired_checkout(self, session):
+        """Handle an abandoned checkout: fail the donation and free its reward."""
+        try:
+            donation_id = session['metadata']['donation_id']
+            donation = Donation.query.get(donation_id)
+            if not donation:
+                logger.error(f"Donation {donation_id} not found")
+                return False
+
+            if donation.status == DonationStatus.PENDING:
+                donation.status = DonationStatus.FAILED
+                donation.failure_reason = 'Checkout session expired'
+                donation.failed_at = datetime.utcnow()
+            RewardInventoryService().release(db.session, donation_id=donation.id, reason='checkout_expired')
+            db.session.commit()
+            return True
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error handling expired checkout: {str(e)}")
+            return False
+
     def _handle_refund(self, refund):
         """Handle refund webhook."""
         try:
@@ -221,9 +314,12 @@ class DonationService:
             if donation_id:
                 donation = Donation.query.get(donation_id)
                 if donation:
+                    already_refunded = donation.status == DonationStatus.REFUNDED
                     donation.status = DonationStatus.REFUNDED
                     donation.refunded_at = datetime.utcnow()
                     donation.refund_amount = float(refund.amount) / 100
+                    if not already_refunded:
+                        AnalyticsService().record_donation_refunded(db.session, donation)
                     db.session.commit()
                     
                     # Send refund notification email
@@ -1,13 +1,15 @@
 # app/utils/email_service.py
 
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 from flask import current_app, render_template
 import logging
 from python_http_client.exceptions import HTTPError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from datetime import datetime
+from app.utils.metrics import track_external_call
+from app.utils.lazy_import import lazy_module
+
+sendgrid = lazy_module('sendgrid')
 
 logger = logging.getLogger(__name__)
 
@@ -34,7 +36,7 @@ def send_email(to_email: str, subject: str, text_content: str, html_content: str
     if not current_app.config.get('SENDGRID_API_KEY'):
         raise EmailServiceError("SendGrid API key not configured")
 
-    message = Mail(
+    message = sendgrid.Mail(
         from_email=current_app.config['SENDGRID_DEFAULT_FROM'],
         to_emails=to_email,
         subject=subject,
@@ -42,8 +44,10 @@ def send_email(to_email: str, subject: str, text_content: str, html_content: str
         html_content=html_content)
     
     try:
-        sg = SendGridAPIClient(current_app.config['SENDGRID_API_KEY'])
-        response = sg.send(message)
+        sg = sendgrid.SendGridAPIClient(current_app.config['SENDGRID_API_KEY'],
+                               host=current_app.config.get('SENDGRID_API_HOST', 'https://api.sendgrid.com'))
+        with track_external_call('sendgrid', 'mail.send'):
+            response = sg.send(message)
 
         if response.status_code not in (200, 201, 202):
             raise EmailServiceError(f"Unexpected status code: {response.status_code}")
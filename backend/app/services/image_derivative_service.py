@@ -0,0 +1,97 @@
+# app/services/image_derivative_service.py
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from app.utils.image_utils import IMAGE_EXTENSIONS, render_variants
+import logging
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+
+def _get_executor(workers):
+    """Return the process pool of this process, creating it on first use."""
+    global _executor, _executor_pid
+    # A pool inherited through fork belongs to the parent, start a new one
+    if _executor is None or _executor_pid != os.getpid():
+        # forkserver keeps the workers from inheriting database and Redis sockets
+        context = multiprocessing.get_context('forkserver')
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        _executor_pid = os.getpid()
+    return _executor
+
+def shutdown_executor(wait=True):
+    global _executor
+    if _executor is not None and _executor_pid == os.getpid():
+        _executor.shutdown(wait=wait)
+    _executor = None
+
+class ImageDerivativeService:
+    """
+    Generates the thumbnail, card and hero variants of uploaded images.
+
+    Rendering runs in a pool of worker processes so resizing never blocks a
+    request or holds the GIL of the web worker. Variants are written next to
+    the staged original and published by the caller; until they exist the
+    upload route serves the original in their place.
+    """
+
+    @staticmethod
+    def is_image(extension):
+        return extension in IMAGE_EXTENSIONS
+
+    @staticmethod
+    def _quality():
+        return current_app.config.get('IMAGE_DERIVATIVE_QUALITY', 82)
+
+    def schedule(self, source_path, sha256, extension, on_done=None):
+        """
+        Queue variant generation for a newly stored image. Returns the future, or None.
+
+        ``on_done`` is called with the paths of the rendered variants (an empty
+        list when rendering failed) from a pool thread, outside the app context.
+        """
+        if not self.is_image(extension):
+            return None
+
+        workers = current_app.config.get('IMAGE_DERIVATIVE_WORKERS', 2)
+        if workers <= 0:
+            paths = self.generate(source_path, sha256)
+            if on_done:
+                on_done(paths)
+            return None
+
+        try:
+            future = _get_executor(workers).submit(render_variants, source_path, sha256, self._quality())
+        except RuntimeError as e:
+            # The pool is shutting down or broken
+            logger.error(f"Could not queue image variants for {sha256}: {str(e)}")
+            if on_done:
+                on_done([])
+            return None
+
+        def finish(done):
+            paths = []
+            error = done.exception()
+            if error:
+                logger.error(f"Failed to generate image variants for {sha256}: {str(error)}")
+            else:
+                paths = done.result()
+            if on_done:
+                try:
+                    on_done(paths)
+                except Exception as e:
+                    logger.error(f"Failed to publish image variants for {sha256}: {str(e)}")
+        future.add_done_callback(finish)
+        return future
+
+    def generate(self, source_path, sha256):
+        """Generate the variants in this process. Returns the written paths."""
+        try:
+            return render_variants(source_path, sha256, self._quality())
+        except Exception as e:
+            logger.error(f"Failed to generate image variants for {sha256}: {str(e)}")
+            return []
@@ -0,0 +1,411 @@
+# app/services/media_blob_service.py
+
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, delete, case, event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import db
+from app.models.media import Media, MediaBlob
+from app.models.project import Project
+from app.models.user import User
+from app.models.upload_session import UploadSession
+from app.utils.db_utils import upsert_increment, previous_value_getter, track_previous_values
+from app.utils.file_utils import get_file_subfolder
+from app.utils.image_utils import variant_filenames
+from app.utils.storage import get_storage
+from app.services.image_derivative_service import ImageDerivativeService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches local (/uploads/...) and object storage URLs of blobs
+BLOB_URL_PATTERN = re.compile(r'(?:^|/)(photos|videos)/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.[a-z0-9]+$')
+INCOMING_DIR = '.incoming'
+
+def blob_hash_from_url(url):
+    """Return the SHA-256 of a content-addressed upload URL, or None for any other URL."""
+    match = BLOB_URL_PATTERN.search(url or '')
+    return match.group(2) if match else None
+
+class MediaBlobService:
+    """
+    Content-addressed storage for uploaded media.
+
+    Files are stored once per distinct content under the storage key
+    ``<subfolder>/<sha[:2]>/<sha[2:4]>/<sha>.<ext>`` of the configured backend
+    (see app.utils.storage), so identical uploads share a file and different
+    files can never overwrite each other. New images get resized variants
+    generated in the background. Every row that points at a blob holds a
+    reference; the counts are maintained by mapper events in the referencing
+    row's transaction.
+    """
+
+    @staticmethod
+    def _buffer_size():
+        return current_app.config.get('UPLOAD_CHUNK_BUFFER_SIZE', 1024 * 1024)
+
+    @staticmethod
+    def blob_key(sha256, extension):
+        subfolder, _ = get_file_subfolder(extension)
+        return f"{subfolder}/{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+    @staticmethod
+    def variant_keys(key):
+        directory, name = key.rsplit('/', 1)
+        return [f"{directory}/{variant}" for variant in variant_filenames(name.split('.', 1)[0])]
+
+    def blob_path(self, sha256, extension):
+        """Local (staging) path of a blob."""
+        return get_storage().stage_path(self.blob_key(sha256, extension))
+
+    def blob_url(self, sha256, extension):
+        return get_storage().url(self.blob_key(sha256, extension))
+
+    @staticmethod
+    def _touch(sha256):
+        """
+        Mark a blob as just used so the collector leaves it alone.
+
+        Commits in its own transaction, like register_blob: the collector only
+        deletes blobs untouched for MEDIA_BLOB_GC_GRACE, far longer than the
+        caller's transaction takes to add its reference.
+
+        Returns:
+            str: The extension the blob is stored under, or None if it is unknown
+        """
+        with Session(db.engine) as session:
+            result = session.execute(
+                update(MediaBlob)
+                .where(MediaBlob.sha256 == sha256)
+                .values(updated_at=datetime.utcnow())
+            )
+            extension = None
+            if result.rowcount == 1:
+                extension = session.query(MediaBlob.extension).filter(MediaBlob.sha256 == sha256).scalar()
+            session.commit()
+        return extension
+
+    def find_existing(self, sha256):
+        """
+        Return the URL of an already stored blob with this content, or None.
+
+        Blobs are keyed on their hash alone, so the same bytes uploaded under
+        another extension resolve to the file stored first.
+        """
+        extension = self._touch(sha256)
+        if extension and get_storage().exists(self.blob_key(sha256, extension)):
+            return self.blob_url(sha256, extension)
+        return None
+
+    def _hash_stream(self, stream, max_size=None):
+        digest = hashlib.sha256()
+        size = 0
+        buffer_size = self._buffer_size()
+        for block in iter(lambda: stream.read(buffer_size), b''):
+            size += len(block)
+            if max_size and size > max_size:
+                raise RequestEntityTooLarge()
+            digest.update(block)
+        return digest.hexdigest(), size
+
+    def store_stream(self, stream, extension, max_size=None):
+        """
+        Store the content of a binary stream and return its URL.
+
+        Seekable streams (werkzeug spools form uploads) are hashed first, so
+        content that is already stored is never written again. Other streams
+        are hashed while they are copied to a temporary file.
+
+        Raises:
+            RequestEntityTooLarge: If the content exceeds ``max_size`` bytes
+        """
+        if stream.seekable():
+            start = stream.tell()
+            sha256, size = self._hash_stream(stream, max_size)
+            existing = self.find_existing(sha256)
+            if existing:
+                logger.info(f"Upload deduplicated to existing blob {sha256}")
+                return existing
+            stream.seek(start)
+
+        subfolder, _ = get_file_subfolder(extension)
+        incoming = os.path.join(get_storage().staging_root(subfolder), INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            buffer_size = self._buffer_size()
+            with os.fdopen(fd, 'wb') as temp_file:
+                for block in iter(lambda: stream.read(buffer_size), b''):
+                    size += len(block)
+                    if max_size and size > max_size:
+                        raise RequestEntityTooLarge()
+                    digest.update(block)
+                    temp_file.write(block)
+            return self.adopt_file(temp_path, digest.hexdigest(), size, extension)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def adopt_file(self, path, sha256, size, extension):
+        """
+        Move a fully written file with known hash into the store and return its URL.
+
+        The file is discarded when the content is already stored. ``path`` must
+        be in the staging area of the backend so the move is a rename. The blob
+        row is committed before the file is published (see register_blob); the
+        caller's transaction only adds the references.
+        """
+        storage = get_storage()
+        # A recorded blob whose file went missing is restored where its row says it is
+        extension = self.register_blob(sha256, extension, size)
+        key = self.blob_key(sha256, extension)
+        if storage.exists(key):
+            os.remove(path)
+            logger.info(f"Upload deduplicated to existing blob {sha256}")
+            return storage.url(key)
+
+        final_path = storage.stage_path(key)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(path, final_path)
+
+        is_image = ImageDerivativeService.is_image(extension)
+        # Images stay staged until their variants are rendered from the local copy
+        storage.publish(key, keep_local=is_image)
+        logger.info(f"Stored new blob {sha256} ({size} bytes)")
+        if is_image:
+            self.schedule_variants(key, sha256, extension)
+        return storage.url(key)
+
+    @staticmethod
+    def register_blob(sha256, extension, size):
+        """
+        Record a blob in its own transaction and return the extension it is recorded under.
+
+        Runs before the file is published. The row starts without references,
+        so if the caller's transaction rolls back, the collector removes the
+        file after MEDIA_BLOB_GC_GRACE instead of leaving it untracked. Safe
+        when a concurrent upload of the same content recorded it already; the
+        existing row is only touched.
+        """
+        subfolder, _ = get_file_subfolder(extension)
+        now = datetime.utcnow()
+        with Session(db.engine) as session:
+            upsert_increment(session, MediaBlob.__table__, ('sha256',), ('ref_count',), [{
+                'sha256': sha256,
+                'extension': extension,
+                'subfolder': subfolder,
+                'size': size,
+                'ref_count': 0,
+                'created_at': now,
+                'updated_at': now,
+            }])
+            session.execute(update(MediaBlob).where(MediaBlob.sha256 == sha256).values(updated_at=now))
+            recorded = session.query(MediaBlob.extension).filter(MediaBlob.sha256 == sha256).scalar()
+            session.commit()
+        return recorded
+
+    def schedule_variants(self, key, sha256, extension):
+        """Render the variants of a staged image in the background, then publish them."""
+        storage = get_storage()
+        directory = key.rsplit('/', 1)[0]
+
+        def publish_variants(paths):
+            # Runs outside the app context, only use the captured backend
+            for path in paths:
+                storage.publish(f"{directory}/{os.path.basename(path)}")
+            storage.discard_staged(key)
+
+        return ImageDerivativeService().schedule(storage.stage_path(key), sha256, extension, on_done=publish_variants)
+
+    @staticmethod
+    def _referenced_urls(urls):
+        """Return which of ``urls`` are still referenced, regardless of the stored counts."""
+        referenced = set()
+        for column in (Project.image_url, Project.video_url, Media.url, User.profile_image):
+            referenced.update(
+                value for (value,) in db.session.query(column).filter(column.in_(urls)).distinct()
+            )
+        # Completed uploads that a project may still pick up
+        referenced.update(
+            value for (value,) in db.session.query(UploadSession.url).filter(
+                UploadSession.url.in_(urls), UploadSession.expires_at > datetime.utcnow()
+            ).distinct()
+        )
+        return referenced
+
+    def collect_garbage(self, batch_size=500, grace_seconds=None, max_batches=None, dry_run=False):
+        """
+        Delete blobs that have been unreferenced for longer than the grace period.
+
+        Works in batches of ``batch_size``. Candidates are double-checked
+        against the referencing tables, so counts drifted by bulk updates never
+        cause a referenced file to be removed. A row is only deleted while it
+        is still unreferenced and untouched, and its file is removed after the
+        deletion committed.
+
+        Returns:
+            dict: Numbers of blobs and bytes removed and of candidates skipped
+        """
+        if grace_seconds is None:
+            grace_seconds = current_app.config.get('MEDIA_BLOB_GC_GRACE', 2 * 86400)
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        stats = {'blobs_deleted': 0, 'bytes_reclaimed': 0, 'skipped': 0, 'batches': 0}
+        last_hash = ''
+
+        while max_batches is None or stats['batches'] < max_batches:
+            candidates = db.session.query(
+                MediaBlob.sha256, MediaBlob.extension, MediaBlob.size
+            ).filter(
+                MediaBlob.ref_count <= 0,
+                MediaBlob.updated_at < cutoff,
+                MediaBlob.sha256 > last_hash
+            ).order_by(MediaBlob.sha256).limit(batch_size).all()
+            if not candidates:
+                break
+            stats['batches'] += 1
+            last_hash = candidates[-1].sha256
+
+            urls = {blob.sha256: self.blob_url(blob.sha256, blob.extension) for blob in candidates}
+            referenced = self._referenced_urls(list(urls.values()))
+            for blob in candidates:
+                if urls[blob.sha256] in referenced:
+                    logger.info(f"Blob {blob.sha256} is still referenced, skipping")
+                    stats['skipped'] += 1
+                    continue
+                if dry_run:
+                    stats['blobs_deleted'] += 1
+                    stats['bytes_reclaimed'] += blob.size
+                    continue
+
+                try:
+                    result = db.session.execute(
+                        delete(MediaBlob)
+                        .where(MediaBlob.sha256 == blob.sha256,
+                               MediaBlob.ref_count <= 0,
+                               MediaBlob.updated_at < cutoff)
+                        .execution_options(synchronize_session=False)
+                    )
+                    db.session.commit()
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    logger.error(f"Failed to delete blob {blob.sha256}: {str(e)}")
+                    stats['skipped'] += 1
+                    continue
+                if result.rowcount != 1:
+                    stats['skipped'] += 1
+                    continue
+
+                key = self.blob_key(blob.sha256, blob.extension)
+                freed = get_storage().delete([key] + self.variant_keys(key))
+                stats['blobs_deleted'] += 1
+                # Object stores do not report sizes on deletion
+                stats['bytes_reclaimed'] += freed or blob.size
+
+        logger.info(f"Blob garbage collection: {stats}")
+        return stats
+
+    def generate_missing_variants(self, batch_size=500):
+        """
+        Render the resized variants of stored images that do not have them yet.
+
+        Used to backfill images stored before variants existed; runs in this
+        process.
+
+        Returns:
+            dict: Numbers of images examined and generated
+        """
+        derivatives = ImageDerivativeService()
+        storage = get_storage()
+        stats = {'examined': 0, 'generated': 0}
+        last_hash = ''
+        while True:
+            blobs = db.session.query(MediaBlob.sha256, MediaBlob.extension).filter(
+                MediaBlob.subfolder == 'photos',
+                MediaBlob.sha256 > last_hash
+            ).order_by(MediaBlob.sha256).limit(batch_size).all()
+            if not blobs:
+                break
+            last_hash = blobs[-1].sha256
+
+            for blob in blobs:
+                if not derivatives.is_image(blob.extension):
+                    continue
+                stats['examined'] += 1
+                key = self.blob_key(blob.sha256, blob.extension)
+                if all(storage.exists(variant) for variant in self.variant_keys(key)) or not storage.exists(key):
+                    continue
+
+                paths = derivatives.generate(storage.fetch(key), blob.sha256)
+                directory = key.rsplit('/', 1)[0]
+                for path in paths:
+                    storage.publish(f"{directory}/{os.path.basename(path)}")
+                storage.discard_staged(key)
+                if paths:
+                    stats['generated'] += 1
+
+        logger.info(f"Image variant backfill: {stats}")
+        return stats
+
+# Model -> attributes holding blob URLs
+REFERENCING_MODELS = {
+    Project: ('image_url', 'video_url'),
+    Media: ('url',),
+    User: ('profile_image',),
+}
+
+def _blob_hashes(get, attrs):
+    return Counter(sha for sha in (blob_hash_from_url(get(attr)) for attr in attrs) if sha)
+
+def _apply_ref_deltas(connection, old, new):
+    deltas = Counter(new)
+    deltas.subtract(old)
+    now = datetime.utcnow()
+    for sha256, delta in deltas.items():
+        if not delta:
+            continue
+        new_count = MediaBlob.ref_count + delta
+        connection.execute(
+            update(MediaBlob)
+            .where(MediaBlob.sha256 == sha256)
+            .values(ref_count=case((new_count < 0, 0), else_=new_count), updated_at=now)
+        )
+
+def _make_ref_listeners(attrs):
+    def after_insert(mapper, connection, target):
+        _apply_ref_deltas(connection, Counter(), _blob_hashes(lambda attr: getattr(target, attr), attrs))
+
+    def after_update(mapper, connection, target):
+        _apply_ref_deltas(connection,
+                          _blob_hashes(previous_value_getter(target), attrs),
+                          _blob_hashes(lambda attr: getattr(target, attr), attrs))
+
+    def after_delete(mapper, connection, target):
+        _apply_ref_deltas(connection, _blob_hashes(previous_value_getter(target), attrs), Counter())
+
+    return {'after_insert': after_insert, 'after_update': after_update, 'after_delete': after_delete}
+
+def _set_media_content_hash(mapper, connection, target):
+    target.content_hash = blob_hash_from_url(target.url)
+
+_ref_listeners = {model: _make_ref_listeners(attrs) for model, attrs in REFERENCING_MODELS.items()}
+
+def register_blob_ref_listeners():
+    """Keep ``media_blobs.ref_count`` in step with ORM writes to the referencing rows."""
+    for model, listeners in _ref_listeners.items():
+        for identifier, fn in listeners.items():
+            if not event.contains(model, identifier, fn):
+                event.listen(model, identifier, fn)
+        track_previous_values(model, REFERENCING_MODELS[model])
+
+    for identifier in ('before_insert', 'before_update'):
+        if not event.contains(Media, identifier, _set_media_content_hash):
+            event.listen(Media, identifier, _set_media_content_hash)
@@ -0,0 +1,178 @@
+# app/services/orphan_reaper_service.py
+
+import os
+import re
+import shutil
+import time
+from urllib.parse import urlsplit
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.media import Media, MediaBlob
+from app.models.project import Project
+from app.models.user import User
+from app.models.upload_session import UploadSession
+from app.models.enums import UploadStatus
+from app.utils.storage import get_storage
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upload URL (local or absolute) -> subfolder and path inside it
+UPLOAD_URL_PATTERN = re.compile(r'(?:^|/)(photos|videos)/(.+)$')
+# Originals and variants in the content-addressed store start with the blob hash
+BLOB_FILE_PATTERN = re.compile(r'^([0-9a-f]{64})[.-]')
+PART_SUFFIX = '.part'
+
+class OrphanReaperService:
+    """
+    Removes uploaded files that no row references any more.
+
+    Drafts that are abandoned and media that is replaced leave their files
+    behind. The reaper collects every referenced path from the referencing
+    columns, then walks the upload directories and deletes (or moves to the
+    quarantine directory) files that are neither referenced nor younger than
+    the grace period. Content-addressed blobs are left to the blob collector
+    (``gc-media-blobs``), and parts of active resumable uploads are kept.
+    """
+
+    REFERENCING_COLUMNS = (Project.image_url, Project.video_url, Media.url, User.profile_image)
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+
+    @staticmethod
+    def upload_roots():
+        """Directories holding uploaded files, by subfolder name."""
+        storage = get_storage()
+        roots = {subfolder: storage.staging_root(subfolder) for subfolder in ('photos', 'videos')}
+        # Profile images saved before the media store are kept by file name here
+        roots['profiles'] = os.path.join(current_app.root_path, 'static', 'uploads', 'profiles')
+        return roots
+
+    def _stream(self, statement):
+        # yield_per fetches in batches (a server-side cursor on MySQL) instead of loading every row
+        return db.session.execute(statement.execution_options(yield_per=self.batch_size)).scalars()
+
+    @staticmethod
+    def reference_key(value):
+        """Return ``(subfolder, relative path)`` for a stored URL or legacy file name, or None."""
+        if not value:
+            return None
+        path = urlsplit(value).path
+        if '/' not in path:
+            return 'profiles', path
+        match = UPLOAD_URL_PATTERN.search(path)
+        return (match.group(1), match.group(2)) if match else None
+
+    def collect_references(self):
+        """
+        Stream the referencing columns into the sets of referenced paths and blob hashes.
+
+        Returns:
+            tuple: ``(paths, blob hashes, ids of active upload sessions)``
+        """
+        paths = set()
+        for column in self.REFERENCING_COLUMNS:
+            for value in self._stream(select(column).where(column.isnot(None)).distinct()):
+                key = self.reference_key(value)
+                if key:
+                    paths.add(key)
+
+        now = datetime.utcnow()
+        upload_ids = set()
+        for upload in db.session.execute(
+            select(UploadSession.id, UploadSession.status, UploadSession.url)
+            .where(UploadSession.expires_at > now)
+            .execution_options(yield_per=self.batch_size)
+        ):
+            if upload.status == UploadStatus.IN_PROGRESS:
+                upload_ids.add(upload.id)
+            # Completed uploads that a project may still pick up
+            key = self.reference_key(upload.url)
+            if key:
+                paths.add(key)
+
+        # Every registered blob is owned by the blob collector, referenced or not
+        blob_hashes = set(self._stream(select(MediaBlob.sha256)))
+        return paths, blob_hashes, upload_ids
+
+    @staticmethod
+    def _scan(root):
+        """Yield ``(relative path, DirEntry)`` for every regular file below ``root``."""
+        pending = ['']
+        while pending:
+            relative_dir = pending.pop()
+            try:
+                entries = os.scandir(os.path.join(root, relative_dir))
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(relative_path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield relative_path, entry
+
+    def reap(self, grace_seconds=None, quarantine=False, dry_run=False):
+        """
+        Delete or quarantine unreferenced upload files older than the grace period.
+
+        References are collected before the directories are walked, so a file
+        written in between is protected by the grace period.
+
+        Returns:
+            dict: Numbers of files scanned and reaped, and bytes reclaimed
+        """
+        if grace_seconds is None:
+            grace_seconds = current_app.config.get('ORPHAN_UPLOAD_GRACE', 7 * 86400)
+        quarantine_dir = current_app.config.get('ORPHAN_UPLOAD_QUARANTINE_DIR')
+        if quarantine and not quarantine_dir:
+            raise ValueError("ORPHAN_UPLOAD_QUARANTINE_DIR is not configured")
+
+        paths, blob_hashes, upload_ids = self.collect_references()
+        cutoff = time.time() - grace_seconds
+        stats = {'files_scanned': 0, 'files_reaped': 0, 'bytes_reclaimed': 0, 'recent': 0, 'errors': 0}
+
+        for subfolder, root in self.upload_roots().items():
+            for relative_path, entry in self._scan(root):
+                stats['files_scanned'] += 1
+                name = entry.name
+                if (subfolder, relative_path) in paths:
+                    continue
+                blob = BLOB_FILE_PATTERN.match(name)
+                if blob and blob.group(1) in blob_hashes:
+                    continue
+                if name.endswith(PART_SUFFIX) and name[:-len(PART_SUFFIX)] in upload_ids:
+                    continue
+
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime > cutoff:
+                    stats['recent'] += 1
+                    continue
+
+                if not dry_run:
+                    try:
+                        if quarantine:
+                            target = os.path.join(quarantine_dir, subfolder, relative_path)
+                            os.makedirs(os.path.dirname(target), exist_ok=True)
+                            shutil.move(entry.path, target)
+                        else:
+                            os.remove(entry.path)
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        logger.error(f"Failed to reap orphaned upload {entry.path}: {str(e)}")
+                        stats['errors'] += 1
+                        continue
+                    logger.info(f"Reaped orphaned upload {subfolder}/{relative_path} ({stat.st_size} bytes)")
+                stats['files_reaped'] += 1
+                stats['bytes_reclaimed'] += stat.st_size
+
+        logger.info(f"Orphaned upload reaper: {stats}")
+        return stats
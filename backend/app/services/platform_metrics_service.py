@@ -0,0 +1,325 @@
+# app/services/platform_metrics_service.py
+
+from collections import defaultdict
+from datetime import datetime, timedelta, date
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import event, func
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.user import User
+from app.models.project import Project
+from app.models.category import Category
+from app.models.donation import Donation
+from app.models.payout import Payout
+from app.models.platform_metric import PlatformMetric
+from app.models.enums import DonationStatus
+from app.utils.db_utils import upsert_increment, previous_value_getter, track_previous_values
+import logging
+
+logger = logging.getLogger(__name__)
+
+METRIC_KEY_COLUMNS = ('metric', 'dimension', 'period')
+METRIC_INCREMENT_COLUMNS = ('count', 'amount')
+ALL_TIME = 'all'
+MAX_DAILY_WINDOW = 366
+
+def _day(moment):
+    return (moment or datetime.utcnow()).date().isoformat()
+
+def _decimal(value):
+    return Decimal(str(value)) if value is not None else Decimal('0')
+
+def _name(value):
+    return getattr(value, 'name', value) or ''
+
+# Each function returns the (metric, dimension, period) -> (count, amount)
+# contributions a row makes to the summary table, given an attribute getter.
+# Inserts add the contributions of the new values, deletes subtract those of
+# the old values and updates apply the difference between the two.
+
+def _donation_contributions(get):
+    status = get('status')
+    if status not in (DonationStatus.COMPLETED, DonationStatus.REFUNDED):
+        return []
+    amount = _decimal(get('amount'))
+    completed_day = _day(get('completed_at'))
+    contributions = [
+        ('gmv', '', ALL_TIME, 1, amount),
+        ('gmv', '', completed_day, 1, amount),
+    ]
+    if status == DonationStatus.REFUNDED:
+        refund = get('refund_amount')
+        refund = _decimal(refund) if refund is not None else amount
+        refunded_day = _day(get('refunded_at'))
+        contributions += [
+            ('refunds', '', ALL_TIME, 1, refund),
+            ('refunds', '', refunded_day, 1, refund),
+        ]
+    return contributions
+
+def _project_contributions(get):
+    if get('is_deleted'):
+        return []
+    return [
+        ('projects_by_status', _name(get('status')), ALL_TIME, 1, Decimal('0')),
+        ('projects_by_category', str(get('category_id') or ''), ALL_TIME, 1, Decimal('0')),
+    ]
+
+def _payout_contributions(get):
+    status = _name(get('status'))
+    contributions = [('payouts_by_status', status, ALL_TIME, 1, _decimal(get('amount')))]
+    if status == 'COMPLETED':
+        contributions.append(('payout_fees', '', ALL_TIME, 1, _decimal(get('fee_amount'))))
+    return contributions
+
+def _user_contributions(get):
+    return [
+        ('signups', '', ALL_TIME, 1, Decimal('0')),
+        ('signups', '', _day(get('created_at')), 1, Decimal('0')),
+    ]
+
+# Model -> (contributions function, attributes it reads)
+TRACKED_MODELS = {
+    Donation: (_donation_contributions, ('status', 'amount', 'completed_at', 'refunded_at', 'refund_amount')),
+    Project: (_project_contributions, ('status', 'category_id', 'is_deleted')),
+    Payout: (_payout_contributions, ('status', 'amount', 'fee_amount')),
+    User: (_user_contributions, ('created_at',)),
+}
+
+def _new_value_getter(target):
+    return lambda attr: getattr(target, attr)
+
+def _apply_deltas(connection, old, new):
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for sign, contributions in ((-1, old), (1, new)):
+        for metric, dimension, period, count, amount in contributions:
+            delta = deltas[(metric, dimension, period)]
+            delta[0] += sign * count
+            delta[1] += sign * amount
+
+    rows = [
+        {'metric': metric, 'dimension': dimension, 'period': period, 'count': count, 'amount': amount}
+        for (metric, dimension, period), (count, amount) in deltas.items()
+        if count or amount
+    ]
+    upsert_increment(connection, PlatformMetric.__table__,
+                     METRIC_KEY_COLUMNS, METRIC_INCREMENT_COLUMNS, rows)
+
+def _make_listeners(contributions):
+    def after_insert(mapper, connection, target):
+        _apply_deltas(connection, [], contributions(_new_value_getter(target)))
+
+    def after_update(mapper, connection, target):
+        _apply_deltas(connection,
+                      contributions(previous_value_getter(target)),
+                      contributions(_new_value_getter(target)))
+
+    def after_delete(mapper, connection, target):
+        _apply_deltas(connection, contributions(previous_value_getter(target)), [])
+
+    return {'after_insert': after_insert, 'after_update': after_update, 'after_delete': after_delete}
+
+_listeners = {model: _make_listeners(fn) for model, (fn, _) in TRACKED_MODELS.items()}
+
+def register_metric_listeners():
+    """
+    Keep ``platform_metrics`` in step with ORM writes to the tracked models.
+
+    The summary rows are updated on the flushing connection, so they commit or
+    roll back together with the change that caused them. Bulk ``Query.update``
+    calls bypass mapper events; use ``flask rebuild-platform-metrics`` after those.
+    """
+    for model, listeners in _listeners.items():
+        for identifier, fn in listeners.items():
+            if not event.contains(model, identifier, fn):
+                event.listen(model, identifier, fn)
+
+        # Load the previous value of expired attributes when they are assigned,
+        # otherwise their history has nothing to subtract in after_update
+        track_previous_values(model, TRACKED_MODELS[model][1])
+
+class PlatformMetricsService:
+    """Serves and rebuilds the admin dashboard metrics."""
+
+    @staticmethod
+    def _fee_percentage():
+        return Decimal(str(current_app.config.get('PLATFORM_FEE_PERCENTAGE', '5')))
+
+    def get_dashboard(self, days=30):
+        """
+        Return the admin dashboard from the summary table.
+
+        Reads at most a fixed number of rows (all-time totals plus ``days`` daily
+        buckets per metric), independent of the size of the underlying tables.
+        """
+        try:
+            if days < 1 or days > MAX_DAILY_WINDOW:
+                return {'error': f'days must be between 1 and {MAX_DAILY_WINDOW}', 'status_code': 400}
+
+            today = datetime.utcnow().date()
+            window_start = today - timedelta(days=days - 1)
+            month_start = today.replace(day=1)
+            first_day = min(window_start, month_start).isoformat()
+
+            totals = PlatformMetric.query.filter(PlatformMetric.period == ALL_TIME).all()
+            daily = PlatformMetric.query.filter(
+                PlatformMetric.metric.in_(['gmv', 'refunds', 'signups']),
+                PlatformMetric.dimension == '',
+                PlatformMetric.period >= first_day,
+                PlatformMetric.period != ALL_TIME
+            ).all()
+
+            all_time = defaultdict(dict)
+            for row in totals:
+                all_time[row.metric][row.dimension] = row
+            by_day = defaultdict(dict)
+            for row in daily:
+                by_day[row.metric][row.period] = row
+
+            fee_percentage = self._fee_percentage()
+
+            def money(value):
+                return float(value.quantize(Decimal('0.01')))
+
+            def summary(metric):
+                total = all_time[metric].get('')
+                today_row = by_day[metric].get(today.isoformat())
+                month = [row for period, row in by_day[metric].items() if period >= month_start.isoformat()]
+                return {
+                    'total': {'count': total.count if total else 0,
+                              'amount': _decimal(total.amount if total else 0)},
+                    'today': {'count': today_row.count if today_row else 0,
+                              'amount': _decimal(today_row.amount if today_row else 0)},
+                    'this_month': {'count': sum(row.count for row in month),
+                                   'amount': sum((_decimal(row.amount) for row in month), Decimal('0'))},
+                }
+
+            def as_json(section):
+                return {
+                    period: {'count': values['count'], 'amount': money(values['amount'])}
+                    for period, values in section.items()
+                }
+
+            gmv = summary('gmv')
+            refunds = summary('refunds')
+            fees = {
+                period: money(values['amount'] * fee_percentage / 100)
+                for period, values in gmv.items()
+            }
+            collected = all_time['payout_fees'].get('')
+
+            category_names = dict(db.session.query(Category.id, Category.name).all())
+            projects_by_category = [
+                {
+                    'category_id': int(dimension) if dimension else None,
+                    'name': category_names.get(int(dimension)) if dimension else None,
+                    'count': row.count
+                }
+                for dimension, row in sorted(all_time['projects_by_category'].items())
+                if row.count
+            ]
+
+            signups_per_day = []
+            for offset in range(days):
+                day = (window_start + timedelta(days=offset)).isoformat()
+                row = by_day['signups'].get(day)
+                signups_per_day.append({'date': day, 'count': row.count if row else 0})
+
+            total_users = all_time['signups'].get('')
+
+            return {
+                'gmv': as_json(gmv),
+                'refunds': as_json(refunds),
+                'fees': {
+                    'percentage': float(fee_percentage),
+                    'accrued': fees,
+                    'collected_on_payouts': money(_decimal(collected.amount if collected else 0))
+                },
+                'payouts_by_status': {
+                    dimension: {'count': row.count, 'amount': money(_decimal(row.amount))}
+                    for dimension, row in all_time['payouts_by_status'].items()
+                    if row.count
+                },
+                'projects_by_status': {
+                    dimension: row.count
+                    for dimension, row in all_time['projects_by_status'].items()
+                    if row.count
+                },
+                'projects_by_category': projects_by_category,
+                'users': {
+                    'total': total_users.count if total_users else 0,
+                    'signups_per_day': signups_per_day
+                },
+                'generated_at': datetime.utcnow().isoformat()
+            }
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in get_dashboard: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+    def rebuild(self):
+        """
+        Recompute every metric from the source tables.
+
+        This is the only path that scans the full tables; run it once after
+        deploying the summary table and after bulk updates that bypass the ORM.
+        """
+        table = PlatformMetric.__table__
+        try:
+            deltas = []
+
+            def day_key(value):
+                if value is None:
+                    return _day(None)
+                return value.isoformat() if isinstance(value, date) else str(value)
+
+            counted = Donation.status.in_([DonationStatus.COMPLETED, DonationStatus.REFUNDED])
+            completed_day = func.date(Donation.completed_at)
+            gmv = db.session.query(
+                completed_day, func.count(Donation.id), func.sum(Donation.amount)
+            ).filter(counted).group_by(completed_day)
+            for day, count, amount in gmv:
+                deltas.append(('gmv', '', ALL_TIME, count, _decimal(amount)))
+                deltas.append(('gmv', '', day_key(day), count, _decimal(amount)))
+
+            refunded_day = func.date(Donation.refunded_at)
+            refunds = db.session.query(
+                refunded_day, func.count(Donation.id),
+                func.sum(func.coalesce(Donation.refund_amount, Donation.amount))
+            ).filter(Donation.status == DonationStatus.REFUNDED).group_by(refunded_day)
+            for day, count, amount in refunds:
+                deltas.append(('refunds', '', ALL_TIME, count, _decimal(amount)))
+                deltas.append(('refunds', '', day_key(day), count, _decimal(amount)))
+
+            projects = db.session.query(
+                Project.status, Project.category_id, func.count(Project.id)
+            ).filter(Project.is_deleted.is_(False)).group_by(Project.status, Project.category_id)
+            for status, category_id, count in projects:
+                deltas.append(('projects_by_status', _name(status), ALL_TIME, count, Decimal('0')))
+                deltas.append(('projects_by_category', str(category_id or ''), ALL_TIME, count, Decimal('0')))
+
+            payouts = db.session.query(
+                Payout.status, func.count(Payout.id), func.sum(Payout.amount), func.sum(Payout.fee_amount)
+            ).group_by(Payout.status)
+            for status, count, amount, fee_amount in payouts:
+                deltas.append(('payouts_by_status', _name(status), ALL_TIME, count, _decimal(amount)))
+                if _name(status) == 'COMPLETED':
+                    deltas.append(('payout_fees', '', ALL_TIME, count, _decimal(fee_amount)))
+
+            signup_day = func.date(User.created_at)
+            signups = db.session.query(signup_day, func.count(User.id)).group_by(signup_day)
+            for day, count in signups:
+                deltas.append(('signups', '', ALL_TIME, count, Decimal('0')))
+                deltas.append(('signups', '', day_key(day), count, Decimal('0')))
+
+            db.session.execute(table.delete())
+            connection = db.session.connection()
+            _apply_deltas(connection, [], deltas)
+            db.session.commit()
+
+            logger.info(f"Rebuilt platform metrics from {len(deltas)} contributions")
+            return {'contributions': len(deltas)}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error rebuilding platform metrics: {str(e)}")
+            raise
@@ -11,6 +11,9 @@ from app.services.role_permission_service import RolePermissionService
 from app.utils.exceptions import ValidationError, ProjectNotFoundError
 from app.services.notification_service import NotificationService
 from app.services.project_role_service import ProjectRoleService
+from app.services.cache_tags import PROJECTS_TAG, project_tag
+from app.utils.project_projections import compile_serializer, load_fields, serialize_projects
+from app.utils.tiered_cache import cached
 import logging
 from sqlalchemy import desc
 
@@ -138,14 +141,59 @@ def update_project(project_id: int, data: Dict[str, Any]) -> Project:
         logger.error(f"Error updating project {project_id}: {e}")
         raise Exception(f"Error updating project: {e}")
 
-def get_project_by_id(project_id: int) -> Project:
-    """Retrieve a project by its ID."""
-    project = Project.query.filter_by(id=project_id, is_deleted=False).first()
+def get_project_by_id(project_id: int, options: List[Any] = None) -> Project:
+    """Retrieve a project by its ID, with optional loader options (e.g. ``load_only``)."""
+    query = Project.query.filter_by(id=project_id, is_deleted=False)
+    if options:
+        query = query.options(*options)
+    project = query.first()
     if project is None:
         logger.warning(f"Project with ID {project_id} not found or has been deleted")
         raise ProjectNotFoundError(f"Project with ID {project_id} not found")
     return project
 
+@cached('project_detail', key=lambda project_id, fields: f"{project_id}:{','.join(fields)}",
+        tags=lambda project_id, fields: [project_tag(project_id)], stale_ttl=600)
+def get_project_data(project_id: int, fields: tuple) -> Dict[str, Any]:
+    """Serialized fields of a project (see app.utils.project_projections), cached until it changes."""
+    project = get_project_by_id(project_id, options=[load_fields(fields)])
+    return serialize_projects([project], fields)[0]
+
+@cached('discovery', key=lambda grid_count, fields: f"{grid_count}:{','.join(fields)}",
+        tags=lambda grid_count, fields: [PROJECTS_TAG], ttl=60, stale_ttl=300)
+def get_discovery_data(grid_count: int, fields: tuple) -> Dict[str, Any]:
+    """The featured project and ``grid_count`` trending active projects, serialized with ``fields``."""
+    serialize = compile_serializer(fields)
+
+    # Base query for active projects
+    base_query = Project.query.filter_by(status=ProjectStatus.ACTIVE).options(load_fields(fields))
+
+    # Get one featured project (prioritize projects marked as featured)
+    featured_query = base_query.filter_by(featured=True)
+    featured_project = featured_query.order_by(Project.current_amount.desc()).first()
+
+    # If no featured projects exist, get the highest funded active project
+    if not featured_project:
+        featured_project = base_query.order_by(Project.current_amount.desc()).first()
+
+    # Query for grid projects (avoid including the featured project)
+    grid_query = base_query
+    if featured_project:
+        grid_query = grid_query.filter(Project.id != featured_project.id)
+
+    # Get trending projects based on recent backers or funding progress
+    grid_projects = grid_query.order_by(
+        # Order by percentage funded (for projects with momentum)
+        (Project.current_amount / Project.goal_amount).desc(),
+        # Then by newest
+        Project.created_at.desc()
+    ).limit(grid_count).all()
+
+    return {
+        'featured': serialize(featured_project) if featured_project else None,
+        'trending': [serialize(p) for p in grid_projects]
+    }
+
 def delete_project(project_id: int) -> bool:
     """Soft delete a project."""
     try:
@@ -167,9 +215,11 @@ def delete_project(project_id: int) -> bool:
         logger.error(f"Error deleting project {project_id}: {e}")
         raise Exception(f"Error deleting project: {e}")
 
-def get_all_projects(page: int = 1, per_page: int = 10, sort_by: str = 'created_at', sort_order: str = 'desc', filters: Dict[str, Any] = None) -> Any:
+def get_all_projects(page: int = 1, per_page: int = 10, sort_by: str = 'created_at', sort_order: str = 'desc', filters: Dict[str, Any] = None, options: List[Any] = None) -> Any:
     """Retrieve all non-deleted projects with pagination, sorting, and filtering."""
     query = Project.query.filter_by(is_deleted=False)
+    if options:
+        query = query.options(*options)
 
     # Apply filters
     if filters:
@@ -0,0 +1,63 @@
+# app/services/reward_catalog_service.py
+
+from flask import current_app
+from app.models.reward import Reward
+from app.schemas.reward_schemas import RewardSchema
+from app.services.cache_tags import rewards_tag
+from app.utils.tiered_cache import get_cache, invalidate, invalidate_on_commit
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RewardCatalogService:
+    """
+    Per-project cache of the serialized reward list with remaining quantities.
+
+    The catalog lives in the service cache (app.utils.tiered_cache) under the
+    project's rewards tag. Invalidating the tag bumps its version, and a cached
+    catalog is only served while it carries the current version, so a rebuild
+    racing with a write can never put stale data back. On a miss only the
+    request holding the rebuild lock queries the database; the others wait
+    briefly for its result.
+    """
+
+    @staticmethod
+    def _ttl():
+        return current_app.config.get('REWARD_CATALOG_TTL', 300)
+
+    @staticmethod
+    def build(project_id):
+        """Serialize every reward of a project, annotated with availability."""
+        # Quantities may have been changed by another session, never trust the identity map
+        rewards = Reward.query.filter_by(project_id=project_id).order_by(
+            Reward.minimum_amount, Reward.id
+        ).populate_existing().all()
+        catalog = RewardSchema(many=True).dump(rewards)
+        for item in catalog:
+            available = item.get('quantity_available')
+            claimed = item.get('quantity_claimed') or 0
+            item['quantity_claimed'] = claimed
+            item['quantity_remaining'] = None if available is None else max(available - claimed, 0)
+            item['is_sold_out'] = available is not None and claimed >= available
+        return catalog
+
+    def get_catalog(self, project_id):
+        """Return the full reward catalog of a project, from cache when possible."""
+        return get_cache().get_or_set(
+            'reward_catalog', project_id, lambda: self.build(project_id),
+            tags=[rewards_tag(project_id)], ttl=self._ttl()
+        )
+
+    def get_page(self, project_id, page, per_page):
+        catalog = self.get_catalog(project_id)
+        start = (max(page, 1) - 1) * per_page
+        return catalog[start:start + per_page]
+
+    def invalidate(self, project_id):
+        """Drop the cached catalog of a project; call after the change is committed."""
+        invalidate(rewards_tag(project_id))
+
+    @staticmethod
+    def invalidate_on_commit(session, project_id):
+        """Invalidate a project's catalog once ``session`` commits its transaction."""
+        invalidate_on_commit(session, rewards_tag(project_id))
@@ -0,0 +1,213 @@
+# app/services/reward_inventory_service.py
+
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, func, or_
+from app import db
+from app.models.reward import Reward
+from app.models.reward_reservation import RewardReservation
+from app.models.enums import ReservationStatus
+from app.services.reward_catalog_service import RewardCatalogService
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RewardInventoryService:
+    """
+    Lock-free inventory for limited rewards.
+
+    Units are taken with a single conditional ``UPDATE`` that only succeeds while
+    ``quantity_claimed < quantity_available``, so concurrent claimers never wait
+    on a row lock and a reward can never be oversold. Donations hold a unit
+    through a ``RewardReservation`` that is confirmed when checkout completes
+    and released when it fails or expires.
+
+    Methods that take a ``session`` run inside the caller's transaction and do
+    not commit.
+    """
+
+    @staticmethod
+    def try_acquire(session, reward_id):
+        """Take one unit of a reward. Returns False when it is sold out."""
+        claimed = func.coalesce(Reward.quantity_claimed, 0)
+        result = session.execute(
+            update(Reward)
+            .where(
+                Reward.id == reward_id,
+                or_(Reward.quantity_available.is_(None), claimed < Reward.quantity_available)
+            )
+            .values(quantity_claimed=claimed + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+        RewardInventoryService._quantity_changed(session, reward_id)
+        return True
+
+    @staticmethod
+    def give_back(session, reward_id):
+        """Return one unit of a reward to the pool."""
+        session.execute(
+            update(Reward)
+            .where(Reward.id == reward_id, Reward.quantity_claimed > 0)
+            .values(quantity_claimed=Reward.quantity_claimed - 1)
+            .execution_options(synchronize_session=False)
+        )
+        RewardInventoryService._quantity_changed(session, reward_id)
+
+    @staticmethod
+    def _quantity_changed(session, reward_id):
+        project_id = session.query(Reward.project_id).filter(Reward.id == reward_id).scalar()
+        if project_id is not None:
+            RewardCatalogService.invalidate_on_commit(session, project_id)
+
+    @staticmethod
+    def _reservation_ttl():
+        return timedelta(seconds=current_app.config.get('REWARD_RESERVATION_TTL', 1860))
+
+    def reserve(self, session, reward_id, user_id, donation_id=None):
+        """
+        Hold one unit of a reward for a pending donation.
+
+        When the reward looks sold out, expired holds on it are released and
+        the claim is retried once.
+
+        Returns:
+            RewardReservation or None if the reward is sold out
+        """
+        acquired = self.try_acquire(session, reward_id)
+        if not acquired and self.release_expired(session, reward_id=reward_id):
+            acquired = self.try_acquire(session, reward_id)
+        if not acquired:
+            return None
+
+        reservation = RewardReservation(
+            reward_id=reward_id,
+            user_id=user_id,
+            donation_id=donation_id,
+            status=ReservationStatus.HELD,
+            expires_at=datetime.utcnow() + self._reservation_ttl()
+        )
+        session.add(reservation)
+        return reservation
+
+    @staticmethod
+    def get_for_donation(session, donation_id):
+        return session.query(RewardReservation).filter_by(donation_id=donation_id).first()
+
+    @staticmethod
+    def extend(session, donation_id, expires_at):
+        """Align a held reservation with the expiry of its checkout session."""
+        session.execute(
+            update(RewardReservation)
+            .where(RewardReservation.donation_id == donation_id,
+                   RewardReservation.status == ReservationStatus.HELD)
+            .values(expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    def confirm(self, session, donation_id):
+        """
+        Turn the hold of a paid donation into a permanent claim.
+
+        If the hold was already released (checkout completed after the sweep),
+        the unit is taken again; when none is left the claim is still honoured
+        because the backer has paid, and the oversell is logged.
+        """
+        now = datetime.utcnow()
+        result = session.execute(
+            update(RewardReservation)
+            .where(RewardReservation.donation_id == donation_id,
+                   RewardReservation.status == ReservationStatus.HELD)
+            .values(status=ReservationStatus.CONFIRMED, confirmed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return True
+
+        reservation = self.get_for_donation(session, donation_id)
+        if reservation is None or reservation.status != ReservationStatus.RELEASED:
+            return reservation is not None
+
+        if not self.try_acquire(session, reservation.reward_id):
+            logger.warning(f"Reward {reservation.reward_id} oversold by late payment of donation {donation_id}")
+            session.execute(
+                update(Reward)
+                .where(Reward.id == reservation.reward_id)
+                .values(quantity_claimed=func.coalesce(Reward.quantity_claimed, 0) + 1)
+                .execution_options(synchronize_session=False)
+            )
+            self._quantity_changed(session, reservation.reward_id)
+        reservation.status = ReservationStatus.CONFIRMED
+        reservation.confirmed_at = now
+        return True
+
+    def release(self, session, reservation_id=None, donation_id=None, reason=None):
+        """
+        Release a held reservation and give its unit back.
+
+        Safe to call repeatedly or concurrently: only the caller that flips the
+        reservation from HELD to RELEASED returns the unit.
+
+        Returns:
+            bool: Whether a hold was released
+        """
+        condition = (RewardReservation.id == reservation_id if reservation_id is not None
+                     else RewardReservation.donation_id == donation_id)
+        reservation = session.query(RewardReservation.id, RewardReservation.reward_id).filter(condition).first()
+        if reservation is None:
+            return False
+
+        result = session.execute(
+            update(RewardReservation)
+            .where(RewardReservation.id == reservation.id,
+                   RewardReservation.status == ReservationStatus.HELD)
+            .values(status=ReservationStatus.RELEASED, released_at=datetime.utcnow(), release_reason=reason)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return False
+
+        self.give_back(session, reservation.reward_id)
+        logger.info(f"Released reservation {reservation.id} of reward {reservation.reward_id} ({reason})")
+        return True
+
+    def release_for_donation(self, donation_id, reason):
+        """Release a donation's hold in its own transaction."""
+        try:
+            released = self.release(db.session, donation_id=donation_id, reason=reason)
+            db.session.commit()
+            return released
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to release reservation for donation {donation_id}: {str(e)}")
+            return False
+
+    def release_expired(self, session=None, reward_id=None, limit=500):
+        """
+        Release holds whose checkout window (plus REWARD_RESERVATION_GRACE) has passed.
+
+        Returns:
+            int: Number of holds released
+        """
+        own_session = session is None
+        session = session or db.session
+        grace = timedelta(seconds=current_app.config.get('REWARD_RESERVATION_GRACE', 600))
+
+        query = session.query(RewardReservation.id).filter(
+            RewardReservation.status == ReservationStatus.HELD,
+            RewardReservation.expires_at < datetime.utcnow() - grace
+        )
+        if reward_id is not None:
+            query = query.filter(RewardReservation.reward_id == reward_id)
+        expired_ids = [row.id for row in query.order_by(RewardReservation.expires_at).limit(limit)]
+
+        released = sum(
+            1 for reservation_id in expired_ids
+            if self.release(session, reservation_id=reservation_id, reason='expired')
+        )
+        if own_session:
+            session.commit()
+        if released:
+            logger.info(f"Released {released} expired reward reservations")
+        return released
@@ -8,6 +8,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from app.schemas.reward_schemas import RewardSchema, RewardUpdateSchema
 from app.services.email_service import send_templated_email
 from app.services.reward_email_service import reward_email_service
+from app.services.reward_inventory_service import RewardInventoryService
+from app.services.reward_catalog_service import RewardCatalogService
 from sqlalchemy import and_, select
 from sqlalchemy.exc import IntegrityError
 import logging
@@ -22,6 +24,10 @@ class ServiceResponse:
     status_code: int = 200
 
 class RewardService:
+    def __init__(self):
+        self.inventory = RewardInventoryService()
+        self.catalog = RewardCatalogService()
+
     def _validate_reward_constraints(self, reward: Reward) -> bool:
         """
         Validate business rules for rewards
@@ -66,6 +72,7 @@ class RewardService:
                     raise ValueError("Reward constraints validation failed")
 
             db.session.commit()
+            self.catalog.invalidate(project_id)
 
             # Send email notification using the email service
             reward_email_service.notify_reward_creation(project, reward)
@@ -159,6 +166,7 @@ class RewardService:
             
             try:
                 db.session.commit()
+                self.catalog.invalidate(project_id)
                 if changes:
                     reward_email_service.notify_reward_update(project, reward, changes)
                 return schema.dump(reward)
@@ -189,7 +197,7 @@ class RewardService:
             reward = Reward.query.filter_by(
                 project_id=project_id, 
                 id=reward_id
-            ).with_for_update().first()
+            ).first()
             
             if not reward:
                 return ServiceResponse(
@@ -204,20 +212,19 @@ class RewardService:
                     'status_code': 404
                 }
 
-            # Check if the reward is still available
-            if (reward.quantity_available is not None and 
-                reward.quantity_claimed >= reward.quantity_available):
-                return ServiceResponse(
-                    error='Reward is no longer available',
-                    status_code=400
-                ).data
+            # Take a unit with a conditional update instead of locking the row
+            if not self.inventory.try_acquire(db.session, reward.id):
+                db.session.rollback()
+                return {
+                    'error': 'Reward is no longer available',
+                    'status_code': 400
+                }
 
-            # Increment claimed quantity and associate with user
-            reward.quantity_claimed += 1
             user.claimed_rewards.append(reward)
             
             try:
                 db.session.commit()
+                db.session.refresh(reward)
             except SQLAlchemyError as e:
                 db.session.rollback()
                 logger.error(f"Failed to commit claim reward transaction: {str(e)}")
@@ -252,14 +259,8 @@ class RewardService:
             }
 
     def get_project_rewards(self, project_id, page, per_page):
-        """Get paginated rewards for a project"""
-        pagination = Reward.query.filter_by(project_id=project_id).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        schema = RewardSchema(many=True)
-        return schema.dump(pagination.items)
+        """Get paginated rewards for a project, with remaining quantities, from the catalog cache"""
+        return self.catalog.get_page(project_id, page, per_page)
 
     def get_reward(self, project_id, reward_id):
         reward = Reward.query.filter_by(project_id=project_id, id=reward_id).first()
@@ -274,6 +275,7 @@ class RewardService:
             if reward:
                 db.session.delete(reward)
                 db.session.commit()
+                self.catalog.invalidate(project_id)
                 return True
             return False
         except SQLAlchemyError as e:
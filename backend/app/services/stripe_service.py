@@ -1,11 +1,13 @@
 # app/services/stripe_service.py
-import stripe
+from app.utils.lazy_import import lazy_module
 from flask import current_app, url_for
 from app.models.user import User
 from app import db
 import logging
 import json
 
+stripe = lazy_module('stripe')
+
 logger = logging.getLogger(__name__)
 
 class StripeService:
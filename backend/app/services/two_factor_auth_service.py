@@ -1,7 +1,6 @@
 # app/services/two_factor_auth_service.py
 
-import pyotp
-import qrcode
+from app.utils.lazy_import import lazy_module
 import io
 import base64
 from app.models.user import User
@@ -9,6 +8,9 @@ from app import db
 from app.services.email_service import send_templated_email
 import secrets
 
+pyotp = lazy_module('pyotp')
+qrcode = lazy_module('qrcode')
+
 class TwoFactorAuthService:
     @staticmethod
     def initiate_2fa_setup(user):
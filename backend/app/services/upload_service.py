@@ -0,0 +1,472 @@
+# app/services/upload_service.py
+
+import hashlib
+import mimetypes
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.utils import secure_filename
+from app import db
+from app.models.upload_session import UploadSession
+from app.models.media import MediaBlob
+from app.models.enums import UploadStatus
+from app.utils.exceptions import ValidationError
+from app.utils.file_utils import get_file_subfolder
+from app.utils.storage import get_storage
+from app.services.media_blob_service import MediaBlobService
+from app.services.image_derivative_service import ImageDerivativeService
+import logging
+
+logger = logging.getLogger(__name__)
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+class UploadService:
+    """
+    Resumable chunked uploads.
+
+    A session is created with the final size (and optionally the SHA-256) of
+    the file. Chunks are appended at the current offset and streamed straight
+    into a ``.part`` file next to the final location, so memory use is bounded
+    by the copy buffer and completing the upload is a rename, not a copy. A
+    client that lost its connection asks for the current offset and resumes
+    from there. Completed files go into the content-addressed media store; when
+    the declared checksum is already stored the session completes right away
+    and no bytes need to be sent. With an object storage backend, clients can
+    instead put the file straight into the bucket through a presigned URL.
+    """
+
+    def __init__(self):
+        self.blobs = MediaBlobService()
+
+    @staticmethod
+    def _buffer_size():
+        return current_app.config.get('UPLOAD_CHUNK_BUFFER_SIZE', 1024 * 1024)
+
+    @staticmethod
+    def _claim_timeout():
+        return timedelta(seconds=current_app.config.get('UPLOAD_CHUNK_CLAIM_TIMEOUT', 600))
+
+    @staticmethod
+    def _allowed_extensions():
+        return current_app.config['ALLOWED_EXTENSIONS'] | current_app.config['ALLOWED_VIDEO_EXTENSIONS']
+
+    @staticmethod
+    def part_path(upload):
+        return os.path.join(get_storage().staging_root(upload.subfolder), f"{upload.id}.part")
+
+    @staticmethod
+    def _get_owned(upload_id, user_id):
+        upload = db.session.get(UploadSession, upload_id)
+        if not upload or upload.user_id != user_id:
+            return None
+        return upload
+
+    def _validate_new_upload(self, filename, total_size, checksum, checksum_required=False):
+        """Normalize the metadata of a new upload. Returns (values, None) or (None, error)."""
+        filename = secure_filename(filename or '')
+        if '.' not in filename:
+            return None, {'error': 'No file extension found', 'status_code': 400}
+        extension = filename.rsplit('.', 1)[1].lower()
+        if extension not in self._allowed_extensions():
+            return None, {'error': f'File type .{extension} is not supported', 'status_code': 400}
+
+        try:
+            total_size = int(total_size)
+        except (TypeError, ValueError):
+            return None, {'error': 'total_size must be an integer', 'status_code': 400}
+        max_size = current_app.config.get('MAX_RESUMABLE_UPLOAD_SIZE', 2 * 1024 ** 3)
+        if total_size <= 0 or total_size > max_size:
+            return None, {'error': f'total_size must be between 1 and {max_size} bytes', 'status_code': 400}
+
+        if checksum is None and checksum_required:
+            return None, {'error': 'checksum is required', 'status_code': 400}
+        if checksum is not None:
+            checksum = str(checksum).lower()
+            if not SHA256_PATTERN.match(checksum):
+                return None, {'error': 'checksum must be a hex encoded SHA-256 digest', 'status_code': 400}
+
+        subfolder, _ = get_file_subfolder(extension)
+        return {
+            'filename': filename,
+            'extension': extension,
+            'subfolder': subfolder,
+            'total_size': total_size,
+            'checksum': checksum,
+        }, None
+
+    @staticmethod
+    def _session_expiry():
+        return datetime.utcnow() + timedelta(seconds=current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+
+    def init_upload(self, user_id, filename, total_size, checksum=None):
+        """
+        Start a resumable upload.
+
+        Returns:
+            dict: The upload session or error information
+        """
+        try:
+            values, error = self._validate_new_upload(filename, total_size, checksum)
+            if error:
+                return error
+
+            if values['checksum'] is not None:
+                deduplicated = self._complete_from_existing(user_id, **values)
+                if deduplicated:
+                    return deduplicated
+
+            upload = UploadSession(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                received_size=0,
+                status=UploadStatus.IN_PROGRESS,
+                expires_at=self._session_expiry(),
+                **values
+            )
+
+            os.makedirs(get_storage().staging_root(upload.subfolder), exist_ok=True)
+            # Create the part file up front so appends can always open it for update
+            open(self.part_path(upload), 'wb').close()
+
+            db.session.add(upload)
+            db.session.commit()
+            return upload.to_dict()
+
+        except ValidationError as e:
+            return {'error': str(e), 'status_code': 400}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error in init_upload: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+    def init_direct_upload(self, user_id, filename, total_size, checksum):
+        """
+        Start an upload that the client sends straight to object storage.
+
+        The presigned PUT is bound to the content-addressed key and to the
+        declared SHA-256, so the store rejects any other content and the API
+        only records metadata. Backends that cannot presign (the filesystem)
+        return 501; clients then use the resumable upload API.
+
+        Returns:
+            dict: The upload session with an ``upload`` request description, or error information
+        """
+        try:
+            values, error = self._validate_new_upload(filename, total_size, checksum, checksum_required=True)
+            if error:
+                return error
+
+            deduplicated = self._complete_from_existing(user_id, **values)
+            if deduplicated:
+                return deduplicated
+
+            key = self.blobs.blob_key(values['checksum'], values['extension'])
+            presigned = get_storage().presigned_put(
+                key,
+                mimetypes.guess_type(values['filename'])[0] or 'application/octet-stream',
+                values['checksum'],
+                current_app.config.get('DIRECT_UPLOAD_URL_TTL', 900)
+            )
+            if presigned is None:
+                return {'error': 'Direct uploads are not supported by this storage backend', 'status_code': 501}
+
+            upload = UploadSession(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                received_size=0,
+                status=UploadStatus.IN_PROGRESS,
+                is_direct=True,
+                expires_at=self._session_expiry(),
+                **values
+            )
+            db.session.add(upload)
+            db.session.commit()
+            return {**upload.to_dict(), 'upload': presigned}
+
+        except ValidationError as e:
+            return {'error': str(e), 'status_code': 400}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error in init_direct_upload: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+    def _complete_from_existing(self, user_id, filename, extension, subfolder, total_size, checksum):
+        blob = db.session.get(MediaBlob, checksum)
+        if not blob or blob.size != total_size:
+            return None
+        url = self.blobs.find_existing(checksum)
+        if not url:
+            return None
+
+        now = datetime.utcnow()
+        upload = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            filename=filename,
+            extension=extension,
+            subfolder=subfolder,
+            total_size=total_size,
+            received_size=total_size,
+            checksum=checksum,
+            status=UploadStatus.COMPLETED,
+            url=url,
+            completed_at=now,
+            expires_at=self._session_expiry()
+        )
+        db.session.add(upload)
+        db.session.commit()
+        logger.info(f"Upload {upload.id} deduplicated to existing blob {checksum}")
+        return {**upload.to_dict(), 'deduplicated': True}
+
+    def get_upload(self, upload_id, user_id):
+        upload = self._get_owned(upload_id, user_id)
+        if not upload:
+            return {'error': 'Upload not found', 'status_code': 404}
+        return upload.to_dict()
+
+    def append_chunk(self, upload_id, user_id, offset, stream, length):
+        """
+        Write one chunk read from ``stream`` at ``offset``.
+
+        ``offset`` must equal the bytes received so far; otherwise 409 is
+        returned together with the current offset so the client can resume.
+        The offset is claimed before any byte is written, so of two racing
+        appends only one touches the part file; the other gets 409. A claim
+        lapses after UPLOAD_CHUNK_CLAIM_TIMEOUT, and its writer stops there.
+        If the client disconnects mid-chunk, the bytes that reached the disk
+        are kept and counted.
+        """
+        upload = self._get_owned(upload_id, user_id)
+        if not upload:
+            return {'error': 'Upload not found', 'status_code': 404}
+        if upload.status != UploadStatus.IN_PROGRESS:
+            return {'error': f'Upload is {upload.status.value.lower()}', 'status_code': 409}
+        if upload.is_direct:
+            return {'error': 'Direct uploads are sent to the presigned URL', 'status_code': 409}
+        if upload.expires_at < datetime.utcnow():
+            return {'error': 'Upload session has expired', 'status_code': 410}
+        if offset != upload.received_size:
+            return {
+                'error': 'Offset does not match the received size',
+                'status_code': 409,
+                'received_size': upload.received_size
+            }
+        if length is None or length <= 0:
+            return {'error': 'Content-Length is required', 'status_code': 411}
+        if offset + length > upload.total_size:
+            return {'error': 'Chunk exceeds the declared total size', 'status_code': 400}
+
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        claimed_until = now + self._claim_timeout()
+        try:
+            claim = db.session.execute(
+                update(UploadSession)
+                .where(UploadSession.id == upload.id,
+                       UploadSession.status == UploadStatus.IN_PROGRESS,
+                       UploadSession.received_size == offset,
+                       or_(UploadSession.chunk_token.is_(None), UploadSession.chunk_claimed_until < now))
+                .values(chunk_token=token, chunk_claimed_until=claimed_until)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error claiming a chunk of upload {upload_id}: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+        if claim.rowcount != 1:
+            db.session.refresh(upload)
+            return {
+                'error': 'Another chunk is being written at this offset',
+                'status_code': 409,
+                'received_size': upload.received_size
+            }
+
+        written = 0
+        failed = False
+        buffer_size = self._buffer_size()
+        try:
+            with open(self.part_path(upload), 'r+b') as part:
+                part.seek(offset)
+                while written < length:
+                    data = stream.read(min(buffer_size, length - written))
+                    # Past the claim another append may own the offset, stop writing
+                    if not data or datetime.utcnow() >= claimed_until:
+                        break
+                    part.write(data)
+                    written += len(data)
+        except ClientDisconnected:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to write chunk of upload {upload_id}: {str(e)}")
+            # Release the claim without counting bytes that may not have reached the disk
+            failed = True
+            written = 0
+
+        try:
+            # Advance and release in one step, unless the claim lapsed and was taken over
+            result = db.session.execute(
+                update(UploadSession)
+                .where(UploadSession.id == upload.id, UploadSession.chunk_token == token)
+                .values(received_size=offset + written, chunk_token=None, chunk_claimed_until=None,
+                        updated_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error in append_chunk: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+        db.session.refresh(upload)
+        if result.rowcount != 1:
+            return {
+                'error': 'The chunk took too long and its offset was taken over',
+                'status_code': 409,
+                'received_size': upload.received_size
+            }
+        if failed:
+            return {'error': 'Failed to store chunk', 'status_code': 500}
+        if written < length:
+            logger.info(f"Upload {upload_id} chunk interrupted after {written} of {length} bytes")
+        return upload.to_dict()
+
+    def complete_upload(self, upload_id, user_id):
+        """
+        Verify the received file and move it into the media store.
+
+        Returns:
+            dict: The completed upload including its URL, or error information
+        """
+        upload = self._get_owned(upload_id, user_id)
+        if not upload:
+            return {'error': 'Upload not found', 'status_code': 404}
+        if upload.status == UploadStatus.COMPLETED:
+            return upload.to_dict()
+        if upload.status != UploadStatus.IN_PROGRESS:
+            return {'error': f'Upload is {upload.status.value.lower()}', 'status_code': 409}
+        if upload.is_direct:
+            return self._complete_direct_upload(upload)
+        if upload.received_size != upload.total_size:
+            return {
+                'error': 'Upload is incomplete',
+                'status_code': 409,
+                'received_size': upload.received_size
+            }
+
+        part_path = self.part_path(upload)
+        try:
+            digest = hashlib.sha256()
+            buffer_size = self._buffer_size()
+            with open(part_path, 'rb') as part:
+                for block in iter(lambda: part.read(buffer_size), b''):
+                    digest.update(block)
+
+            if upload.checksum and digest.hexdigest() != upload.checksum:
+                self._abort(upload)
+                return {'error': 'Checksum mismatch, the upload was discarded', 'status_code': 422}
+
+            url = self.blobs.adopt_file(part_path, digest.hexdigest(), upload.total_size, upload.extension)
+
+            upload.checksum = digest.hexdigest()
+            upload.status = UploadStatus.COMPLETED
+            upload.completed_at = datetime.utcnow()
+            upload.url = url
+            db.session.commit()
+
+            logger.info(f"Upload {upload.id} completed: {upload.url}")
+            return upload.to_dict()
+
+        except OSError as e:
+            logger.error(f"Failed to finalize upload {upload_id}: {str(e)}")
+            return {'error': 'Failed to store upload', 'status_code': 500}
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error in complete_upload: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+    def _complete_direct_upload(self, upload):
+        """Record a file the client has put into object storage."""
+        storage = get_storage()
+        key = self.blobs.blob_key(upload.checksum, upload.extension)
+        try:
+            # The store verified the signed checksum, so the object holds the declared content
+            size = storage.object_size(key)
+            if size is None:
+                return {'error': 'The file has not been uploaded yet', 'status_code': 409, 'received_size': 0}
+            if size != upload.total_size:
+                # The size limit was checked against the declared size only
+                self._abort(upload)
+                if db.session.get(MediaBlob, upload.checksum) is None:
+                    storage.delete([key])
+                logger.warning(f"Direct upload {upload.id} is {size} bytes, {upload.total_size} were declared")
+                return {'error': 'Uploaded size does not match the declared size, the upload was discarded',
+                        'status_code': 422}
+
+            self.blobs.register_blob(upload.checksum, upload.extension, size)
+            if ImageDerivativeService.is_image(upload.extension):
+                storage.fetch(key)
+                self.blobs.schedule_variants(key, upload.checksum, upload.extension)
+
+            upload.received_size = size
+            upload.status = UploadStatus.COMPLETED
+            upload.completed_at = datetime.utcnow()
+            upload.url = storage.url(key)
+            db.session.commit()
+
+            logger.info(f"Direct upload {upload.id} completed: {upload.url}")
+            return upload.to_dict()
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error completing direct upload {upload.id}: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+        except Exception as e:
+            logger.error(f"Failed to complete direct upload {upload.id}: {str(e)}")
+            return {'error': 'Failed to verify upload', 'status_code': 502}
+
+    def _abort(self, upload):
+        upload.status = UploadStatus.ABORTED
+        db.session.commit()
+        try:
+            os.remove(self.part_path(upload))
+        except FileNotFoundError:
+            pass
+
+    def abort_upload(self, upload_id, user_id):
+        upload = self._get_owned(upload_id, user_id)
+        if not upload:
+            return {'error': 'Upload not found', 'status_code': 404}
+        if upload.status != UploadStatus.IN_PROGRESS:
+            return {'error': f'Upload is {upload.status.value.lower()}', 'status_code': 409}
+        try:
+            self._abort(upload)
+            return upload.to_dict()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"Database error in abort_upload: {str(e)}")
+            return {'error': 'An unexpected error occurred', 'status_code': 500}
+
+    @staticmethod
+    def resolve_upload_url(upload_id, user_id, allowed_extensions):
+        """
+        Return the URL of a completed upload so a project can reference it.
+
+        Raises:
+            ValidationError: If the upload does not exist, is not the user's,
+                is not completed or has the wrong file type
+        """
+        upload = db.session.get(UploadSession, upload_id)
+        if not upload or upload.user_id != int(user_id):
+            raise ValidationError(f"Upload {upload_id} not found")
+        if upload.status != UploadStatus.COMPLETED:
+            raise ValidationError(f"Upload {upload_id} is not completed")
+        if upload.extension not in allowed_extensions:
+            raise ValidationError(f"File type .{upload.extension} is not supported here")
+        return upload.url
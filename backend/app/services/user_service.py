@@ -6,9 +6,8 @@ from app import db
 from werkzeug.datastructures import FileStorage
 from app.utils.validators import validate_email
 from flask import current_app
-import os
-import uuid
 from werkzeug.utils import secure_filename
+from app.services.media_blob_service import MediaBlobService
 
 logger = logging.getLogger(__name__)
 
@@ -91,15 +90,9 @@ class UserService:
                 if file_ext not in allowed_extensions:
                     return False, "Invalid image type. Allowed types: png, jpg, jpeg, gif"
                 
-                # Generate unique filename
-                unique_filename = f"{user.id}_{str(uuid.uuid4())}.{file_ext}"
-                filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
-                
-                # Save file
-                profile_image.save(filepath)
-                
-                # Update user's profile image path
-                user.profile_image = unique_filename
+                # Store in the media store, which also generates the avatar sizes
+                max_size = current_app.config.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)
+                user.profile_image = MediaBlobService().store_stream(profile_image.stream, file_ext, max_size=max_size)
 
             db.session.commit()
             logger.info(f"User {user.username} profile updated successfully")
@@ -0,0 +1,75 @@
+"""
+Conditional GET for read endpoints.
+
+A view decorated with ``etag`` gets an ETag derived from the versions of the
+cache tags its response depends on (see app.services.cache_tags), never
+from the response body. Those versions are bumped whenever a committed
+write touches a tagged row, so computing the ETag is a single Redis MGET.
+When the client's ``If-None-Match`` matches, a 304 is returned before the
+view runs: no queries, no serialization. Authentication decorators listed
+above ``etag`` still run first.
+
+The view runs with the cache's local tier skipped. Local entries are not
+checked against the tag versions, so right after a write they could pair the
+previous body with the new ETag, which clients would then keep.
+
+The ETag covers the URL (path and query string) but not the caller, so only
+decorate views whose response is the same for every caller allowed to see it.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, make_response, request
+from redis.exceptions import RedisError
+
+from app.utils.metrics import CONDITIONAL_REQUESTS
+from app.utils.tiered_cache import get_cache, skip_local_tier
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _cache_control(policy):
+    return current_app.config['CACHE_CONTROL_POLICIES'][policy]
+
+def compute_etag(tags):
+    """Return the ETag value of the current URL given the tags its response depends on."""
+    versions = get_cache().tag_versions(tags)
+    identity = repr((current_app.config.get('ETAG_VERSION'), request.full_path, versions))
+    return hashlib.blake2b(identity.encode(), digest_size=12).hexdigest()
+
+def etag(tags, policy):
+    """
+    Answer GETs with 304 Not Modified while the tags of the response are unchanged.
+
+    ``tags`` is called with the view arguments and returns the cache tags the
+    response depends on; ``policy`` names the Cache-Control policy of the
+    endpoint (``CACHE_CONTROL_POLICIES``). Only 200 responses get an ETag.
+    When Redis is unavailable the view runs unconditionally.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+            try:
+                value = compute_etag(tags(*args, **kwargs))
+            except RedisError as e:
+                logger.error(f"Could not compute ETag for {request.path}: {str(e)}")
+                return f(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(value):
+                CONDITIONAL_REQUESTS.labels(request.endpoint, 'not_modified').inc()
+                response = current_app.response_class(status=304)
+            else:
+                CONDITIONAL_REQUESTS.labels(request.endpoint, 'modified').inc()
+                with skip_local_tier():
+                    response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(value, weak=True)
+            response.headers['Cache-Control'] = _cache_control(policy)
+            if policy == 'private':
+                response.vary.add('Authorization')
+            return response
+        return decorated_function
+    return decorator
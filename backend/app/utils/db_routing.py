@@ -0,0 +1,208 @@
+"""
+Read-replica routing.
+
+Replicas are listed in ``SQLALCHEMY_REPLICA_URIS`` and get engines named
+``replica_0``, ``replica_1``, ... (kept out of Flask-SQLAlchemy's binds so
+``create_all`` and migrations never touch them). Nothing is routed to
+them by default: views and service functions opt in with ``replica_reads``.
+Inside them, the SELECTs of ``db.session`` go to a replica while flushes,
+DML, ``SELECT ... FOR UPDATE`` and every read after the session's first
+write go to the primary. Values computed for the service cache are always
+read from the primary, so a lagging replica never gets cached under the
+current tag versions.
+
+A replica is used only when it is safe to:
+
+* Read-your-writes: a request that committed a write marks its user as
+  sticky in Redis for ``REPLICA_STICKY_SECONDS``, and that user's reads stay
+  on the primary meanwhile (so does the rest of the writing request).
+* Lag: replicas more than ``REPLICA_MAX_LAG`` seconds behind, or that cannot
+  be reached, are skipped; with none left reads fall back to the primary.
+  Lag is read from ``SHOW REPLICA STATUS`` on MySQL (at most every
+  ``REPLICA_LAG_CHECK_INTERVAL`` seconds per process) and taken as 0 on
+  other databases.
+
+Locally, point ``SQLALCHEMY_REPLICA_URIS`` at a second SQLite file or MySQL
+container; the app never writes to it.
+"""
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session as FlaskSession
+from redis.exceptions import RedisError
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.utils.metrics import DB_READ_ROUTES
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica_bind'
+SESSION_WROTE = 'wrote'
+
+def _sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+class RoutingSession(FlaskSession):
+    """Flask-SQLAlchemy session that sends reads to the replica chosen by ``replica_reads``."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(REPLICA_BIND)
+        if (replica is None or bind is not None or self._flushing or self.info.get(SESSION_WROTE)
+                or _needs_primary(clause)):
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        return replica_engines()[replica]
+
+def _needs_primary(clause):
+    if clause is None:
+        return False
+    return getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None
+
+# Lag of each replica: (checked at, seconds behind)
+_lag = {}
+_lag_lock = threading.Lock()
+
+def replica_lag(engine):
+    """Seconds the replica behind ``engine`` trails its primary, inf if unknown."""
+    if engine.dialect.name != 'mysql':
+        return 0.0
+    with engine.connect() as connection:
+        try:
+            status = connection.exec_driver_sql('SHOW REPLICA STATUS').mappings().first()
+        except DBAPIError:
+            # MySQL before 8.0.22
+            status = connection.exec_driver_sql('SHOW SLAVE STATUS').mappings().first()
+    if status is None:
+        # Not replicating, e.g. a second local container
+        return 0.0
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    # NULL while the replication threads are stopped
+    return math.inf if lag is None else float(lag)
+
+def _current_lag(name, engine):
+    interval = current_app.config.get('REPLICA_LAG_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    with _lag_lock:
+        checked = _lag.get(name)
+    if checked and now - checked[0] < interval:
+        return checked[1]
+    try:
+        lag = replica_lag(engine)
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not check lag of {name}, skipping it: {str(e)}")
+        lag = math.inf
+    with _lag_lock:
+        _lag[name] = (now, lag)
+    return lag
+
+def _current_user_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # No JWT verified for this request
+        return None
+
+def _is_sticky():
+    if g.get('db_wrote'):
+        return True
+    user_id = _current_user_id()
+    if user_id is None:
+        return False
+    try:
+        return bool(current_app.redis_client.exists(_sticky_key(user_id)))
+    except RedisError as e:
+        logger.error(f"Could not check replica stickiness of user {user_id}: {str(e)}")
+        return True
+
+def choose_replica():
+    """Return the name of a replica safe to read from now, or None for the primary."""
+    replicas = replica_engines()
+    if not replicas:
+        return None
+    if has_request_context() and _is_sticky():
+        DB_READ_ROUTES.labels('primary', 'sticky').inc()
+        return None
+    max_lag = current_app.config.get('REPLICA_MAX_LAG', 2)
+    healthy = [name for name, engine in replicas.items() if _current_lag(name, engine) <= max_lag]
+    if not healthy:
+        DB_READ_ROUTES.labels('primary', 'lag').inc()
+        return None
+    DB_READ_ROUTES.labels('replica', 'ok').inc()
+    return random.choice(healthy)
+
+@contextmanager
+def replica_session():
+    """Route the reads of ``db.session`` to a replica for the duration of the block."""
+    from app import db
+
+    session = db.session()
+    previous = session.info.get(REPLICA_BIND)
+    session.info[REPLICA_BIND] = previous or choose_replica()
+    try:
+        yield session
+    finally:
+        session.info[REPLICA_BIND] = previous
+
+@contextmanager
+def primary_session():
+    """Route the reads of ``db.session`` to the primary for the duration of the block."""
+    from app import db
+
+    session = db.session()
+    previous = session.info.get(REPLICA_BIND)
+    session.info[REPLICA_BIND] = None
+    try:
+        yield session
+    finally:
+        session.info[REPLICA_BIND] = previous
+
+def replica_reads(f):
+    """Run a read-only view or service function against a replica when one is safe to use."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with replica_session():
+            return f(*args, **kwargs)
+    return decorated_function
+
+@event.listens_for(Session, 'after_flush')
+def _mark_write(session, flush_context):
+    session.info[SESSION_WROTE] = True
+
+@event.listens_for(Session, 'after_commit')
+def _mark_request_write(session):
+    if session.info.get(SESSION_WROTE) and has_request_context():
+        g.db_wrote = True
+
+def _stick_writer(response):
+    if g.get('db_wrote'):
+        user_id = _current_user_id()
+        if user_id is not None:
+            seconds = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+            try:
+                current_app.redis_client.set(_sticky_key(user_id), 1, px=int(seconds * 1000))
+            except RedisError as e:
+                logger.error(f"Could not make user {user_id} sticky to the primary: {str(e)}")
+    return response
+
+def replica_engines():
+    """Engines of the replicas of the current app, by name."""
+    return current_app.extensions.get('db_replicas', {})
+
+def init_replicas(app):
+    """Create an engine for each URL in ``SQLALCHEMY_REPLICA_URIS``."""
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    app.extensions['db_replicas'] = {
+        f'replica_{index}': create_engine(uri, **options) for index, uri in enumerate(uris)
+    }
+    app.after_request(_stick_writer)
@@ -0,0 +1,114 @@
+# app/utils/db_utils.py
+
+from typing import Any, Dict, Iterable, List, Sequence
+from sqlalchemy import Table, and_, event, inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+    elif dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+def upsert_increment(session, table: Table, key_columns: Sequence[str],
+                     increment_columns: Sequence[str], rows: Iterable[Dict[str, Any]]) -> int:
+    """
+    Insert rows, adding their increment columns onto any existing row with the same key.
+
+    Uses a single ``INSERT ... ON DUPLICATE KEY UPDATE`` (MySQL) or
+    ``INSERT ... ON CONFLICT DO UPDATE`` (SQLite/PostgreSQL) statement executed
+    with all rows, so concurrent writers never lose increments.
+
+    Args:
+        session: SQLAlchemy session or connection to execute on
+        table: Target table; ``key_columns`` must be covered by a unique constraint
+        key_columns: Columns identifying a row
+        increment_columns: Numeric columns to add onto the existing values
+        rows: Dictionaries holding key and increment values
+
+    Returns:
+        int: Number of rows submitted
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    dialect_name = session.get_bind().dialect.name if hasattr(session, 'get_bind') else session.dialect.name
+    insert = _dialect_insert(dialect_name)
+
+    if insert is None:
+        # Generic fallback, not safe against concurrent inserts of the same key
+        logger.warning(f"No native upsert for dialect {dialect_name}, using update-then-insert")
+        for row in rows:
+            condition = and_(*[table.c[col] == row[col] for col in key_columns])
+            result = session.execute(
+                table.update().where(condition).values(
+                    {col: table.c[col] + row[col] for col in increment_columns}
+                )
+            )
+            if result.rowcount == 0:
+                session.execute(table.insert().values(**row))
+        return len(rows)
+
+    stmt = insert(table)
+    if dialect_name == 'mysql':
+        stmt = stmt.on_duplicate_key_update(
+            {col: table.c[col] + stmt.inserted[col] for col in increment_columns}
+        )
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={col: table.c[col] + stmt.excluded[col] for col in increment_columns}
+        )
+    session.execute(stmt, rows)
+    return len(rows)
+
+def chunked(items: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    """Yield successive lists of at most ``size`` items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def previous_value_getter(target):
+    """
+    Return a getter for the values an ORM object had before the pending flush.
+
+    Meant for ``after_update``/``after_delete`` mapper events; attributes that
+    were not changed return their current value.
+    """
+    state = inspect(target)
+
+    def get(attr):
+        history = state.attrs[attr].history
+        if history.deleted:
+            return history.deleted[0]
+        return getattr(target, attr)
+    return get
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+def track_previous_values(model, attrs: Sequence[str]) -> None:
+    """
+    Make sure the previous value of ``attrs`` is recorded when they are assigned.
+
+    Expired attributes (e.g. after a commit) are not loaded before being
+    overwritten, which leaves their history empty; an active-history ``set``
+    listener loads the old value first.
+    """
+    for attr in attrs:
+        column = getattr(model, attr)
+        if not event.contains(column, 'set', _load_previous_value):
+            event.listen(column, 'set', _load_previous_value, active_history=True, retval=True)
@@ -48,4 +48,17 @@ def permission_required(permission):
             logger.info(f"User {current_user_id} granted access to {permission}")
             return f(*args, **kwargs)
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
+
+def query_budget(max_queries, max_repeats=2):
+    """
+    Declare how many SQL statements a view may run per request.
+
+    Only records the budget on the view; the test suite's query-counting
+    client enforces it and flags any statement shape repeated more than
+    ``max_repeats`` times (an N+1 lazy load). No runtime cost.
+    """
+    def decorator(f):
+        f.query_budget = {'max_queries': max_queries, 'max_repeats': max_repeats}
+        return f
+    return decorator
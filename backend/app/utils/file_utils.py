@@ -47,6 +47,9 @@ def get_file_subfolder(extension: str) -> Tuple[str, str]:
 def handle_file_upload(file: FileStorage, allowed_extensions: Set[str], upload_folder: str, is_draft: bool = False) -> Optional[str]:
     """
     Handle file upload based on file type.
+
+    The file is stored in the content-addressed media store, so the returned
+    URL is derived from the SHA-256 of its content, not from its name.
     
     Args:
         file (FileStorage): The uploaded file
@@ -73,33 +76,15 @@ def handle_file_upload(file: FileStorage, allowed_extensions: Set[str], upload_f
         if not allowed_file(file.filename, allowed_extensions):
             raise ValidationError(f"File type .{extension} is not supported")
 
-        filename = secure_filename(file.filename)
-        
-        # Get the correct subfolder and base path
-        subfolder, base_path = get_file_subfolder(extension)
-        
-        # Create full save path
-        save_path = os.path.join(base_path, filename)
-        
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        
-        # Check file size before saving
-        file.seek(0, os.SEEK_END)
-        size = file.tell()
-        file.seek(0)
-        
+        # Files are stored by content hash, identical uploads share one file
+        from app.services.media_blob_service import MediaBlobService
         max_size = current_app.config.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024)  # Default 16MB
-        if size > max_size:
-            raise RequestEntityTooLarge()
-        
-        # Save the file
-        file.save(save_path)
-        
-        logger.info(f"File uploaded successfully: {save_path}")
-        
+        url = MediaBlobService().store_stream(file.stream, extension, max_size=max_size)
+
+        logger.info(f"File uploaded successfully: {file.filename} -> {url}")
+
         # Return the URL path that will be stored in database
-        return f'/uploads/{subfolder}/{filename}'
+        return url
         
     except RequestEntityTooLarge:
         logger.error(f"File size exceeds limit: {file.filename}")
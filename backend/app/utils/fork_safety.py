@@ -0,0 +1,32 @@
+"""
+Per-process resources of a preforked worker.
+
+With ``preload_app`` gunicorn builds the app once in the master and forks the
+workers from it. Pooled database connections and Redis sockets created
+before the fork would then be shared by every worker, interleaving their
+traffic on the same socket. ``reinit_after_fork`` is called in each worker
+right after the fork (see gunicorn.conf.py) and gives it its own pools.
+"""
+from app.utils.redis_client import get_redis_client
+import logging
+
+logger = logging.getLogger(__name__)
+
+def reinit_after_fork(app):
+    """Give the current (freshly forked) process its own connection pools."""
+    from app import db
+    from app.services.image_derivative_service import shutdown_executor
+    from app.utils.db_routing import replica_engines
+
+    with app.app_context():
+        # close=False: the parent's connections stay usable by the parent, the child just forgets them
+        for engine in (*db.engines.values(), *replica_engines().values()):
+            engine.dispose(close=False)
+
+        app.redis_client = get_redis_client()
+        # Rebuilt on first use from the new client
+        app.extensions.pop('tiered_cache', None)
+
+        # A process pool inherited from the master belongs to it
+        shutdown_executor(wait=False)
+    logger.debug("Connection pools re-created after fork")
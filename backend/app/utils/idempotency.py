@@ -0,0 +1,178 @@
+# app/utils/idempotency.py
+
+import hashlib
+import json
+import os
+from functools import wraps
+from typing import Callable, Optional
+from flask import request, current_app, make_response
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from redis.exceptions import RedisError
+from app.utils.response import error_response
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+IN_FLIGHT = 'in_flight'
+COMPLETED = 'completed'
+
+# Finish or release a key only while it still holds this request's in-flight
+# record; a key that expired and was taken over by a retry belongs to the retry.
+COMPLETE_IF_OWNED = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('set', KEYS[1], ARGV[2], 'EX', ARGV[3])
+end
+return 0
+"""
+
+DISCARD_IF_OWNED = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+def _request_fingerprint() -> str:
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+def _caller_identity() -> str:
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return str(identity) if identity is not None else request.headers.get('X-Forwarded-For', request.remote_addr)
+
+def _is_cacheable(status_code: int) -> bool:
+    # Transient failures must stay retryable with the same key
+    return status_code < 500 and status_code != 429
+
+def _replay(record: dict):
+    response = current_app.response_class(
+        record['body'],
+        status=record['status_code'],
+        mimetype=record.get('mimetype', 'application/json')
+    )
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+def _in_flight_response():
+    response = make_response(error_response(
+        message="A request with this Idempotency-Key is already being processed",
+        status_code=409
+    ))
+    response.headers['Retry-After'] = '1'
+    return response
+
+def idempotent(ttl: Optional[int] = None, lock_timeout: Optional[int] = None, required: bool = False) -> Callable:
+    """
+    Make a POST endpoint safe to retry with an ``Idempotency-Key`` header.
+
+    The first request with a given key runs the view and its response is stored
+    in Redis for ``ttl`` seconds; retries with the same key and body get the
+    stored response back (with ``Idempotent-Replayed: true``) without running
+    the view again. While the first request is still running, retries get 409.
+    Reusing a key with a different body is rejected with 422.
+
+    Keys are scoped to the endpoint and the caller (JWT identity or client IP).
+    5xx and 429 responses are not stored so the client can retry them. When
+    Redis is unavailable the view runs without idempotency protection.
+
+    Apply it directly above the view, below the authentication, permission and
+    rate-limit decorators, so their rejections are never stored and replayed.
+
+    Args:
+        ttl: Seconds a completed response is kept (IDEMPOTENCY_KEY_TTL by default)
+        lock_timeout: Seconds the in-flight marker lives if the worker dies
+            (IDEMPOTENCY_LOCK_TIMEOUT by default)
+        required: Reject requests without the header with 400
+    """
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                if required:
+                    return error_response(message=f"{IDEMPOTENCY_HEADER} header is required", status_code=400)
+                return f(*args, **kwargs)
+
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return error_response(
+                    message=f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters",
+                    status_code=400
+                )
+
+            record_ttl = ttl or current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400)
+            in_flight_ttl = lock_timeout or current_app.config.get('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+            redis_key = f"idempotency:{request.endpoint}:{_caller_identity()}:{idempotency_key}"
+            fingerprint = _request_fingerprint()
+            # The token makes this request's in-flight record unique, see COMPLETE_IF_OWNED
+            in_flight = json.dumps({'state': IN_FLIGHT, 'fingerprint': fingerprint, 'token': os.urandom(16).hex()})
+
+            try:
+                redis_client = current_app.redis_client
+                acquired = redis_client.set(redis_key, in_flight, nx=True, ex=in_flight_ttl)
+                if not acquired:
+                    stored = redis_client.get(redis_key)
+                    if stored is not None:
+                        record = json.loads(stored)
+                        if record.get('fingerprint') != fingerprint:
+                            return error_response(
+                                message=f"{IDEMPOTENCY_HEADER} was already used with a different request",
+                                status_code=422
+                            )
+                        if record.get('state') == COMPLETED:
+                            logger.info(f"Replaying stored response for {request.endpoint}")
+                            return _replay(record)
+                        return _in_flight_response()
+                    # The record expired between SET and GET, take it over unless another retry got there first
+                    acquired = redis_client.set(redis_key, in_flight, nx=True, ex=in_flight_ttl)
+                    if not acquired:
+                        return _in_flight_response()
+            except RedisError as e:
+                logger.error(f"Redis error in idempotency check, continuing without it: {str(e)}")
+                return f(*args, **kwargs)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                _discard(redis_key, in_flight)
+                raise
+
+            if _is_cacheable(response.status_code):
+                try:
+                    stored = redis_client.register_script(COMPLETE_IF_OWNED)(keys=[redis_key], args=[
+                        in_flight,
+                        json.dumps({
+                            'state': COMPLETED,
+                            'fingerprint': fingerprint,
+                            'status_code': response.status_code,
+                            'mimetype': response.mimetype,
+                            'body': response.get_data(as_text=True)
+                        }),
+                        record_ttl
+                    ])
+                    if not stored:
+                        logger.warning(f"Idempotency key for {request.endpoint} expired before the response was stored")
+                except RedisError as e:
+                    logger.error(f"Failed to store idempotent response: {str(e)}")
+            else:
+                _discard(redis_key, in_flight)
+
+            return response
+        return decorated_function
+    return decorator
+
+def _discard(redis_key: str, in_flight: str) -> None:
+    try:
+        current_app.redis_client.register_script(DISCARD_IF_OWNED)(keys=[redis_key], args=[in_flight])
+    except RedisError as e:
+        logger.error(f"Failed to release idempotency key: {str(e)}")
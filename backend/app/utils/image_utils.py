@@ -0,0 +1,114 @@
+# app/utils/image_utils.py
+import os
+import re
+from typing import Dict, List, Optional
+
+# Resized variants generated for every stored image: (name, max width in px)
+IMAGE_VARIANTS = (
+    ('thumbnail', 320),
+    ('card', 640),
+    ('hero', 1600),
+)
+
+# Output format -> (file extension, Pillow format name)
+IMAGE_FORMATS = {
+    'webp': ('webp', 'WEBP'),
+    'jpeg': ('jpg', 'JPEG'),
+}
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# Local (/uploads/photos/...) or object storage URL of a content-addressed image
+ORIGINAL_URL_PATTERN = re.compile(
+    r'^(?P<prefix>(?:.*/)?photos/[0-9a-f]{2}/[0-9a-f]{2}/)(?P<sha>[0-9a-f]{64})\.(?P<ext>png|jpe?g|gif)$'
+)
+VARIANT_NAME_PATTERN = re.compile(r'^(?P<sha>[0-9a-f]{64})-(?P<variant>[a-z]+)\.(?P<ext>webp|jpg)$')
+
+def variant_filename(sha256: str, variant: str, image_format: str) -> str:
+    return f"{sha256}-{variant}.{IMAGE_FORMATS[image_format][0]}"
+
+def variant_filenames(sha256: str) -> List[str]:
+    """All derivative file names of the blob ``sha256``."""
+    return [
+        variant_filename(sha256, variant, image_format)
+        for variant, _ in IMAGE_VARIANTS
+        for image_format in IMAGE_FORMATS
+    ]
+
+def original_for_variant(path: str) -> Optional[str]:
+    """Return the path of the original image a variant file is derived from, if it exists."""
+    match = VARIANT_NAME_PATTERN.match(os.path.basename(path))
+    if not match:
+        return None
+    directory = os.path.dirname(path)
+    for extension in sorted(IMAGE_EXTENSIONS):
+        original = os.path.join(directory, f"{match.group('sha')}.{extension}")
+        if os.path.exists(original):
+            return original
+    return None
+
+def image_variant_urls(url: Optional[str]) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Map each variant to its URL per format, e.g. ``{'card': {'webp': ..., 'jpeg': ...}}``.
+
+    Only content-addressed images have variants; None is returned for any
+    other URL. The URLs are derived from the original's, so no lookup is done.
+    """
+    match = ORIGINAL_URL_PATTERN.match(url or '')
+    if not match:
+        return None
+    prefix, sha256 = match.group('prefix'), match.group('sha')
+    return {
+        variant: {
+            image_format: prefix + variant_filename(sha256, variant, image_format)
+            for image_format in IMAGE_FORMATS
+        }
+        for variant, _ in IMAGE_VARIANTS
+    }
+
+def image_srcset(url: Optional[str]) -> Optional[Dict[str, str]]:
+    """Return ``srcset`` strings per format (``{'webp': 'url 320w, ...', 'jpeg': ...}``) for an image URL."""
+    variants = image_variant_urls(url)
+    if variants is None:
+        return None
+    return {
+        image_format: ', '.join(f"{variants[variant][image_format]} {width}w" for variant, width in IMAGE_VARIANTS)
+        for image_format in IMAGE_FORMATS
+    }
+
+def render_variants(source_path: str, sha256: str, quality: int = 82) -> List[str]:
+    """
+    Write every resized variant of an image next to it and return their paths.
+
+    Images are never upscaled. Runs in worker processes, so it must not touch
+    the app or database; files are written under a temporary name and renamed
+    so readers never see a partial file.
+    """
+    from PIL import Image, ImageOps
+
+    output_dir = os.path.dirname(source_path)
+    written = []
+    with Image.open(source_path) as original:
+        original.seek(0)  # First frame of animated GIFs
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+        for variant, width in IMAGE_VARIANTS:
+            resized = image.copy()
+            resized.thumbnail((width, width * 4), Image.LANCZOS)
+
+            for image_format, (_, pil_format) in IMAGE_FORMATS.items():
+                frame = resized
+                if pil_format == 'JPEG' and frame.mode == 'RGBA':
+                    # JPEG has no alpha channel, flatten onto white
+                    background = Image.new('RGB', frame.size, (255, 255, 255))
+                    background.paste(frame, mask=frame.split()[3])
+                    frame = background
+
+                path = os.path.join(output_dir, variant_filename(sha256, variant, image_format))
+                temp_path = f"{path}.tmp"
+                frame.save(temp_path, format=pil_format, quality=quality, optimize=True)
+                os.replace(temp_path, path)
+                written.append(path)
+    return written
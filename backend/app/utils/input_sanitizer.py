@@ -1,6 +1,8 @@
 # app/utils/input_sanitizer.py
 
-import bleach
+from app.utils.lazy_import import lazy_module
+
+bleach = lazy_module('bleach')
 
 def sanitize_input(data):
     """
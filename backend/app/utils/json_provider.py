@@ -0,0 +1,89 @@
+"""
+JSON provider for API responses.
+
+Serializes with orjson when it is installed and with the standard library
+otherwise. Both produce the same documents:
+
+* ``Decimal`` as a string (``"25.00"``), so amounts keep their precision
+* ``datetime``, ``date`` and ``time`` as ISO 8601, like ``.isoformat()``
+* ``Enum`` as its value, ``UUID`` and dataclasses as usual
+* keys sorted, compact unless the app runs in debug mode
+
+Models and services can therefore put these values into response dicts as
+they are, without converting every field by hand.
+"""
+import dataclasses
+import decimal
+import enum
+import json
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+def _default(obj):
+    """Encode the types neither encoder handles natively."""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+class FastJSONProvider(JSONProvider):
+    """``app.json`` provider backed by orjson, see the module docstring."""
+
+    sort_keys = True
+    compact = None
+    mimetype = 'application/json'
+
+    def _pretty(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def _encode(self, obj, pretty=False):
+        """Serialize to bytes."""
+        if orjson is None:
+            return self._stdlib_dumps(
+                obj, indent=2 if pretty else None, separators=None if pretty else (',', ':')
+            ).encode()
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def _stdlib_dumps(self, obj, **kwargs):
+        kwargs.setdefault('default', _default)
+        kwargs.setdefault('ensure_ascii', False)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        return json.dumps(obj, **kwargs)
+
+    def dumps(self, obj, **kwargs):
+        # Callers passing encoder options (the session serializer passes separators) get the stdlib
+        if kwargs or orjson is None:
+            kwargs.setdefault('separators', (',', ':'))
+            return self._stdlib_dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        # The session serializer passes an object_hook, which orjson does not support
+        if kwargs or orjson is None:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj, self._pretty()) + b'\n', mimetype=self.mimetype)
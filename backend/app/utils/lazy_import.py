@@ -0,0 +1,68 @@
+"""
+Deferred imports of heavy third-party SDKs.
+
+``stripe = lazy_module('stripe')`` at the top of a module behaves like
+``import stripe`` but only imports the package on first attribute access, so
+importing the app (every worker boot, CLI command and test run) does not pay
+for SDKs the process may never call. ``when_imported`` runs setup code (API
+base URLs, instrumentation) once the module is actually loaded.
+
+Run ``python -m benchmarks.bench_startup --imports 25`` to see what the app
+still imports eagerly.
+"""
+import importlib
+import sys
+import threading
+
+_callbacks = {}
+_lock = threading.RLock()
+
+def _run_callbacks(name, module):
+    for callback in _callbacks.pop(name, ()):
+        callback(module)
+
+class LazyModule:
+    """Stand-in for a module, imported on first attribute access or assignment."""
+
+    def __init__(self, name):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with _lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    _run_callbacks(self._name, module)
+                    object.__setattr__(self, '_module', module)
+        return module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+_lazy_modules = {}
+
+def lazy_module(name):
+    """Return ``name`` if it is already imported, else a LazyModule that imports it when used."""
+    with _lock:
+        if name in sys.modules:
+            return sys.modules[name]
+        return _lazy_modules.setdefault(name, LazyModule(name))
+
+def when_imported(name, callback):
+    """Call ``callback(module)`` once ``name`` is imported through lazy_module, or now if it already is."""
+    with _lock:
+        module = sys.modules.get(name)
+        if module is None:
+            _callbacks.setdefault(name, []).append(callback)
+            return
+    callback(module)
@@ -0,0 +1,101 @@
+# app/utils/media_serving.py
+import mimetypes
+import os
+import re
+from typing import Optional
+from flask import current_app, request
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+# <sha[:2]>/<sha[2:4]>/<sha>.<ext> or a variant <sha>-<name>.<ext>, relative to the subfolder
+CONTENT_ADDRESSED_PATH = re.compile(
+    r'^(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?P<name>(?P<sha>[0-9a-f]{64})(?:-[a-z]+)?\.[a-z0-9]+)$'
+)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+OFFLOAD_X_SENDFILE = 'x-sendfile'
+OFFLOAD_X_ACCEL_REDIRECT = 'x-accel-redirect'
+
+def is_content_addressed(relative_path: str) -> bool:
+    match = CONTENT_ADDRESSED_PATH.match(relative_path)
+    return bool(match) and match.group('sha').startswith(match.group('a') + match.group('b'))
+
+def _etag(relative_path: str, path: str) -> str:
+    # The name of a content-addressed file is derived from its bytes, so it is
+    # a strong validator that is identical on every node
+    if is_content_addressed(relative_path):
+        return os.path.basename(relative_path)
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def _max_age(immutable: bool) -> int:
+    return IMMUTABLE_MAX_AGE if immutable else current_app.config.get('MEDIA_CACHE_MAX_AGE', 300)
+
+def _cache_headers(response, immutable: bool):
+    response.cache_control.public = True
+    response.cache_control.max_age = _max_age(immutable)
+    # Let players know they can seek before their first range request
+    response.accept_ranges = 'bytes'
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+def send_media(base_dir: str, subfolder: str, relative_path: str, immutable: Optional[bool] = None):
+    """
+    Serve a stored media file with validators, caching headers and byte ranges.
+
+    Content-addressed paths never change, so they are cached as immutable and
+    a matching ``If-None-Match`` is answered with 304 without touching the
+    disk. ``Range`` and ``If-Range`` requests get 206/416 responses. With
+    MEDIA_OFFLOAD set, the transfer is handed to the front server via
+    ``X-Sendfile`` or ``X-Accel-Redirect`` (under MEDIA_ACCEL_REDIRECT_PREFIX).
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    path = safe_join(base_dir, relative_path)
+    if path is None:
+        raise FileNotFoundError(relative_path)
+    if immutable is None:
+        immutable = is_content_addressed(relative_path)
+
+    response_class = current_app.response_class
+    offload = current_app.config.get('MEDIA_OFFLOAD') or ''
+
+    if immutable:
+        etag = os.path.basename(relative_path)
+        if request.if_none_match.contains(etag):
+            response = response_class(status=304)
+            response.set_etag(etag)
+            return _cache_headers(response, immutable)
+
+    # Checked here as well, the front server would answer a redirect to a
+    # missing file with its own 404 and the caller could not fall back
+    if not os.path.isfile(path):
+        raise FileNotFoundError(relative_path)
+
+    if offload == OFFLOAD_X_ACCEL_REDIRECT:
+        # nginx serves the bytes (including ranges) from an internal location
+        prefix = current_app.config.get('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+        response = response_class(
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        )
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{subfolder}/{relative_path}"
+        if immutable:
+            response.set_etag(os.path.basename(relative_path))
+        return _cache_headers(response, immutable)
+
+    response = send_file(
+        path,
+        request.environ,
+        conditional=True,
+        etag=_etag(relative_path, path),
+        max_age=_max_age(immutable),
+        use_x_sendfile=offload == OFFLOAD_X_SENDFILE,
+        response_class=response_class
+    )
+    # Let players know they can seek before their first range request
+    response.accept_ranges = 'bytes'
+    if immutable:
+        response.cache_control.immutable = True
+    return response
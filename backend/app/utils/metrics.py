@@ -0,0 +1,308 @@
+# app/utils/metrics.py
+"""
+Prometheus instrumentation.
+
+Collects per-endpoint request latency, the number and time of SQL statements
+per request, Redis command counts and latency, the duration of calls to
+Stripe and SendGrid, service cache hit rates and 304 rates of conditional
+GETs, how long requests wait for a pooled database connection and how many
+of each pool's connections are in use, and serves them on ``/metrics`` in
+the Prometheus text format. Pool saturation is
+``db_pool_connections{state="checked_out"} / ignoring(state) db_pool_connections{state="capacity"}``.
+
+Per-request database figures are accumulated in a context variable by
+SQLAlchemy cursor events and observed once when the response is finalized,
+so the per-statement overhead is two ``perf_counter`` calls and a few
+additions. With ``PROMETHEUS_MULTIPROC_DIR`` set (several gunicorn workers),
+values are shared through files and aggregated at scrape time.
+"""
+import os
+import re
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest, multiprocess, REGISTRY
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app.utils.lazy_import import when_imported
+import logging
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+FAST_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1)
+POOL_WAIT_BUCKETS = (.0005, .001, .005, .01, .05, .1, .25, .5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time spent handling requests', ['method', 'endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'Requests handled', ['method', 'endpoint', 'status']
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request', ['endpoint'],
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in SQL statements per request', ['endpoint'],
+    buckets=LATENCY_BUCKETS
+)
+DB_STATEMENT_DURATION = Histogram(
+    'db_statement_duration_seconds', 'SQL statement execution time', ['operation'],
+    buckets=FAST_BUCKETS
+)
+REDIS_COMMAND_DURATION = Histogram(
+    'redis_command_duration_seconds', 'Redis round trips (pipelines count once)', ['command'],
+    buckets=FAST_BUCKETS
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    'external_call_duration_seconds', 'Calls to third-party APIs', ['service', 'operation', 'outcome'],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests_total', 'Service cache lookups by tier that answered', ['cache', 'result']
+)
+CACHE_BUILD_DURATION = Histogram(
+    'cache_build_duration_seconds', 'Time spent computing values on a cache miss', ['cache'],
+    buckets=LATENCY_BUCKETS
+)
+CACHE_INVALIDATIONS = Counter(
+    'cache_invalidations_total', 'Cache tags invalidated, by whether this process or a peer sent them', ['origin']
+)
+CONDITIONAL_REQUESTS = Counter(
+    'http_conditional_requests_total', 'GETs on ETag endpoints, by whether the client copy was current',
+    ['endpoint', 'result']
+)
+DB_READ_ROUTES = Counter(
+    'db_read_routes_total', 'Replica-eligible reads by the database they went to and why', ['target', 'reason']
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    'db_pool_checkout_duration_seconds', 'Time spent getting a connection from the pool (opening one included)',
+    ['pool'], buckets=POOL_WAIT_BUCKETS
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    'db_pool_checkout_timeouts_total', 'Checkouts that gave up after pool_timeout with every connection in use', ['pool']
+)
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', 'Connections of the pool in use, and the most it lends (pool_size + max_overflow)',
+    ['pool', 'state'], multiprocess_mode='livesum'
+)
+
+# [statement count, seconds] of the request being handled in this context
+_request_db = ContextVar('request_db', default=None)
+
+UNMATCHED_ENDPOINT = '<unmatched>'
+STRIPE_ID_PATTERN = re.compile(r'^[a-z]{2,8}_[A-Za-z0-9]{10,}$')
+SQL_OPERATIONS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE', 'SHOW'}
+
+@contextmanager
+def track_external_call(service, operation):
+    """Time a call to a third-party API; failures are recorded with outcome 'error'."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'success'
+    finally:
+        EXTERNAL_CALL_DURATION.labels(service, operation, outcome).observe(time.perf_counter() - started)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_started'].pop()
+    elapsed = time.perf_counter() - started
+    operation = statement.lstrip()[:8].split(None, 1)[0].upper() if statement else ''
+    DB_STATEMENT_DURATION.labels(operation if operation in SQL_OPERATIONS else 'OTHER').observe(elapsed)
+    totals = _request_db.get()
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += elapsed
+
+def _handle_error(exception_context):
+    # The statement failed, drop its start time
+    started = exception_context.connection.info.get('metrics_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+def _instrument_sqlalchemy():
+    for identifier, fn in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if not event.contains(Engine, identifier, fn):
+            event.listen(Engine, identifier, fn)
+
+# QueuePool's default when SQLALCHEMY_ENGINE_OPTIONS does not set max_overflow
+QUEUE_POOL_MAX_OVERFLOW = 10
+
+# Pool label of each watched engine
+_pool_names = weakref.WeakKeyDictionary()
+
+def watch_pool(engine, name, max_overflow=QUEUE_POOL_MAX_OVERFLOW):
+    """
+    Time the checkouts of ``engine`` and count the connections its pool has lent out.
+
+    ``max_overflow`` is the value the engine was created with; pools do not expose it.
+    """
+    if engine in _pool_names:
+        return
+    _pool_names[engine] = name
+    if not isinstance(engine.pool, QueuePool):
+        # SQLite in memory and NullPool have no bounded set of connections
+        return
+    in_use = DB_POOL_CONNECTIONS.labels(name, 'checked_out')
+    capacity = DB_POOL_CONNECTIONS.labels(name, 'capacity')
+
+    # Engine-level listeners stay on the pools that dispose() creates
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool = engine.pool
+        # Set here rather than once so every forked worker reports its own pool
+        capacity.set(pool.size() + max(max_overflow, 0))
+        in_use.inc()
+
+    def on_checkin(dbapi_connection, connection_record):
+        in_use.dec()
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+
+def _instrument_pools():
+    """Time ``Engine.raw_connection``, which every checkout goes through; pools have no event before one."""
+    if getattr(Engine.raw_connection, '_instrumented', False):
+        return
+    raw_connection = Engine.raw_connection
+
+    def instrumented_raw_connection(self):
+        name = _pool_names.get(self)
+        if name is None:
+            return raw_connection(self)
+        started = time.perf_counter()
+        try:
+            return raw_connection(self)
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_DURATION.labels(name).observe(time.perf_counter() - started)
+
+    instrumented_raw_connection._instrumented = True
+    Engine.raw_connection = instrumented_raw_connection
+
+def _instrument_redis():
+    """Time every command and pipeline sent by redis-py clients."""
+    from redis import Redis
+    from redis.client import Pipeline
+
+    if getattr(Redis.execute_command, '_instrumented', False):
+        return
+    execute_command = Redis.execute_command
+    execute_pipeline = Pipeline.execute
+
+    def instrumented_execute_command(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            return execute_command(self, *args, **options)
+        finally:
+            REDIS_COMMAND_DURATION.labels(str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def instrumented_execute_pipeline(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return execute_pipeline(self, *args, **kwargs)
+        finally:
+            REDIS_COMMAND_DURATION.labels('PIPELINE').observe(time.perf_counter() - started)
+
+    instrumented_execute_command._instrumented = True
+    Redis.execute_command = instrumented_execute_command
+    Pipeline.execute = instrumented_execute_pipeline
+
+def _instrument_stripe(stripe):
+    """Route Stripe API calls through an HTTP client that times them."""
+    if getattr(stripe.default_http_client, 'instrumented', False):
+        return
+
+    class InstrumentedRequestsClient(stripe.RequestsClient):
+        instrumented = True
+
+        def request(self, method, url, headers, post_data=None):
+            with track_external_call('stripe', f"{method.upper()} {_stripe_operation(url)}"):
+                return super().request(method, url, headers, post_data)
+
+    stripe.default_http_client = InstrumentedRequestsClient()
+
+def _stripe_operation(url):
+    # /v1/accounts/acct_123/login_links -> /v1/accounts/{id}/login_links
+    path = url.split('://', 1)[-1].split('/', 1)[-1].split('?', 1)[0]
+    return '/' + '/'.join('{id}' if STRIPE_ID_PATTERN.match(part) else part for part in path.split('/'))
+
+def _endpoint():
+    return request.endpoint or UNMATCHED_ENDPOINT
+
+def _start_request_timer():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_token = _request_db.set([0, 0.0])
+
+def _record_request(response):
+    started = g.pop('metrics_started', None)
+    token = g.pop('metrics_db_token', None)
+    if started is None:
+        return response
+    endpoint = _endpoint()
+    HTTP_REQUEST_DURATION.labels(request.method, endpoint).observe(time.perf_counter() - started)
+    HTTP_REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+    totals = _request_db.get()
+    if totals is not None:
+        REQUEST_DB_QUERIES.labels(endpoint).observe(totals[0])
+        REQUEST_DB_DURATION.labels(endpoint).observe(totals[1])
+    if token is not None:
+        _request_db.reset(token)
+    return response
+
+def metrics_view():
+    token = current_app.config.get('METRICS_BEARER_TOKEN')
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """Install the instrumentation hooks and the ``/metrics`` endpoint."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    _instrument_sqlalchemy()
+    _instrument_pools()
+    _instrument_redis()
+    # Once the SDK is first used, importing it here would cost every worker boot
+    when_imported('stripe', _instrument_stripe)
+
+    from app import db
+    from app.utils.db_routing import replica_engines
+    # Replicas are created with the same options as the primary
+    max_overflow = (app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}).get('max_overflow', QUEUE_POOL_MAX_OVERFLOW)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            watch_pool(engine, bind_key or 'primary', max_overflow)
+        for name, engine in replica_engines().items():
+            watch_pool(engine, name, max_overflow)
+
+    app.before_request(_start_request_timer)
+    app.after_request(_record_request)
+    # The metrics expose endpoint names and traffic, only serve them without a token in development
+    if app.config.get('METRICS_BEARER_TOKEN') or app.debug or app.testing:
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', metrics_view, methods=['GET'])
+    else:
+        logger.warning("METRICS_BEARER_TOKEN is not set, the metrics endpoint is disabled")
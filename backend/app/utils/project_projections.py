@@ -0,0 +1,106 @@
+"""
+Named projections and sparse fieldsets for project responses.
+
+Project endpoints accept ``?fields=`` with projection names and/or field
+names, comma separated: ``fields=card``, ``fields=id,title,current_amount``
+or ``fields=card,description``. Only the columns the requested fields need
+are loaded (``load_only``), and the dicts are built by a serializer made
+once per field set.
+
+* ``card``: what a project card shows (title, image, funding progress)
+* ``detail``: the fields of ``Project.to_dict()``, the default
+* ``admin``: ``detail`` plus the bookkeeping fields
+"""
+from functools import lru_cache
+from operator import attrgetter
+
+from sqlalchemy.orm import load_only
+
+from app.models.project import Project
+from app.utils.exceptions import ValidationError
+from app.utils.image_utils import image_srcset
+
+# Fields read straight from a column of the same name
+COLUMN_FIELDS = (
+    'id', 'title', 'description', 'goal_amount', 'current_amount', 'currency',
+    'start_date', 'end_date', 'created_at', 'creator_id', 'category_id', 'image_url',
+    'status', 'featured', 'risk_and_challenges', 'video_url', 'is_deleted', 'deleted_at',
+    'backers_count', 'funds_available',
+)
+
+# Derived fields: the getter building them and the columns it reads
+COMPUTED_FIELDS = {
+    'image_srcset': (lambda project: image_srcset(project.image_url), ('image_url',)),
+}
+
+DETAIL_FIELDS = (
+    'id', 'title', 'description', 'goal_amount', 'current_amount', 'start_date', 'end_date',
+    'created_at', 'creator_id', 'category_id', 'image_url', 'image_srcset', 'status', 'featured',
+    'risk_and_challenges', 'video_url', 'is_deleted', 'deleted_at',
+)
+
+PROJECTIONS = {
+    'card': (
+        'id', 'title', 'image_url', 'image_srcset', 'goal_amount', 'current_amount', 'currency',
+        'end_date', 'status', 'category_id', 'featured', 'backers_count',
+    ),
+    'detail': DETAIL_FIELDS,
+    'admin': DETAIL_FIELDS + ('currency', 'backers_count', 'funds_available'),
+}
+
+FIELDS_PARAM = 'fields'
+
+def parse_fields(value, default='detail'):
+    """
+    Resolve a ``fields`` parameter to a tuple of field names.
+
+    Projection names expand to their fields, ``id`` is always included.
+    Raises ValidationError for unknown names.
+    """
+    if not value:
+        return PROJECTIONS[default]
+
+    fields = ['id']
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        if name in PROJECTIONS:
+            fields.extend(PROJECTIONS[name])
+        elif name in COLUMN_FIELDS or name in COMPUTED_FIELDS:
+            fields.append(name)
+        else:
+            raise ValidationError(f"Unknown project field or projection: {name}")
+    return tuple(dict.fromkeys(fields))
+
+def columns_for(fields):
+    """The model columns a set of fields reads."""
+    columns = []
+    for name in fields:
+        if name in COMPUTED_FIELDS:
+            columns.extend(COMPUTED_FIELDS[name][1])
+        else:
+            columns.append(name)
+    return tuple(dict.fromkeys(columns))
+
+def load_fields(fields):
+    """A ``load_only`` option restricting a Project query to what ``fields`` need."""
+    return load_only(*(getattr(Project, column) for column in columns_for(fields)))
+
+@lru_cache(maxsize=64)
+def compile_serializer(fields):
+    """Build ``serialize(project) -> dict`` for a field tuple from one getter per field."""
+    unknown = [name for name in fields if name not in COLUMN_FIELDS and name not in COMPUTED_FIELDS]
+    if unknown:
+        raise ValidationError(f"Unknown project fields: {', '.join(unknown)}")
+    getters = tuple(
+        (name, COMPUTED_FIELDS[name][0] if name in COMPUTED_FIELDS else attrgetter(name))
+        for name in fields
+    )
+
+    def serialize(project):
+        return {name: getter(project) for name, getter in getters}
+    return serialize
+
+def serialize_projects(projects, fields):
+    serialize = compile_serializer(fields)
+    return [serialize(project) for project in projects]
@@ -0,0 +1,159 @@
+"""
+Query plans of the hot query shapes.
+
+``HOT_QUERIES`` lists the queries the services run most, in the shape they
+run them, with the composite index each one is meant to use (migration
+e4a7c2f9d6b3):
+
+* ``projects(status, created_at)``: active projects newest first (search,
+  listings, discovery's base query).
+* ``projects(creator_id, status)``: a creator's projects by status (drafts,
+  "my projects"); it also serves the foreign key on ``creator_id``.
+* ``projects(is_deleted, created_at)``: the non-deleted listing newest first.
+* ``donations(project_id, user_id, amount, created_at)``: a backer's
+  donations to a project, and the per-backer totals of a project grouped by
+  ``user_id`` in index order without reading the rows.
+* ``donations(project_id, status, amount)``: completed totals of a project
+  (payouts, analytics), from the index alone. On a popular project the
+  totals cover most of its donations, so the covering columns are what makes
+  them faster than a table scan.
+* ``notifications(user_id, created_at)`` and
+  ``notifications(user_id, read_at, created_at)``: the notification list and
+  its unread filter, newest first without a sort.
+* ``payouts(user_id, created_at)`` and ``saved_projects(user_id, created_at)``:
+  paginated histories newest first.
+
+Indexes leading with a foreign key column take over the single-column index
+MySQL would otherwise keep for that key, so they cost no extra writes there.
+
+The statements here are copies of the service queries, kept so the
+benchmark can time each shape on its own. The query plan tests
+(test/test_query_plans.py) also capture the SQL the services and views
+actually send with ``captured_statements`` and check those plans, so a
+copy that drifts from its service does not hide a lost index.
+
+``explain(connection, statement)`` returns the plan of a statement, or of
+captured SQL with its parameters, on MySQL (``EXPLAIN``) or SQLite
+(``EXPLAIN QUERY PLAN``) in one shape, for those tests and
+``benchmarks.bench_indexes``.
+"""
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from sqlalchemy import event, func, select
+
+from app.models.donation import Donation
+from app.models.enums import DonationStatus, ProjectStatus
+from app.models.notification import Notification
+from app.models.payout import Payout
+from app.models.project import Project
+from app.models.saved_project import SavedProject
+
+@dataclass
+class HotQuery:
+    name: str
+    table: str
+    index: str
+    # Whether the index also provides the ORDER BY / GROUP BY, i.e. no sort step
+    ordered: bool
+    build: Callable
+
+HOT_QUERIES = [
+    HotQuery('active_projects_newest', 'projects', 'ix_projects_status_created', True,
+             lambda ids: select(Project).where(Project.status == ProjectStatus.ACTIVE)
+             .order_by(Project.created_at.desc()).limit(10)),
+    HotQuery('creator_drafts', 'projects', 'ix_projects_creator_status', False,
+             lambda ids: select(Project).where(Project.creator_id == ids['user_id'],
+                                               Project.status == ProjectStatus.DRAFT)),
+    HotQuery('projects_not_deleted_newest', 'projects', 'ix_projects_deleted_created', True,
+             lambda ids: select(Project).where(Project.is_deleted.is_(False))
+             .order_by(Project.created_at.desc()).limit(10)),
+    HotQuery('backer_donations', 'donations', 'ix_donations_project_user', False,
+             lambda ids: select(Donation).where(Donation.project_id == ids['project_id'],
+                                                Donation.user_id == ids['user_id'])),
+    HotQuery('project_backer_totals', 'donations', 'ix_donations_project_user', True,
+             lambda ids: select(Donation.user_id, func.sum(Donation.amount), func.min(Donation.created_at))
+             .where(Donation.project_id == ids['project_id']).group_by(Donation.user_id)),
+    HotQuery('project_completed_total', 'donations', 'ix_donations_project_status', False,
+             lambda ids: select(func.sum(Donation.amount)).where(Donation.project_id == ids['project_id'],
+                                                                 Donation.status == DonationStatus.COMPLETED)),
+    HotQuery('notifications_newest', 'notifications', 'ix_notifications_user_created', True,
+             lambda ids: select(Notification).where(Notification.user_id == ids['user_id'])
+             .order_by(Notification.created_at.desc())),
+    HotQuery('unread_notifications_newest', 'notifications', 'ix_notifications_user_read_created', True,
+             lambda ids: select(Notification).where(Notification.user_id == ids['user_id'],
+                                                    Notification.read_at.is_(None))
+             .order_by(Notification.created_at.desc())),
+    HotQuery('payout_history', 'payouts', 'ix_payouts_user_created', True,
+             lambda ids: select(Payout).where(Payout.user_id == ids['user_id'])
+             .order_by(Payout.created_at.desc()).limit(20)),
+    HotQuery('saved_projects_newest', 'saved_projects', 'ix_saved_projects_user_created', True,
+             lambda ids: select(SavedProject).where(SavedProject.user_id == ids['user_id'])
+             .order_by(SavedProject.created_at.desc()).limit(10)),
+]
+
+@dataclass
+class PlanStep:
+    table: str
+    index: Optional[str]
+    full_scan: bool
+
+@dataclass
+class QueryPlan:
+    steps: List[PlanStep] = field(default_factory=list)
+    # A filesort / temporary B-tree for ORDER BY or GROUP BY
+    sorts: bool = False
+
+    def step(self, table):
+        return next((step for step in self.steps if step.table == table), None)
+
+_SQLITE_STEP = re.compile(r'^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?')
+
+def _literal_sql(statement, dialect):
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+@contextmanager
+def captured_statements(engine):
+    """Collect the ``(sql, parameters)`` of every statement sent through ``engine`` meanwhile."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def explain(connection, statement, parameters=None):
+    """
+    The plan ``connection``'s database picks for ``statement`` (MySQL or SQLite).
+
+    ``statement`` is a SQLAlchemy statement, or SQL of the connection's
+    dialect as captured by ``captured_statements`` together with its ``parameters``.
+    """
+    dialect = connection.dialect
+    if isinstance(statement, str):
+        sql = statement
+    else:
+        sql, parameters = _literal_sql(statement, dialect), None
+    plan = QueryPlan()
+    if dialect.name == 'mysql':
+        for row in connection.exec_driver_sql(f'EXPLAIN {sql}', parameters).mappings():
+            extra = row['Extra'] or ''
+            plan.steps.append(PlanStep(row['table'], row['key'], row['type'] == 'ALL'))
+            plan.sorts = plan.sorts or 'Using filesort' in extra or 'Using temporary' in extra
+    elif dialect.name == 'sqlite':
+        for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parameters):
+            detail = row[-1]
+            match = _SQLITE_STEP.match(detail)
+            if match:
+                kind, table, index = match.groups()
+                plan.steps.append(PlanStep(table, index, kind == 'SCAN' and index is None))
+            plan.sorts = plan.sorts or detail.startswith('USE TEMP B-TREE')
+    else:
+        raise NotImplementedError(f"No plan parser for {dialect.name}")
+    return plan
@@ -1,4 +1,5 @@
 from redis import Redis
+from redis.exceptions import RedisError
 from flask import current_app
 from app.utils.some_module import ConfigurationError
 
@@ -19,10 +20,11 @@ def get_redis_client():
         'retry_on_timeout': True
     }
     
-    try:
-        redis_client = Redis.from_url(redis_url, **redis_options)
-        redis_client.ping()  # Verify connection
-        return redis_client
-    except Exception as e:
-        current_app.logger.error(f"Redis connection error: {e}")
-        raise ConnectionError(f"Failed to connect to Redis: {e}")
\ No newline at end of file
+    # Connections are opened on first use; an unreachable Redis fails those commands, not app startup
+    redis_client = Redis.from_url(redis_url, **redis_options)
+    if current_app.config.get('REDIS_PING_ON_STARTUP'):
+        try:
+            redis_client.ping()
+        except RedisError as e:
+            logger.warning(f"Redis is not reachable at startup, continuing: {e}")
+    return redis_client
\ No newline at end of file
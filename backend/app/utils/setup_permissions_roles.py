@@ -67,6 +67,9 @@ def setup_permissions_and_roles():
                 ('view_payout_eligibility', 'Can check payout eligibility'),
                 ('process_payout', 'Can process payouts (admin)'),
                 ('manage_payouts', 'Can manage all payouts (admin)'),
+                ('view_project_analytics', 'Can view funding analytics of own projects'),
+                ('view_platform_metrics', 'Can view platform-wide metrics (admin)'),
+                ('upload_media', 'Can upload project and profile media'),
 
             ]
 
@@ -100,7 +103,9 @@ def setup_permissions_and_roles():
                     'share_project',
                     'create_payout',
                     'view_payouts',
-                    'view_payout_eligibility'
+                    'view_payout_eligibility',
+                    'view_project_analytics',
+                    'upload_media'
                 ])
             ]
 
@@ -0,0 +1,243 @@
+# app/utils/storage.py
+"""
+Storage backends for uploaded media.
+
+Files are addressed by a key of the form ``<subfolder>/<path>`` (for example
+``photos/ab/cd/<sha256>.png``). Every backend has a local staging area where
+files are written before they are published; for the filesystem backend that
+area *is* the final location, so publishing is free, while the S3 backend
+uploads the staged file to the bucket.
+
+The S3 backend needs ``boto3`` and works with any S3-compatible service
+(AWS, MinIO, a moto server, ...) through ``STORAGE_S3_ENDPOINT_URL``.
+"""
+import base64
+import mimetypes
+import os
+from typing import Dict, Iterable, Optional
+from flask import current_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+class StorageBackend:
+    """Interface implemented by the storage backends."""
+
+    name = None
+
+    def staging_root(self, subfolder: str) -> str:
+        """Local directory where files of ``subfolder`` are written before publishing."""
+        raise NotImplementedError
+
+    def stage_path(self, key: str) -> str:
+        """Local path where the file for ``key`` is staged."""
+        subfolder, _, rest = key.partition('/')
+        return os.path.join(self.staging_root(subfolder), rest)
+
+    def publish(self, key: str, keep_local: bool = False) -> None:
+        """Make the staged file of ``key`` available at ``url(key)``."""
+        raise NotImplementedError
+
+    def discard_staged(self, key: str) -> None:
+        """Drop the local staged copy of a published file, if it is not the stored file itself."""
+
+    def fetch(self, key: str) -> str:
+        """Make sure the file of ``key`` is present at ``stage_path(key)`` and return that path."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, keys: Iterable[str]) -> int:
+        """Delete files, ignoring missing ones. Returns the number of bytes freed when known."""
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def presigned_put(self, key: str, content_type: str, sha256: str, expires_in: int) -> Optional[Dict]:
+        """Return ``{'url', 'method', 'headers'}`` for a direct client upload, or None if unsupported."""
+        return None
+
+    def object_size(self, key: str) -> Optional[int]:
+        raise NotImplementedError
+
+class FileSystemStorage(StorageBackend):
+    """Stores files under the local upload directories, served by the upload route."""
+
+    name = 'filesystem'
+
+    def __init__(self, roots: Dict[str, str]):
+        self.roots = roots
+
+    def staging_root(self, subfolder):
+        return self.roots[subfolder]
+
+    def publish(self, key, keep_local=False):
+        pass
+
+    def fetch(self, key):
+        return self.stage_path(key)
+
+    def exists(self, key):
+        return os.path.exists(self.stage_path(key))
+
+    def delete(self, keys):
+        freed = 0
+        for key in keys:
+            path = self.stage_path(key)
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def url(self, key):
+        return f"/uploads/{key}"
+
+    def object_size(self, key):
+        try:
+            return os.path.getsize(self.stage_path(key))
+        except FileNotFoundError:
+            return None
+
+class S3Storage(StorageBackend):
+    """
+    Stores files in an S3-compatible bucket.
+
+    Files are staged under ``staging_dir`` and uploaded when published. Public
+    URLs are built from ``public_url`` (a CDN or the bucket's endpoint).
+    """
+
+    name = 's3'
+
+    def __init__(self, bucket: str, staging_dir: str, public_url: str, endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key: Optional[str] = None, secret_key: Optional[str] = None):
+        try:
+            import boto3
+            from botocore.config import Config as BotoConfig
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)") from e
+
+        self.bucket = bucket
+        self.staging_dir = staging_dir
+        self.public_url = public_url.rstrip('/')
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            config=BotoConfig(signature_version='s3v4', s3={'addressing_style': 'path'})
+        )
+
+    def staging_root(self, subfolder):
+        return os.path.join(self.staging_dir, subfolder)
+
+    @staticmethod
+    def _content_type(key):
+        return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+    def publish(self, key, keep_local=False):
+        path = self.stage_path(key)
+        self.client.upload_file(path, self.bucket, key, ExtraArgs={
+            'ContentType': self._content_type(key),
+            'CacheControl': IMMUTABLE_CACHE_CONTROL,
+        })
+        if not keep_local:
+            self.discard_staged(key)
+
+    def discard_staged(self, key):
+        try:
+            os.remove(self.stage_path(key))
+        except FileNotFoundError:
+            pass
+
+    def fetch(self, key):
+        path = self.stage_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.download"
+            self.client.download_file(self.bucket, key, temp_path)
+            os.replace(temp_path, path)
+        return path
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def object_size(self, key):
+        head = self._head(key)
+        return head['ContentLength'] if head else None
+
+    def delete(self, keys):
+        keys = list(keys)
+        # DeleteObjects takes at most 1000 keys per call
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': key} for key in keys[start:start + 1000]],
+                'Quiet': True
+            })
+        return 0
+
+    def url(self, key):
+        return f"{self.public_url}/{key}"
+
+    def presigned_put(self, key, content_type, sha256, expires_in):
+        # Signing the checksum makes the store reject any body with other content
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.client.generate_presigned_url('put_object', Params={
+            'Bucket': self.bucket,
+            'Key': key,
+            'ContentType': content_type,
+            'CacheControl': IMMUTABLE_CACHE_CONTROL,
+            'ChecksumSHA256': checksum,
+        }, ExpiresIn=expires_in, HttpMethod='PUT')
+        return {
+            'url': url,
+            'method': 'PUT',
+            'headers': {
+                'Content-Type': content_type,
+                'Cache-Control': IMMUTABLE_CACHE_CONTROL,
+                'x-amz-checksum-sha256': checksum,
+                'x-amz-sdk-checksum-algorithm': 'SHA256',
+            }
+        }
+
+def _build_storage(config) -> StorageBackend:
+    backend = config.get('STORAGE_BACKEND', 'filesystem')
+    if backend == 'filesystem':
+        return FileSystemStorage({
+            'photos': config['UPLOADED_PHOTOS_DEST'],
+            'videos': config['UPLOADED_VIDEOS_DEST'],
+        })
+    if backend == 's3':
+        return S3Storage(
+            bucket=config['STORAGE_S3_BUCKET'],
+            staging_dir=config['STORAGE_STAGING_DIR'],
+            public_url=config['STORAGE_S3_PUBLIC_URL'],
+            endpoint_url=config.get('STORAGE_S3_ENDPOINT_URL'),
+            region=config.get('STORAGE_S3_REGION'),
+            access_key=config.get('STORAGE_S3_ACCESS_KEY_ID'),
+            secret_key=config.get('STORAGE_S3_SECRET_ACCESS_KEY'),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+def get_storage() -> StorageBackend:
+    """Return the storage backend of the current app, built on first use."""
+    storage = current_app.extensions.get('media_storage')
+    if storage is None:
+        storage = _build_storage(current_app.config)
+        current_app.extensions['media_storage'] = storage
+    return storage
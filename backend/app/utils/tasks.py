@@ -1,10 +1,11 @@
-from celery import Celery
-
 def make_celery(app):
+    # Celery and kombu are only needed by the worker, not by every web process importing the app
+    from celery import Celery
+
     celery = Celery(
         app.import_name,
         backend=app.config['REDIS_URL'],
         broker=app.config['REDIS_URL']
     )
     celery.conf.update(app.config)
-    return celery
+    return celery
\ No newline at end of file
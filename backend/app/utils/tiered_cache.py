@@ -0,0 +1,458 @@
+"""
+Two-tier cache for the services layer.
+
+Values are looked up in a bounded in-process LRU first, then in Redis, and
+computed on a miss. Every entry carries tags (``project:42``,
+``category:3``, see app.services.cache_tags) and is invalidated by tag:
+
+* Redis keeps a version counter per tag. An entry stores the versions of its
+  tags as they were before the value was computed and is only served while
+  they are current, so a value computed while a write was in flight never
+  outlives the write.
+* Invalidating bumps the counters and publishes the tags on a pub/sub
+  channel; every process drops its local entries with those tags. Local
+  entries also expire after ``SERVICE_CACHE_LOCAL_TTL`` seconds, which bounds
+  staleness if a message is missed, and the local tier is cleared whenever
+  the subscription (re)connects.
+
+On a miss only one thread per process looks the entry up, and only the caller
+holding a short Redis lock computes the value; the others wait up to
+``SERVICE_CACHE_LOCK_WAIT`` seconds for it before computing it themselves.
+Entries cached with a ``stale_ttl`` are kept that much longer in Redis and,
+once expired, are served while a background thread rebuilds them
+(stale-while-revalidate). Values are pickled, so callers always get their own
+copy. When Redis is unavailable values are computed uncached.
+
+Use the ``cached`` decorator on service functions and ``invalidate`` (or
+``invalidate_on_commit``) after writes. Code that pairs a value with the
+current tag versions (ETags) reads inside ``skip_local_tier()``: the local
+tier does not check versions, so it can trail them until the pub/sub message
+arrives.
+"""
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from flask import current_app, has_app_context
+from redis import Redis, ConnectionPool
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.db_routing import primary_session
+from app.utils.metrics import CACHE_BUILD_DURATION, CACHE_INVALIDATIONS, CACHE_REQUESTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'cache:invalidate'
+# Random per Redis dataset, so tag versions restarting at 0 after a flush never repeat
+EPOCH_KEY = 'cache:epoch'
+PENDING_TAGS = 'cache_pending_tags'
+
+def _entry_key(name, key):
+    return f"cache:{name}:{key}"
+
+def _tag_key(tag):
+    return f"cache:tag:{tag}"
+
+def _lock_key(name, key):
+    return f"cache:lock:{name}:{key}"
+
+# Delete a build lock only while it still holds the caller's token: a build that
+# outlived the lock must not free the lock another caller has taken since
+RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_bypass = threading.local()
+
+@contextmanager
+def skip_local_tier():
+    """Look entries up in Redis, where their tag versions are checked, for the duration of the block."""
+    previous = getattr(_bypass, 'active', False)
+    _bypass.active = True
+    try:
+        yield
+    finally:
+        _bypass.active = previous
+
+def _is_cacheable(value):
+    # Services report failures as {'error': ..., 'status_code': ...}, never cache those
+    return not (isinstance(value, dict) and 'error' in value)
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.leader = False
+        self.payload = None
+
+class TieredCache:
+    """Process-local LRU in front of Redis with tag invalidation, see the module docstring."""
+
+    def __init__(self, redis_client, local_size=1024, local_ttl=30, default_ttl=300,
+                 lock_timeout=10, lock_wait=2, build_context=nullcontext):
+        self.redis = redis_client
+        # Context manager every build runs in
+        self.build_context = build_context
+        self.local_size = local_size
+        self.local_ttl = local_ttl
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+        self._release_lock_script = redis_client.register_script(RELEASE_LOCK)
+        self._reset_local()
+
+    def _reset_local(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # entry key -> (expires at, tags, pickled value)
+        self._local = OrderedDict()
+        self._tag_index = defaultdict(set)
+        # Bumped per tag on every invalidation seen by this process
+        self._tag_generations = defaultdict(int)
+        self._listener = None
+        # entry key -> _Flight of the thread looking it up
+        self._flights = {}
+        self._refreshes = set()
+
+    def _check_fork(self):
+        # Locks, the local tier and the listener thread do not survive a fork
+        if self._pid != os.getpid():
+            self._reset_local()
+
+    # Local tier
+
+    def _local_get(self, entry_key):
+        with self._lock:
+            entry = self._local.get(entry_key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._local_discard(entry_key)
+                return None
+            self._local.move_to_end(entry_key)
+            return entry[2]
+
+    def _local_set(self, entry_key, tags, payload, ttl, generations):
+        with self._lock:
+            # An invalidation arrived while the value was computed, do not keep it
+            if any(self._tag_generations[tag] != generations[tag] for tag in tags):
+                return
+            self._local_discard(entry_key)
+            self._local[entry_key] = (time.monotonic() + min(ttl, self.local_ttl), tags, payload)
+            for tag in tags:
+                self._tag_index[tag].add(entry_key)
+            while len(self._local) > self.local_size:
+                self._local_discard(next(iter(self._local)))
+
+    def _local_discard(self, entry_key):
+        entry = self._local.pop(entry_key, None)
+        if entry:
+            for tag in entry[1]:
+                keys = self._tag_index.get(tag)
+                if keys:
+                    keys.discard(entry_key)
+                    if not keys:
+                        del self._tag_index[tag]
+
+    def _local_invalidate(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._tag_generations[tag] += 1
+                for entry_key in list(self._tag_index.get(tag, ())):
+                    self._local_discard(entry_key)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+            self._tag_index.clear()
+            for tag in list(self._tag_generations):
+                self._tag_generations[tag] += 1
+
+    # Pub/sub
+
+    def _ensure_listener(self):
+        if self._listener is None or not self._listener.is_alive():
+            with self._lock:
+                if self._listener is None or not self._listener.is_alive():
+                    self._listener = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+                    self._listener.start()
+
+    def _listen(self):
+        pid = os.getpid()
+        backoff = 0.5
+        while pid == self._pid:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                # Messages may have been missed while disconnected
+                self.clear_local()
+                backoff = 0.5
+                while pid == self._pid:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message['type'] == 'message':
+                        tags = message['data'].decode().split('\n')
+                        self._local_invalidate(tags)
+                        CACHE_INVALIDATIONS.labels('remote').inc(len(tags))
+            except Exception as e:
+                logger.warning(f"Cache invalidation subscription lost, retrying: {str(e)}")
+                self.clear_local()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+    # Redis tier
+
+    def _redis_get(self, name, key, tags):
+        """Return (pickled value or None, seconds it stays fresh, current tag versions)."""
+        raw, *versions = self.redis.mget([_entry_key(name, key)] + [_tag_key(tag) for tag in tags])
+        versions = tuple(int(version or 0) for version in versions)
+        if raw is not None:
+            stored_versions, fresh_until, payload = pickle.loads(raw)
+            if stored_versions == versions:
+                return payload, fresh_until - time.time(), versions
+        return None, 0, versions
+
+    def _redis_set(self, name, key, versions, payload, ttl, stale_ttl):
+        entry = (versions, time.time() + ttl, payload)
+        self.redis.set(_entry_key(name, key), pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL),
+                       ex=ttl + stale_ttl)
+
+    # Single flight
+
+    @contextmanager
+    def _flight(self, entry_key):
+        """Yield a _Flight; ``leader`` is set for the one caller per process that should do the work."""
+        with self._lock:
+            flight = self._flights.get(entry_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[entry_key] = _Flight()
+        flight.leader = leader
+        try:
+            yield flight
+        finally:
+            if leader:
+                with self._lock:
+                    self._flights.pop(entry_key, None)
+                flight.done.set()
+
+    def get_or_set(self, name, key, build, tags=(), ttl=None, stale_ttl=0, cache_if=_is_cacheable):
+        """
+        Return the cached value of ``name``/``key``, computing it with ``build()`` on a miss.
+
+        Concurrent misses wait for a single computation: one per process
+        looks the entry up, and one across processes builds it. With
+        ``stale_ttl`` an entry that expired less than ``stale_ttl`` seconds
+        ago is still served while one caller refreshes it in the background;
+        invalidated entries are never served.
+        """
+        self._check_fork()
+        ttl = ttl or self.default_ttl
+        tags = tuple(tags)
+        entry_key = _entry_key(name, key)
+
+        payload = None if getattr(_bypass, 'active', False) else self._local_get(entry_key)
+        if payload is not None:
+            CACHE_REQUESTS.labels(name, 'local_hit').inc()
+            return pickle.loads(payload)
+
+        with self._flight(entry_key) as flight:
+            if not flight.leader:
+                # Another thread of this process is already on it
+                flight.done.wait(self.lock_timeout + self.lock_wait)
+                if flight.payload is not None:
+                    CACHE_REQUESTS.labels(name, 'coalesced').inc()
+                    return pickle.loads(flight.payload)
+                return self._build(name, build)
+
+            with self._lock:
+                generations = {tag: self._tag_generations[tag] for tag in tags}
+            try:
+                self._ensure_listener()
+                payload, fresh_for, versions = self._redis_get(name, key, tags)
+                if payload is not None:
+                    flight.payload = payload
+                    if fresh_for > 0:
+                        CACHE_REQUESTS.labels(name, 'redis_hit').inc()
+                        self._local_set(entry_key, tags, payload, fresh_for, generations)
+                    else:
+                        CACHE_REQUESTS.labels(name, 'stale_hit').inc()
+                        self._refresh_in_background(name, key, build, versions, ttl, stale_ttl, cache_if)
+                    return pickle.loads(payload)
+
+                CACHE_REQUESTS.labels(name, 'miss').inc()
+                lock_token = self._acquire_lock(name, key)
+                if lock_token is None:
+                    # Another process is computing it, wait for its result instead of piling on
+                    deadline = time.monotonic() + self.lock_wait
+                    while time.monotonic() < deadline:
+                        time.sleep(0.02)
+                        payload, _, _ = self._redis_get(name, key, tags)
+                        if payload is not None:
+                            flight.payload = payload
+                            return pickle.loads(payload)
+                    logger.warning(f"Timed out waiting for cache entry {entry_key}, computing it")
+                    return self._build(name, build)
+                try:
+                    value = self._build(name, build)
+                    if cache_if(value):
+                        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                        self._redis_set(name, key, versions, payload, ttl, stale_ttl)
+                        self._local_set(entry_key, tags, payload, ttl, generations)
+                        flight.payload = payload
+                    return value
+                finally:
+                    self._release_lock(name, key, lock_token)
+            except RedisError as e:
+                logger.error(f"Redis error in cache {name}, computing uncached: {str(e)}")
+                return self._build(name, build)
+
+    def _refresh_in_background(self, name, key, build, versions, ttl, stale_ttl, cache_if):
+        """Rebuild an expired entry in a thread, unless another process already is."""
+        lock_token = self._acquire_lock(name, key)
+        if lock_token is None:
+            return
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def refresh():
+            try:
+                with app.app_context() if app else nullcontext():
+                    value = self._build(name, build)
+                    if cache_if(value):
+                        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                        # Versions read before the build: a write in between leaves the entry unusable
+                        self._redis_set(name, key, versions, payload, ttl, stale_ttl)
+            except Exception as e:
+                logger.error(f"Background refresh of cache entry {_entry_key(name, key)} failed: {str(e)}")
+            finally:
+                try:
+                    self._release_lock(name, key, lock_token)
+                except RedisError:
+                    pass
+
+        thread = threading.Thread(target=refresh, name='cache-refresh', daemon=True)
+        with self._lock:
+            self._refreshes.add(thread)
+        thread.start()
+
+    def _acquire_lock(self, name, key):
+        """Take the build lock of an entry; returns its token, or None while another caller holds it."""
+        token = os.urandom(16).hex()
+        if self.redis.set(_lock_key(name, key), token, nx=True, ex=self.lock_timeout):
+            return token
+        return None
+
+    def _release_lock(self, name, key, token):
+        self._release_lock_script(keys=[_lock_key(name, key)], args=[token])
+
+    def wait_for_refreshes(self, timeout=None):
+        """Wait for background refreshes started by this process (tests, shutdown)."""
+        with self._lock:
+            threads = list(self._refreshes)
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            self._refreshes = {thread for thread in self._refreshes if thread.is_alive()}
+
+    def _build(self, name, build):
+        started = time.perf_counter()
+        try:
+            with self.build_context():
+                return build()
+        finally:
+            CACHE_BUILD_DURATION.labels(name).observe(time.perf_counter() - started)
+
+    def tag_versions(self, tags):
+        """Return the current versions of ``tags``, preceded by the epoch of the Redis data."""
+        epoch, *versions = self.redis.mget([EPOCH_KEY] + [_tag_key(tag) for tag in tags])
+        if epoch is None:
+            self.redis.set(EPOCH_KEY, os.urandom(8).hex(), nx=True)
+            epoch = self.redis.get(EPOCH_KEY)
+        return (epoch.decode(),) + tuple(int(version or 0) for version in versions)
+
+    def invalidate(self, *tags):
+        """Invalidate every entry carrying one of ``tags``, in all processes."""
+        tags = tuple(dict.fromkeys(tags))
+        if not tags:
+            return
+        self._check_fork()
+        self._local_invalidate(tags)
+        CACHE_INVALIDATIONS.labels('local').inc(len(tags))
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(_tag_key(tag))
+            pipe.publish(CHANNEL, '\n'.join(tags))
+            pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to invalidate cache tags {tags}: {str(e)}")
+
+def _raw_client(redis_client):
+    """A client on the same server as ``redis_client`` that returns bytes (values are pickled)."""
+    pool = redis_client.connection_pool
+    return Redis(connection_pool=ConnectionPool(
+        connection_class=pool.connection_class,
+        **{**pool.connection_kwargs, 'decode_responses': False}
+    ))
+
+def get_cache():
+    """Return the service cache of the current app, built on first use."""
+    cache = current_app.extensions.get('tiered_cache')
+    if cache is None:
+        config = current_app.config
+        cache = TieredCache(
+            _raw_client(current_app.redis_client),
+            local_size=config.get('SERVICE_CACHE_LOCAL_SIZE', 1024),
+            local_ttl=config.get('SERVICE_CACHE_LOCAL_TTL', 30),
+            default_ttl=config.get('SERVICE_CACHE_TTL', 300),
+            lock_timeout=config.get('SERVICE_CACHE_LOCK_TIMEOUT', 10),
+            lock_wait=config.get('SERVICE_CACHE_LOCK_WAIT', 2),
+            build_context=primary_session,
+        )
+        current_app.extensions['tiered_cache'] = cache
+    return cache
+
+def cached(name, key, tags=None, ttl=None, stale_ttl=0, cache_if=_is_cacheable):
+    """
+    Cache a function's result in the service cache.
+
+    ``key`` and ``tags`` are called with the function's arguments and return
+    the entry key and its tags. The undecorated function is ``f.uncached``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            return get_cache().get_or_set(
+                name, key(*args, **kwargs), lambda: f(*args, **kwargs),
+                tags=tags(*args, **kwargs) if tags else (), ttl=ttl, stale_ttl=stale_ttl, cache_if=cache_if
+            )
+        decorated_function.uncached = f
+        return decorated_function
+    return decorator
+
+def invalidate(*tags):
+    """Invalidate cache tags now; call after the change is committed."""
+    if has_app_context():
+        get_cache().invalidate(*tags)
+
+def invalidate_on_commit(session, *tags):
+    """Invalidate cache tags once ``session`` commits its transaction."""
+    session.info.setdefault(PENDING_TAGS, set()).update(tags)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tags(session):
+    tags = session.info.pop(PENDING_TAGS, None)
+    if tags:
+        invalidate(*tags)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_tags(session):
+    session.info.pop(PENDING_TAGS, None)
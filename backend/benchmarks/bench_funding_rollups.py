@@ -0,0 +1,172 @@
+"""
+Benchmark: project funding series from rollups vs. aggregating raw donations.
+
+Generates a synthetic donation history (10M donations by default), builds the
+hourly/daily rollups with ``AnalyticsService.backfill`` and compares the
+latency of reading one project's daily series from ``project_funding_rollups``
+against a GROUP BY over ``donations``.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_funding_rollups --donations 10000000
+    python -m benchmarks.bench_funding_rollups --donations 200000 --database-url sqlite:////tmp/bench.db
+
+The database given by ``--database-url`` is dropped and recreated, never point
+it at a real database.
+"""
+import argparse
+import importlib
+import os
+import pkgutil
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app import db
+import app.models
+from app.models.donation import Donation
+from app.models.funding_rollup import ProjectFundingRollup
+from app.models.enums import DonationStatus, ProjectStatus, RollupGranularity
+from app.services.analytics_service import AnalyticsService
+from app.utils.db_utils import chunked
+
+# Register every table on db.metadata, some models are only imported by the routes
+for _module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f'app.models.{_module.name}')
+
+INSERT_CHUNK = 50000
+HISTORY_DAYS = 365
+
+def _timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, samples
+
+def _summary(samples):
+    return f"median {statistics.median(samples):8.2f} ms   min {min(samples):8.2f} ms"
+
+def generate(engine, args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    epoch = now - timedelta(days=HISTORY_DAYS)
+    tables = db.metadata.tables
+
+    with engine.begin() as conn:
+        conn.execute(tables['categories'].insert(), [{'id': 1, 'name': 'Benchmark'}])
+        for rows in chunked(({
+            'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com',
+            'password_hash': 'x', 'created_at': epoch
+        } for i in range(1, args.users + 1)), INSERT_CHUNK):
+            conn.execute(tables['users'].insert(), rows)
+        for rows in chunked(({
+            'id': i, 'title': f'Project {i}', 'description': '-', 'goal_amount': 10000,
+            'current_amount': 0, 'start_date': epoch, 'end_date': now, 'created_at': epoch,
+            'creator_id': rng.randint(1, args.users), 'category_id': 1, 'currency': 'USD',
+            'status': ProjectStatus.ACTIVE.name, 'is_deleted': False
+        } for i in range(1, args.projects + 1)), INSERT_CHUNK):
+            conn.execute(tables['projects'].insert(), rows)
+
+    # Skewed popularity: a few projects receive most donations
+    weights = [1.0 / (rank ** 1.1) for rank in range(1, args.projects + 1)]
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    def donations():
+        span = HISTORY_DAYS * 24 * 3600
+        for i in range(1, args.donations + 1):
+            completed = epoch + timedelta(seconds=rng.randrange(span))
+            refunded = rng.random() < 0.02
+            amount = Decimal(rng.choice((5, 10, 25, 50, 100, 250)))
+            yield {
+                'id': i,
+                'amount': amount,
+                'currency': 'USD',
+                'created_at': completed,
+                'user_id': rng.randint(1, args.users),
+                'project_id': rng.choices(range(1, args.projects + 1), cum_weights=cumulative)[0],
+                'status': (DonationStatus.REFUNDED if refunded else DonationStatus.COMPLETED).name,
+                'completed_at': completed,
+                'refunded_at': completed + timedelta(days=1) if refunded else None,
+                'refund_amount': float(amount) if refunded else None,
+            }
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for rows in chunked(donations(), INSERT_CHUNK):
+            conn.execute(tables['donations'].insert(), rows)
+    print(f"Inserted {args.donations:,} donations in {time.perf_counter() - started:.1f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default='sqlite:////tmp/payforme_rollup_bench.db')
+    parser.add_argument('--donations', type=int, default=10_000_000)
+    parser.add_argument('--projects', type=int, default=10_000)
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-generate', action='store_true', help='Reuse data from a previous run')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if not args.skip_generate:
+        db.metadata.drop_all(engine)
+        db.metadata.create_all(engine)
+        generate(engine, args)
+
+    with Session(engine) as session:
+        started = time.perf_counter()
+        stats = AnalyticsService().backfill(session=session)
+        print(f"Backfill: {stats} in {time.perf_counter() - started:.1f}s")
+
+    # Benchmark the busiest project, the worst case for scanning donations
+    with engine.connect() as conn:
+        project_id = conn.execute(
+            select(Donation.project_id).group_by(Donation.project_id)
+            .order_by(func.count().desc()).limit(1)
+        ).scalar()
+        now = datetime.utcnow()
+        start = RollupGranularity.DAY.truncate(now - timedelta(days=90))
+
+        def from_donations():
+            return conn.execute(
+                select(func.date(Donation.completed_at), func.sum(Donation.amount), func.count())
+                .where(Donation.project_id == project_id,
+                       Donation.status.in_([DonationStatus.COMPLETED, DonationStatus.REFUNDED]),
+                       Donation.completed_at >= start)
+                .group_by(func.date(Donation.completed_at))
+            ).all()
+
+        def from_rollups():
+            return conn.execute(
+                select(ProjectFundingRollup.bucket_start, ProjectFundingRollup.amount,
+                       ProjectFundingRollup.donation_count)
+                .where(ProjectFundingRollup.project_id == project_id,
+                       ProjectFundingRollup.granularity == RollupGranularity.DAY,
+                       ProjectFundingRollup.bucket_start >= start)
+                .order_by(ProjectFundingRollup.bucket_start)
+            ).all()
+
+        raw_rows, raw_samples = _timed(from_donations, args.repeat)
+        rollup_rows, rollup_samples = _timed(from_rollups, args.repeat)
+
+    print(f"Project {project_id}, 90 day daily series")
+    print(f"  GROUP BY donations ({len(raw_rows)} rows):  {_summary(raw_samples)}")
+    print(f"  rollup range read ({len(rollup_rows)} rows):   {_summary(rollup_samples)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: the hot query shapes with and without their composite indexes.
+
+Runs every query of ``app.utils.query_plans.HOT_QUERIES`` against a database
+filled by ``benchmarks.generate_data``. It times each query with the indexes
+of migration e4a7c2f9d6b3 ("after"), drops those indexes and times them again
+("before"), then puts the indexes back. It prints the median latency and the
+index the plan used in each case. Queries run for the most active user and
+the most backed project. generate_data creates no payouts, so payout_history
+is skipped unless the table has rows.
+
+On MySQL, a foreign key whose only index is about to be dropped gets a
+temporary single-column index for the "before" run, as the database requires.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.generate_data --database-url sqlite:////tmp/payforme_load.db --recreate --scale 0.1
+    python -m benchmarks.bench_indexes --database-url sqlite:////tmp/payforme_load.db --repeat 20
+
+The indexes are dropped and re-created, never point it at a production database.
+"""
+import argparse
+import importlib
+import os
+import pkgutil
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, func, inspect, select
+
+from app import db
+import app.models
+from app.models.donation import Donation
+from app.models.notification import Notification
+from app.utils.query_plans import HOT_QUERIES, explain
+
+# Register every table on db.metadata, some models are only imported by the routes
+for _module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f'app.models.{_module.name}')
+
+def composite_indexes():
+    names = {query.index for query in HOT_QUERIES}
+    return [index for table in db.metadata.tables.values() for index in table.indexes if index.name in names]
+
+def sample_ids(conn):
+    """The most backed project and the user with the most notifications: the worst cases."""
+    project_id = conn.execute(select(Donation.project_id).group_by(Donation.project_id)
+                              .order_by(func.count().desc()).limit(1)).scalar()
+    user_id = conn.execute(select(Notification.user_id).group_by(Notification.user_id)
+                           .order_by(func.count().desc()).limit(1)).scalar()
+    return {'project_id': project_id or 1, 'user_id': user_id or 1}
+
+def measure(engine, ids, repeat):
+    # Fresh connections: SQLite connections keep serving cached plans of the dropped indexes
+    engine.dispose()
+    results = {}
+    with engine.connect() as conn:
+        for query in HOT_QUERIES:
+            if conn.execute(select(func.count()).select_from(db.metadata.tables[query.table])).scalar() == 0:
+                continue
+            statement = query.build(ids)
+            plan = explain(conn, statement)
+            conn.execute(statement).fetchall()  # Warm the caches
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(statement).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            step = plan.step(query.table)
+            index = step.index if step and step.index else 'scan'
+            results[query.name] = (statistics.median(samples), index + (' +sort' if plan.sorts else ''))
+    return results
+
+def foreign_key_stand_ins(engine, dropping):
+    """Single-column indexes MySQL needs for foreign keys once ``dropping`` is gone."""
+    if engine.dialect.name != 'mysql':
+        return []
+    inspector = inspect(engine)
+    dropped = {index.name for index in dropping}
+    stand_ins = []
+    for table_name in sorted({index.table.name for index in dropping}):
+        remaining = [entry['column_names'] for entry in inspector.get_indexes(table_name)
+                     if entry['name'] not in dropped]
+        remaining.append(inspector.get_pk_constraint(table_name)['constrained_columns'])
+        for foreign_key in inspector.get_foreign_keys(table_name):
+            column = foreign_key['constrained_columns'][0]
+            if not any(columns and columns[0] == column for columns in remaining):
+                stand_ins.append((f'bench_fk_{table_name}_{column}', table_name, column))
+                remaining.append([column])
+    return stand_ins
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    existing = set()
+    for table_name in {query.table for query in HOT_QUERIES}:
+        existing.update(entry['name'] for entry in inspect(engine).get_indexes(table_name))
+    indexes = composite_indexes()
+    with engine.begin() as conn:
+        for index in indexes:
+            if index.name not in existing:
+                index.create(conn)
+        ids = sample_ids(conn)
+
+    print(f"Timing {len(HOT_QUERIES)} queries with the composite indexes ...", file=sys.stderr)
+    after = measure(engine, ids, args.repeat)
+
+    stand_ins = foreign_key_stand_ins(engine, indexes)
+    with engine.begin() as conn:
+        for name, table_name, column in stand_ins:
+            conn.exec_driver_sql(f'CREATE INDEX {name} ON {table_name} ({column})')
+        for index in indexes:
+            index.drop(conn)
+    try:
+        print("Timing them without ...", file=sys.stderr)
+        before = measure(engine, ids, args.repeat)
+    finally:
+        with engine.begin() as conn:
+            for index in indexes:
+                index.create(conn)
+            for name, table_name, _ in stand_ins:
+                conn.exec_driver_sql(f'DROP INDEX {name} ON {table_name}')
+
+    print(f"{engine.dialect.name}, user {ids['user_id']}, project {ids['project_id']}, "
+          f"median of {args.repeat} runs")
+    print(f"{'query':<30}{'before ms':>11}  {'plan':<36}{'after ms':>10}  {'plan':<36}{'speedup':>8}")
+    for name, (after_ms, after_plan) in after.items():
+        before_ms, before_plan = before[name]
+        print(f"{name:<30}{before_ms:>11.2f}  {before_plan:<36}{after_ms:>10.2f}  {after_plan:<36}"
+              f"{before_ms / after_ms:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
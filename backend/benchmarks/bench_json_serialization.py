@@ -0,0 +1,148 @@
+"""
+Serialization benchmark for API responses.
+
+Times building and encoding a page of projects the way the list endpoints do
+(``Project.to_dict`` for every project, then the JSON response), with:
+
+* ``flask-default``: Flask's default provider on dicts converted field by
+  field (``.isoformat()``, ``.value``), as ``to_dict`` did before
+* ``stdlib``: ``FastJSONProvider`` without orjson, on the raw dicts
+* ``orjson``: ``FastJSONProvider`` with orjson, on the raw dicts
+
+and checks that all of them produce the same document.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_json_serialization --page-size 100 --iterations 500
+"""
+import argparse
+import importlib
+import os
+import pkgutil
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import app.models
+from app.models import Project
+from app.models.enums import ProjectStatus
+from app.utils import json_provider
+from app.utils.image_utils import image_srcset
+from app.utils.json_provider import FastJSONProvider
+
+# Register every model, some are only imported by the routes
+for _module in pkgutil.iter_modules(app.models.__path__):
+    importlib.import_module(f'app.models.{_module.name}')
+
+def make_projects(count):
+    start = datetime(2024, 1, 1, 12, 0, 0)
+    statuses = list(ProjectStatus)
+    return [Project(
+        id=index,
+        title=f'Project {index}',
+        description='Synthetic project for the serialization benchmark. ' * 4,
+        goal_amount=Decimal('10000.00') + index,
+        current_amount=Decimal('1234.56') * (index % 7),
+        start_date=start + timedelta(days=index),
+        end_date=start + timedelta(days=index + 30),
+        created_at=start + timedelta(days=index, microseconds=index),
+        creator_id=index % 50 + 1,
+        category_id=index % 10 + 1,
+        image_url=f'/api/v1/projects/media/photos/{index:064x}.jpg' if index % 3 else None,
+        status=statuses[index % len(statuses)],
+        featured=index % 11 == 0,
+        risk_and_challenges='None worth mentioning.',
+        video_url=None,
+        is_deleted=False,
+        deleted_at=None,
+    ) for index in range(count)]
+
+def legacy_to_dict(project):
+    """``Project.to_dict`` with the per-field conversions it used to do."""
+    return {
+        "id": project.id,
+        "title": project.title,
+        "description": project.description,
+        "goal_amount": project.goal_amount,
+        "current_amount": project.current_amount,
+        "start_date": project.start_date.isoformat(),
+        "end_date": project.end_date.isoformat(),
+        "created_at": project.created_at.isoformat(),
+        "creator_id": project.creator_id,
+        "category_id": project.category_id,
+        "image_url": project.image_url,
+        "image_srcset": image_srcset(project.image_url),
+        "status": project.status.value,
+        "featured": project.featured,
+        "risk_and_challenges": project.risk_and_challenges,
+        "video_url": project.video_url,
+        "is_deleted": project.is_deleted,
+        "deleted_at": project.deleted_at.isoformat() if project.deleted_at else None,
+    }
+
+def render(app, to_dict, projects):
+    payload = {
+        'status': 'success', 'message': '', 'meta': {},
+        'data': {'projects': [to_dict(project) for project in projects], 'total': len(projects)},
+    }
+    return app.json.response(payload).get_data()
+
+def run(app, to_dict, projects, iterations):
+    body = render(app, to_dict, projects)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        render(app, to_dict, projects)
+        timings.append((time.perf_counter() - started) * 1000)
+    return body, timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    projects = make_projects(args.page_size)
+    legacy_app, fast_app = Flask('legacy'), Flask('fast')
+    legacy_app.json = DefaultJSONProvider(legacy_app)
+    fast_app.json = FastJSONProvider(fast_app)
+
+    variants = [('flask-default', legacy_app, legacy_to_dict, None)]
+    variants.append(('stdlib', fast_app, Project.to_dict, patch.object(json_provider, 'orjson', None)))
+    if json_provider.orjson is not None:
+        variants.append(('orjson', fast_app, Project.to_dict, None))
+    else:
+        print("orjson is not installed, skipping the orjson variant")
+
+    print(f"{args.page_size} projects per response, {args.iterations} iterations\n")
+    print(f"{'variant':15} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'bytes':>8}")
+    bodies = {}
+    for name, flask_app, to_dict, context in variants:
+        if context:
+            with context:
+                body, timings = run(flask_app, to_dict, projects, args.iterations)
+        else:
+            body, timings = run(flask_app, to_dict, projects, args.iterations)
+        bodies[name] = body
+        timings.sort()
+        print(f"{name:15} {statistics.mean(timings):10.3f} {timings[len(timings) // 2]:10.3f} "
+              f"{timings[int(len(timings) * 0.95)]:10.3f} {len(body):8d}")
+
+    documents = {name: fast_app.json.loads(body) for name, body in bodies.items()}
+    reference = documents['flask-default']
+    mismatched = [name for name, document in documents.items() if document != reference]
+    if mismatched:
+        print(f"\nOutput differs from flask-default for: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("\nAll variants produce the same document.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Throughput benchmark for the upload serving route.
+
+Serves the same files through:
+
+* ``legacy``: the previous ``uploaded_file`` handler (``os.path.exists`` plus
+  ``send_from_directory``, four info log lines per request)
+* ``current``: ``projects_bp.uploaded_file`` streaming from Python
+* ``x-accel``: ``projects_bp.uploaded_file`` with ``MEDIA_OFFLOAD=x-accel-redirect``,
+  where the front server sends the bytes
+
+for three request types: full downloads, revalidations carrying the ETag from
+a previous response (``If-None-Match``) and 1 MB range requests as issued by
+video players while seeking. Requests go through the WSGI stack in process, so
+the numbers are the cost a Python worker pays per request; network transfer
+is not included. Logging is written to a null handler as it would be in
+production.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_media_serving
+    python -m benchmarks.bench_media_serving --size-mb 20 --requests 200
+"""
+import argparse
+import hashlib
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, current_app, send_from_directory, abort
+
+from app.routes.projects import uploaded_file
+from app.services.media_blob_service import MediaBlobService
+from app.utils.response import api_response
+
+logger = logging.getLogger('benchmarks.legacy_uploaded_file')
+
+def legacy_uploaded_file(filename):
+    """The handler as it was before conditional requests and caching were added."""
+    try:
+        logger.info(f"Attempting to serve file: {filename}")
+        parts = filename.split('/')
+        if len(parts) != 2:
+            logger.error(f"Invalid file path format: {filename}")
+            return api_response(message="Invalid file path", status_code=400)
+        subfolder, actual_filename = parts
+        if subfolder == 'photos':
+            upload_dir = current_app.config['UPLOADED_PHOTOS_DEST']
+        elif subfolder == 'videos':
+            upload_dir = current_app.config['UPLOADED_VIDEOS_DEST']
+        else:
+            return api_response(message="Invalid subfolder", status_code=400)
+        if not os.path.exists(os.path.join(upload_dir, actual_filename)):
+            abort(404)
+        logger.info(f"Serving file from directory: {upload_dir}")
+        logger.info(f"File name: {actual_filename}")
+        response = send_from_directory(upload_dir, actual_filename, as_attachment=False)
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Origin, Accept, Content-Type'
+        return response
+    except Exception as e:
+        logger.error(f"Error serving uploaded file {filename}: {str(e)}")
+        return api_response(message="File not found", status_code=404)
+
+def build_app(root):
+    bench_app = Flask(__name__)
+    bench_app.config.update(
+        UPLOADED_PHOTOS_DEST=os.path.join(root, 'photos'),
+        UPLOADED_VIDEOS_DEST=os.path.join(root, 'videos'),
+        MEDIA_OFFLOAD='',
+    )
+    bench_app.add_url_rule('/legacy/<path:filename>/', 'legacy', legacy_uploaded_file)
+    bench_app.add_url_rule('/current/<path:filename>/', 'current', uploaded_file)
+    return bench_app
+
+def prepare_files(bench_app, size_mb):
+    """Write one video both under a plain name and at its content-addressed path."""
+    data = os.urandom(size_mb * 1024 * 1024)
+    videos = bench_app.config['UPLOADED_VIDEOS_DEST']
+    os.makedirs(videos, exist_ok=True)
+    with open(os.path.join(videos, 'clip.mp4'), 'wb') as f:
+        f.write(data)
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    with bench_app.app_context():
+        path = MediaBlobService().blob_path(sha256, 'mp4')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    return 'videos/clip.mp4', f"videos/{sha256[:2]}/{sha256[2:4]}/{sha256}.mp4"
+
+def measure(client, url, requests, headers=None):
+    # Prime once to get the validator revalidations send back
+    first = client.get(url)
+    headers = {key: value.replace('{etag}', first.headers.get('ETag', '')) for key, value in (headers or {}).items()}
+
+    transferred = 0
+    status = None
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, headers=headers)
+        for chunk in response.response:
+            transferred += len(chunk)
+        response.close()
+        status = response.status_code
+    elapsed = time.perf_counter() - started
+    return {
+        'status': status,
+        'rps': requests / elapsed,
+        'mb_per_s': transferred / elapsed / 1024 / 1024,
+        'ms_per_request': elapsed / requests * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+
+    with tempfile.TemporaryDirectory() as root:
+        bench_app = build_app(root)
+        plain, content_addressed = prepare_files(bench_app, args.size_mb)
+        client = bench_app.test_client()
+
+        scenarios = [
+            ('full', {}),
+            ('revalidate', {'If-None-Match': '{etag}'}),
+            ('range 1MB', {'Range': 'bytes=1048576-2097151'}),
+        ]
+        variants = [
+            ('legacy', f'/legacy/{plain}/', ''),
+            ('current', f'/current/{content_addressed}/', ''),
+            ('x-accel', f'/current/{content_addressed}/', 'x-accel-redirect'),
+        ]
+
+        print(f"{args.size_mb} MB file, {args.requests} sequential requests per row")
+        for scenario, headers in scenarios:
+            for name, url, offload in variants:
+                bench_app.config['MEDIA_OFFLOAD'] = offload
+                result = measure(client, url, args.requests, headers)
+                print(f"  {scenario:<11} {name:<8} status {result['status']}  "
+                      f"{result['rps']:9.1f} req/s  {result['mb_per_s']:9.1f} MB/s  "
+                      f"{result['ms_per_request']:7.3f} ms/req")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Startup benchmark for the Flask app.
+
+Starts a fresh interpreter per run (a cold worker boot) and times:
+
+* ``import``: ``from app import create_app``
+* ``create_app``: building the app
+* ``first_request``: the first request (``GET /metrics``), which registers the
+  blueprints when ``--lazy-blueprints`` is on
+* ``process``: the whole child process, interpreter start included
+
+With ``--imports N`` it also runs the child once under ``python -X importtime``
+and prints the N top-level packages that cost the most to import (self time of
+all their modules), to spot SDKs that should be imported lazily (see
+app.utils.lazy_import).
+
+Redis is not contacted while starting; the database URL only has to be valid.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --runs 10 --lazy-blueprints
+    python -m benchmarks.bench_startup --runs 1 --imports 25
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+app.test_client().get(app.config['METRICS_PATH'])
+served = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': served - created,
+}))
+"""
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+def child_env(args):
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_startup.db')}")
+    env['LAZY_BLUEPRINTS'] = 'true' if args.lazy_blueprints else 'false'
+    return env
+
+def run_once(args, extra_flags=()):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, *extra_flags, '-c', CHILD], cwd=BACKEND_DIR, env=child_env(args),
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"Child process failed:\n{result.stderr[-4000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process'] = elapsed
+    return timings, result.stderr
+
+def import_report(stderr, top):
+    """Self time and module count per top-level package, from -X importtime output."""
+    self_us = defaultdict(int)
+    modules = defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            package = match.group(4).split('.')[0]
+            self_us[package] += int(match.group(1))
+            modules[package] += 1
+    total = sum(self_us.values())
+    print(f"\nImport time by top-level package (self time, total {total / 1000:.0f} ms):")
+    print(f"{'package':<28}{'ms':>10}{'share':>8}{'modules':>9}")
+    for package, us in sorted(self_us.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<28}{us / 1000:>10.1f}{us / total:>8.0%}{modules[package]:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--lazy-blueprints', action='store_true', help='Set LAZY_BLUEPRINTS in the child')
+    parser.add_argument('--imports', type=int, default=0, metavar='N',
+                        help='Also print the N most expensive packages to import')
+    args = parser.parse_args()
+
+    # Warm the bytecode cache so every measured run is equally cold otherwise
+    run_once(args)
+    runs = [run_once(args)[0] for _ in range(args.runs)]
+
+    mode = 'lazy blueprints' if args.lazy_blueprints else 'eager blueprints'
+    print(f"{args.runs} cold starts, {mode}")
+    print(f"{'phase':<16}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for phase in ('import', 'create_app', 'first_request', 'process'):
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<16}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+
+    if args.imports:
+        _, stderr = run_once(args, extra_flags=('-X', 'importtime'))
+        import_report(stderr, args.imports)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Gunicorn worker model benchmark.
+
+Runs ``benchmarks.load_test --start-app`` once per worker class and workload,
+with the same data, concurrency and total worker slots, and prints throughput
+and p95/p99 latency side by side:
+
+* ``browsing``: discovery, search, project views and notifications
+* ``backing``: backing a project and the Stripe webhook that completes it,
+  which wait on the (stubbed, ``--stripe-latency-ms``) Stripe API
+
+``sync`` gets ``--workers`` processes with one request each, ``gthread`` the
+same processes with ``--threads`` threads each, ``gevent`` the same processes
+with greenlets (skipped when gevent is not installed). All of them run
+gunicorn.conf.py with ``preload_app`` on.
+
+Usage (from the backend directory):
+
+    python -m benchmarks.generate_data --database-url sqlite:////tmp/payforme_load.db --recreate --scale 0.01
+    python -m benchmarks.bench_worker_models --database-url sqlite:////tmp/payforme_load.db \\
+        --concurrency 32 --duration 30 --workers 4 --threads 4
+
+Use the production database engine (MySQL) for figures that mean anything;
+SQLite serializes writers and penalizes every model alike.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+WORKER_CLASSES = ['sync', 'gthread', 'gevent']
+
+WORKLOADS = {
+    'browsing': 'backing=0,webhook=0',
+    'backing': 'discovery=0,search=0,project_view=0,notifications=0,backing=1,webhook=1',
+}
+
+def run_load_test(args, worker_class, mix, output):
+    command = [
+        sys.executable, '-m', 'benchmarks.load_test',
+        '--database-url', args.database_url,
+        '--start-stubs', '--start-app', '--app-port', str(args.app_port),
+        '--worker-class', worker_class, '--workers', str(args.workers), '--threads', str(args.threads),
+        '--concurrency', str(args.concurrency), '--duration', str(args.duration), '--warmup', str(args.warmup),
+        '--stripe-latency-ms', str(args.stripe_latency_ms),
+        '--mix', mix, '--output', output,
+    ]
+    result = subprocess.run(command, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"Load test with {worker_class} failed:\n{result.stderr[-4000:]}")
+    with open(output) as handle:
+        return json.load(handle)
+
+def slowest(report, key):
+    return max((row[key] for row in report['endpoints'].values()), default=0.0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--worker-classes', default=','.join(WORKER_CLASSES))
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5)
+    parser.add_argument('--stripe-latency-ms', type=float, default=150)
+    parser.add_argument('--app-port', type=int, default=5055)
+    args = parser.parse_args()
+
+    worker_classes = args.worker_classes.split(',')
+    if 'gevent' in worker_classes and importlib.util.find_spec('gevent') is None:
+        print("gevent is not installed, skipping the gevent worker class", file=sys.stderr)
+        worker_classes.remove('gevent')
+
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for workload in args.workloads.split(','):
+            for worker_class in worker_classes:
+                print(f"{workload} / {worker_class} ...", file=sys.stderr)
+                report = run_load_test(args, worker_class, WORKLOADS[workload],
+                                       os.path.join(directory, f'{workload}-{worker_class}.json'))
+                rows.append((workload, worker_class, report))
+
+    print(f"{args.workers} workers, {args.threads} threads (gthread), {args.concurrency} users, "
+          f"{args.duration:.0f}s per run; p95/p99 of the slowest endpoint")
+    print(f"{'workload':<10}{'worker':<10}{'req/s':>10}{'errors':>8}{'p95 ms':>10}{'p99 ms':>10}")
+    for workload, worker_class, report in rows:
+        print(f"{workload:<10}{worker_class:<10}{report['throughput_rps']:>10.1f}{report['total_errors']:>8}"
+              f"{slowest(report, 'p95_ms'):>10.1f}{slowest(report, 'p99_ms'):>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Local stand-ins for the Stripe and SendGrid APIs.
+
+Answers every Stripe call with a plausible object (checkout sessions get a
+unique ``cs_test_...`` id and a URL) and every SendGrid mail send with 202,
+after a configurable delay that models the provider's latency. Point the app
+at them with:
+
+    STRIPE_API_BASE=http://127.0.0.1:12111
+    SENDGRID_API_HOST=http://127.0.0.1:12112
+
+Usage (from the backend directory):
+
+    python -m benchmarks.external_stubs --stripe-latency-ms 120 --sendgrid-latency-ms 60
+
+The load test (benchmarks.load_test) starts them itself with --start-stubs.
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+STRIPE_PORT = 12111
+SENDGRID_PORT = 12112
+
+# Stripe path segment -> (object name, id prefix)
+STRIPE_OBJECTS = {
+    'sessions': ('checkout.session', 'cs_test'),
+    'accounts': ('account', 'acct'),
+    'account_links': ('account_link', 'acctlink'),
+    'login_links': ('login_link', 'lnk'),
+    'transfers': ('transfer', 'tr'),
+    'refunds': ('refund', 're'),
+    'payment_intents': ('payment_intent', 'pi'),
+    'customers': ('customer', 'cus'),
+}
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+    counter = None
+    run_id = ''
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _respond(self, status, payload):
+        time.sleep(self.latency)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StripeHandler(_StubHandler):
+    def _object(self, params):
+        path = urlsplit(self.path).path.strip('/').split('/')
+        # /v1/<resource>[/<id>[/<sub resource>]], the last named resource decides the object
+        resource = next((part for part in reversed(path) if part in STRIPE_OBJECTS), path[-1])
+        name, prefix = STRIPE_OBJECTS.get(resource, (resource.rstrip('s'), 'obj'))
+        number = next(self.counter)
+        # Unique across restarts, the app stores session ids in a unique column
+        payload = {'id': f'{prefix}_{self.run_id}{number:010d}', 'object': name, 'livemode': False, 'created': int(time.time())}
+        if name == 'checkout.session':
+            payload.update({
+                'url': f'https://checkout.stripe.test/pay/{payload["id"]}',
+                'payment_intent': f'pi_{self.run_id}{number:010d}',
+                'status': 'open',
+                'metadata': {key[len('metadata['):-1]: values[0] for key, values in params.items()
+                             if key.startswith('metadata[')},
+            })
+        elif name in ('account_link', 'login_link'):
+            payload['url'] = f'https://connect.stripe.test/{payload["id"]}'
+        return payload
+
+    def do_GET(self):
+        self._respond(200, self._object({}))
+
+    def do_POST(self):
+        params = parse_qs(self._body().decode())
+        self._respond(200, self._object(params))
+
+    def do_DELETE(self):
+        self._respond(200, {**self._object({}), 'deleted': True})
+
+class SendGridHandler(_StubHandler):
+    def do_POST(self):
+        self._body()
+        self._respond(202, None)
+
+def _serve(handler, port, latency_ms):
+    handler_class = type(handler.__name__, (handler,), {
+        'latency': latency_ms / 1000.0, 'counter': itertools.count(1), 'run_id': f'{int(time.time()):x}'
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name=f'{handler.__name__}-{port}', daemon=True)
+    thread.start()
+    return server
+
+def start_stubs(stripe_port=STRIPE_PORT, sendgrid_port=SENDGRID_PORT, stripe_latency_ms=0, sendgrid_latency_ms=0):
+    """Start both stand-ins in background threads. Returns their servers and the app settings for them."""
+    servers = [
+        _serve(StripeHandler, stripe_port, stripe_latency_ms),
+        _serve(SendGridHandler, sendgrid_port, sendgrid_latency_ms),
+    ]
+    settings = {
+        'STRIPE_API_BASE': f'http://127.0.0.1:{stripe_port}',
+        'SENDGRID_API_HOST': f'http://127.0.0.1:{sendgrid_port}',
+    }
+    return servers, settings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stripe-port', type=int, default=STRIPE_PORT)
+    parser.add_argument('--sendgrid-port', type=int, default=SENDGRID_PORT)
+    parser.add_argument('--stripe-latency-ms', type=float, default=0)
+    parser.add_argument('--sendgrid-latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    servers, settings = start_stubs(args.stripe_port, args.sendgrid_port,
+                                    args.stripe_latency_ms, args.sendgrid_latency_ms)
+    for key, value in settings.items():
+        print(f"{key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+"""
+HTTP load test with a production-like traffic mix.
+
+Closed-loop virtual users (threads, one keep-alive connection each) pick a
+scenario by weight and run it against a live server:
+
+* discovery      GET  /api/v1/projects/discovery
+* search         GET  /api/v1/projects/search?q=...
+* project_view   GET  /api/v1/projects/<id>, its rewards and public backer stats
+* backing        POST /api/v1/backers/projects/<id>/back (with an Idempotency-Key)
+* webhook        POST /api/v1/backers/webhook, a signed checkout.session.completed
+                 for a donation created by ``backing``
+* notifications  GET  /api/v1/notifications/
+
+Projects are picked with a Zipf-like skew over the most backed active
+projects, so popular ones are hot like in production. Users are the ones
+``benchmarks.generate_data`` creates; their tokens are minted locally with the
+server's JWT secret. Stripe and SendGrid are replaced by the stand-ins in
+``benchmarks.external_stubs`` (``--start-stubs``), the server must be started
+with ``STRIPE_API_BASE``/``SENDGRID_API_HOST`` pointing at them, the same
+``STRIPE_WEBHOOK_SECRET`` and ``RATELIMIT_ENABLED=false`` -- or let
+``--start-app`` run it under gunicorn (gunicorn.conf.py) with all of that set.
+
+The report has count, errors, throughput and p50/p95/p99/max latency per
+endpoint. ``--save-baseline`` stores it, ``--baseline`` compares a run with a
+stored one and exits with status 1 when an endpoint regressed (p95 or p99
+slower by more than ``--tolerance`` and ``--min-delta-ms``, a higher error
+rate, or lower total throughput).
+
+Usage (from the backend directory):
+
+    python -m benchmarks.generate_data --database-url sqlite:////tmp/payforme_load.db --recreate --scale 0.01
+    python -m benchmarks.load_test --database-url sqlite:////tmp/payforme_load.db \\
+        --start-stubs --start-app --concurrency 32 --duration 60 --save-baseline baseline.json
+    python -m benchmarks.load_test --database-url sqlite:////tmp/payforme_load.db \\
+        --start-stubs --start-app --concurrency 32 --duration 60 --baseline baseline.json
+
+Against a server that is already running:
+
+    python -m benchmarks.load_test --base-url http://127.0.0.1:5000 --database-url ... \\
+        --jwt-secret ... --webhook-secret ... --start-stubs
+
+Compare runs made with the same data, concurrency and machine only.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from itertools import accumulate
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import requests
+from sqlalchemy import create_engine, text
+
+from benchmarks.external_stubs import start_stubs
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Share of the scenarios in the traffic mix
+DEFAULT_MIX = {
+    'discovery': 25,
+    'search': 15,
+    'project_view': 35,
+    'backing': 5,
+    'webhook': 5,
+    'notifications': 15,
+}
+
+PERMISSIONS = ['view_projects', 'list_rewards', 'back_project']
+SEARCH_TERMS = ['project', 'synthetic', 'load', 'testing', 'Project 1', 'Project 42']
+REPORT_VERSION = 1
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+class Recorder:
+    """Latencies and errors per endpoint label, recorded after the warmup."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def record(self, label, elapsed_ms, status, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            self.latencies[label].append(elapsed_ms)
+            self.statuses[label][status] += 1
+            if not ok:
+                self.errors[label] += 1
+
+    def report(self, duration):
+        endpoints = {}
+        total = 0
+        with self.lock:
+            for label in sorted(self.latencies):
+                values = sorted(self.latencies[label])
+                total += len(values)
+                endpoints[label] = {
+                    'count': len(values),
+                    'errors': self.errors[label],
+                    'error_rate': round(self.errors[label] / len(values), 4),
+                    'rps': round(len(values) / duration, 2),
+                    'p50_ms': round(percentile(values, 0.50), 2),
+                    'p95_ms': round(percentile(values, 0.95), 2),
+                    'p99_ms': round(percentile(values, 0.99), 2),
+                    'max_ms': round(values[-1], 2),
+                    'statuses': {str(status): count for status, count in sorted(self.statuses[label].items())},
+                }
+        return {
+            'total_requests': total,
+            'total_errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+            'throughput_rps': round(total / duration, 2) if duration else 0.0,
+            'endpoints': endpoints,
+        }
+
+class LoadTest:
+    """Shared state of a run: targets, tokens, the stop flag and the webhook queue."""
+
+    def __init__(self, base_url, project_ids, tokens, webhook_secret, mix, recorder,
+                 timeout=10.0, think_ms=0, seed=42):
+        self.base_url = base_url.rstrip('/')
+        self.project_ids = project_ids
+        # Zipf-like weights over projects ordered by popularity
+        self.project_cum_weights = list(accumulate(1.0 / rank for rank in range(1, len(project_ids) + 1)))
+        self.tokens = tokens
+        self.webhook_secret = webhook_secret
+        self.scenarios = [name for name, weight in mix.items() if weight > 0]
+        self.scenario_cum_weights = list(accumulate(mix[name] for name in self.scenarios))
+        self.recorder = recorder
+        self.timeout = timeout
+        self.think = think_ms / 1000.0
+        self.seed = seed
+        self.stop = threading.Event()
+        # Checkout sessions created by backing, completed by the webhook scenario
+        self.pending_checkouts = deque(maxlen=10000)
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index, run):
+        super().__init__(name=f'vu-{index}', daemon=True)
+        self.run_state = run
+        self.rng = random.Random(f'{run.seed}:{index}')
+        self.session = requests.Session()
+
+    def run(self):
+        state = self.run_state
+        while not state.stop.is_set():
+            scenario = self.rng.choices(state.scenarios, cum_weights=state.scenario_cum_weights)[0]
+            getattr(self, scenario)()
+            if state.think:
+                time.sleep(self.rng.uniform(0, 2 * state.think))
+        self.session.close()
+
+    def _request(self, label, method, path, expected=(200,), **kwargs):
+        state = self.run_state
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, state.base_url + path, timeout=state.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 'exception'
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        state.recorder.record(label, elapsed_ms, status, status in expected)
+        return response
+
+    def _project_id(self):
+        state = self.run_state
+        return self.rng.choices(state.project_ids, cum_weights=state.project_cum_weights)[0]
+
+    def _auth(self):
+        return {'Authorization': f'Bearer {self.rng.choice(self.run_state.tokens)}'}
+
+    def discovery(self):
+        self._request('GET /projects/discovery', 'GET', '/api/v1/projects/discovery',
+                      params={'count': self.rng.choice([4, 8, 12])})
+
+    def search(self):
+        self._request('GET /projects/search', 'GET', '/api/v1/projects/search',
+                      params={'q': self.rng.choice(SEARCH_TERMS), 'page': self.rng.randint(1, 3)})
+
+    def project_view(self):
+        project_id = self._project_id()
+        headers = self._auth()
+        self._request('GET /projects/<id>', 'GET', f'/api/v1/projects/{project_id}', headers=headers)
+        self._request('GET /rewards/projects/<id>/rewards', 'GET',
+                      f'/api/v1/rewards/projects/{project_id}/rewards', headers=headers)
+        self._request('GET /backers/projects/<id>/public-stats', 'GET',
+                      f'/api/v1/backers/projects/{project_id}/public-stats', headers=headers)
+
+    def backing(self):
+        headers = {**self._auth(), 'Idempotency-Key': str(uuid.UUID(int=self.rng.getrandbits(128)))}
+        payload = {'amount': self.rng.choice([5, 10, 25, 50, 100]), 'currency': 'USD'}
+        response = self._request('POST /backers/projects/<id>/back', 'POST',
+                                 f'/api/v1/backers/projects/{self._project_id()}/back',
+                                 expected=(200, 201), headers=headers, json=payload)
+        if response is not None and response.status_code in (200, 201):
+            data = (response.json() or {}).get('data') or {}
+            donation_id = (data.get('donation') or {}).get('id')
+            if donation_id:
+                self.run_state.pending_checkouts.append((donation_id, data.get('session_id')))
+
+    def webhook(self):
+        state = self.run_state
+        try:
+            donation_id, session_id = state.pending_checkouts.popleft()
+        except IndexError:
+            return
+        event = {
+            'id': f'evt_{uuid.UUID(int=self.rng.getrandbits(128)).hex}',
+            'object': 'event',
+            'type': 'checkout.session.completed',
+            'data': {'object': {
+                'id': session_id,
+                'object': 'checkout.session',
+                'payment_intent': f'pi_{donation_id:016d}',
+                'payment_status': 'paid',
+                'metadata': {'donation_id': str(donation_id)},
+            }},
+        }
+        payload = json.dumps(event)
+        timestamp = int(time.time())
+        signature = hmac.new(state.webhook_secret.encode(), f'{timestamp}.{payload}'.encode(),
+                             hashlib.sha256).hexdigest()
+        self._request('POST /backers/webhook', 'POST', '/api/v1/backers/webhook', data=payload,
+                      headers={'Content-Type': 'application/json',
+                               'Stripe-Signature': f't={timestamp},v1={signature}'})
+
+    def notifications(self):
+        self._request('GET /notifications/', 'GET', '/api/v1/notifications/', headers=self._auth())
+
+def load_targets(database_url, project_limit, user_limit):
+    """The most backed active projects and a sample of user ids from the generated data."""
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            project_ids = connection.execute(text(
+                "SELECT id FROM projects WHERE status = 'ACTIVE' "
+                "ORDER BY backers_count DESC, id LIMIT :limit"
+            ), {'limit': project_limit}).scalars().all()
+            user_ids = connection.execute(text(
+                "SELECT id FROM users ORDER BY id LIMIT :limit"
+            ), {'limit': user_limit}).scalars().all()
+    finally:
+        engine.dispose()
+    if not project_ids or not user_ids:
+        raise SystemExit('No active projects or users found, run benchmarks.generate_data first')
+    return project_ids, user_ids
+
+def mint_tokens(jwt_secret, user_ids):
+    """Access tokens like the login endpoint issues, signed with the server's secret."""
+    from flask import Flask
+    from flask_jwt_extended import JWTManager, create_access_token
+
+    issuer = Flask(__name__)
+    issuer.config.update(JWT_SECRET_KEY=jwt_secret, JWT_ACCESS_TOKEN_EXPIRES=False)
+    JWTManager(issuer)
+    with issuer.app_context():
+        return [create_access_token(identity=user_id, additional_claims={
+            'permissions': PERMISSIONS,
+            'last_permission_update': time.time(),
+        }) for user_id in user_ids]
+
+def start_app(args, stub_settings):
+    """Run the app under gunicorn with the load-test settings, return the process once it answers."""
+    env = {
+        **os.environ,
+        'DATABASE_URL': args.database_url,
+        'JWT_SECRET_KEY': args.jwt_secret,
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'load-test-secret'),
+        'STRIPE_SECRET_KEY': os.environ.get('STRIPE_SECRET_KEY', 'sk_test_loadtest'),
+        'STRIPE_WEBHOOK_SECRET': args.webhook_secret,
+        'SENDGRID_API_KEY': os.environ.get('SENDGRID_API_KEY', 'SG.loadtest'),
+        'FRONTEND_URL': os.environ.get('FRONTEND_URL', 'http://localhost:3000'),
+        'RATELIMIT_ENABLED': 'false',
+        'GUNICORN_BIND': f'127.0.0.1:{args.app_port}',
+        'GUNICORN_WORKER_CLASS': args.worker_class,
+        'GUNICORN_WORKERS': str(args.workers),
+        'GUNICORN_THREADS': str(args.threads),
+        'GUNICORN_ACCESS_LOG': '',
+        'GUNICORN_LOG_LEVEL': 'warning',
+        **stub_settings,
+    }
+    command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app']
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with status {process.returncode}')
+        try:
+            requests.get(f'http://127.0.0.1:{args.app_port}/api/v1/projects/discovery', timeout=2)
+            return process
+        except requests.RequestException:
+            time.sleep(0.5)
+    process.terminate()
+    raise SystemExit('The app did not answer within 60 seconds')
+
+def compare(report, baseline, tolerance, min_delta_ms):
+    """Regressions of a report against a baseline report, as readable lines."""
+    regressions = []
+    for label, current in report['endpoints'].items():
+        previous = baseline['endpoints'].get(label)
+        if not previous:
+            continue
+        for key in ('p95_ms', 'p99_ms'):
+            delta = current[key] - previous[key]
+            if delta > min_delta_ms and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{label}: {key} {previous[key]:.1f} -> {current[key]:.1f} ms")
+        if current['error_rate'] > previous['error_rate'] + 0.01:
+            regressions.append(f"{label}: error rate {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    if report['throughput_rps'] < baseline['throughput_rps'] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['throughput_rps']:.1f} -> {report['throughput_rps']:.1f} req/s")
+    return regressions
+
+def print_report(report, baseline=None):
+    header = f"{'endpoint':40} {'count':>8} {'err':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print('-' * len(header))
+    for label, row in report['endpoints'].items():
+        line = (f"{label:40} {row['count']:8d} {row['errors']:6d} {row['rps']:8.1f} "
+                f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}")
+        previous = baseline and baseline['endpoints'].get(label)
+        if previous:
+            line += f"   (baseline p95 {previous['p95_ms']:.1f})"
+        print(line)
+    print('-' * len(header))
+    print(f"total: {report['total_requests']} requests, {report['total_errors']} errors, "
+          f"{report['throughput_rps']:.1f} req/s over {report['duration_seconds']:.0f}s "
+          f"with {report['concurrency']} users")
+
+def parse_mix(value):
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'unknown scenario {name!r}, one of {", ".join(DEFAULT_MIX)}')
+        mix[name] = float(weight)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', help='Server to test, default: the one --start-app runs')
+    parser.add_argument('--database-url', required=True, help='Database the server uses, to pick projects and users')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=60, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=10, help='Seconds of traffic before measuring')
+    parser.add_argument('--think-ms', type=float, default=0, help='Mean pause between scenarios per user')
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help='Scenario weights, e.g. "backing=10,webhook=10,search=0"')
+    parser.add_argument('--projects', type=int, default=1000, help='Most backed projects to target')
+    parser.add_argument('--users', type=int, default=1000, help='Users to spread authenticated calls over')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jwt-secret', default=os.environ.get('JWT_SECRET_KEY', 'load-test-jwt-secret'))
+    parser.add_argument('--webhook-secret', default=os.environ.get('STRIPE_WEBHOOK_SECRET', 'whsec_loadtest'))
+    parser.add_argument('--start-stubs', action='store_true', help='Run the Stripe/SendGrid stand-ins')
+    parser.add_argument('--stripe-latency-ms', type=float, default=150)
+    parser.add_argument('--sendgrid-latency-ms', type=float, default=80)
+    parser.add_argument('--start-app', action='store_true', help='Run the app under gunicorn for the test')
+    parser.add_argument('--app-port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--worker-class', choices=['sync', 'gthread', 'gevent'], default='gthread')
+    parser.add_argument('--output', help='Write the report as JSON')
+    parser.add_argument('--save-baseline', help='Write the report as the baseline for later runs')
+    parser.add_argument('--baseline', help='Compare with this baseline, exit 1 on a regression')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative slowdown')
+    parser.add_argument('--min-delta-ms', type=float, default=5.0, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    if not args.base_url and not args.start_app:
+        parser.error('give --base-url or --start-app')
+
+    servers, stub_settings, app_process = [], {}, None
+    if args.start_stubs:
+        servers, stub_settings = start_stubs(stripe_latency_ms=args.stripe_latency_ms,
+                                             sendgrid_latency_ms=args.sendgrid_latency_ms)
+    try:
+        if args.start_app:
+            app_process = start_app(args, stub_settings)
+        base_url = args.base_url or f'http://127.0.0.1:{args.app_port}'
+
+        project_ids, user_ids = load_targets(args.database_url, args.projects, args.users)
+        tokens = mint_tokens(args.jwt_secret, user_ids)
+        recorder = Recorder()
+        run = LoadTest(base_url, project_ids, tokens, args.webhook_secret, args.mix, recorder,
+                       timeout=args.timeout, think_ms=args.think_ms, seed=args.seed)
+
+        users = [VirtualUser(index, run) for index in range(args.concurrency)]
+        for user in users:
+            user.start()
+        print(f"Warming up for {args.warmup:.0f}s against {base_url} ...", file=sys.stderr)
+        time.sleep(args.warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        recorder.recording = False
+        duration = time.perf_counter() - started
+        run.stop.set()
+        for user in users:
+            user.join(timeout=args.timeout + 1)
+    finally:
+        if app_process:
+            app_process.terminate()
+            app_process.wait(timeout=30)
+        for server in servers:
+            server.shutdown()
+
+    report = {
+        'version': REPORT_VERSION,
+        'concurrency': args.concurrency,
+        'duration_seconds': round(duration, 2),
+        'mix': args.mix,
+        'stripe_latency_ms': args.stripe_latency_ms if args.start_stubs else None,
+        'sendgrid_latency_ms': args.sendgrid_latency_ms if args.start_stubs else None,
+        **recorder.report(duration),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    print_report(report, baseline)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w') as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+        print(f"Report written to {path}")
+
+    if baseline:
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print('\nRegressions against the baseline:')
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print('\nNo regressions against the baseline.')
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,6 @@ import os
 from dotenv import load_dotenv
 from pathlib import Path
 from datetime import timedelta
-import stripe
 
 load_dotenv()
 
@@ -10,9 +9,26 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool of every engine, per process: a gunicorn worker holds up to
+    # DB_POOL_SIZE + DB_MAX_OVERFLOW connections; size it for its threads plus background work
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # Seconds to wait for a free connection
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),  # Keep below the server's wait_timeout
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+
+    # Read replicas (app.utils.db_routing), comma-separated; only @replica_reads views and services use them
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if uri]
+    REPLICA_MAX_LAG = float(os.getenv('REPLICA_MAX_LAG', 2))  # Seconds; replicas further behind are skipped
+    REPLICA_LAG_CHECK_INTERVAL = float(os.getenv('REPLICA_LAG_CHECK_INTERVAL', 5))
+    # A user's reads stay on the primary this long after their write; keep it above REPLICA_MAX_LAG
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     SENDGRID_API_KEY = os.environ.get('SENDGRID_API_KEY')
     SENDGRID_DEFAULT_FROM = os.environ.get('SENDGRID_DEFAULT_FROM', 'noreply@yourdomain.com')
+    SENDGRID_API_HOST = os.environ.get('SENDGRID_API_HOST', 'https://api.sendgrid.com')
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
     FRONTEND_URL = os.environ.get('FRONTEND_URL')  # React app URL
@@ -27,6 +43,33 @@ class Config:
     ALLOWED_EXTENSIONS = set(os.getenv('ALLOWED_EXTENSIONS', 'png,jpg,jpeg,gif').split(','))
     ALLOWED_VIDEO_EXTENSIONS = set(os.getenv('ALLOWED_VIDEO_EXTENSIONS', 'mp4,avi,mov').split(','))
     
+    # Resumable chunked uploads: each chunk is still limited by MAX_CONTENT_LENGTH
+    MAX_RESUMABLE_UPLOAD_SIZE = int(os.getenv('MAX_RESUMABLE_UPLOAD_SIZE', 2 * 1024 * 1024 * 1024))  # 2 GB
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 86400))
+    UPLOAD_CHUNK_BUFFER_SIZE = 1024 * 1024
+    UPLOAD_CHUNK_CLAIM_TIMEOUT = int(os.getenv('UPLOAD_CHUNK_CLAIM_TIMEOUT', 600))  # Longest a single chunk may take to arrive
+    MEDIA_BLOB_GC_GRACE = int(os.getenv('MEDIA_BLOB_GC_GRACE', 2 * 86400))  # Unreferenced blobs are kept this long
+    ORPHAN_UPLOAD_GRACE = int(os.getenv('ORPHAN_UPLOAD_GRACE', 7 * 86400))  # Unreferenced files younger than this are kept
+    ORPHAN_UPLOAD_QUARANTINE_DIR = os.getenv('ORPHAN_UPLOAD_QUARANTINE_DIR', os.path.join(UPLOAD_FOLDERS, 'quarantine'))
+    IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 2))  # 0 renders variants inline
+    IMAGE_DERIVATIVE_QUALITY = int(os.getenv('IMAGE_DERIVATIVE_QUALITY', 82))
+    # Media serving: '' streams from Python, 'x-sendfile' (Apache/lighttpd) or
+    # 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_REDIRECT_PREFIX)
+    MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '')
+    MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+    MEDIA_CACHE_MAX_AGE = int(os.getenv('MEDIA_CACHE_MAX_AGE', 300))  # Files that are not content-addressed
+
+    # Media storage: 'filesystem' (the upload directories) or 's3' (any S3-compatible store)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'filesystem')
+    STORAGE_STAGING_DIR = os.getenv('STORAGE_STAGING_DIR', os.path.join(UPLOAD_FOLDERS, 'staging'))
+    STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET')
+    STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+    STORAGE_S3_REGION = os.getenv('STORAGE_S3_REGION', 'us-east-1')
+    STORAGE_S3_ACCESS_KEY_ID = os.getenv('STORAGE_S3_ACCESS_KEY_ID')
+    STORAGE_S3_SECRET_ACCESS_KEY = os.getenv('STORAGE_S3_SECRET_ACCESS_KEY')
+    STORAGE_S3_PUBLIC_URL = os.getenv('STORAGE_S3_PUBLIC_URL')  # Base URL files are served from (bucket or CDN)
+    DIRECT_UPLOAD_URL_TTL = int(os.getenv('DIRECT_UPLOAD_URL_TTL', 900))
+
     # Specific upload destinations
     UPLOADED_PHOTOS_DEST = os.path.abspath(os.path.join(UPLOAD_FOLDERS, 'photos'))
     UPLOADED_VIDEOS_DEST = os.path.abspath(os.path.join(UPLOAD_FOLDERS, 'videos'))
@@ -47,7 +90,50 @@ class Config:
     REDIS_PORT = os.getenv('REDIS_PORT', 6379)
     REDIS_DB = os.getenv('REDIS_DB', 0)
     REDIS_URL = os.getenv('REDIS_URL', f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}')
+    # Log a warning at startup when Redis is unreachable (the app starts either way)
+    REDIS_PING_ON_STARTUP = os.getenv('REDIS_PING_ON_STARTUP', 'false').lower() == 'true'
     
+    # Idempotency-Key handling for retried POST requests
+    IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400))  # Keep completed responses for 24 hours
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+    # Limited reward reservations: hold time while checkout is open (Stripe requires
+    # at least 30 minutes) and extra time before unconfirmed holds are swept
+    REWARD_RESERVATION_TTL = int(os.getenv('REWARD_RESERVATION_TTL', 1860))
+    REWARD_RESERVATION_GRACE = int(os.getenv('REWARD_RESERVATION_GRACE', 600))
+
+    # Per-project reward catalog cache
+    REWARD_CATALOG_TTL = int(os.getenv('REWARD_CATALOG_TTL', 300))
+
+    # Service cache (app.utils.tiered_cache): in-process LRU in front of Redis, invalidated by tag
+    SERVICE_CACHE_TTL = int(os.getenv('SERVICE_CACHE_TTL', 300))
+    SERVICE_CACHE_LOCAL_SIZE = int(os.getenv('SERVICE_CACHE_LOCAL_SIZE', 1024))  # Entries per process
+    SERVICE_CACHE_LOCAL_TTL = int(os.getenv('SERVICE_CACHE_LOCAL_TTL', 30))  # Upper bound if an invalidation is missed
+    SERVICE_CACHE_LOCK_TIMEOUT = int(os.getenv('SERVICE_CACHE_LOCK_TIMEOUT', 10))
+    SERVICE_CACHE_LOCK_WAIT = float(os.getenv('SERVICE_CACHE_LOCK_WAIT', 2))  # Wait for another process's rebuild
+
+    # Cache-Control of conditional GET endpoints (app.utils.conditional), by endpoint class.
+    # "no-cache" lets clients store a response but revalidate it on every use, which costs a 304.
+    CACHE_CONTROL_POLICIES = {
+        'reference': 'public, max-age=60',  # Rarely changing lookup data (categories)
+        'listing': 'public, no-cache',      # Public, changes with every backing (discovery)
+        'private': 'private, no-cache',     # Needs a token (project detail, reward catalogs)
+    }
+    # Part of every ETag; bump when response shapes change so clients drop old representations
+    ETAG_VERSION = os.getenv('ETAG_VERSION', '1')
+
+    # Register the blueprints on the first request instead of in create_app (faster boot, slower first request)
+    LAZY_BLUEPRINTS = os.getenv('LAZY_BLUEPRINTS', 'false').lower() == 'true'
+
+    # Flask-Limiter's default limits and @rate_limit; load tests from a single host turn them off
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+
+    # Prometheus metrics on METRICS_PATH; scrapes need "Authorization: Bearer <token>". Without a
+    # token the endpoint is only served in debug and testing, the instrumentation runs regardless
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_PATH = os.getenv('METRICS_PATH', '/metrics')
+    METRICS_BEARER_TOKEN = os.getenv('METRICS_BEARER_TOKEN')
+
     # Configure Flask-Caching with Redis
     CACHE_TYPE = 'redis'
     CACHE_REDIS_URL = REDIS_URL  # Use the same URL for caching
@@ -57,6 +143,7 @@ class Config:
     STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
     STRIPE_LOGGING = os.getenv('STRIPE_LOGGING', False)
     STRIPE_CONNECT_WEBHOOK_SECRET = os.getenv('STRIPE_CONNECT_WEBHOOK_SECRET')
+    STRIPE_API_BASE = os.getenv('STRIPE_API_BASE')  # Stand-in API (stripe-mock, load tests); unset uses Stripe
     
     # Platform fee configuration for payouts (defaults to 5% if not set)
     PLATFORM_FEE_PERCENTAGE = os.getenv('PLATFORM_FEE_PERCENTAGE', '5')
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Gunicorn configuration for production.
+
+    gunicorn --config gunicorn.conf.py wsgi:app
+
+Every setting can be changed through the environment:
+
+* ``GUNICORN_WORKER_CLASS``: ``gthread`` (default), ``sync`` or ``gevent``.
+  ``sync`` handles one request per worker at a time. ``gthread`` adds
+  ``GUNICORN_THREADS`` threads per worker, which suits this app: requests
+  mostly wait on MySQL, Redis, Stripe and SendGrid. ``gevent`` (needs the
+  gevent package) multiplexes ``GUNICORN_WORKER_CONNECTIONS`` greenlets per
+  worker and patches the standard library before the app is loaded.
+* ``GUNICORN_WORKERS``: worker processes, default 2 x CPUs + 1.
+* ``GUNICORN_PRELOAD``: build the app once in the master and fork the workers
+  from it (default on), so they share the memory of the imported code and
+  boot faster. Connection pools are re-created in each worker after the fork
+  (app.utils.fork_safety).
+
+Compare worker classes on this app with ``python -m benchmarks.bench_worker_models``.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('1', 'true', 'yes')
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '8000')}")
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Gunicorn turns sync workers with more than one thread into gthread ones
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+preload_app = _env_bool('GUNICORN_PRELOAD', True)
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+# Empty to turn the access log off
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+if worker_class == 'gevent':
+    # Must happen before the app and its clients are imported (preload imports them in the master)
+    from gevent import monkey
+    monkey.patch_all()
+
+# Workers report Prometheus metrics through files in a shared directory, which must
+# be set before prometheus_client is imported
+if workers > 1 and not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='payforme-prometheus-')
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        # Files of a previous run would be added to this one's counters
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def post_fork(server, worker):
+    if preload_app:
+        import wsgi
+        from app.utils.fork_safety import reinit_after_fork
+        reinit_after_fork(wsgi.app)
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,42 @@
+"""Add reward reservations
+
+Revision ID: 5a2d8e4c1f93
+Revises: d81f0b5c7e29
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a2d8e4c1f93'
+down_revision = 'd81f0b5c7e29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reward_reservations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reward_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('donation_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('HELD', 'CONFIRMED', 'RELEASED', name='reservationstatus'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('confirmed_at', sa.DateTime(), nullable=True),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.Column('release_reason', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['donation_id'], ['donations.id'], ),
+    sa.ForeignKeyConstraint(['reward_id'], ['rewards.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('donation_id')
+    )
+    op.create_index('ix_reward_reservations_status_expires', 'reward_reservations', ['status', 'expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_reward_reservations_status_expires', table_name='reward_reservations')
+    op.drop_table('reward_reservations')
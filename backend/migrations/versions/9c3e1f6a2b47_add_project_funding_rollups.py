@@ -0,0 +1,38 @@
+"""Add project funding rollups
+
+Revision ID: 9c3e1f6a2b47
+Revises: 4b7d24d5e7ff
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e1f6a2b47'
+down_revision = '4b7d24d5e7ff'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('project_funding_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.Enum('HOUR', 'DAY', name='rollupgranularity'), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('donation_count', sa.Integer(), nullable=False),
+    sa.Column('new_backers', sa.Integer(), nullable=False),
+    sa.Column('refund_count', sa.Integer(), nullable=False),
+    sa.Column('refund_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('project_id', 'granularity', 'bucket_start', name='uix_funding_rollup_bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('project_funding_rollups')
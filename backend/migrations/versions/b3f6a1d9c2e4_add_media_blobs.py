@@ -0,0 +1,42 @@
+"""Add content-addressed media blobs
+
+Revision ID: b3f6a1d9c2e4
+Revises: 7e4b2c9d0a18
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f6a1d9c2e4'
+down_revision = '7e4b2c9d0a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('media_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('extension', sa.String(length=10), nullable=False),
+    sa.Column('subfolder', sa.String(length=10), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.create_index('ix_media_blobs_gc', 'media_blobs', ['ref_count', 'updated_at'], unique=False)
+    with op.batch_alter_table('media', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_media_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('media', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_media_content_hash'))
+        batch_op.drop_column('content_hash')
+
+    op.drop_index('ix_media_blobs_gc', table_name='media_blobs')
+    op.drop_table('media_blobs')
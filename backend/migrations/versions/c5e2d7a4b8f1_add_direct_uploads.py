@@ -0,0 +1,26 @@
+"""Add direct uploads flag to upload sessions
+
+Revision ID: c5e2d7a4b8f1
+Revises: b3f6a1d9c2e4
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e2d7a4b8f1'
+down_revision = 'b3f6a1d9c2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_direct', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_column('is_direct')
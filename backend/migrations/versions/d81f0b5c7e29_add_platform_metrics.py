@@ -0,0 +1,36 @@
+"""Add platform metrics
+
+Revision ID: d81f0b5c7e29
+Revises: 9c3e1f6a2b47
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f0b5c7e29'
+down_revision = '9c3e1f6a2b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('platform_metrics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=50), nullable=False),
+    sa.Column('dimension', sa.String(length=50), nullable=False),
+    sa.Column('period', sa.String(length=10), nullable=False),
+    sa.Column('count', sa.BigInteger(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=16, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('metric', 'dimension', 'period', name='uix_platform_metric_key')
+    )
+    op.create_index('ix_platform_metric_period', 'platform_metrics', ['period', 'metric'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_platform_metric_period', table_name='platform_metrics')
+    op.drop_table('platform_metrics')
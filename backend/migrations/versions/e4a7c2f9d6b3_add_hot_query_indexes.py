@@ -0,0 +1,53 @@
+"""Add composite indexes for the hot query shapes
+
+Revision ID: e4a7c2f9d6b3
+Revises: c5e2d7a4b8f1
+Create Date: 2026-10-19 18:00:00.000000
+
+The query each index serves is listed in app/utils/query_plans.py. InnoDB
+builds secondary indexes in place without blocking writes.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7c2f9d6b3'
+down_revision = 'c5e2d7a4b8f1'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_projects_status_created', 'projects', ['status', 'created_at']),
+    ('ix_projects_creator_status', 'projects', ['creator_id', 'status']),
+    ('ix_projects_deleted_created', 'projects', ['is_deleted', 'created_at']),
+    ('ix_donations_project_user', 'donations', ['project_id', 'user_id', 'amount', 'created_at']),
+    ('ix_donations_project_status', 'donations', ['project_id', 'status', 'amount']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at']),
+    ('ix_notifications_user_read_created', 'notifications', ['user_id', 'read_at', 'created_at']),
+    ('ix_payouts_user_created', 'payouts', ['user_id', 'created_at']),
+    ('ix_saved_projects_user_created', 'saved_projects', ['user_id', 'created_at']),
+]
+
+# MySQL drops its own index of a foreign key once another index starts with the
+# key's column, and refuses to drop that one later; these get a plain index back
+FOREIGN_KEY_COLUMNS = [
+    ('projects', 'creator_id'),
+    ('donations', 'project_id'),
+    ('notifications', 'user_id'),
+    ('payouts', 'user_id'),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        for table, column in FOREIGN_KEY_COLUMNS:
+            op.create_index(f'ix_{table}_{column}', table, [column], unique=False)
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,28 @@
+"""Add chunk claims to upload sessions
+
+Revision ID: f2c8a5e1b7d4
+Revises: e4a7c2f9d6b3
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8a5e1b7d4'
+down_revision = 'e4a7c2f9d6b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chunk_token', sa.String(length=32), nullable=True))
+        batch_op.add_column(sa.Column('chunk_claimed_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('upload_sessions', schema=None) as batch_op:
+        batch_op.drop_column('chunk_claimed_until')
+        batch_op.drop_column('chunk_token')
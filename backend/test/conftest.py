@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from query_budget import QueryBudgetClient
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'query_budget(max_queries): fail if a request runs more SQL statements')
+    config.addinivalue_line('markers', 'allow_n_plus_one: do not fail on repeated query shapes')
+
+@pytest.fixture
+def redis_client():
+    """A real Redis at TEST_REDIS_URL, or fakeredis (with Lua support) when it is not set."""
+    url = os.environ.get('TEST_REDIS_URL')
+    if url:
+        from redis import Redis
+        client = Redis.from_url(url, decode_responses=True)
+        client.flushdb()
+        return client
+    fakeredis = pytest.importorskip('fakeredis', reason='set TEST_REDIS_URL or install fakeredis[lua]')
+    # The cache and the idempotency keys release their locks with Lua scripts
+    pytest.importorskip('lupa', reason='set TEST_REDIS_URL or install fakeredis[lua]')
+    return fakeredis.FakeRedis(decode_responses=True)
+
+@pytest.fixture
+def app_config():
+    """Extra configuration for the app fixture; override it in a test module."""
+    return {}
+
+@pytest.fixture
+def app(tmp_path, redis_client, app_config):
+    from app import create_app, db
+
+    with patch('app.utils.redis_client.Redis.from_url', return_value=redis_client):
+        application = create_app({
+            'TESTING': True,
+            'SECRET_KEY': 'test-secret',
+            'JWT_SECRET_KEY': 'test-jwt-secret',
+            'SQLALCHEMY_DATABASE_URI': os.environ.get('TEST_DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}"),
+            'CACHE_TYPE': 'SimpleCache',
+            'RATELIMIT_ENABLED': False,
+            'UPLOADED_PHOTOS_DEST': str(tmp_path / 'photos'),
+            'UPLOADED_VIDEOS_DEST': str(tmp_path / 'videos'),
+            'STORAGE_STAGING_DIR': str(tmp_path / 'staging'),
+            'ORPHAN_UPLOAD_QUARANTINE_DIR': str(tmp_path / 'quarantine'),
+            'IMAGE_DERIVATIVE_WORKERS': 0,
+            **app_config,
+        })
+        application.test_client_class = QueryBudgetClient
+        with application.app_context():
+            db.create_all()
+        yield application
+        with application.app_context():
+            db.session.remove()
+            db.drop_all()
+
+@pytest.fixture
+def client(app, request):
+    """Test client that fails the test when a request breaks its query budget."""
+    test_client = app.test_client()
+    marker = request.node.get_closest_marker('query_budget')
+    if marker:
+        test_client.budget = marker.args[0]
+    test_client.allow_repeats = request.node.get_closest_marker('allow_n_plus_one') is not None
+    return test_client
+
+@pytest.fixture
+def auth_headers(app):
+    """Build Authorization headers for a user, with the given permissions in the token."""
+    from flask_jwt_extended import create_access_token
+
+    def make(user, *permissions):
+        with app.app_context():
+            token = create_access_token(identity=user.id, additional_claims={
+                'permissions': list(permissions),
+                'last_permission_update': time.time(),
+            })
+        return {'Authorization': f'Bearer {token}'}
+    return make
+
+@pytest.fixture
+def make_project(app):
+    """Add an active 30-day project; call it in an app context and commit.
+
+    The creator and the 'Energy' category are reused or created unless passed in.
+    """
+    from app import db
+    from app.models import User, Project, Category
+    from app.models.enums import ProjectStatus
+
+    def make(session=None, creator=None, category=None, **fields):
+        session = session or db.session
+        if creator is None and 'creator_id' not in fields:
+            creator = (session.query(User).filter_by(username='creator').first()
+                       or User(username='creator', email='creator@example.com', password_hash='x'))
+        if category is None and 'category_id' not in fields:
+            category = session.query(Category).filter_by(name='Energy').first() or Category(name='Energy')
+        values = {
+            'title': 'Solar lamp', 'description': 'Lamps', 'goal_amount': 100, 'current_amount': 0,
+            'status': ProjectStatus.ACTIVE, 'start_date': date.today(),
+            'end_date': date.today() + timedelta(days=30),
+        }
+        values.update(fields)
+        if creator is not None:
+            values['creator'] = creator
+        if category is not None:
+            values['category'] = category
+        project = Project(**values)
+        session.add(project)
+        session.flush()
+        return project
+    return make
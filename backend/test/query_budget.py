@@ -0,0 +1,135 @@
+"""
+Query counting for the test suite.
+
+Every request made through the ``client`` fixture is recorded: the SQL
+statements it executed are counted and grouped by shape (the statement with
+literals and bound parameters collapsed). A request fails the test when
+
+* it runs more statements than the budget its view declares with
+  ``@query_budget(...)`` (see app.utils.decorators), or that the test sets
+  with ``@pytest.mark.query_budget(...)``, or
+* a statement shape repeats more than ``max_repeats`` times, which is how a
+  lazy load inside a loop (N+1) shows up. Tests that expect repetition can
+  opt out with ``@pytest.mark.allow_n_plus_one``.
+
+The statements of the last request are available as ``client.queries``.
+"""
+import re
+from collections import Counter
+from flask import request_started
+from flask.testing import FlaskClient
+from sqlalchemy import event
+
+DEFAULT_MAX_REPEATS = 2
+
+_IN_LIST = re.compile(r'\(\s*(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])\d+(?:\.\d+)?(?![\w.])')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement):
+    """Collapse literals and parameter lists so repeated queries compare equal."""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryRecorder:
+    """Collects the statements executed on any of ``engines`` while active."""
+
+    def __init__(self, *engines):
+        self.engines = engines
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in self.engines:
+            event.remove(engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated_shapes(self, max_repeats):
+        """Shapes executed more than ``max_repeats`` times, with their counts."""
+        shapes = Counter(statement_shape(statement) for statement in self.statements)
+        return {shape: count for shape, count in shapes.items() if count > max_repeats}
+
+def _format(statements, limit=40):
+    lines = [f"  {index + 1:3}. {_WHITESPACE.sub(' ', statement)[:300]}"
+             for index, statement in enumerate(statements[:limit])]
+    if len(statements) > limit:
+        lines.append(f"  ... {len(statements) - limit} more")
+    return '\n'.join(lines)
+
+def check_request(method, path, endpoint, view, recorder, budget=None, allow_repeats=False):
+    """
+    Raise QueryBudgetExceeded if a request broke its budget or repeated a query shape.
+
+    ``budget`` (from a test marker) overrides the one the view declares.
+    """
+    declared = getattr(view, 'query_budget', None) or {}
+    max_queries = budget if budget is not None else declared.get('max_queries')
+    max_repeats = declared.get('max_repeats', DEFAULT_MAX_REPEATS)
+
+    if max_queries is not None and recorder.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{method} {path} ({endpoint}) ran {recorder.count} queries, budget is {max_queries}:\n"
+            f"{_format(recorder.statements)}"
+        )
+    if not allow_repeats:
+        repeated = recorder.repeated_shapes(max_repeats)
+        if repeated:
+            details = '\n'.join(f"  {count}x {shape[:300]}" for shape, count in repeated.items())
+            raise QueryBudgetExceeded(
+                f"{method} {path} ({endpoint}) repeated queries more than {max_repeats} times "
+                f"(N+1?):\n{details}"
+            )
+
+class QueryBudgetClient(FlaskClient):
+    """Test client that checks the queries of every request it makes."""
+
+    budget = None
+    allow_repeats = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = []
+
+    def open(self, *args, **kwargs):
+        from app import db
+
+        matched = {}
+
+        def capture(sender, **extra):
+            from flask import request
+            matched['endpoint'] = request.endpoint
+            matched['path'] = request.path
+            matched['method'] = request.method
+
+        with self.application.app_context():
+            # Reads routed to a replica count against the budget too
+            engines = [db.engine, *self.application.extensions.get('db_replicas', {}).values()]
+        with request_started.connected_to(capture, self.application), QueryRecorder(*engines) as recorder:
+            response = super().open(*args, **kwargs)
+        self.queries = recorder.statements
+
+        endpoint = matched.get('endpoint')
+        if endpoint:
+            check_request(
+                matched['method'], matched['path'], endpoint,
+                self.application.view_functions.get(endpoint), recorder,
+                budget=self.budget, allow_repeats=self.allow_repeats
+            )
+        return response
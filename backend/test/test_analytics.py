@@ -0,0 +1,139 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+@pytest.fixture
+def funded(app, make_project):
+    """A project with two backers: three completed donations, one later refunded, and a pending one."""
+    from app import db
+    from app.models import User
+    from app.models.donation import Donation
+    from app.models.enums import DonationStatus
+    from app.services.analytics_service import AnalyticsService
+
+    with app.app_context():
+        project = make_project()
+        first = User(username='first', email='first@example.com', password_hash='x')
+        second = User(username='second', email='second@example.com', password_hash='x')
+        db.session.add_all([first, second])
+        db.session.flush()
+
+        service = AnalyticsService()
+        for user, amount, completed_at in [
+            (first, 10, datetime(2026, 3, 1, 10, 15)),
+            (first, 15, datetime(2026, 3, 1, 11, 30)),
+            (second, 20, datetime(2026, 3, 2, 9, 0)),
+        ]:
+            donation = Donation(user_id=user.id, project_id=project.id, amount=Decimal(amount))
+            db.session.add(donation)
+            db.session.flush()
+            # The order the webhook handler follows: mark completed, then record
+            donation.status = DonationStatus.COMPLETED
+            donation.completed_at = completed_at
+            service.record_donation_completed(db.session, donation)
+
+        donation.status = DonationStatus.REFUNDED
+        donation.refunded_at = datetime(2026, 3, 3, 12, 0)
+        donation.refund_amount = 20.0
+        service.record_donation_refunded(db.session, donation)
+
+        db.session.add(Donation(user_id=second.id, project_id=project.id, amount=Decimal(99),
+                                status=DonationStatus.PENDING))
+        db.session.commit()
+        return project.id, db.session.get(User, project.creator_id), db.session.get(User, second.id)
+
+def rollup_rows(project_id):
+    from app.models.funding_rollup import ProjectFundingRollup
+
+    rows = ProjectFundingRollup.query.filter_by(project_id=project_id) \
+        .order_by(ProjectFundingRollup.granularity, ProjectFundingRollup.bucket_start).all()
+    return [(row.granularity.value, row.bucket_start, row.amount, row.donation_count, row.new_backers,
+             row.refund_count, row.refund_amount) for row in rows]
+
+def test_incremental_rollups(app, funded):
+    project_id, _, _ = funded
+    with app.app_context():
+        rows = rollup_rows(project_id)
+    assert ('DAY', datetime(2026, 3, 1), Decimal('25.00'), 2, 1, 0, Decimal('0.00')) in rows
+    assert ('HOUR', datetime(2026, 3, 1, 11), Decimal('15.00'), 1, 0, 0, Decimal('0.00')) in rows
+    assert ('DAY', datetime(2026, 3, 3), Decimal('0.00'), 0, 0, 1, Decimal('20.00')) in rows
+
+def test_backfill_matches_incremental_rollups(app, funded):
+    from app.services.analytics_service import AnalyticsService
+
+    project_id, _, _ = funded
+    with app.app_context():
+        incremental = rollup_rows(project_id)
+        # One row per batch, so every page boundary of both keyset scans is crossed
+        stats = AnalyticsService().backfill(batch_size=1)
+        assert stats['donations_scanned'] == 3
+        assert rollup_rows(project_id) == incremental
+
+        AnalyticsService().backfill(project_id=project_id)
+        assert rollup_rows(project_id) == incremental
+
+def test_backfill_leaves_newer_donations_to_the_listener(app, funded, monkeypatch):
+    from app import db
+    from app.models.donation import Donation
+    from app.models.enums import DonationStatus
+    from app.services import analytics_service
+    from app.services.analytics_service import AnalyticsService
+
+    project_id, _, backer = funded
+    upsert_increment = analytics_service.upsert_increment
+    completed = []
+
+    def complete_during_backfill(session, *args):
+        # A webhook completes a new donation and records it while the backfill runs
+        if not completed:
+            completed.append(Donation(user_id=backer.id, project_id=project_id, amount=Decimal(5),
+                                      status=DonationStatus.COMPLETED, completed_at=datetime(2026, 3, 2, 9, 30)))
+            session.add(completed[0])
+            session.flush()
+            AnalyticsService().record_donation_completed(session, completed[0])
+        upsert_increment(session, *args)
+
+    with app.app_context():
+        monkeypatch.setattr(analytics_service, 'upsert_increment', complete_during_backfill)
+        stats = AnalyticsService().backfill(batch_size=1)
+        assert stats['donations_scanned'] == 3
+
+        monkeypatch.setattr(analytics_service, 'upsert_increment', upsert_increment)
+        rows = rollup_rows(project_id)
+        assert ('DAY', datetime(2026, 3, 2), Decimal('25.00'), 2, 1, 0, Decimal('0.00')) in rows
+
+        AnalyticsService().backfill()
+        assert rollup_rows(project_id) == rows
+
+def test_failed_backfill_keeps_the_rollups(app, funded, monkeypatch):
+    from sqlalchemy.exc import OperationalError
+    from app.services.analytics_service import AnalyticsService
+
+    project_id, _, _ = funded
+
+    def lost_connection(*args):
+        raise OperationalError('SELECT', {}, Exception('connection lost'))
+
+    with app.app_context():
+        before = rollup_rows(project_id)
+        monkeypatch.setattr(AnalyticsService, '_backfill_new_backers', lost_connection)
+        with pytest.raises(OperationalError):
+            AnalyticsService().backfill(batch_size=1)
+        assert rollup_rows(project_id) == before
+
+def test_funding_series_endpoint(client, funded, auth_headers):
+    project_id, creator, backer = funded
+    url = f'/api/v1/analytics/projects/{project_id}/funding'
+    query = '?granularity=day&start=2026-03-01T00:00:00&end=2026-03-03T00:00:00'
+
+    response = client.get(url + query, headers=auth_headers(creator, 'view_project_analytics'))
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [point['amount'] for point in data['series']] == [25.0, 20.0, 0.0]
+    assert data['totals'] == {'amount': 45.0, 'donation_count': 3, 'new_backers': 2,
+                              'refund_count': 1, 'refund_amount': 20.0}
+
+    assert client.get(url + query, headers=auth_headers(backer, 'view_project_analytics')).status_code == 403
+    assert client.get(url + '?granularity=week',
+                      headers=auth_headers(creator, 'view_project_analytics')).status_code == 400
@@ -0,0 +1,98 @@
+import time
+from decimal import Decimal
+
+import pytest
+
+@pytest.fixture
+def project(app, make_project):
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        project = make_project(title='Lamp')
+        db.session.commit()
+        return project.id, db.session.get(User, project.creator_id)
+
+def back(app, project_id, user_id, amount):
+    from app import db
+    from app.models import Project
+    from app.models.donation import Donation
+    from app.models.enums import DonationStatus
+
+    with app.app_context():
+        project = db.session.get(Project, project_id)
+        project.current_amount += Decimal(amount)
+        db.session.add(Donation(user_id=user_id, project_id=project_id, amount=Decimal(amount),
+                                status=DonationStatus.COMPLETED))
+        db.session.commit()
+
+def test_discovery_revalidates_without_queries(app, client, project):
+    project_id, creator = project
+    response = client.get('/api/v1/projects/discovery')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'public, no-cache'
+    etag = response.headers['ETag']
+
+    response = client.get('/api/v1/projects/discovery', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.data == b''
+    assert client.queries == []
+
+    # A different projection is a different representation
+    assert client.get('/api/v1/projects/discovery?fields=card', headers={'If-None-Match': etag}).status_code == 200
+
+    back(app, project_id, creator.id, 10)
+    response = client.get('/api/v1/projects/discovery', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_project_detail_is_private(app, client, project, auth_headers):
+    project_id, creator = project
+    headers = auth_headers(creator, 'view_projects')
+    response = client.get(f'/api/v1/projects/{project_id}', headers=headers)
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    assert 'Authorization' in response.headers['Vary']
+    etag = response.headers['ETag']
+
+    response = client.get(f'/api/v1/projects/{project_id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert not any('projects' in statement for statement in client.queries)
+
+    # Still authenticated before answering
+    assert client.get(f'/api/v1/projects/{project_id}', headers={'If-None-Match': etag}).status_code == 401
+
+    back(app, project_id, creator.id, 10)
+    response = client.get(f'/api/v1/projects/{project_id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['data']['current_amount'] == '10.00'
+
+def test_errors_have_no_etag(client):
+    response = client.get('/api/v1/categories/999')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+def test_new_etag_never_pairs_with_a_local_entry(app, client, project, auth_headers, monkeypatch):
+    from app.services.project_service import get_project_data
+    from app.utils.project_projections import parse_fields
+    from app.utils.tiered_cache import get_cache
+
+    project_id, creator = project
+    headers = auth_headers(creator, 'view_projects')
+    etag = client.get(f'/api/v1/projects/{project_id}', headers=headers).headers['ETag']
+    with app.app_context():
+        cache = get_cache()
+        # The listener clears the local tier as it subscribes; once it has, entries stay there
+        deadline = time.monotonic() + 5
+        while not cache._local and time.monotonic() < deadline:
+            get_project_data(project_id, parse_fields(None))
+            time.sleep(0.05)
+        assert cache._local
+
+    # The invalidation reaches Redis but this process has not heard of it yet
+    monkeypatch.setattr(cache, '_local_invalidate', lambda tags: None)
+    back(app, project_id, creator.id, 10)
+
+    response = client.get(f'/api/v1/projects/{project_id}', headers=headers)
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['data']['current_amount'] == '10.00'
@@ -0,0 +1,46 @@
+import pytest
+
+from app.utils.metrics import DB_POOL_CHECKOUT_DURATION, DB_POOL_CONNECTIONS
+
+@pytest.fixture
+def app_config():
+    return {'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 3, 'max_overflow': 2, 'pool_timeout': 5}}
+
+@pytest.fixture
+def project(app, make_project):
+    from app import db
+
+    with app.app_context():
+        make_project()
+        db.session.commit()
+
+def test_engine_options_from_config(app):
+    from app import db
+
+    with app.app_context():
+        assert db.engine.pool.size() == 3
+        assert db.engine.pool.timeout() == 5
+
+def test_services_share_the_request_session(app, project):
+    from sqlalchemy import event
+    from app import db
+    from app.models import User
+    from app.services.backer_service import BackerService
+
+    in_use = DB_POOL_CONNECTIONS.labels('primary', 'checked_out')
+    waits_before = DB_POOL_CHECKOUT_DURATION.labels('primary')._sum.get()
+    with app.app_context():
+        checked_out = []
+        event.listen(db.engine, 'checkout', lambda *args: checked_out.append(db.engine.pool.checkedout()))
+        # The request session already holds a connection, e.g. from loading the current user
+        db.session.get(User, 1)
+        assert in_use._value.get() >= 1
+
+        result = BackerService().back_project(1, 1, {'amount': '25'})
+        assert 'error' not in result
+        assert BackerService().get_backer_stats(1)['total_donations'] == 1
+        assert max(checked_out) == 1
+
+        db.session.remove()
+        assert db.engine.pool.checkedout() == 0
+    assert DB_POOL_CHECKOUT_DURATION.labels('primary')._sum.get() > waits_before
@@ -0,0 +1,18 @@
+from app.utils import fork_safety
+from app.utils.tiered_cache import get_cache
+
+def test_reinit_after_fork_replaces_pools(app, monkeypatch):
+    from app import db
+
+    fresh_client = object()
+    monkeypatch.setattr(fork_safety, 'get_redis_client', lambda: fresh_client)
+    with app.app_context():
+        inherited_pool = db.engine.pool
+        get_cache()
+
+    fork_safety.reinit_after_fork(app)
+
+    with app.app_context():
+        assert db.engine.pool is not inherited_pool
+        assert 'tiered_cache' not in app.extensions
+    assert app.redis_client is fresh_client
@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from flask import request
+
+from app.utils.idempotency import REPLAYED_HEADER, idempotent
+
+@pytest.fixture
+def calls(app):
+    """A POST endpoint answering with the status code in its body, recording each run."""
+    calls = []
+
+    @app.route('/idempotent', methods=['POST'])
+    @idempotent()
+    def idempotent_view():
+        calls.append(request.get_json())
+        return {'call': len(calls)}, request.get_json().get('status', 201)
+    return calls
+
+def post(client, body, key='key-1'):
+    return client.post('/idempotent', json=body, headers={'Idempotency-Key': key})
+
+def test_retry_replays_the_stored_response(client, calls):
+    first = post(client, {'amount': 10})
+    retry = post(client, {'amount': 10})
+    assert retry.status_code == first.status_code == 201
+    assert retry.get_json() == first.get_json() == {'call': 1}
+    assert retry.headers[REPLAYED_HEADER] == 'true'
+    assert len(calls) == 1
+
+    assert post(client, {'amount': 10}, key='key-2').get_json() == {'call': 2}
+    assert client.post('/idempotent', json={'amount': 10}).get_json() == {'call': 3}
+
+def test_key_reused_with_another_body(client, calls):
+    post(client, {'amount': 10})
+    assert post(client, {'amount': 20}).status_code == 422
+    assert len(calls) == 1
+
+def test_server_errors_are_not_stored(client, calls):
+    assert post(client, {'status': 503}).status_code == 503
+    assert post(client, {'status': 503}).status_code == 503
+    assert len(calls) == 2
+
+def test_in_flight_request(app, client, calls, monkeypatch):
+    from app.utils.idempotency import _request_fingerprint
+
+    with app.test_request_context('/idempotent', method='POST', json={'amount': 10}):
+        fingerprint = _request_fingerprint()
+    redis_key = 'idempotency:idempotent_view:127.0.0.1:key-1'
+    app.redis_client.set(redis_key, json.dumps({'state': 'in_flight', 'fingerprint': fingerprint}))
+
+    response = post(client, {'amount': 10})
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+
+    # The record seemed to expire between SET NX and GET, but a concurrent retry took the key first
+    monkeypatch.setattr(app.redis_client, 'get', lambda key: None)
+    assert post(client, {'amount': 10}).status_code == 409
+    assert calls == []
+
+@pytest.fixture
+def reward(app, make_project):
+    from app import db
+    from app.models import User
+    from app.models.reward import Reward
+
+    with app.app_context():
+        project = make_project()
+        reward = Reward(project=project, title='Lamp', description='One lamp', minimum_amount=10,
+                        quantity_available=1, quantity_claimed=0)
+        backer = User(username='backer', email='backer@example.com', password_hash='x')
+        db.session.add_all([reward, backer])
+        db.session.commit()
+        return project.id, reward.id, db.session.get(User, backer.id)
+
+# The permission check and the claim each load the user
+@pytest.mark.allow_n_plus_one
+def test_claim_reward_is_replayed(app, client, reward, auth_headers):
+    from app import db
+    from app.models.reward import Reward
+
+    project_id, reward_id, backer = reward
+    url = f'/api/v1/rewards/projects/{project_id}/rewards/{reward_id}/claim'
+    headers = {**auth_headers(backer, 'claim_reward'), 'Idempotency-Key': 'claim-1'}
+
+    first = client.post(url, headers=headers)
+    assert first.status_code == 200
+    retry = client.post(url, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers[REPLAYED_HEADER] == 'true'
+    with app.app_context():
+        assert db.session.get(Reward, reward_id).quantity_claimed == 1
+
+@pytest.mark.allow_n_plus_one
+def test_permission_rejection_is_not_stored(client, reward, auth_headers):
+    project_id, reward_id, backer = reward
+    url = f'/api/v1/rewards/projects/{project_id}/rewards/{reward_id}/claim'
+
+    denied = client.post(url, headers={**auth_headers(backer), 'Idempotency-Key': 'claim-1'})
+    assert denied.status_code == 403
+
+    # Granted the permission, the retry with the same key runs the claim
+    response = client.post(url, headers={**auth_headers(backer, 'claim_reward'), 'Idempotency-Key': 'claim-1'})
+    assert response.status_code == 200
+    assert REPLAYED_HEADER not in response.headers
+
+def test_key_taken_over_by_a_retry_is_left_alone(app, client):
+    """A request that outlived its in-flight marker neither overwrites nor deletes the retry's record."""
+    retry_record = json.dumps({'state': 'in_flight', 'fingerprint': 'retry', 'token': 'retry'})
+    redis_key = 'idempotency:slow_view:127.0.0.1:key-1'
+
+    @app.route('/slow', methods=['POST'])
+    @idempotent()
+    def slow_view():
+        # The marker expires and a retry claims the key while this request still runs
+        app.redis_client.set(redis_key, retry_record)
+        return {}, request.get_json()['status']
+
+    for status in (201, 503):
+        client.post('/slow', json={'status': status}, headers={'Idempotency-Key': 'key-1'})
+        assert app.redis_client.get(redis_key) == retry_record
+
+# Without FRONTEND_URL the view fails building the redirect URLs, before Stripe is called
+@pytest.mark.allow_n_plus_one
+@pytest.mark.parametrize('frontend_url', ['http://localhost:3000', None])
+def test_failed_checkout_undoes_the_donation(app, client, reward, auth_headers, monkeypatch, frontend_url):
+    import stripe
+    from app import db
+    from app.models import Project
+    from app.models.donation import Donation
+    from app.models.reward import Reward
+    from app.models.enums import DonationStatus
+
+    def unavailable(**kwargs):
+        raise stripe.APIConnectionError('Stripe is unreachable')
+    monkeypatch.setattr(stripe.checkout.Session, 'create', unavailable)
+    app.config.update(STRIPE_SECRET_KEY='sk_test', FRONTEND_URL=frontend_url)
+
+    project_id, reward_id, backer = reward
+    headers = {**auth_headers(backer, 'back_project'), 'Idempotency-Key': 'back-1'}
+    body = {'amount': '50.00', 'reward_id': reward_id}
+
+    # The 500 is retryable with the same key, so it must leave nothing behind to duplicate
+    for _ in range(2):
+        response = client.post(f'/api/v1/backers/projects/{project_id}/back', json=body, headers=headers)
+        assert response.status_code == 500
+        assert REPLAYED_HEADER not in response.headers
+
+    with app.app_context():
+        donations = db.session.query(Donation).all()
+        assert [donation.status for donation in donations] == [DonationStatus.FAILED] * 2
+        project = db.session.get(Project, project_id)
+        assert project.current_amount == 0
+        assert project.backers_count == 0 and project.backers == []
+        assert db.session.get(Reward, reward_id).quantity_claimed == 0
@@ -0,0 +1,105 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+from app.utils.image_utils import IMAGE_VARIANTS, image_srcset, original_for_variant, variant_filenames
+
+def image_bytes(size, mode='RGB', image_format='PNG'):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 40, 40, 128) if mode == 'RGBA' else (200, 40, 40)).save(buffer, image_format)
+    return buffer.getvalue()
+
+@pytest.fixture
+def blobs(app):
+    from app.services.media_blob_service import MediaBlobService
+
+    with app.app_context():
+        yield MediaBlobService()
+
+def stored_path(url):
+    from app.utils.storage import get_storage
+
+    return get_storage().stage_path(url.split('/uploads/', 1)[1])
+
+def test_variants_are_rendered_for_new_images(blobs):
+    content = image_bytes((2000, 1000))
+    sha256 = hashlib.sha256(content).hexdigest()
+    original = stored_path(blobs.store_stream(io.BytesIO(content), 'png'))
+
+    directory = os.path.dirname(original)
+    for variant, width in IMAGE_VARIANTS:
+        for extension in ('webp', 'jpg'):
+            with Image.open(os.path.join(directory, f'{sha256}-{variant}.{extension}')) as image:
+                assert image.size == (width, width // 2)
+    assert sorted(os.listdir(directory)) == sorted(variant_filenames(sha256) + [f'{sha256}.png'])
+    assert original_for_variant(os.path.join(directory, f'{sha256}-card.webp')) == original
+
+def test_small_and_transparent_images(blobs):
+    content = image_bytes((100, 80), mode='RGBA')
+    sha256 = hashlib.sha256(content).hexdigest()
+    directory = os.path.dirname(stored_path(blobs.store_stream(io.BytesIO(content), 'png')))
+
+    # Never upscaled, and the JPEG variants are flattened onto white
+    with Image.open(os.path.join(directory, f'{sha256}-hero.jpg')) as image:
+        assert image.size == (100, 80)
+        assert image.mode == 'RGB'
+    with Image.open(os.path.join(directory, f'{sha256}-hero.webp')) as image:
+        assert image.mode == 'RGBA'
+
+def test_videos_get_no_variants(blobs):
+    content = os.urandom(1024)
+    sha256 = hashlib.sha256(content).hexdigest()
+    directory = os.path.dirname(stored_path(blobs.store_stream(io.BytesIO(content), 'mp4')))
+    assert os.listdir(directory) == [f'{sha256}.mp4']
+
+def test_srcset(blobs, make_project):
+    from app import db
+
+    url = blobs.store_stream(io.BytesIO(image_bytes((400, 300))), 'png')
+    project = make_project(image_url=url)
+    db.session.commit()
+
+    srcset = project.to_dict()['image_srcset']
+    sha256 = url.rsplit('/', 1)[1].split('.')[0]
+    prefix = url.rsplit('/', 1)[0]
+    assert srcset['webp'] == (f'{prefix}/{sha256}-thumbnail.webp 320w, {prefix}/{sha256}-card.webp 640w, '
+                              f'{prefix}/{sha256}-hero.webp 1600w')
+    assert srcset['jpeg'].startswith(f'{prefix}/{sha256}-thumbnail.jpg 320w')
+    assert image_srcset('/static/uploads/profiles/avatar.png') is None
+    assert image_srcset(None) is None
+
+def test_backfill_renders_missing_variants(blobs):
+    content = image_bytes((800, 600), image_format='JPEG')
+    sha256 = hashlib.sha256(content).hexdigest()
+    directory = os.path.dirname(stored_path(blobs.store_stream(io.BytesIO(content), 'jpg')))
+    os.remove(os.path.join(directory, f'{sha256}-card.webp'))
+
+    assert blobs.generate_missing_variants() == {'examined': 1, 'generated': 1}
+    assert os.path.exists(os.path.join(directory, f'{sha256}-card.webp'))
+    assert blobs.generate_missing_variants() == {'examined': 1, 'generated': 0}
+
+def test_variants_are_rendered_in_the_process_pool(app, tmp_path):
+    from app.services.image_derivative_service import ImageDerivativeService, shutdown_executor
+
+    source = tmp_path / 'original.png'
+    source.write_bytes(image_bytes((700, 700)))
+    app.config['IMAGE_DERIVATIVE_WORKERS'] = 1
+    done = []
+    try:
+        with app.app_context():
+            future = ImageDerivativeService().schedule(str(source), 'a' * 64, 'png', on_done=done.append)
+        paths = future.result(timeout=60)
+    finally:
+        shutdown_executor()
+    assert len(paths) == len(IMAGE_VARIANTS) * 2
+    assert done == [paths]
+    with Image.open(tmp_path / f"{'a' * 64}-card.jpg") as image:
+        assert image.size == (640, 640)
+
+    # Unreadable files are logged and reported as an empty result
+    source.write_bytes(b'not an image')
+    with app.app_context():
+        assert ImageDerivativeService().generate(str(source), 'b' * 64) == []
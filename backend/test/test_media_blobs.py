@@ -0,0 +1,110 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+def image_bytes(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def blob(sha256):
+    from app import db
+    from app.models.media import MediaBlob
+
+    db.session.expire_all()
+    return db.session.get(MediaBlob, sha256)
+
+def stored_files(app):
+    with app.app_context():
+        root = app.config['UPLOADED_PHOTOS_DEST']
+    return sorted(name for _, _, names in os.walk(root) for name in names)
+
+@pytest.fixture
+def blobs(app):
+    from app.services.media_blob_service import MediaBlobService
+
+    with app.app_context():
+        yield MediaBlobService()
+
+def test_identical_uploads_share_one_file(app, blobs):
+    from app import db
+
+    content = image_bytes('red')
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    first = blobs.store_stream(io.BytesIO(content), 'png')
+    db.session.commit()
+    assert blobs.store_stream(io.BytesIO(content), 'png') == first
+    # The same bytes under another extension reuse the stored file and its extension
+    assert blobs.store_stream(io.BytesIO(content), 'jpg') == first
+    db.session.commit()
+
+    assert first.endswith(f'{sha256}.png')
+    assert blob(sha256).extension == 'png'
+    originals = [name for name in stored_files(app) if name.startswith(sha256 + '.')]
+    assert originals == [f'{sha256}.png']
+
+def test_rolled_back_upload_is_left_to_the_collector(app, blobs):
+    from app import db
+
+    content = image_bytes('green')
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    # The blob row is committed before the file is published, the caller only adds references
+    blobs.store_stream(io.BytesIO(content), 'png')
+    db.session.rollback()
+    assert blob(sha256).ref_count == 0
+    assert f'{sha256}.png' in stored_files(app)
+
+    stats = blobs.collect_garbage(grace_seconds=-1)
+    assert stats['blobs_deleted'] == 1
+    assert not any(name.startswith(sha256) for name in stored_files(app))
+
+def test_references_are_counted_and_unreferenced_blobs_collected(app, blobs, make_project):
+    from app import db
+
+    kept, replaced = image_bytes('blue'), image_bytes('yellow')
+    kept_hash, replaced_hash = (hashlib.sha256(content).hexdigest() for content in (kept, replaced))
+    kept_url = blobs.store_stream(io.BytesIO(kept), 'png')
+    replaced_url = blobs.store_stream(io.BytesIO(replaced), 'png')
+    project = make_project(image_url=replaced_url)
+    make_project(title='Second', image_url=replaced_url)
+    db.session.commit()
+    assert blob(replaced_hash).ref_count == 2
+    assert blob(kept_hash).ref_count == 0
+
+    project.image_url = kept_url
+    db.session.commit()
+    assert blob(replaced_hash).ref_count == 1
+    assert blob(kept_hash).ref_count == 1
+
+    # Within the grace period nothing is collected
+    assert blobs.collect_garbage(grace_seconds=3600)['blobs_deleted'] == 0
+
+    db.session.delete(project)
+    db.session.commit()
+    assert blob(kept_hash).ref_count == 0
+    stats = blobs.collect_garbage(grace_seconds=-1)
+    assert stats['blobs_deleted'] == 1
+    assert blob(kept_hash) is None and blob(replaced_hash) is not None
+    assert not any(name.startswith(kept_hash) for name in stored_files(app))
+    assert any(name.startswith(replaced_hash) for name in stored_files(app))
+
+def test_drifted_counts_never_remove_referenced_files(blobs, make_project):
+    from sqlalchemy import update
+    from app import db
+    from app.models.media import MediaBlob
+
+    content = image_bytes('purple')
+    sha256 = hashlib.sha256(content).hexdigest()
+    make_project(image_url=blobs.store_stream(io.BytesIO(content), 'png'))
+    db.session.commit()
+    db.session.execute(update(MediaBlob).values(ref_count=0))
+    db.session.commit()
+
+    stats = blobs.collect_garbage(grace_seconds=-1)
+    assert stats == {**stats, 'blobs_deleted': 0, 'skipped': 1}
+    assert blob(sha256) is not None
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+
+VIDEO = os.urandom(4096)
+VIDEO_HASH = hashlib.sha256(VIDEO).hexdigest()
+
+def image_bytes():
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 300), (20, 90, 160)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+@pytest.fixture
+def stored(app):
+    """URLs of a stored video and image (with its variants)."""
+    from app import db
+    from app.services.media_blob_service import MediaBlobService
+
+    with app.app_context():
+        blobs = MediaBlobService()
+        urls = blobs.store_stream(io.BytesIO(VIDEO), 'mp4'), blobs.store_stream(io.BytesIO(image_bytes()), 'png')
+        db.session.commit()
+    return urls
+
+def get(client, url, **headers):
+    return client.get(f'/api/v1/projects{url}/', headers=headers)
+
+def variant_of(url, name='card', extension='webp'):
+    return url.rsplit('.', 1)[0] + f'-{name}.{extension}'
+
+def remove(app, url):
+    from app.utils.storage import get_storage
+
+    with app.app_context():
+        os.remove(get_storage().stage_path(url.split('/uploads/', 1)[1]))
+
+def test_content_addressed_files_are_immutable(client, stored):
+    video_url, _ = stored
+    response = get(client, video_url)
+    assert response.status_code == 200
+    assert response.data == VIDEO
+    assert response.headers['ETag'] == f'"{VIDEO_HASH}.mp4"'
+    assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 3600
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+    revalidated = get(client, video_url, **{'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+def test_byte_ranges(client, stored):
+    video_url, _ = stored
+    response = get(client, video_url, Range='bytes=100-199')
+    assert response.status_code == 206
+    assert response.data == VIDEO[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(VIDEO)}'
+
+    assert get(client, video_url, Range='bytes=-10').data == VIDEO[-10:]
+    assert get(client, video_url, Range=f'bytes={len(VIDEO)}-').status_code == 416
+
+    # A range for another version of the file is answered with the whole file
+    stale = get(client, video_url, Range='bytes=0-9', **{'If-Range': '"something-else"'})
+    assert stale.status_code == 200 and stale.data == VIDEO
+
+def test_missing_variant_falls_back_to_the_original(app, client, stored):
+    _, image_url = stored
+    variant = get(client, variant_of(image_url))
+    assert variant.status_code == 200
+    assert variant.cache_control.immutable
+
+    remove(app, variant_of(image_url))
+    fallback = get(client, variant_of(image_url))
+    assert fallback.status_code == 200
+    assert fallback.data == get(client, image_url).data
+    assert not fallback.cache_control.immutable
+    assert fallback.cache_control.max_age == 300
+
+    remove(app, image_url)
+    assert get(client, variant_of(image_url)).status_code == 404
+    assert get(client, '/uploads/photos/missing.png').status_code == 404
+
+def test_x_accel_redirect(app, client, stored):
+    video_url, image_url = stored
+    app.config['MEDIA_OFFLOAD'] = 'x-accel-redirect'
+
+    response = get(client, video_url)
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers['X-Accel-Redirect'] == '/protected-uploads' + video_url.split('/uploads', 1)[1]
+    assert response.headers['Content-Type'] == 'video/mp4'
+    assert response.cache_control.immutable
+
+    # The redirect is only issued for files that exist, a missing variant still falls back
+    remove(app, variant_of(image_url))
+    fallback = get(client, variant_of(image_url))
+    assert fallback.headers['X-Accel-Redirect'] == '/protected-uploads' + image_url.split('/uploads', 1)[1]
+    assert not fallback.cache_control.immutable
+
+    remove(app, video_url)
+    missing = get(client, video_url)
+    assert missing.status_code == 404
+    assert 'X-Accel-Redirect' not in missing.headers
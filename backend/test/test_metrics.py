@@ -0,0 +1,59 @@
+import pytest
+
+from app.utils.metrics import DB_POOL_CONNECTIONS, EXTERNAL_CALL_DURATION, REQUEST_DB_QUERIES, track_external_call
+
+def sample(text, name, **labels):
+    """Value of one sample in the Prometheus text output."""
+    wanted = [f'{key}="{value}"' for key, value in labels.items()]
+    for line in text.splitlines():
+        if line.startswith(f'{name}{{') and all(part in line for part in wanted):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+def test_requests_and_queries_are_recorded(app, client, make_project):
+    from app import db
+
+    with app.app_context():
+        make_project()
+        db.session.commit()
+    endpoint = 'projects.get_discovery_projects'
+    queries = REQUEST_DB_QUERIES.labels(endpoint)
+    before = queries._sum.get()
+
+    assert client.get('/api/v1/projects/discovery').status_code == 200
+    assert queries._sum.get() > before
+
+    text = client.get('/metrics').get_data(as_text=True)
+    assert sample(text, 'http_requests_total', endpoint=endpoint, method='GET', status='200') >= 1
+    assert sample(text, 'http_request_duration_seconds_count', endpoint=endpoint) >= 1
+    assert sample(text, 'db_statement_duration_seconds_count', operation='SELECT') >= 1
+
+def test_external_calls_are_timed_with_their_outcome():
+    failures = EXTERNAL_CALL_DURATION.labels('sendgrid', 'POST /v3/mail/send', 'error')
+    before = failures._sum.get()
+    with pytest.raises(ConnectionError):
+        with track_external_call('sendgrid', 'POST /v3/mail/send'):
+            raise ConnectionError()
+    assert failures._sum.get() > before
+
+@pytest.mark.parametrize('app_config', [{
+    'METRICS_BEARER_TOKEN': 'scrape-token',
+    'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 3, 'max_overflow': 2},
+}])
+def test_token_and_pool_capacity(app, client):
+    from app import db
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+    with app.app_context():
+        db.session.execute(db.text('SELECT 1'))
+        db.session.remove()
+    assert DB_POOL_CONNECTIONS.labels('primary', 'capacity')._value.get() == 5
+    response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert sample(response.get_data(as_text=True), 'db_pool_connections', pool='primary', state='capacity') == 5
+
+@pytest.mark.parametrize('app_config', [{'TESTING': False}])
+def test_endpoint_is_disabled_without_a_token_in_production(client):
+    assert client.get('/metrics').status_code == 404
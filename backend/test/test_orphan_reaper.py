@@ -0,0 +1,108 @@
+import io
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+DAY = 86400
+
+@pytest.fixture
+def roots(app, tmp_path, monkeypatch):
+    """Upload roots with the legacy profile folder moved out of the source tree."""
+    from app.services.orphan_reaper_service import OrphanReaperService
+
+    upload_roots = OrphanReaperService.upload_roots
+    profiles = tmp_path / 'profiles'
+    monkeypatch.setattr(OrphanReaperService, 'upload_roots',
+                        staticmethod(lambda: {**upload_roots(), 'profiles': str(profiles)}))
+    with app.app_context():
+        return {**upload_roots(), 'profiles': str(profiles)}
+
+def write(roots, subfolder, relative_path, age=10 * DAY):
+    path = os.path.join(roots[subfolder], relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(b'x' * 100)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+@pytest.fixture
+def files(app, roots, make_project):
+    """One file of every kind the reaper has to tell apart, by name."""
+    from app import db
+    from app.models import User
+    from app.models.enums import UploadStatus
+    from app.models.upload_session import UploadSession
+    from app.services.media_blob_service import MediaBlobService
+
+    with app.app_context():
+        blob_url = MediaBlobService().store_stream(io.BytesIO(b'blob content'), 'mp4')
+        blob_path = os.path.join(roots['videos'], blob_url.split('/uploads/videos/', 1)[1])
+        os.utime(blob_path, (time.time() - 10 * DAY,) * 2)
+        project = make_project(image_url='/uploads/photos/legacy.png')
+        db.session.add(User(username='avatar', email='avatar@example.com', password_hash='x',
+                            profile_image='kept-avatar.png'))
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        db.session.add_all([
+            UploadSession(id='a' * 32, user_id=project.creator_id, filename='clip.mp4', extension='mp4',
+                          subfolder='videos', total_size=100, received_size=10, expires_at=expires_at,
+                          status=UploadStatus.IN_PROGRESS),
+            UploadSession(id='b' * 32, user_id=project.creator_id, filename='done.png', extension='png',
+                          subfolder='photos', total_size=100, received_size=100, expires_at=expires_at,
+                          status=UploadStatus.COMPLETED, url='/uploads/photos/picked-up-later.png'),
+        ])
+        db.session.commit()
+
+    untracked_blob = 'c' * 64
+    return {
+        'referenced': write(roots, 'photos', 'legacy.png'),
+        'avatar': write(roots, 'profiles', 'kept-avatar.png'),
+        'completed_upload': write(roots, 'photos', 'picked-up-later.png'),
+        'active_part': write(roots, 'videos', 'a' * 32 + '.part'),
+        'blob': blob_path,
+        'orphan': write(roots, 'photos', 'replaced.png'),
+        'orphan_avatar': write(roots, 'profiles', 'old-avatar.png'),
+        'abandoned_part': write(roots, 'videos', 'd' * 32 + '.part'),
+        'untracked_blob': write(roots, 'photos', f'cc/cc/{untracked_blob}-card.webp'),
+        'recent': write(roots, 'photos', 'just-uploaded.png', age=60),
+    }
+
+ORPHANS = ('orphan', 'orphan_avatar', 'abandoned_part', 'untracked_blob')
+
+def test_reaps_unreferenced_files_past_the_grace_period(app, files):
+    from app.services.orphan_reaper_service import OrphanReaperService
+
+    with app.app_context():
+        dry_run = OrphanReaperService().reap(grace_seconds=DAY, dry_run=True)
+        assert all(os.path.exists(path) for path in files.values())
+        stats = OrphanReaperService(batch_size=1).reap(grace_seconds=DAY)
+
+    assert stats == dry_run
+    assert stats['files_reaped'] == len(ORPHANS)
+    assert stats['bytes_reclaimed'] == 100 * len(ORPHANS)
+    assert stats['recent'] == 1
+    for name, path in files.items():
+        assert os.path.exists(path) == (name not in ORPHANS), name
+
+def test_quarantine(app, files, tmp_path):
+    from app.services.orphan_reaper_service import OrphanReaperService
+
+    app.config['ORPHAN_UPLOAD_QUARANTINE_DIR'] = None
+    with app.app_context():
+        with pytest.raises(ValueError):
+            OrphanReaperService().reap(grace_seconds=DAY, quarantine=True)
+
+        app.config['ORPHAN_UPLOAD_QUARANTINE_DIR'] = str(tmp_path / 'quarantine')
+        OrphanReaperService().reap(grace_seconds=DAY, quarantine=True)
+
+    assert not os.path.exists(files['orphan'])
+    assert (tmp_path / 'quarantine' / 'photos' / 'replaced.png').exists()
+    assert (tmp_path / 'quarantine' / 'profiles' / 'old-avatar.png').exists()
+
+def test_cli(app, files):
+    result = app.test_cli_runner().invoke(args=['reap-orphaned-uploads', '--grace-seconds', str(DAY), '--dry-run'])
+    assert result.exit_code == 0
+    assert f'Would reap {len(ORPHANS)} of {len(files)} files' in result.output
+    assert os.path.exists(files['orphan'])
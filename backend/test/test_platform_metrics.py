@@ -0,0 +1,107 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+def metrics():
+    from app.models.platform_metric import PlatformMetric
+
+    return {(row.metric, row.dimension, row.period): (row.count, row.amount)
+            for row in PlatformMetric.query.all() if row.count or row.amount}
+
+@pytest.fixture
+def activity(app, make_project):
+    """A funded project with a completed and a refunded donation and a completed payout."""
+    from app import db
+    from app.models.donation import Donation
+    from app.models.enums import DonationStatus, ProjectStatus
+    from app.models.payout import Payout, PayoutStatus
+
+    with app.app_context():
+        project = make_project()
+        make_project(title='Draft', status=ProjectStatus.DRAFT)
+        db.session.add_all([
+            Donation(user_id=project.creator_id, project_id=project.id, amount=Decimal(40),
+                     status=DonationStatus.COMPLETED, completed_at=datetime(2026, 3, 1, 9)),
+            Donation(user_id=project.creator_id, project_id=project.id, amount=Decimal(10),
+                     status=DonationStatus.REFUNDED, completed_at=datetime(2026, 3, 1, 10),
+                     refunded_at=datetime(2026, 3, 2, 10), refund_amount=10.0),
+            Donation(user_id=project.creator_id, project_id=project.id, amount=Decimal(99),
+                     status=DonationStatus.PENDING),
+            Payout(project_id=project.id, user_id=project.creator_id, amount=Decimal(30),
+                   fee_amount=Decimal('1.50'), status=PayoutStatus.COMPLETED),
+        ])
+        db.session.commit()
+        return project.id, project.category_id
+
+def test_inserts_are_counted(app, activity):
+    _, category_id = activity
+    with app.app_context():
+        counted = metrics()
+    assert counted[('gmv', '', 'all')] == (2, Decimal('50.00'))
+    assert counted[('gmv', '', '2026-03-01')] == (2, Decimal('50.00'))
+    assert counted[('refunds', '', '2026-03-02')] == (1, Decimal('10.00'))
+    assert counted[('projects_by_status', 'ACTIVE', 'all')][0] == 1
+    assert counted[('projects_by_status', 'DRAFT', 'all')][0] == 1
+    assert counted[('projects_by_category', str(category_id), 'all')][0] == 2
+    assert counted[('payout_fees', '', 'all')] == (1, Decimal('1.50'))
+    assert counted[('signups', '', 'all')][0] == 1
+    assert counted[('signups', '', date.today().isoformat())][0] == 1
+
+def test_updates_move_contributions(app, activity):
+    from app import db
+    from app.models import Project
+    from app.models.donation import Donation
+    from app.models.enums import DonationStatus, ProjectStatus
+
+    project_id, _ = activity
+    with app.app_context():
+        # Attributes are expired after the commit; the listener still needs the old values
+        project = db.session.get(Project, project_id)
+        project.status = ProjectStatus.FUNDED
+        pending = Donation.query.filter_by(status=DonationStatus.PENDING).one()
+        pending.status = DonationStatus.COMPLETED
+        pending.completed_at = datetime(2026, 3, 1, 12)
+        db.session.commit()
+
+        counted = metrics()
+        assert ('projects_by_status', 'ACTIVE', 'all') not in counted
+        assert counted[('projects_by_status', 'FUNDED', 'all')][0] == 1
+        assert counted[('gmv', '', 'all')] == (3, Decimal('149.00'))
+
+        project.is_deleted = True
+        db.session.delete(pending)
+        db.session.commit()
+
+        counted = metrics()
+        assert ('projects_by_status', 'FUNDED', 'all') not in counted
+        assert counted[('gmv', '', 'all')] == (2, Decimal('50.00'))
+
+def test_rebuild_matches_incremental(app, activity):
+    from app.services.platform_metrics_service import PlatformMetricsService
+
+    with app.app_context():
+        incremental = metrics()
+        PlatformMetricsService().rebuild()
+        assert metrics() == incremental
+
+def test_dashboard(app, client, activity, auth_headers):
+    from app.models import User
+
+    with app.app_context():
+        admin = User.query.first()
+    headers = auth_headers(admin, 'view_platform_metrics')
+
+    response = client.get('/api/v1/admin/metrics?days=7', headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['gmv']['total'] == {'count': 2, 'amount': 50.0}
+    assert data['fees']['accrued']['total'] == 2.5
+    assert data['fees']['collected_on_payouts'] == 1.5
+    assert data['payouts_by_status'] == {'COMPLETED': {'count': 1, 'amount': 30.0}}
+    assert data['projects_by_status'] == {'ACTIVE': 1, 'DRAFT': 1}
+    assert data['users']['total'] == 1
+    assert len(data['users']['signups_per_day']) == 7
+
+    assert client.get('/api/v1/admin/metrics?days=0', headers=headers).status_code == 400
+    assert client.get('/api/v1/admin/metrics', headers=auth_headers(admin)).status_code == 403
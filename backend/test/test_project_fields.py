@@ -0,0 +1,59 @@
+import pytest
+
+from app.utils.project_projections import PROJECTIONS, compile_serializer, parse_fields
+
+@pytest.fixture
+def projects(app, make_project):
+    """Active projects with long descriptions, saved by their creator."""
+    from app import db
+    from app.models import User
+    from app.models.saved_project import SavedProject
+
+    with app.app_context():
+        for index in range(3):
+            project = make_project(title=f'Solar lamp {index}', description='x' * 5000,
+                                   risk_and_challenges='y' * 5000, goal_amount=1000, current_amount=250,
+                                   featured=index == 0)
+            db.session.add(SavedProject(user_id=project.creator_id, project_id=project.id))
+        db.session.commit()
+        return db.session.get(User, project.creator_id)
+
+def test_parse_fields():
+    assert parse_fields(None) == PROJECTIONS['detail']
+    assert parse_fields('title,current_amount') == ('id', 'title', 'current_amount')
+    assert parse_fields('card,description') == PROJECTIONS['card'] + ('description',)
+
+def test_compiled_serializer_matches_to_dict(app, projects):
+    from app.models import Project
+
+    with app.app_context():
+        project = Project.query.first()
+        assert compile_serializer(PROJECTIONS['detail'])(project) == project.to_dict()
+
+def test_card_projection_skips_large_columns(client, projects):
+    response = client.get('/api/v1/projects/discovery?fields=card&count=4')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert set(data['featured']) == set(PROJECTIONS['card'])
+    assert all(set(project) == set(PROJECTIONS['card']) for project in data['trending'])
+    assert not any('description' in statement or 'risk_and_challenges' in statement
+                   for statement in client.queries)
+
+def test_default_shape_is_unchanged(client, projects):
+    response = client.get('/api/v1/projects/discovery')
+    assert set(response.get_json()['data']['featured']) == set(PROJECTIONS['detail'])
+
+def test_explicit_fields(client, projects, auth_headers):
+    response = client.get('/api/v1/projects/saved?fields=title,current_amount', headers=auth_headers(projects))
+    assert response.status_code == 200
+    saved = response.get_json()['data']['projects']
+    assert len(saved) == 3
+    assert set(saved[0]) == {'id', 'title', 'current_amount', 'saved_at', 'category_name'}
+
+    response = client.get('/api/v1/projects/search?q=lamp&fields=card')
+    assert set(response.get_json()['data']['projects'][0]) == set(PROJECTIONS['card']) | {'category_name'}
+
+def test_unknown_field_is_rejected(client, projects):
+    response = client.get('/api/v1/projects/discovery?fields=title,password_hash')
+    assert response.status_code == 400
+    assert 'password_hash' in response.get_json()['message']
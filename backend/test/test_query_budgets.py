@@ -0,0 +1,100 @@
+from decimal import Decimal
+
+import pytest
+
+from query_budget import QueryBudgetExceeded, statement_shape
+
+PROJECTS = 6
+
+@pytest.fixture
+def catalog(app, make_project):
+    """A creator with projects in distinct categories, backed, donated to and saved by a backer."""
+    from app import db
+    from app.models import User, Category
+    from app.models.donation import Donation
+    from app.models.saved_project import SavedProject
+    from app.models.enums import DonationStatus
+
+    with app.app_context():
+        creator = User(username='creator', email='creator@example.com', password_hash='x')
+        backer = User(username='backer', email='backer@example.com', password_hash='x')
+        db.session.add_all([creator, backer])
+        db.session.flush()
+
+        projects = []
+        for index in range(PROJECTS):
+            project = make_project(creator=creator, category=Category(name=f'Category {index}'),
+                                   title=f'Solar lamp {index}', description='Lamps for schools', goal_amount=1000)
+            project.backers.append(backer)
+            projects.append(project)
+        db.session.flush()
+
+        other_backers = [User(username=f'user{index}', email=f'user{index}@example.com', password_hash='x')
+                         for index in range(PROJECTS)]
+        db.session.add_all(other_backers)
+        projects[0].backers.extend(other_backers)
+        db.session.flush()
+
+        for user in [backer] + other_backers:
+            for amount in (10, 15):
+                db.session.add(Donation(user_id=user.id, project_id=projects[0].id, amount=Decimal(amount),
+                                        status=DonationStatus.COMPLETED))
+        for project in projects:
+            db.session.add(SavedProject(user_id=backer.id, project_id=project.id))
+        db.session.commit()
+
+        return {
+            'creator': db.session.get(User, creator.id),
+            'backer': db.session.get(User, backer.id),
+            'project_ids': [project.id for project in projects],
+        }
+
+def test_statement_shape_collapses_literals_and_in_lists():
+    first = statement_shape("SELECT * FROM users WHERE id IN (?, ?, ?) AND name = 'a'  LIMIT 10")
+    second = statement_shape("SELECT * FROM users\nWHERE id IN (?) AND name = 'bb' LIMIT 20")
+    assert first == second
+    assert statement_shape('SELECT users_1.id FROM users AS users_1') == 'SELECT users_1.id FROM users AS users_1'
+
+def test_repeated_statements_fail_the_request(app, catalog):
+    from app import db
+    from app.models import Project
+
+    @app.route('/n-plus-one')
+    def n_plus_one():
+        return {'categories': [project.category.name for project in Project.query.all()]}
+
+    with pytest.raises(QueryBudgetExceeded, match='N\\+1'):
+        app.test_client().get('/n-plus-one')
+
+@pytest.mark.query_budget(1)
+def test_marker_budget_is_enforced(app, client, catalog):
+    with pytest.raises(QueryBudgetExceeded, match='budget is 1'):
+        client.get('/api/v1/projects/search?q=lamp')
+
+def test_search_projects(client, catalog):
+    response = client.get('/api/v1/projects/search?q=lamp')
+    assert response.status_code == 200
+    assert len(response.get_json()['data']['projects']) == PROJECTS
+
+def test_saved_projects(client, catalog, auth_headers):
+    response = client.get('/api/v1/projects/saved', headers=auth_headers(catalog['backer']))
+    assert response.status_code == 200
+    projects = response.get_json()['data']['projects']
+    assert len(projects) == PROJECTS
+    assert {project['category_name'] for project in projects} == {f'Category {i}' for i in range(PROJECTS)}
+
+def test_project_backers(client, catalog, auth_headers):
+    project_id = catalog['project_ids'][0]
+    response = client.get(f'/api/v1/backers/projects/{project_id}/backers',
+                          headers=auth_headers(catalog['creator'], 'view_backers'))
+    assert response.status_code == 200
+    backers = response.get_json()['data']
+    assert len(backers) == PROJECTS + 1
+    assert all(backer['total_amount'] == 25.0 for backer in backers)
+
+def test_profile(client, catalog, auth_headers):
+    response = client.get('/api/v1/profile/', headers=auth_headers(catalog['backer']))
+    assert response.status_code == 200
+    user = response.get_json()['data']['user']
+    assert user['backed_projects_count'] == PROJECTS
+    assert float(user['total_donations']) == 25.0
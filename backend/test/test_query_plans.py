@@ -0,0 +1,143 @@
+"""
+Every hot query shape uses its composite index (app.utils.query_plans).
+
+The shapes are checked as listed in HOT_QUERIES and as the services and views
+that run them actually send them. Runs on SQLite by default; point
+TEST_DATABASE_URL at a MySQL database to check the plans MySQL picks, which is
+the one that matters in production.
+"""
+import random
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.utils.query_plans import HOT_QUERIES, captured_statements, explain
+
+USERS = 50
+PROJECTS = 500
+ROWS = 5000
+IDS = {'user_id': 3, 'project_id': 42}
+
+def seed(connection, tables):
+    """Enough rows, spread over users and projects, that MySQL prefers the indexes to scanning."""
+    from app.models.enums import DonationStatus, NotificationType, ProjectStatus
+    from app.models.payout import PayoutStatus
+
+    rng = random.Random(7)
+    epoch = datetime(2026, 1, 1)
+
+    def at(i):
+        return epoch + timedelta(minutes=i)
+
+    connection.execute(tables['categories'].insert(), [{'id': 1, 'name': 'Energy'}])
+    connection.execute(tables['users'].insert(), [
+        {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+        for i in range(1, USERS + 1)])
+    connection.execute(tables['projects'].insert(), [{
+        'id': i, 'title': f'Project {i}', 'description': '-', 'goal_amount': 1000, 'current_amount': 0,
+        'start_date': epoch, 'end_date': epoch + timedelta(days=60), 'created_at': at(i),
+        'creator_id': rng.randint(1, USERS), 'category_id': 1, 'currency': 'USD',
+        'status': rng.choice(list(ProjectStatus)).name, 'is_deleted': rng.random() < 0.05,
+    } for i in range(1, PROJECTS + 1)])
+    donations = [{
+        'id': i, 'amount': 10, 'currency': 'USD', 'created_at': at(i), 'user_id': rng.randint(1, USERS),
+        'project_id': rng.randint(1, PROJECTS), 'status': rng.choice(list(DonationStatus)).name,
+    } for i in range(1, ROWS + 1)]
+    # The backer the service calls look at
+    donations[0].update(IDS)
+    connection.execute(tables['donations'].insert(), donations)
+    connection.execute(tables['project_backers'].insert(), [
+        {'user_id': user_id, 'project_id': project_id}
+        for user_id, project_id in sorted({(row['user_id'], row['project_id']) for row in donations})])
+    connection.execute(tables['notifications'].insert(), [{
+        'id': i, 'user_id': rng.randint(1, USERS), 'type': rng.choice(list(NotificationType)).name,
+        'message': '-', 'read_at': at(i + 60) if rng.random() < 0.6 else None, 'created_at': at(i),
+    } for i in range(1, ROWS + 1)])
+    connection.execute(tables['payouts'].insert(), [{
+        'id': i, 'project_id': rng.randint(1, PROJECTS), 'user_id': rng.randint(1, USERS), 'amount': 100,
+        'fee_amount': 5, 'currency': 'USD', 'status': rng.choice(list(PayoutStatus)).name, 'created_at': at(i),
+    } for i in range(1, ROWS + 1)])
+    connection.execute(tables['saved_projects'].insert(), [
+        {'id': i, 'user_id': user_id, 'project_id': project_id, 'created_at': at(i)}
+        for i, (user_id, project_id) in enumerate(
+            sorted({(rng.randint(1, USERS), rng.randint(1, PROJECTS)) for _ in range(ROWS)}), start=1)])
+
+@pytest.fixture
+def connection(app):
+    from app import db
+
+    with app.app_context():
+        with db.engine.begin() as connection:
+            seed(connection, db.metadata.tables)
+            if connection.dialect.name == 'mysql':
+                connection.exec_driver_sql('ANALYZE TABLE projects, donations, notifications, payouts, saved_projects')
+            else:
+                connection.execute(text('ANALYZE'))
+        with db.engine.connect() as connection:
+            yield connection
+
+@pytest.mark.parametrize('query', HOT_QUERIES, ids=[query.name for query in HOT_QUERIES])
+def test_hot_query_uses_its_index(connection, query):
+    plan = explain(connection, query.build(IDS))
+
+    step = plan.step(query.table)
+    assert step is not None, plan
+    assert step.index == query.index, plan
+    assert not step.full_scan, plan
+    if query.ordered:
+        assert not plan.sorts, plan
+
+def _get(path):
+    return lambda client, headers: client.get(path, headers=headers)
+
+def _call(run):
+    return lambda client, headers: run()
+
+def _service_sources():
+    from app.services import project_service
+    from app.services.backer_service import BackerService
+    from app.services.notification_service import NotificationService
+    from app.services.payout_service import PayoutService
+
+    user_id, project_id = IDS['user_id'], IDS['project_id']
+    return {
+        'active_projects_newest': _get('/api/v1/projects/search'),
+        'creator_drafts': _call(lambda: project_service.get_user_drafts(user_id)),
+        'projects_not_deleted_newest': _call(lambda: project_service.get_all_projects()),
+        'backer_donations': _call(lambda: BackerService().get_backer_details(project_id, user_id)),
+        'project_backer_totals': _call(lambda: BackerService().get_project_backers(project_id, 1, 10)),
+        'project_completed_total': _call(lambda: PayoutService().calculate_available_funds(project_id)),
+        'notifications_newest': _call(lambda: NotificationService.get_user_notifications(user_id)),
+        'unread_notifications_newest': _call(
+            lambda: NotificationService.get_user_notifications(user_id, unread_only=True)),
+        'payout_history': _call(lambda: PayoutService().get_payout_history(user_id)),
+        'saved_projects_newest': _get('/api/v1/projects/saved'),
+    }
+
+def uses_index(plan, query):
+    step = plan.step(query.table)
+    return (step is not None and step.index == query.index and not step.full_scan
+            and not (query.ordered and plan.sorts))
+
+@pytest.mark.allow_n_plus_one
+@pytest.mark.parametrize('query', HOT_QUERIES, ids=[query.name for query in HOT_QUERIES])
+def test_service_runs_the_hot_query_with_its_index(app, connection, client, auth_headers, query):
+    """The SQL the code sends, not the copy in HOT_QUERIES, must use the index."""
+    from app import db
+
+    source = _service_sources().get(query.name)
+    assert source is not None, f"No service call runs {query.name}"
+    headers = auth_headers(SimpleNamespace(id=IDS['user_id']))
+    with captured_statements(db.engine) as statements:
+        source(client, headers)
+
+    table = re.compile(rf'\b(?:FROM|JOIN) {query.table}\b')
+    # Counts next to an ordered page read the same rows unordered, only the page must avoid the sort
+    ordered = re.compile(r'\b(?:ORDER|GROUP) BY\b' if query.ordered else '')
+    plans = [explain(connection, sql, parameters) for sql, parameters in statements
+             if table.search(sql) and ordered.search(sql)]
+    assert plans, statements
+    assert all(uses_index(plan, query) for plan in plans), plans
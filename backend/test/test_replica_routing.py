@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from app.utils import db_routing
+from app.utils.db_routing import replica_engines
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {'SQLALCHEMY_REPLICA_URIS': [f"sqlite:///{tmp_path / 'replica.db'}"]}
+
+@pytest.fixture
+def databases(app, make_project):
+    """The same project on the primary and on a replica that has not caught up with its title."""
+    from app import db
+    from app.models import User
+
+    db_routing._lag.clear()
+    with app.app_context():
+        replica = replica_engines()['replica_0']
+        db.metadata.create_all(replica)
+        make_project(title='Solar lamp')
+        db.session.commit()
+        with Session(replica) as session:
+            make_project(session, title='Solar lamp (stale)')
+            session.commit()
+        creator = db.session.get(User, 1)
+    yield creator
+    with app.app_context():
+        db.metadata.drop_all(replica)
+
+def search_title(client):
+    return client.get('/api/v1/projects/search?q=lamp').get_json()['data']['projects'][0]['title']
+
+def test_reads_go_to_the_replica(client, databases):
+    assert search_title(client) == 'Solar lamp (stale)'
+
+def test_writes_and_later_reads_use_the_primary(app, databases):
+    from app import db
+    from app.models import Category
+
+    with app.app_context():
+        with db_routing.replica_session() as session:
+            assert session.get(Category, 1) is not None
+            assert session.get_bind() is replica_engines()['replica_0']
+            session.add(Category(name='Water'))
+            session.flush()
+            assert session.get_bind() is db.engine
+            session.commit()
+        with Session(replica_engines()['replica_0']) as replica:
+            assert replica.query(Category).filter_by(name='Water').count() == 0
+        assert Category.query.filter_by(name='Water').count() == 1
+
+def list_title(client, headers):
+    return client.get('/api/v1/projects/', headers=headers).get_json()['data']['projects'][0]['title']
+
+def test_writer_reads_own_writes(client, databases, auth_headers):
+    headers = auth_headers(databases, 'view_projects')
+    assert list_title(client, headers) == 'Solar lamp (stale)'
+
+    assert client.post('/api/v1/projects/1/save', headers=headers).status_code in (200, 201)
+    assert list_title(client, headers) == 'Solar lamp'
+    # Other users are not affected
+    assert search_title(client) == 'Solar lamp (stale)'
+
+def test_cached_values_are_built_from_the_primary(client, databases, auth_headers):
+    headers = auth_headers(databases, 'view_projects')
+    assert client.get('/api/v1/projects/1', headers=headers).get_json()['data']['title'] == 'Solar lamp'
+
+def test_lagging_replica_falls_back_to_primary(client, databases, monkeypatch):
+    monkeypatch.setattr(db_routing, 'replica_lag', lambda engine: 30.0)
+    assert search_title(client) == 'Solar lamp'
+
+def test_replica_reads_count_against_the_query_budget(client, databases):
+    search_title(client)
+    assert any('FROM projects' in statement for statement in client.queries)
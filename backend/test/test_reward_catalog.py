@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+@pytest.fixture
+def rewards(app, make_project, monkeypatch):
+    """A project with a limited and an unlimited reward."""
+    from app import db
+    from app.models.reward import Reward
+    from app.services.reward_email_service import reward_email_service
+
+    monkeypatch.setattr(reward_email_service, 'notify_reward_update', lambda *args: None)
+    with app.app_context():
+        project = make_project()
+        limited = Reward(project=project, title='Lamp', description='One lamp', minimum_amount=10,
+                         quantity_available=2, quantity_claimed=1)
+        unlimited = Reward(project=project, title='Thanks', description='A thank-you note', minimum_amount=1)
+        db.session.add_all([limited, unlimited])
+        db.session.commit()
+        return project.id, limited.id, unlimited.id
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Count catalog builds, each taking a moment so concurrent misses overlap."""
+    from app.services.reward_catalog_service import RewardCatalogService
+
+    calls = []
+    build = RewardCatalogService.build
+
+    def counted(project_id):
+        calls.append(project_id)
+        time.sleep(0.2)
+        return build(project_id)
+    monkeypatch.setattr(RewardCatalogService, 'build', staticmethod(counted))
+    return calls
+
+def by_title(catalog):
+    return {item['title']: item for item in catalog}
+
+def test_catalog_is_cached_with_availability(app, rewards, builds):
+    from app.services.reward_catalog_service import RewardCatalogService
+
+    project_id, _, _ = rewards
+    service = RewardCatalogService()
+    with app.app_context():
+        catalog = by_title(service.get_catalog(project_id))
+        assert service.get_page(project_id, 2, 1)[0]['title'] == 'Lamp'
+    assert builds == [project_id]
+    assert catalog['Lamp']['quantity_remaining'] == 1 and not catalog['Lamp']['is_sold_out']
+    assert catalog['Thanks']['quantity_remaining'] is None and not catalog['Thanks']['is_sold_out']
+
+def test_concurrent_misses_build_once(app, rewards, builds):
+    from app.services.reward_catalog_service import RewardCatalogService
+
+    project_id, _, _ = rewards
+    results = []
+
+    def read():
+        with app.app_context():
+            results.append(RewardCatalogService().get_catalog(project_id))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    assert builds == [project_id]
+
+def test_writes_invalidate_the_catalog(app, rewards):
+    from app import db
+    from app.services.reward_inventory_service import RewardInventoryService
+    from app.services.reward_service import RewardService
+
+    project_id, limited_id, unlimited_id = rewards
+    service = RewardService()
+    with app.app_context():
+        assert by_title(service.get_project_rewards(project_id, 1, 10))['Lamp']['quantity_remaining'] == 1
+
+        assert RewardInventoryService.try_acquire(db.session, limited_id)
+        db.session.commit()
+        assert by_title(service.get_project_rewards(project_id, 1, 10))['Lamp']['is_sold_out']
+
+        service.update_reward(project_id, unlimited_id, {'title': 'Thank you'})
+        assert 'Thank you' in by_title(service.get_project_rewards(project_id, 1, 10))
+
+        assert service.delete_reward(project_id, unlimited_id)
+        assert list(by_title(service.get_project_rewards(project_id, 1, 10))) == ['Lamp']
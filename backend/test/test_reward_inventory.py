@@ -0,0 +1,132 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+
+@pytest.fixture
+def reward(app, make_project):
+    """A reward limited to two units and a backer."""
+    from app import db
+    from app.models import User
+    from app.models.reward import Reward
+
+    with app.app_context():
+        project = make_project()
+        reward = Reward(project=project, title='Lamp', description='One lamp', minimum_amount=10,
+                        quantity_available=2, quantity_claimed=0)
+        backer = User(username='backer', email='backer@example.com', password_hash='x')
+        db.session.add_all([reward, backer])
+        db.session.commit()
+        return reward.id, backer.id
+
+def claimed(reward_id):
+    from app import db
+    from app.models.reward import Reward
+
+    db.session.expire_all()
+    return db.session.get(Reward, reward_id).quantity_claimed
+
+def test_conditional_update_never_oversells(app, reward):
+    from app import db
+    from app.models.reward import Reward
+    from app.services.reward_inventory_service import RewardInventoryService
+
+    reward_id, _ = reward
+    with app.app_context():
+        engine = db.engine
+        results = []
+
+        def claim():
+            with Session(engine) as session:
+                results.append(RewardInventoryService.try_acquire(session, reward_id))
+                session.commit()
+
+        threads = [threading.Thread(target=claim) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results.count(True) == 2
+        assert claimed(reward_id) == 2
+
+        db.session.get(Reward, reward_id).quantity_available = None
+        db.session.commit()
+        assert RewardInventoryService.try_acquire(db.session, reward_id)
+        db.session.commit()
+        assert claimed(reward_id) == 3
+
+def test_release_gives_the_unit_back_once(app, reward):
+    from app import db
+    from app.models.enums import ReservationStatus
+    from app.services.reward_inventory_service import RewardInventoryService
+
+    reward_id, user_id = reward
+    inventory = RewardInventoryService()
+    with app.app_context():
+        first = inventory.reserve(db.session, reward_id, user_id)
+        assert inventory.reserve(db.session, reward_id, user_id) is not None
+        assert inventory.reserve(db.session, reward_id, user_id) is None
+        db.session.commit()
+
+        assert inventory.release(db.session, reservation_id=first.id, reason='payment_failed')
+        assert not inventory.release(db.session, reservation_id=first.id, reason='payment_failed')
+        db.session.commit()
+        assert claimed(reward_id) == 1
+        db.session.refresh(first)
+        assert first.status == ReservationStatus.RELEASED
+
+def test_expired_holds_are_released(app, reward):
+    from app import db
+    from app.services.reward_inventory_service import RewardInventoryService
+
+    reward_id, user_id = reward
+    inventory = RewardInventoryService()
+    with app.app_context():
+        stale = inventory.reserve(db.session, reward_id, user_id)
+        fresh = inventory.reserve(db.session, reward_id, user_id)
+        stale.expires_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+
+        # Sold out, but the stale hold is swept and its unit handed out again
+        assert inventory.reserve(db.session, reward_id, user_id) is not None
+        db.session.commit()
+        assert claimed(reward_id) == 2
+
+        fresh.expires_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        assert inventory.release_expired() == 1
+        assert claimed(reward_id) == 1
+
+def test_confirm(app, reward):
+    from app import db
+    from app.models.donation import Donation
+    from app.models.reward import Reward
+    from app.models.enums import ReservationStatus
+    from app.services.reward_inventory_service import RewardInventoryService
+
+    reward_id, user_id = reward
+    inventory = RewardInventoryService()
+    with app.app_context():
+        project_id = db.session.get(Reward, reward_id).project_id
+        donations = [Donation(user_id=user_id, project_id=project_id, amount=10, reward_id=reward_id)
+                     for _ in range(3)]
+        db.session.add_all(donations)
+        db.session.flush()
+        paid, late = (inventory.reserve(db.session, reward_id, user_id, donation.id) for donation in donations[:2])
+        db.session.commit()
+
+        assert inventory.confirm(db.session, paid.donation_id)
+        db.session.refresh(paid)
+        assert paid.status == ReservationStatus.CONFIRMED
+
+        # The checkout completed after its hold was swept and the unit went to someone else
+        inventory.release(db.session, donation_id=late.donation_id, reason='expired')
+        assert inventory.reserve(db.session, reward_id, user_id, donations[2].id) is not None
+        db.session.commit()
+        assert inventory.confirm(db.session, late.donation_id)
+        db.session.commit()
+        # The backer has paid, so the claim is honoured even though it oversells
+        assert claimed(reward_id) == 3
+        assert inventory.get_for_donation(db.session, late.donation_id).status == ReservationStatus.CONFIRMED
@@ -0,0 +1,99 @@
+import hashlib
+import os
+
+import pytest
+
+moto = pytest.importorskip('moto')
+requests = pytest.importorskip('requests')
+
+BUCKET = 'media'
+CONTENT = os.urandom(64 * 1024)
+CHECKSUM = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture
+def app_config():
+    return {
+        'STORAGE_BACKEND': 's3',
+        'STORAGE_S3_BUCKET': BUCKET,
+        'STORAGE_S3_PUBLIC_URL': 'https://cdn.example.com/',
+        'STORAGE_S3_REGION': 'us-east-1',
+        'STORAGE_S3_ACCESS_KEY_ID': 'testing',
+        'STORAGE_S3_SECRET_ACCESS_KEY': 'testing',
+    }
+
+@pytest.fixture
+def s3(app):
+    import boto3
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+@pytest.fixture
+def headers(app, auth_headers):
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        user = User(username='uploader', email='uploader@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        return auth_headers(db.session.get(User, user.id), 'upload_media')
+
+def start(client, headers, total_size=len(CONTENT)):
+    response = client.post('/api/v1/uploads/direct', json={'filename': 'pitch.mp4', 'total_size': total_size,
+                                                           'checksum': CHECKSUM}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['data']
+
+def put(upload):
+    request = upload['upload']
+    return requests.put(request['url'], data=CONTENT, headers=request['headers'])
+
+def test_direct_upload(app, client, s3, headers):
+    from app import db
+    from app.models.media import MediaBlob
+
+    upload = start(client, headers)
+    key = f'videos/{CHECKSUM[:2]}/{CHECKSUM[2:4]}/{CHECKSUM}.mp4'
+    assert upload['upload']['method'] == 'PUT'
+    assert f'/{BUCKET}/{key}' in upload['upload']['url']
+
+    # Completing before the client sent the file
+    response = client.post(f"/api/v1/uploads/{upload['id']}/complete", headers=headers)
+    assert response.status_code == 409
+
+    assert put(upload).status_code == 200
+    stored = s3.get_object(Bucket=BUCKET, Key=key)
+    assert stored['Body'].read() == CONTENT
+    assert stored['CacheControl'] == 'public, max-age=31536000, immutable'
+
+    response = client.post(f"/api/v1/uploads/{upload['id']}/complete", headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['status'] == 'COMPLETED'
+    assert data['url'] == f'https://cdn.example.com/{key}'
+    with app.app_context():
+        assert db.session.get(MediaBlob, CHECKSUM).size == len(CONTENT)
+
+    # The same content is not sent again
+    again = start(client, headers)
+    assert again['status'] == 'COMPLETED' and 'upload' not in again
+
+def test_size_mismatch_discards_the_upload(client, s3, headers):
+    # Declared small enough to pass the size limit, then a larger body is sent
+    upload = start(client, headers, total_size=1024)
+    assert put(upload).status_code == 200
+
+    response = client.post(f"/api/v1/uploads/{upload['id']}/complete", headers=headers)
+    assert response.status_code == 422
+    assert client.get(f"/api/v1/uploads/{upload['id']}", headers=headers).get_json()['data']['status'] == 'ABORTED'
+    assert s3.list_objects_v2(Bucket=BUCKET).get('KeyCount') == 0
+
+def test_filesystem_backend_cannot_presign(client, headers, app):
+    app.config['STORAGE_BACKEND'] = 'filesystem'
+    app.extensions.pop('media_storage', None)
+    response = client.post('/api/v1/uploads/direct', json={'filename': 'pitch.mp4', 'total_size': len(CONTENT),
+                                                          'checksum': CHECKSUM}, headers=headers)
+    assert response.status_code == 501
@@ -0,0 +1,42 @@
+import sys
+
+import pytest
+
+from app.utils.lazy_import import lazy_module, when_imported
+
+@pytest.fixture
+def make_app(tmp_path):
+    from app import create_app
+
+    def make(**config):
+        return create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'CACHE_TYPE': 'SimpleCache',
+            # Nothing listens there
+            'REDIS_URL': 'redis://127.0.0.1:1/0',
+            **config,
+        })
+    return make
+
+def test_starts_without_redis(make_app):
+    app = make_app(REDIS_PING_ON_STARTUP=True)
+    assert 'projects' in app.blueprints
+
+def test_lazy_blueprints(make_app):
+    app = make_app(LAZY_BLUEPRINTS=True)
+    assert 'projects' not in app.blueprints
+
+    response = app.test_client().get('/api/v1/projects/discovery?fields=nope')
+    assert response.status_code == 400
+    assert 'projects' in app.blueprints
+
+def test_lazy_module(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'colorsys', raising=False)
+    loaded = []
+    colorsys = lazy_module('colorsys')
+    when_imported('colorsys', loaded.append)
+    assert 'colorsys' not in sys.modules and not loaded
+
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert loaded == [sys.modules['colorsys']]
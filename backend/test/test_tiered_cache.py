@@ -0,0 +1,179 @@
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from app.utils.tiered_cache import TieredCache, _raw_client
+
+@pytest.fixture
+def caches(redis_client):
+    """Two caches on the same Redis, like two worker processes."""
+    raw = _raw_client(redis_client)
+    return TieredCache(raw, lock_wait=5), TieredCache(raw, lock_wait=5)
+
+class Builder:
+    def __init__(self, value, delay=0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+def wait_for(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+def test_tiers_and_copies(caches):
+    first, second = caches
+    build = Builder({'total': Decimal('10.50'), 'items': [1, 2]})
+
+    value = first.get_or_set('stats', 1, build, tags=['project:1'])
+    value['items'].append(3)
+    assert first.get_or_set('stats', 1, build, tags=['project:1']) == {'total': Decimal('10.50'), 'items': [1, 2]}
+    assert second.get_or_set('stats', 1, build, tags=['project:1'])['total'] == Decimal('10.50')
+    assert build.calls == 1
+
+def test_tag_invalidation_reaches_other_processes(caches):
+    first, second = caches
+    build = Builder('v1')
+    first.get_or_set('detail', 7, build, tags=['project:7'])
+    second.get_or_set('detail', 7, build, tags=['project:7'])
+    assert wait_for(lambda: second._listener is not None and second._listener.is_alive())
+    time.sleep(0.2)
+
+    build.value = 'v2'
+    first.invalidate('project:7')
+    assert first.get_or_set('detail', 7, build, tags=['project:7']) == 'v2'
+    assert wait_for(lambda: second.get_or_set('detail', 7, build, tags=['project:7']) == 'v2')
+    assert build.calls == 2
+
+def test_stale_build_is_not_served(caches):
+    first, _ = caches
+    build = Builder('stale')
+
+    def build_then_write():
+        value = build()
+        # A write commits while the value is being computed
+        first.invalidate('project:3')
+        return value
+
+    assert first.get_or_set('detail', 3, build_then_write, tags=['project:3']) == 'stale'
+    build.value = 'fresh'
+    assert first.get_or_set('detail', 3, build, tags=['project:3']) == 'fresh'
+
+def test_concurrent_misses_build_once(caches):
+    first, second = caches
+    build = Builder('value', delay=0.3)
+    results = []
+
+    def read(cache):
+        results.append(cache.get_or_set('slow', 1, build, tags=['project:1']))
+
+    # Four threads in each of two processes
+    threads = [threading.Thread(target=read, args=(caches[index % 2],)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['value'] * 8
+    assert build.calls == 1
+
+def test_expired_entries_are_served_while_refreshing(caches):
+    first, second = caches
+    build = Builder('v1', delay=0.2)
+    first.get_or_set('stats', 5, build, tags=['project:5'], ttl=1, stale_ttl=30)
+    time.sleep(1.1)
+
+    build.value = 'v2'
+    started = time.monotonic()
+    assert first.get_or_set('stats', 5, build, tags=['project:5'], ttl=1, stale_ttl=30) == 'v1'
+    assert time.monotonic() - started < 0.2
+    first.wait_for_refreshes()
+    assert second.get_or_set('stats', 5, build, tags=['project:5'], ttl=1, stale_ttl=30) == 'v2'
+    assert build.calls == 2
+
+def test_invalidated_entries_are_not_served_stale(caches):
+    first, _ = caches
+    build = Builder('v1')
+    first.get_or_set('stats', 6, build, tags=['project:6'], stale_ttl=30)
+    build.value = 'v2'
+    first.invalidate('project:6')
+    assert first.get_or_set('stats', 6, build, tags=['project:6'], stale_ttl=30) == 'v2'
+
+def test_errors_are_not_cached(caches):
+    first, _ = caches
+    build = Builder({'error': 'Project not found', 'status_code': 404})
+    first.get_or_set('stats', 9, build)
+    first.get_or_set('stats', 9, build)
+    assert build.calls == 2
+
+def test_local_tier_is_bounded(redis_client):
+    cache = TieredCache(_raw_client(redis_client), local_size=2)
+    for key in range(5):
+        cache.get_or_set('bounded', key, Builder(key))
+    assert len(cache._local) == 2
+
+def test_committed_donation_invalidates_backer_stats(app, make_project):
+    from app import db
+    from app.models.donation import Donation
+    from app.models.enums import DonationStatus
+    from app.services.backer_service import BackerService
+
+    with app.app_context():
+        project = make_project(title='Lamp')
+        db.session.commit()
+
+        service = BackerService()
+        assert service.get_public_backer_stats(project.id)['total_amount'] == 0
+
+        db.session.add(Donation(user_id=project.creator_id, project_id=project.id, amount=Decimal(25),
+                                status=DonationStatus.COMPLETED))
+        db.session.commit()
+        assert service.get_public_backer_stats(project.id)['total_amount'] == 25.0
+
+def test_categories_endpoint_reflects_updates(app, client, auth_headers):
+    from app import db
+    from app.models import User, Category
+    from app.services.category_service import update_category
+
+    with app.app_context():
+        user = User(username='viewer', email='viewer@example.com', password_hash='x')
+        category = Category(name='Energy')
+        db.session.add_all([user, category])
+        db.session.commit()
+        user, category_id = db.session.get(User, user.id), category.id
+
+    headers = auth_headers(user, 'view_categories')
+    assert client.get('/api/v1/categories/', headers=headers).get_json()['data'] == [
+        {'id': category_id, 'name': 'Energy'}
+    ]
+    with app.app_context():
+        update_category(category_id, 'Solar')
+    assert client.get('/api/v1/categories/', headers=headers).get_json()['data'][0]['name'] == 'Solar'
+    assert client.get(f'/api/v1/categories/{category_id}').get_json()['name'] == 'Solar'
+    assert client.get('/api/v1/categories/999').status_code == 404
+
+def test_build_lock_is_only_released_by_its_holder(caches):
+    from app.utils.tiered_cache import _lock_key
+
+    first, second = caches
+    lock_key = _lock_key('stats', 1)
+    token = first._acquire_lock('stats', 1)
+    assert token and second._acquire_lock('stats', 1) is None
+
+    # The first build outlived the lock and another caller took it over
+    first.redis.delete(lock_key)
+    other = second._acquire_lock('stats', 1)
+    first._release_lock('stats', 1, token)
+    assert first.redis.get(lock_key) == other.encode()
+
+    second._release_lock('stats', 1, other)
+    assert first.redis.get(lock_key) is None
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from werkzeug.exceptions import ClientDisconnected
+
+CONTENT = os.urandom(300 * 1024)
+CHECKSUM = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture
+def uploader(app):
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        user = User(username='uploader', email='uploader@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        return db.session.get(User, user.id)
+
+@pytest.fixture
+def headers(uploader, auth_headers):
+    return auth_headers(uploader, 'upload_media')
+
+def start(client, headers, checksum=CHECKSUM, size=len(CONTENT)):
+    response = client.post('/api/v1/uploads', json={'filename': 'pitch.mp4', 'total_size': size,
+                                                    'checksum': checksum}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()['data']['id']
+
+def append(client, headers, upload_id, offset, chunk):
+    return client.patch(f'/api/v1/uploads/{upload_id}', data=chunk,
+                        headers={**headers, 'Upload-Offset': str(offset)})
+
+def stored_path(app, url):
+    from app.utils.storage import get_storage
+
+    with app.app_context():
+        return get_storage().stage_path(url.split('/uploads/', 1)[1])
+
+def test_resume_after_interrupted_chunk(app, client, headers, uploader):
+    from app.services.upload_service import UploadService
+
+    upload_id = start(client, headers)
+
+    class Dropped(io.BytesIO):
+        """The client went away after sending part of the chunk."""
+        def read(self, size=-1):
+            if self.tell() >= 100 * 1024:
+                raise ClientDisconnected()
+            return super().read(min(size, 100 * 1024 - self.tell()))
+
+    with app.app_context():
+        result = UploadService().append_chunk(upload_id, uploader.id, 0, Dropped(CONTENT[:200 * 1024]), 200 * 1024)
+    assert result['received_size'] == 100 * 1024
+
+    response = client.get(f'/api/v1/uploads/{upload_id}', headers=headers)
+    offset = int(response.headers['Upload-Offset'])
+    assert offset == 100 * 1024
+
+    # A chunk sent at a stale offset is refused with the offset to resume from
+    response = append(client, headers, upload_id, 0, CONTENT[:1024])
+    assert response.status_code == 409
+    assert response.headers['Upload-Offset'] == str(offset)
+
+    assert client.post(f'/api/v1/uploads/{upload_id}/complete', headers=headers).status_code == 409
+
+    assert append(client, headers, upload_id, offset, CONTENT[offset:]).headers['Upload-Offset'] == str(len(CONTENT))
+    response = client.post(f'/api/v1/uploads/{upload_id}/complete', headers=headers)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['status'] == 'COMPLETED'
+    assert CHECKSUM in data['url']
+    with open(stored_path(app, data['url']), 'rb') as stored:
+        assert stored.read() == CONTENT
+
+    with app.app_context():
+        assert UploadService.resolve_upload_url(upload_id, uploader.id, {'mp4'}) == data['url']
+
+def test_checksum_mismatch_discards_the_upload(client, headers):
+    upload_id = start(client, headers, checksum='0' * 64)
+    append(client, headers, upload_id, 0, CONTENT)
+    response = client.post(f'/api/v1/uploads/{upload_id}/complete', headers=headers)
+    assert response.status_code == 422
+    assert client.get(f'/api/v1/uploads/{upload_id}', headers=headers).get_json()['data']['status'] == 'ABORTED'
+
+def test_chunks_are_checked_against_the_session(client, headers, auth_headers, app):
+    from app import db
+    from app.models import User
+
+    upload_id = start(client, headers, size=10)
+    assert append(client, headers, upload_id, 0, b'x' * 11).status_code == 400
+
+    with app.app_context():
+        other = User(username='other', email='other@example.com', password_hash='x')
+        db.session.add(other)
+        db.session.commit()
+        other = db.session.get(User, other.id)
+    assert append(client, auth_headers(other, 'upload_media'), upload_id, 0, b'x').status_code == 404
+
+    assert client.delete(f'/api/v1/uploads/{upload_id}', headers=headers).status_code == 200
+    assert append(client, headers, upload_id, 0, b'x').status_code == 409
+
+def test_racing_appends_write_one_chunk(app, client, headers, uploader):
+    from app import db
+    from app.models.upload_session import UploadSession
+    from app.services.upload_service import UploadService
+
+    upload_id = start(client, headers)
+    rival = []
+
+    class Racing(io.BytesIO):
+        """Another append of the same offset arrives while this chunk is being written."""
+        def read(self, size=-1):
+            if not rival:
+                rival.append(UploadService().append_chunk(upload_id, uploader.id, 0, io.BytesIO(b'x' * 1024), 1024))
+            return super().read(size)
+
+    with app.app_context():
+        result = UploadService().append_chunk(upload_id, uploader.id, 0, Racing(CONTENT[:1024]), 1024)
+        assert rival[0]['status_code'] == 409
+        assert result['received_size'] == 1024
+        with open(UploadService.part_path(db.session.get(UploadSession, upload_id)), 'rb') as part:
+            assert part.read(1024) == CONTENT[:1024]
+
+    class Stalled(io.BytesIO):
+        """The chunk outlives its claim and another append takes the offset over."""
+        def read(self, size=-1):
+            if not rival[1:]:
+                time.sleep(0.01)
+                app.config['UPLOAD_CHUNK_CLAIM_TIMEOUT'] = 600
+                rival.append(UploadService().append_chunk(upload_id, uploader.id, 1024,
+                                                          io.BytesIO(CONTENT[1024:2048]), 1024))
+            return super().read(size)
+
+    app.config['UPLOAD_CHUNK_CLAIM_TIMEOUT'] = 0
+    with app.app_context():
+        result = UploadService().append_chunk(upload_id, uploader.id, 1024, Stalled(b'y' * 1024), 1024)
+        assert rival[1]['received_size'] == 2048
+        assert result['status_code'] == 409
+        assert result['received_size'] == 2048
+        with open(UploadService.part_path(db.session.get(UploadSession, upload_id)), 'rb') as part:
+            assert part.read(2048) == CONTENT[:2048]
@@ -0,0 +1,12 @@
+"""
+WSGI entry point for production servers (see gunicorn.conf.py).
+
+run.py starts the Flask development server instead.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app
+
+app = create_app()